@@ -14,18 +14,34 @@ See the License for the specific language governing permissions and
 limitations under the License.
 '''
 import os
+import sys
+import json
+import time
 import shutil
+import itertools
+import csv
+import xml.etree.ElementTree as ET
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tests', 'common'))
+import log_utils as logs
+from process_utils import run_command
 
-# Copy related test folder into temp
-def copy_test_folder_ci (test_id, ci_test_folder, test_folder):
+# Copy related test folder into temp (temp/tests, or the folder given by temp_dir)
+def copy_test_folder_ci (test_id, ci_test_folder, test_folder, temp_dir="temp/tests"):
 
-    test_dest_folder = str(ci_test_folder)+"/temp/tests/ci_test_"+str(test_id)
+    test_dest_folder = str(ci_test_folder)+"/"+temp_dir+"/ci_test_"+str(test_id)
     if not os.path.exists(test_dest_folder):
         os.mkdir(test_dest_folder)
     os.chdir(test_dest_folder)
     shutil.copytree(test_folder, test_dest_folder, dirs_exist_ok=True)
 
 
+# Copy the utilities shared by the tests (tests/common) next to the copies of the tests (temp/tests, or the folder given by temp_dir)
+def copy_common_ci (ci_test_folder, common_folder, temp_dir="temp/tests"):
+
+    common_dest_folder = str(ci_test_folder)+"/"+temp_dir+"/common"
+    shutil.copytree(common_folder, common_dest_folder, dirs_exist_ok=True, ignore=shutil.ignore_patterns('__pycache__'))
+
+
 # Copy the trainlib into the suitable position
 def copy_trainlib_ci (ci_test_folder, trainlib_folder):
 
@@ -34,3 +50,487 @@ def copy_trainlib_ci (ci_test_folder, trainlib_folder):
     shutil.copytree(trainlib_folder, trainlib_dest_folder, dirs_exist_ok=True)
 
 
+
+"""
+PARALLEL TEST RUNNER
+"""
+
+
+
+# Load the test matrix (TOML)
+def load_test_matrix (matrix_file):
+
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            print("[ci_utils.load_test_matrix]: Reading the test matrix requires Python >= 3.11 (or the tomli package)!")
+            exit()
+
+    f = open(matrix_file, "rb")
+    matrix = tomllib.load(f)
+    f.close()
+
+    return matrix
+
+
+# Expand the entries of the test matrix into the list of tests (in order)
+def expand_test_matrix (matrix):
+
+    tests = []
+    labels = matrix.get('labels', {})
+    for entry in matrix.get('test', []):
+        for field in ['name', 'folder', 'data_type']:
+            if field not in entry:
+                print("[ci_utils.expand_test_matrix]: Missing field '{}' in test entry {}!".format(field, entry))
+                exit()
+        matrix_vars = entry.get('matrix', {})
+        for values in itertools.product(*matrix_vars.values()):
+            make_vars = dict(entry.get('vars', {}))
+            make_vars.update(zip(matrix_vars.keys(), values))
+            if 'matmul' in entry:
+                make_vars['MATMUL_TYPE'] = entry['matmul']
+            # Names of the values of the variables
+            name_fields = {'data_type': entry['data_type']}
+            for var, value in make_vars.items():
+                name_fields[var] = labels.get(var, {}).get(str(value), value)
+            args = " ".join(["{}={}".format(var, value) for var, value in make_vars.items()])
+            test = {
+                'id'        : len(tests),
+                'name'      : entry['name'].format(**name_fields),
+                'folder'    : entry['folder'],
+                'data_type' : entry['data_type'],
+                'matmul'    : entry.get('matmul', 0),
+                'tolerance' : entry.get('tolerance'),
+                'vars'      : make_vars,
+                'command'   : "rm -rf BUILD/; make clean get_golden all run {} > log.txt 2>&1".format(args)
+            }
+            tests.append(test)
+
+    return tests
+
+
+# Run a test in its own copy of the test folder (the whole process group is killed on timeout)
+def run_ci_test (test, ci_test_folder, test_cwd, timeout, temp_dir="temp/tests"):
+
+    start = time.time()
+    result = dict(test)
+    test_dest_folder = str(ci_test_folder)+"/"+temp_dir+"/ci_test_"+str(test['id'])
+    result['cycles'] = None
+    result['records'] = []
+    result['errors'] = 0
+    result['message'] = ''
+
+    try:
+        if os.path.exists(test_dest_folder):
+            shutil.rmtree(test_dest_folder)
+        copy_test_folder_ci(test['id'], ci_test_folder, test_cwd + "/" + test['folder'], temp_dir)
+    except (OSError, shutil.Error) as e:
+        result['status'] = 'ERROR'
+        result['returncode'] = 1
+        result['message'] = "Unable to copy the test folder: {}".format(e)
+        result['time'] = time.time() - start
+        return result
+
+    returncode, _, _, timed_out = run_command(test['command'], test_dest_folder, timeout)
+    result['returncode'] = returncode
+
+    # Read the results from the log
+    log_file = test_dest_folder + "/log.txt"
+    if os.path.exists(log_file):
+        records, errors = logs.parse_log_file(log_file)
+        result['cycles'] = logs.first_record(records).get('cycles')
+        result['records'] = records
+        result['errors'] += errors
+
+    if timed_out == True:
+        result['status'] = 'TIMEOUT'
+        result['message'] = "TIMEOUT after {}s".format(timeout)
+    elif returncode != 0:
+        result['status'] = 'FAIL'
+        result['message'] = "Build or run failed with return code {}".format(returncode)
+    elif result['errors'] > 0:
+        result['status'] = 'FAIL'
+        result['message'] = "{} errors with respect to the golden model".format(result['errors'])
+    elif result['cycles'] is None:
+        result['status'] = 'FAIL'
+        result['message'] = "No performance counters found in log.txt"
+    else:
+        result['status'] = 'PASS'
+    result['time'] = time.time() - start
+
+    print("Test ({}) {}: {} in {:.2f}s".format(test['id'], test['name'], result['status'], result['time']))
+
+    return result
+
+
+# Run a test given as run_ci_test arguments (for the process pool)
+def run_ci_test_args (test_args):
+
+    return run_ci_test(*test_args)
+
+
+# Load the finished tests from the checkpoint file (one JSON record per line, indexed by test id)
+def load_checkpoint (checkpoint_file):
+
+    finished = {}
+    if not os.path.exists(checkpoint_file):
+        return finished
+    f = open(checkpoint_file, "r")
+    for line in f:
+        try:
+            result = json.loads(line)
+        except ValueError:
+            # Record interrupted while being written
+            continue
+        finished[result['id']] = result
+    f.close()
+
+    return finished
+
+
+# Append a finished test to the checkpoint file
+def append_checkpoint (checkpoint_file, result):
+
+    f = open(checkpoint_file, "a")
+    f.write(json.dumps(result) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+
+# Write the results of the test suite in JSON
+def write_json_results (json_file, results, total_time):
+
+    summary = {
+        'tests'     : len(results),
+        'passed'    : len([result for result in results if result['status'] == 'PASS']),
+        'failed'    : len([result for result in results if result['status'] != 'PASS']),
+        'time'      : total_time,
+        'results'   : results
+    }
+    f = open(json_file, "w")
+    json.dump(summary, f, indent=2)
+    f.close()
+
+
+# Write the results of the test suite in JUnit XML
+def write_junit_results (junit_file, results, total_time):
+
+    suite = ET.Element('testsuite', name='pulp-trainlib-ci', tests=str(len(results)), time="{:.3f}".format(total_time),
+                       failures=str(len([result for result in results if result['status'] in ['FAIL', 'TIMEOUT', 'REGRESSION', 'NO_BASELINE']])),
+                       errors=str(len([result for result in results if result['status'] == 'ERROR'])))
+    for result in results:
+        case = ET.SubElement(suite, 'testcase', classname=result['folder'], name="({}) {}".format(result['id'], result['name']),
+                             time="{:.3f}".format(result['time']))
+        if result['status'] == 'ERROR':
+            ET.SubElement(case, 'error', message=result['message'])
+        elif result['status'] != 'PASS':
+            failure = ET.SubElement(case, 'failure', message=result['message'])
+            failure.text = result['command']
+        else:
+            ET.SubElement(case, 'system-out').text = "cycles = {}".format(result['cycles'])
+    ET.ElementTree(suite).write(junit_file, encoding='utf-8', xml_declaration=True)
+
+
+
+"""
+PERFORMANCE BASELINES
+"""
+# Counters which are stored in the baselines and compared (the status of a test depends on the cycles only)
+BASELINE_COUNTERS = ['cycles', 'instr', 'ld_stalls', 'TCDM_cont']
+
+
+
+# Key of a test in the baselines (folder and make variables, independent of the position in the test matrix)
+def baseline_key (test):
+
+    return test['folder'] + "|" + " ".join(["{}={}".format(var, value) for var, value in test['vars'].items()])
+
+
+# Load the baselines ({'tests': {key: {'name': ..., 'records': [counters of each profiled region]}}})
+def load_baselines (baseline_file):
+
+    if not os.path.exists(baseline_file):
+        return {'tests': {}}
+    f = open(baseline_file, "r")
+    baselines = json.load(f)
+    f.close()
+    if 'tests' not in baselines:
+        print("[ci_utils.load_baselines]: Invalid baseline file {}!".format(baseline_file))
+        exit()
+
+    return baselines
+
+
+# Store the counters of the passed tests as the new baselines (the other tests keep their baseline)
+def bless_baselines (baseline_file, results):
+
+    baselines = load_baselines(baseline_file)
+    blessed = 0
+    for result in results:
+        if result['status'] != 'PASS':
+            continue
+        records = []
+        for record in result.get('records', []):
+            records.append(dict([['region', record['region']]] + [[counter, record[counter]] for counter in BASELINE_COUNTERS if counter in record]))
+        baselines['tests'][baseline_key(result)] = {'name': result['name'], 'records': records}
+        blessed += 1
+    baselines['tests'] = dict(sorted(baselines['tests'].items()))
+    f = open(baseline_file, "w")
+    json.dump(baselines, f, indent=2)
+    f.write("\n")
+    f.close()
+
+    return blessed
+
+
+# Relative difference of a counter with respect to its baseline (None if not available)
+def relative_delta (value, baseline):
+
+    if value is None or baseline is None:
+        return None
+    if baseline == 0:
+        return 0.0 if value == 0 else None
+
+    return (value - baseline) / baseline
+
+
+# Compare the counters of each profiled region of the passed tests with the baselines. The status of a region is
+# REGRESSION (IMPROVEMENT) if its cycles grew (dropped) by more than the tolerance of the test (the tolerance
+# field of its entry in the test matrix, or the default), NEW if it has no baseline, OK otherwise.
+# The status of the tests with a regression is set to REGRESSION, the one of the tests without a baseline
+# to NO_BASELINE (both count as failed, so that a missing baseline cannot hide a regression). Returns the rows of the comparison.
+def compare_baselines (results, baselines, tolerance):
+
+    rows = []
+    for result in results:
+        if result['status'] != 'PASS':
+            continue
+        test_tolerance = result.get('tolerance') if result.get('tolerance') is not None else tolerance
+        baseline = baselines['tests'].get(baseline_key(result))
+        worst = None
+        for idx, record in enumerate(result.get('records', [])):
+            row = {
+                'id'        : result['id'],
+                'name'      : result['name'],
+                'region'    : record['region'] if record['region'] != '' else "#{}".format(idx),
+                'tolerance' : test_tolerance,
+                'status'    : 'NEW'
+            }
+            for counter in BASELINE_COUNTERS:
+                row[counter] = record.get(counter)
+                row['delta_' + counter] = None
+            if baseline is not None and idx < len(baseline['records']):
+                for counter in BASELINE_COUNTERS:
+                    row['delta_' + counter] = relative_delta(record.get(counter), baseline['records'][idx].get(counter))
+                delta = row['delta_cycles']
+                if delta is None:
+                    row['status'] = 'OK'
+                elif delta > test_tolerance:
+                    row['status'] = 'REGRESSION'
+                    if worst is None or delta > worst['delta_cycles']:
+                        worst = row
+                elif delta < -test_tolerance:
+                    row['status'] = 'IMPROVEMENT'
+                else:
+                    row['status'] = 'OK'
+            rows.append(row)
+        if baseline is None:
+            result['status'] = 'NO_BASELINE'
+            result['message'] = "No baseline for this test, bless it with --bless and commit the baselines"
+        elif worst is not None:
+            result['status'] = 'REGRESSION'
+            result['message'] = "{}: cycles {:+.1%} with respect to the baseline (tolerance {:.1%})".format(worst['region'], worst['delta_cycles'], test_tolerance)
+
+    # Ranked from the worst regression to the best improvement
+    rows.sort(key=lambda row: -row['delta_cycles'] if row['delta_cycles'] is not None else 0)
+
+    return rows
+
+
+# Format a relative difference of the regression report
+def format_delta (value):
+
+    return "{:+.1%}".format(value) if value is not None else "-"
+
+
+# Write the ranked regression/improvement report
+def write_regression_report (report_file, rows, tolerance):
+
+    header = "{:<6}{:<50}{:<14}{:>12}{:>10}{:>10}{:>10}{:>10}{:>8}\n".format("id", "test", "region", "cycles", "d_cycles", "d_instr", "d_stalls", "d_TCDM", "tol")
+    f = open(report_file, "w")
+    f.write("PERFORMANCE WITH RESPECT TO THE BASELINES (default tolerance: {:.1%})\n".format(tolerance))
+    for status, title in [['REGRESSION', "REGRESSIONS"], ['IMPROVEMENT', "IMPROVEMENTS"], ['OK', "WITHIN TOLERANCE"], ['NEW', "WITHOUT BASELINE"]]:
+        status_rows = [row for row in rows if row['status'] == status]
+        f.write("\n\n{} ({})\n".format(title, len(status_rows)))
+        if len(status_rows) == 0:
+            continue
+        f.write(header)
+        if status == 'IMPROVEMENT':
+            status_rows.reverse()
+        for row in status_rows:
+            f.write("{:<6}{:<50}{:<14}{:>12}{:>10}{:>10}{:>10}{:>10}{:>8}\n".format(row['id'], row['name'][:49], row['region'][:13],
+                    row['cycles'] if row['cycles'] is not None else "-", format_delta(row['delta_cycles']), format_delta(row['delta_instr']),
+                    format_delta(row['delta_ld_stalls']), format_delta(row['delta_TCDM_cont']), "{:.1%}".format(row['tolerance'])))
+    f.close()
+
+
+
+"""
+MULTI-CORE SCALING
+"""
+
+
+
+# Expand the entries of the test matrix into the list of tests, each one for all the numbers of cores
+# (NUM_CORES is the last matrix variable, so that the runs of the same test are consecutive)
+def expand_scaling_matrix (matrix, cores):
+
+    scaling_matrix = dict(matrix)
+    scaling_matrix['test'] = []
+    for entry in matrix.get('test', []):
+        entry = dict(entry)
+        entry['vars'] = dict([[var, value] for var, value in entry.get('vars', {}).items() if var != 'NUM_CORES'])
+        entry['matrix'] = dict([[var, values] for var, values in entry.get('matrix', {}).items() if var != 'NUM_CORES'])
+        entry['matrix']['NUM_CORES'] = list(cores)
+        scaling_matrix['test'].append(entry)
+
+    tests = expand_test_matrix(scaling_matrix)
+    for test in tests:
+        test['cores'] = int(test['vars']['NUM_CORES'])
+        # Runs of the same test with a different number of cores
+        test['group'] = test['folder'] + "|" + " ".join(["{}={}".format(var, value) for var, value in test['vars'].items() if var != 'NUM_CORES'])
+        test['label'] = test['name']
+        test['name'] = "{} ({} core{})".format(test['label'], test['cores'], "s" if test['cores'] > 1 else "")
+
+    return tests
+
+
+# Ratio of two counters (None if not available)
+def counter_ratio (num, den):
+
+    if num is None or den is None or den == 0:
+        return None
+
+    return num / den
+
+
+# Compute the scaling of each profiled region of each test with respect to its run on the least number of cores:
+# - speedup = cycles(base) / cycles(N), efficiency = speedup * base / N
+# - tcdm_cont = TCDM contention cycles / cycles
+# - idle = (cycles - active cycles) / cycles of the core which prints the counters, i.e. the time it waits
+#   at the barriers (or for the DMA) for the other cores
+# - work_share = instr(N) * N / (instr(base) * base), instructions of the core which prints the counters with
+#   respect to an even split of the work (> 1 if it executes more than its share, e.g. the remainder of the split)
+# A region is flagged if its efficiency is below the threshold.
+def compute_scaling (results, threshold):
+
+    groups = {}
+    for result in results:
+        groups.setdefault(result['group'], []).append(result)
+
+    rows = []
+    for group in groups.values():
+        group = sorted(group, key=lambda result: result['cores'])
+        passed = [result for result in group if result['status'] == 'PASS']
+        base = passed[0] if len(passed) > 0 else None
+        # Rows of the group as [index of the region, row], sorted by region and number of cores
+        group_rows = []
+        for result in group:
+            row = {
+                'id'        : result['id'],
+                'name'      : result['name'],
+                'label'     : result['label'],
+                'group'     : result['group'],
+                'folder'    : result['folder'],
+                'cores'     : result['cores'],
+                'status'    : result['status'],
+                'region'    : '',
+                'cycles'    : None,
+                'speedup'   : None,
+                'efficiency': None,
+                'tcdm_cont' : None,
+                'idle'      : None,
+                'work_share': None,
+                'flag'      : result['status'] if result['status'] != 'PASS' else ''
+            }
+            if result['status'] != 'PASS':
+                group_rows.append([0, row])
+                continue
+            for idx, record in enumerate(result['records']):
+                row = dict(row)
+                row['region'] = record['region'] if record['region'] != '' else "#{}".format(idx)
+                row['cycles'] = record.get('cycles')
+                row['tcdm_cont'] = counter_ratio(record.get('TCDM_cont'), record.get('cycles'))
+                if record.get('active') is not None:
+                    row['idle'] = counter_ratio(record.get('cycles') - record['active'], record.get('cycles'))
+                if idx < len(base['records']):
+                    base_record = base['records'][idx]
+                    row['speedup'] = counter_ratio(base_record.get('cycles'), record.get('cycles'))
+                    if row['speedup'] is not None:
+                        row['efficiency'] = row['speedup'] * base['cores'] / result['cores']
+                    if record.get('instr') is not None:
+                        row['work_share'] = counter_ratio(record['instr'] * result['cores'], base_record.get('instr', 0) * base['cores'])
+                if result['cores'] > base['cores'] and row['efficiency'] is not None and row['efficiency'] < threshold:
+                    row['flag'] = 'LOW_EFFICIENCY'
+                group_rows.append([idx, row])
+        group_rows.sort(key=lambda group_row: group_row[0])
+        rows += [row for idx, row in group_rows]
+
+    return rows
+
+
+# Format a ratio of the scaling report
+def format_ratio (value, fmt="{:.2f}"):
+
+    return fmt.format(value) if value is not None else "-"
+
+
+# Write the scaling report (one table for each test)
+def write_scaling_report (report_file, rows, cores, threshold):
+
+    f = open(report_file, "w")
+    f.write("MULTI-CORE SCALING (cores: {}, efficiency threshold: {:.2f})\n".format(", ".join([str(core) for core in cores]), threshold))
+    f.write("speedup and efficiency w.r.t. the run on the least number of cores, TCDM = contention cycles / cycles,\n")
+    f.write("idle = non-active cycles / cycles, share = instructions w.r.t. an even split of the work\n")
+    group = None
+    for row in rows:
+        if row['group'] != group:
+            group = row['group']
+            f.write("\n\n{} [{}]\n".format(row['label'], row['folder']))
+            f.write("{:<20}{:>6}{:>12}{:>9}{:>12}{:>8}{:>8}{:>8}  {}\n".format("region", "cores", "cycles", "speedup", "efficiency", "TCDM", "idle", "share", "flag"))
+        f.write("{:<20}{:>6}{:>12}{:>9}{:>12}{:>8}{:>8}{:>8}  {}\n".format(row['region'][:19], row['cores'],
+                row['cycles'] if row['cycles'] is not None else "-", format_ratio(row['speedup']), format_ratio(row['efficiency']),
+                format_ratio(row['tcdm_cont'], "{:.1%}"), format_ratio(row['idle'], "{:.1%}"), format_ratio(row['work_share']), row['flag']))
+    f.close()
+
+
+# Write the rows of the scaling report in CSV
+def write_scaling_csv (csv_file, rows):
+
+    fields = ['id', 'name', 'folder', 'region', 'cores', 'status', 'cycles', 'speedup', 'efficiency', 'tcdm_cont', 'idle', 'work_share', 'flag']
+    f = open(csv_file, "w", newline='')
+    writer = csv.DictWriter(f, fieldnames=fields)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(dict([[field, row[field]] for field in fields]))
+    f.close()
+
+
+# Write the scaling report and the results of the runs in JSON
+def write_scaling_json (json_file, rows, results, cores, threshold, total_time):
+
+    summary = {
+        'cores'     : list(cores),
+        'threshold' : threshold,
+        'flagged'   : len([row for row in rows if row['flag'] != '']),
+        'time'      : total_time,
+        'scaling'   : rows,
+        'results'   : results
+    }
+    f = open(json_file, "w")
+    json.dump(summary, f, indent=2)
+    f.close()
@@ -14,6 +14,11 @@ See the License for the specific language governing permissions and
 limitations under the License.
 '''
 
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tests', 'common'))
+import log_utils as logs
+
 """
 UTILS FOR MATMUL OPTIMIZATION EVALUATION
 """
@@ -21,76 +26,17 @@ UTILS FOR MATMUL OPTIMIZATION EVALUATION
 # Extracts profiling information from log file
 def extract_performance (msg, matmul, filename) :
     
-    # Set to 1 to see the read values during the execution
-    DEBUG = 0
-
-    # Open the og file to find the performances of all matmuls
-    f = open("log.txt", "r")
-    Lines = f.readlines()
-    # Phrases to be found 
-    perf_text = '] cycles = '
-    instr_text = '] instr = '
-    ext_ld_text = '] ext load = '
-    TCDM_text = '] TCDM cont = '
-    ld_st_text = '] ld stall = '
-    imiss_text = '] imiss = '
-    error_text = 'Error at index:'
-    # Entries
-    performances = []
-    instructions = []
-    ext_loads = []
-    TCDM_contentions = []
-    load_stalls = []
-    icache_misses = []
-    error_flag = 0
-    # FInd performance
-    for idx, line in enumerate(Lines):
-        if (line.find(perf_text) != -1) :
-            index = line.find(perf_text)
-            performances.append(int(line[index+len(perf_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(instr_text) != -1) :
-            index = line.find(instr_text)
-            instructions.append(int(line[index+len(instr_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(ext_ld_text) != -1) :
-            index = line.find(ext_ld_text)
-            ext_loads.append(int(line[index+len(ext_ld_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(TCDM_text) != -1) :
-            index = line.find(TCDM_text)
-            TCDM_contentions.append(int(line[index+len(TCDM_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(ld_st_text) != -1) :
-            index = line.find(ld_st_text)
-            load_stalls.append(int(line[index+len(ld_st_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(imiss_text) != -1) :
-            index = line.find(imiss_text)
-            icache_misses.append(int(line[index+len(imiss_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(error_text) != -1) :
-            error_flag = 1
-    f.close()
+    # Read the counters of the first profiled region and the errors from the log
+    records, errors = logs.parse_log_file("log.txt")
+    stats = logs.first_record(records)
+    error_flag = 1 if errors > 0 else 0
 
     # Print results to performance file
     f = open(filename, "a")
     f.write(msg)
     if error_flag == 0 :
-        f.write("\nMM {}  => cycles:\n{}".format(matmul, performances[0]))
-        f.write("\ninstr = {}, ext_ld = {}, TCDM_cont = {}, ld_stalls = {}, imiss = {}\n".format(instructions[0], ext_loads[0], TCDM_contentions[0], load_stalls[0], icache_misses[0]))
+        f.write("\nMM {}  => cycles:\n{}".format(matmul, stats['cycles']))
+        f.write("\ninstr = {}, ext_ld = {}, TCDM_cont = {}, ld_stalls = {}, imiss = {}\n".format(stats['instr'], stats['ext_ld'], stats['TCDM_cont'], stats['ld_stalls'], stats['imiss']))
     else:
         f.write("\nMM {}  \nCONTAINS ERRORS!!!".format(matmul))
     f.close()
@@ -207,79 +153,20 @@ UTILS FOR MULTIPLE NETWORK SIZES EVALUATION
 # Extracts profiling information from log file
 def extract_size_performance (step, filename) :
     
-    # Set to 1 to see the read values during the execution
-    DEBUG = 0
-
-    # Open the og file to find the performances of all matmuls
-    f = open("log.txt", "r")
-    Lines = f.readlines()
-    # Phrases to be found 
-    perf_text = '] cycles = '
-    instr_text = '] instr = '
-    ext_ld_text = '] ext load = '
-    TCDM_text = '] TCDM cont = '
-    ld_st_text = '] ld stall = '
-    imiss_text = '] imiss = '
-    error_text = 'Error at index:'
-    # Entries
-    performances = []
-    instructions = []
-    ext_loads = []
-    TCDM_contentions = []
-    load_stalls = []
-    icache_misses = []
-    error_flag = 0
-    # FInd performance
-    for idx, line in enumerate(Lines):
-        if (line.find(perf_text) != -1) :
-            index = line.find(perf_text)
-            performances.append(int(line[index+len(perf_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(instr_text) != -1) :
-            index = line.find(instr_text)
-            instructions.append(int(line[index+len(instr_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(ext_ld_text) != -1) :
-            index = line.find(ext_ld_text)
-            ext_loads.append(int(line[index+len(ext_ld_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(TCDM_text) != -1) :
-            index = line.find(TCDM_text)
-            TCDM_contentions.append(int(line[index+len(TCDM_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(ld_st_text) != -1) :
-            index = line.find(ld_st_text)
-            load_stalls.append(int(line[index+len(ld_st_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(imiss_text) != -1) :
-            index = line.find(imiss_text)
-            icache_misses.append(int(line[index+len(imiss_text):-1]))
-            if DEBUG == 1:
-                print(line)
-
-        if (line.find(error_text) != -1) :
-            error_flag = 1
-    f.close()
+    # Read the counters of the first profiled region and the errors from the log
+    records, errors = logs.parse_log_file("log.txt")
+    stats = logs.first_record(records)
+    error_flag = 1 if errors > 0 else 0
 
-    if (len(performances) == 0):
+    if (len(records) == 0):
         print("Performance not present, check if L1 memory is exceeded or convolution sizes are coherent with the input!!")
         exit()
 
     # Print results to performance file
     f = open(filename, "a")
     if error_flag == 0 :
-        f.write("\n{} => cycles: {}".format(step, performances[0]))
-        f.write(", instr = {}, ext_ld = {}, TCDM_cont = {}, ld_stalls = {}, imiss = {}\n".format(instructions[0], ext_loads[0], TCDM_contentions[0], load_stalls[0], icache_misses[0]))
+        f.write("\n{} => cycles: {}".format(step, stats['cycles']))
+        f.write(", instr = {}, ext_ld = {}, TCDM_cont = {}, ld_stalls = {}, imiss = {}\n".format(stats['instr'], stats['ext_ld'], stats['TCDM_cont'], stats['ld_stalls'], stats['imiss']))
     else:
         f.write("\n{} CONTAINS ERRORS!!!\n".format(step))
     f.close()
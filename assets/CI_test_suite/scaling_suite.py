@@ -0,0 +1,158 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+import os
+import time
+import json
+import shutil
+import argparse
+import sys
+import multiprocessing
+import ci_utils as ci
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tests', 'common'))
+from process_utils import run_pool
+
+"""
+USER CONSTRAINTS
+"""
+timeout                     = 300       # Sets the timeout for each process
+max_procs                   = multiprocessing.cpu_count()   # Number of tests which are executed in parallel
+matrix_file                 = "scaling_matrix.toml"     # Test matrix of the scaling suite (test folders, make variables, optimized matmuls, data types)
+cores                       = "1,2,4,8" # Numbers of cores on which each test is launched
+threshold                   = 0.6       # Parallel efficiency below which a kernel is flagged
+
+
+"""
+BACKEND
+"""
+parser = argparse.ArgumentParser("Multi-Core Scaling Suite")
+parser.add_argument( '--resume', action='store_true', help="Skip the tests which are already in the checkpoint file")
+parser.add_argument( '--procs', type=int, default=max_procs)
+parser.add_argument( '--timeout', type=int, default=timeout)
+parser.add_argument( '--cores', type=str, default=cores, help="Comma-separated numbers of cores")
+parser.add_argument( '--threshold', type=float, default=threshold, help="Flag the kernels whose parallel efficiency is below this value")
+parser.add_argument( '--folders', type=str, default='', help="Only launch the tests of these folders (comma-separated, default: all)")
+args = parser.parse_args()
+
+core_list = sorted(set([int(core) for core in args.cores.split(',') if core.strip() != '']))
+if len(core_list) < 2 or core_list[0] < 1:
+    print("[scaling_suite]: At least two numbers of cores (>= 1) are needed to measure the scaling!")
+    exit()
+
+ci_cwd = os.getcwd()
+test_cwd = os.getcwd()
+trainlib_cwd = os.getcwd() + "/../../lib"
+results_file = ci_cwd + "/scaling_results.txt"
+json_file = ci_cwd + "/scaling_results.json"
+csv_file = ci_cwd + "/scaling_results.csv"
+checkpoint = ci_cwd + "/scaling_checkpoint.txt"
+temp_dir = "temp/scaling"
+
+print("<<< ENTERING MULTI-CORE SCALING SEQUENCE >>>")
+
+# Expand the test matrix for all the numbers of cores
+tests = ci.expand_scaling_matrix(ci.load_test_matrix(ci_cwd + "/" + matrix_file), core_list)
+if args.folders != '':
+    folders = [folder.strip() for folder in args.folders.split(',')]
+    tests = [test for test in tests if test['folder'] in folders]
+    for idx, test in enumerate(tests):
+        test['id'] = idx
+
+# Find the tests which are already finished (same test and command)
+finished = {}
+if args.resume == True:
+    for test_id, result in ci.load_checkpoint(checkpoint).items():
+        if test_id < len(tests) and tests[test_id]['folder'] == result['folder'] and tests[test_id]['command'] == result['command']:
+            finished[test_id] = result
+    print("Resuming from checkpoint: {} of {} tests already finished".format(len(finished), len(tests)))
+else:
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    if os.path.exists(ci_cwd+"/"+temp_dir):
+        shutil.rmtree(ci_cwd+"/"+temp_dir)
+
+# Create the temp folder
+if not os.path.exists(ci_cwd+"/temp"):
+    os.mkdir(ci_cwd+"/temp")
+if not os.path.exists(ci_cwd+"/"+temp_dir):
+    os.mkdir(ci_cwd+"/"+temp_dir)
+if not os.path.exists(ci_cwd+"/temp/lib"):
+    os.mkdir(ci_cwd+"/temp/lib")
+
+# Go to the test folder
+os.chdir(ci_cwd+"/../../tests/")
+test_cwd = os.getcwd()
+
+print("CI Suite Folder: "+ci_cwd)
+print("Test Folder: "+test_cwd)
+print("TrainLib Folder: "+trainlib_cwd)
+
+# Copy PULP-TrainLib in the right position
+ci.copy_trainlib_ci(ci_cwd, trainlib_cwd)
+# Copy the utilities shared by the tests (golden model serializer) next to the tests
+ci.copy_common_ci(ci_cwd, test_cwd + "/common", temp_dir)
+
+
+
+"""
+START SCALING SEQUENCE
+"""
+pending_tests = [test for test in tests if test['id'] not in finished]
+# The longest tests of the previous run are launched first, so that they do not end up last in the queue
+previous_times = {}
+if os.path.exists(json_file):
+    f = open(json_file, 'r')
+    try:
+        for result in json.load(f)['results']:
+            previous_times[result['folder'] + "|" + result['command']] = result['time']
+    except (ValueError, KeyError):
+        pass
+    f.close()
+pending_tests.sort(key=lambda test: -previous_times.get(test['folder'] + "|" + test['command'], 0))
+print("\n=====> LAUNCHING {} TESTS ON {} PROCESSES ({} CORES).. <=====\n".format(len(pending_tests), args.procs, ", ".join([str(core) for core in core_list])))
+
+start = time.time()
+results = dict(finished)
+if len(pending_tests) > 0:
+    # Each finished test is stored in the checkpoint
+    def store_result (result):
+        results[result['id']] = result
+        ci.append_checkpoint(checkpoint, result)
+    test_args = [(test, ci_cwd, test_cwd, args.timeout, temp_dir) for test in pending_tests]
+    run_pool(ci.run_ci_test_args, test_args, args.procs, store_result, "Terminating scaling suite (resume with --resume)")
+total_time = time.time() - start
+results = [results[test['id']] for test in tests]
+
+
+
+"""
+WRITE RESULTS
+"""
+os.chdir(ci_cwd)
+rows = ci.compute_scaling(results, args.threshold)
+ci.write_scaling_report(results_file, rows, core_list, args.threshold)
+ci.write_scaling_csv(csv_file, rows)
+ci.write_scaling_json(json_file, rows, results, core_list, args.threshold, total_time)
+
+num_failed = len([result for result in results if result['status'] != 'PASS'])
+flagged = [row for row in rows if row['flag'] == 'LOW_EFFICIENCY']
+print("\n<<< {} TESTS, {} PASSED, {} FAILED, {} KERNELS BELOW {:.2f} EFFICIENCY (run time {:.2f}s) >>>".format(len(results), len(results)-num_failed, num_failed, len(flagged), args.threshold, total_time))
+for result in results:
+    if result['status'] != 'PASS':
+        print("Test ({}) {}: {} ({})".format(result['id'], result['name'], result['status'], result['message']))
+for row in flagged:
+    print("Test ({}) {}, {}: efficiency {:.2f} (speedup {:.2f})".format(row['id'], row['name'], row['region'], row['efficiency'], row['speedup']))
+print("Results written to {}, {} and {}".format(results_file, json_file, csv_file))
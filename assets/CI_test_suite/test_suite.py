@@ -15,602 +15,164 @@ limitations under the License.
 '''
 
 import os
-import subprocess
+import time
+import json
+import shutil
+import argparse
+import sys
+import multiprocessing
 import profile_utils as prof
 import ci_utils as ci
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tests', 'common'))
+from process_utils import run_pool
 
 """
 USER CONSTRAINTS
 """
 timeout                     = 120       # Sets the timeout for each process
-Conv2D_Opt_MM_FP32          = 10        # Selects the optimized MM for the Conv2D layers (FP32)
-PointWise_Opt_MM_FP32       = 10        # Selects the optimized MM for the PW layers (FP32)
-Linear_Opt_MM_FP32          = 0         # Selects the optimized MM for the Fully Conneced layer (FP32)
-Conv2D_Opt_MM_FP16          = 3         # Selects the optimized MM for the Conv2D layers (FP16)
-PointWise_Opt_MM_FP16       = 3         # Selects the optimized MM for the PW layers (FP16)
-Linear_Opt_MM_FP16          = 0         # Selects the optimized MM for the Fully Conneced layer (FP16)
+max_procs                   = multiprocessing.cpu_count()   # Number of tests which are executed in parallel
+matrix_file                 = "test_matrix.toml"    # Test matrix (test folders, make variables, optimized matmuls, data types)
+baseline_file               = "baselines.json"      # Performance baselines of the tests (counters of each profiled region)
+tolerance                   = 0.05      # Default tolerance on the cycles with respect to the baselines (tolerance field of the test matrix)
 
 
 """
 BACKEND
 """
+parser = argparse.ArgumentParser("CI Test Suite")
+parser.add_argument( '--resume', action='store_true', help="Skip the tests which are already in the checkpoint file")
+parser.add_argument( '--procs', type=int, default=max_procs)
+parser.add_argument( '--timeout', type=int, default=timeout)
+parser.add_argument( '--tolerance', type=float, default=tolerance, help="Default relative tolerance on the cycles with respect to the baselines")
+parser.add_argument( '--bless', action='store_true', help="Store the counters of the passed tests as the new baselines")
+args = parser.parse_args()
+
 ci_cwd = os.getcwd()
 test_cwd = os.getcwd()
 trainlib_cwd = os.getcwd() + "/../../lib"
 results_file = ci_cwd + "/test_suite_results.txt"
+json_file = ci_cwd + "/test_suite_results.json"
+junit_file = ci_cwd + "/test_suite_results.xml"
+regression_file = ci_cwd + "/test_suite_regressions.txt"
 checkpoint = ci_cwd + "/checkpoint.txt"
 
-with open(results_file, 'w') as f:
-
-    print("<<< ENTERING TEST SEQUENCE FOR CONTINUOUS INTEGRATION >>>")
-
-    # Create the temp folder
-    if not os.path.exists(ci_cwd+"/temp"):
-        os.mkdir(ci_cwd+"/temp")   
-    if not os.path.exists(ci_cwd+"/temp/tests"):
-        os.mkdir(ci_cwd+"/temp/tests")
-    if not os.path.exists(ci_cwd+"/temp/lib"):
-        os.mkdir(ci_cwd+"/temp/lib")
-    
-    # Go to the test folder
-    os.chdir(ci_cwd+"/../../tests/")
-    test_cwd = os.getcwd()
-
-    print("CI Suite Folder: "+ci_cwd)
-    print("Test Folder: "+test_cwd)
-    print("TrainLib Folder: "+trainlib_cwd)
-
-    # Copy PULP-TrainLib in the right position
-    ci.copy_trainlib_ci(ci_cwd, trainlib_cwd)
-
-
-
-    """
-    START TEST SEQUENCE
-    """
-    test_sequence_iterator = 0
-
-    print("\n=====> ENTERING TEST SEQUENCE FOR ACTIVATIONS.. <=====\n")
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_act"
-    cmd = "rm -rf BUILD/; make clean get_golden all run DATA_TYPE='FP32' > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Activations (FP32): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_act"
-    cmd = "rm -rf BUILD/; make clean get_golden all run DATA_TYPE='FP16' > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Activations (FP16): ", 0, results_file)
-    test_sequence_iterator += 1
-
-
-    # TO DO
-    #print("\n=====> ENTERING TEST SEQUENCE FOR BLOCKTRANSPOSE.. <=====\n")
-
-
-    print("\n=====> ENTERING TEST SEQUENCE FOR FP16 DEPTWHISE AND POINTWISE.. <=====\n")
-
-    """
-    DEPTHWISE CONVOLUTION
-    """
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_FORWARD' HWC_layout=0 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP16, FW, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_BACKWARD_GRAD' HWC_layout=0 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP16, WG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_BACKWARD_ERROR' HWC_layout=0 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP16, IG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_FORWARD' HWC_layout=1 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP16, FW, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_BACKWARD_GRAD' HWC_layout=1 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP16, WG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_BACKWARD_ERROR' HWC_layout=1 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP16, IG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    """
-    POINTWISE CONVOLUTION
-    """
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_FORWARD' HWC_layout=0 MATMUL_TYPE="+str(PointWise_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP16, FW, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_BACKWARD_GRAD' HWC_layout=0 MATMUL_TYPE="+str(PointWise_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP16, WG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_BACKWARD_ERROR' HWC_layout=0 MATMUL_TYPE="+str(PointWise_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP16, IG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_FORWARD' HWC_layout=1 MATMUL_TYPE="+str(PointWise_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP16, FW, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_BACKWARD_GRAD' HWC_layout=1 MATMUL_TYPE="+str(PointWise_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP16, WG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_BACKWARD_ERROR' HWC_layout=1 MATMUL_TYPE="+str(PointWise_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP16, IG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-
-    print("\n=====> ENTERING TEST SEQUENCE FOR FP32 DEPTWHISE AND POINTWISE.. <=====\n")
-
-    """
-    DEPTHWISE CONVOLUTION
-    """
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_FORWARD' HWC_layout=0 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP32, FW, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_BACKWARD_GRAD' HWC_layout=0 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP32, WG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_BACKWARD_ERROR' HWC_layout=0 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP32, IG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_FORWARD' HWC_layout=1 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP32, FW, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_BACKWARD_GRAD' HWC_layout=1 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP32, WG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='DW_BACKWARD_ERROR' HWC_layout=1 > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Depthwise (FP32, IG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    """
-    POINTWISE CONVOLUTION
-    """
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_FORWARD' HWC_layout=0 MATMUL_TYPE="+str(PointWise_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP32, FW, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_BACKWARD_GRAD' HWC_layout=0 MATMUL_TYPE="+str(PointWise_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP32, WG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_BACKWARD_ERROR' HWC_layout=0 MATMUL_TYPE="+str(PointWise_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP32, IG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_FORWARD' HWC_layout=1 MATMUL_TYPE="+str(PointWise_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP32, FW, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_BACKWARD_GRAD' HWC_layout=1 MATMUL_TYPE="+str(PointWise_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP32, WG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv_pw_dw_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='PW_BACKWARD_ERROR' HWC_layout=1 MATMUL_TYPE="+str(PointWise_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Pointwise (FP32, IG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-
-    print("\n=====> ENTERING TEST SEQUENCE FOR FP16 CONV2D.. <=====\n")
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='FORWARD' HWC_LAYOUT=0 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP16, FW, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_GRAD' HWC_LAYOUT=0 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP16, WG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_ERROR' HWC_LAYOUT=0 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP16, IG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='FORWARD' HWC_LAYOUT=1 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP16, FW, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_GRAD' HWC_LAYOUT=1 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP16, WG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp16"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_ERROR' HWC_LAYOUT=1 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP16)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP16, IG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-
-    print("\n=====> ENTERING TEST SEQUENCE FOR FP32 CONV2D.. <=====\n")
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='FORWARD' HWC_LAYOUT=0 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP32, FW, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_GRAD' HWC_LAYOUT=0 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP32, WG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_ERROR' HWC_LAYOUT=0 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP32, IG, CHW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='FORWARD' HWC_LAYOUT=1 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP32, FW, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_GRAD' HWC_LAYOUT=1 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP32, WG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_conv2d_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_ERROR' HWC_LAYOUT=1 MATMUL_TYPE="+str(Conv2D_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Conv2D (FP32, IG, HWC): ", 0, results_file)
-    test_sequence_iterator += 1
-
-
-    # TO DO
-    #print("\n=====> ENTERING TEST SEQUENCE FOR DMA TRANSFER.. <=====\n")
-
-    # TO DO
-    # print("\n=====> ENTERING TEST SEQUENCE FOR IM2COL.. <=====\n")
-
-    # TO DO
-    #print("\n=====> ENTERING TEST SEQUENCE FOR LAYOUT CHANGE.. <=====\n")
-
-
-    # print("\n=====> ENTERING TEST SEQUENCE FOR FP16 FULLY-CONNECTED.. <=====\n")
-
-    # # Test settings
-    # current_test_source_folder = test_cwd + "/test_linear_fp16"
-    # cmd = "rm -rf BUILD/; make clean get_golden all run STEP='FORWARD' > log.txt"
-    # # Automatic test sequence
-    # ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    # os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    # p = subprocess.call(cmd, shell=True, timeout=timeout)
-    # prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Linear (FP16, FW): ", 0, results_file)
-    # test_sequence_iterator += 1
-
-    # # Test settings
-    # current_test_source_folder = test_cwd + "/test_linear_fp16"
-    # cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_GRAD' > log.txt"
-    # # Automatic test sequence
-    # ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    # os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    # p = subprocess.call(cmd, shell=True, timeout=timeout)
-    # prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Linear (FP16, WG): ", 0, results_file)
-    # test_sequence_iterator += 1
-
-    # # Test settings
-    # current_test_source_folder = test_cwd + "/test_linear_fp16"
-    # cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_ERROR' > log.txt"
-    # # Automatic test sequence
-    # ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    # os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    # p = subprocess.call(cmd, shell=True, timeout=timeout)
-    # prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Linear (FP16, IG): ", 0, results_file)
-    # test_sequence_iterator += 1
-
-
-    print("\n=====> ENTERING TEST SEQUENCE FOR FP32 FULLY-CONNECTED.. <=====\n")
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_linear_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='FORWARD' MATMUL_TYPE="+str(Linear_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Linear (FP32, FW): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_linear_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_GRAD' MATMUL_TYPE="+str(Linear_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Linear (FP32, WG): ", 0, results_file)
-    test_sequence_iterator += 1
-
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_linear_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD_ERROR' MATMUL_TYPE="+str(Linear_Opt_MM_FP32)+" > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") Linear (FP32, IG): ", 0, results_file)
-    test_sequence_iterator += 1
-
-
-    # TO DO
-    #print("\n=====> ENTERING TEST SEQUENCE FOR LOSSES.. <=====\n")
-
-
-    # TO DO
-    #print("\n=====> ENTERING TEST SEQUENCE FOR MATMUL.. <=====\n")
+print("<<< ENTERING TEST SEQUENCE FOR CONTINUOUS INTEGRATION >>>")
+
+# Expand the test matrix
+tests = ci.expand_test_matrix(ci.load_test_matrix(ci_cwd + "/" + matrix_file))
+
+# Find the tests which are already finished (same test and command)
+finished = {}
+if args.resume == True:
+    for test_id, result in ci.load_checkpoint(checkpoint).items():
+        if test_id < len(tests) and tests[test_id]['folder'] == result['folder'] and tests[test_id]['command'] == result['command']:
+            finished[test_id] = result
+    print("Resuming from checkpoint: {} of {} tests already finished".format(len(finished), len(tests)))
+else:
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    if os.path.exists(ci_cwd+"/temp/tests"):
+        shutil.rmtree(ci_cwd+"/temp/tests")
+
+# Create the temp folder
+if not os.path.exists(ci_cwd+"/temp"):
+    os.mkdir(ci_cwd+"/temp")
+if not os.path.exists(ci_cwd+"/temp/tests"):
+    os.mkdir(ci_cwd+"/temp/tests")
+if not os.path.exists(ci_cwd+"/temp/lib"):
+    os.mkdir(ci_cwd+"/temp/lib")
+
+# Go to the test folder
+os.chdir(ci_cwd+"/../../tests/")
+test_cwd = os.getcwd()
 
+print("CI Suite Folder: "+ci_cwd)
+print("Test Folder: "+test_cwd)
+print("TrainLib Folder: "+trainlib_cwd)
 
-    print("\n=====> ENTERING TEST SEQUENCE FOR FP32 MHSA.. <=====\n")
+# Copy PULP-TrainLib in the right position
+ci.copy_trainlib_ci(ci_cwd, trainlib_cwd)
+# Copy the utilities shared by the tests (golden model serializer) next to the tests
+ci.copy_common_ci(ci_cwd, test_cwd + "/common")
 
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_mhsa_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='FORWARD' > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") MHSA (FP32, FW): ", 0, results_file)
-    test_sequence_iterator += 1
 
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_mhsa_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD' > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") MHSA (FP32, BW): ", 0, results_file)
-    test_sequence_iterator += 1
 
+"""
+START TEST SEQUENCE
+"""
+pending_tests = [test for test in tests if test['id'] not in finished]
+# The longest tests of the previous run are launched first, so that they do not end up last in the queue
+previous_times = {}
+if os.path.exists(json_file):
+    f = open(json_file, 'r')
+    try:
+        for result in json.load(f)['results']:
+            previous_times[result['folder'] + "|" + result['command']] = result['time']
+    except (ValueError, KeyError):
+        pass
+    f.close()
+pending_tests.sort(key=lambda test: -previous_times.get(test['folder'] + "|" + test['command'], 0))
+print("\n=====> LAUNCHING {} TESTS ON {} PROCESSES.. <=====\n".format(len(pending_tests), args.procs))
+
+start = time.time()
+results = dict(finished)
+if len(pending_tests) > 0:
+    # Each finished test is stored in the checkpoint
+    def store_result (result):
+        results[result['id']] = result
+        ci.append_checkpoint(checkpoint, result)
+    test_args = [(test, ci_cwd, test_cwd, args.timeout) for test in pending_tests]
+    run_pool(ci.run_ci_test_args, test_args, args.procs, store_result, "Terminating test suite (resume with --resume)")
+total_time = time.time() - start
+results = [results[test['id']] for test in tests]
 
-    print("\n=====> ENTERING TEST SEQUENCE FOR FP32 RNN.. <=====\n")
 
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_rnn_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='FORWARD' > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") RNN (FP32, FW): ", 0, results_file)
-    test_sequence_iterator += 1
 
-    # Test settings
-    current_test_source_folder = test_cwd + "/test_rnn_fp32"
-    cmd = "rm -rf BUILD/; make clean get_golden all run STEP='BACKWARD' > log.txt"
-    # Automatic test sequence
-    ci.copy_test_folder_ci(test_sequence_iterator, ci_cwd, current_test_source_folder)
-    os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(test_sequence_iterator))
-    p = subprocess.call(cmd, shell=True, timeout=timeout)
-    prof.extract_performance("\n\nTest ("+str(test_sequence_iterator)+") RNN (FP32, BW): ", 0, results_file)
-    test_sequence_iterator += 1
-    
\ No newline at end of file
+"""
+WRITE RESULTS
+"""
+# Summary of each test, in the order of the matrix
+f = open(results_file, 'w')
+f.close()
+for result in results:
+    msg = "\n\nTest ("+str(result['id'])+") "+result['name']+": "
+    if result['cycles'] is not None:
+        os.chdir(ci_cwd+"/temp/tests/ci_test_"+str(result['id']))
+        prof.extract_performance(msg, result['matmul'], results_file)
+    else:
+        f = open(results_file, 'a')
+        f.write(msg)
+        f.write("\nMM {}  \nCONTAINS ERRORS!!! ({})".format(result['matmul'], result['message']))
+        f.close()
+os.chdir(ci_cwd)
+
+# Compare the performance with the baselines (or store the new baselines)
+regressions = 0
+missing = 0
+if args.bless == True:
+    blessed = ci.bless_baselines(ci_cwd + "/" + baseline_file, results)
+    print("\nBaselines of {} tests written to {}".format(blessed, baseline_file))
+else:
+    comparison = ci.compare_baselines(results, ci.load_baselines(ci_cwd + "/" + baseline_file), args.tolerance)
+    ci.write_regression_report(regression_file, comparison, args.tolerance)
+    regressions = len([result for result in results if result['status'] == 'REGRESSION'])
+    missing = len([result for result in results if result['status'] == 'NO_BASELINE'])
+
+ci.write_json_results(json_file, results, total_time)
+ci.write_junit_results(junit_file, results, total_time)
+
+num_failed = len([result for result in results if result['status'] != 'PASS'])
+print("\n<<< {} TESTS, {} PASSED, {} FAILED (run time {:.2f}s) >>>".format(len(results), len(results)-num_failed, num_failed, total_time))
+for result in results:
+    if result['status'] != 'PASS':
+        print("Test ({}) {}: {} ({})".format(result['id'], result['name'], result['status'], result['message']))
+print("Results written to {}, {} and {}".format(results_file, json_file, junit_file))
+if args.bless == False:
+    print("Comparison with the baselines written to {}".format(regression_file))
+if regressions > 0:
+    print("<<< {} TESTS SLOWER THAN THEIR BASELINE >>>".format(regressions))
+if missing > 0:
+    print("<<< {} TESTS WITHOUT BASELINE, bless them with --bless and commit {} >>>".format(missing, baseline_file))
+# Failed, timed out, regressed and unbaselined tests make the CI fail
+if num_failed > 0:
+    exit(1)
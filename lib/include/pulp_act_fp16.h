@@ -32,6 +32,18 @@ struct act_args_fp16 {
     struct blob_fp16 * output;
 };
 
+/**
+ * @brief Structure to fuse a ReLU with the layer which produces (forward) or consumes (backward) its data in the same parallel region
+ * @param kernel core function of the layer (parallelized with pi_cl_team_fork)
+ * @param kernel_args arguments of the core function of the layer
+ * @param act_args act_args_fp16 structure of the ReLU
+ */
+struct relu_fused_args_fp16 {
+    void (*kernel)(void *);
+    void * kernel_args;
+    void * act_args;
+};
+
 /**
  * @brief Arguments for exponential and softmax in parallel
  * @param input   pointer to input vector
@@ -109,6 +121,28 @@ void relu_core_fw_fp16( void * act_args_fp16 );
 */
 void relu_core_bw_fp16( void * act_args_fp16 );
 
+/**
+ * @brief Forks kernel on the cluster and, if act_args is not NULL, applies a ReLU in the same parallel region
+ *        (forward: after the kernel, on the output it produced; backward: on the input gradient computed by the kernel).
+ * @param kernel core function of the layer (parallelized with pi_cl_team_fork)
+ * @param kernel_args arguments of the core function of the layer
+ * @param act_args act_args_fp16 structure of the ReLU (NULL if no ReLU is fused)
+ * @param backward 0 to apply the forward of the ReLU, 1 to apply its backward
+*/
+void pulp_relu_fp16_fused_fork( void (*kernel)(void *), void * kernel_args, void * act_args, int backward );
+
+/**
+ * @brief Core function which runs a layer kernel and then the forward of ReLU (parallelize with pi_cl_team_fork(NUM_CORES, relu_fw_fused_core_fp16, &args)).
+ * @param relu_fused_args_fp16 Kernel, kernel arguments and ReLU arguments
+*/
+void relu_fw_fused_core_fp16( void * relu_fused_args_fp16 );
+
+/**
+ * @brief Core function which runs a layer kernel and then the backward of ReLU (parallelize with pi_cl_team_fork(NUM_CORES, relu_bw_fused_core_fp16, &args)).
+ * @param relu_fused_args_fp16 Kernel, kernel arguments and ReLU arguments
+*/
+void relu_bw_fused_core_fp16( void * relu_fused_args_fp16 );
+
 
 
 /**
@@ -33,6 +33,18 @@ struct act_args {
     struct blob * output;
 };
 
+/**
+ * @brief Structure to fuse a ReLU with the layer which produces (forward) or consumes (backward) its data in the same parallel region
+ * @param kernel core function of the layer (parallelized with pi_cl_team_fork)
+ * @param kernel_args arguments of the core function of the layer
+ * @param act_args act_args structure of the ReLU
+ */
+struct relu_fused_args {
+    void (*kernel)(void *);
+    void * kernel_args;
+    void * act_args;
+};
+
 /**
  * @brief Arguments for exponential and softmax in parallel
  * @param input   pointer to input vector
@@ -112,6 +124,28 @@ void relu_core_fw_fp32( void * act_args );
 */
 void relu_core_bw_fp32( void * act_args );
 
+/**
+ * @brief Forks kernel on the cluster and, if act_args is not NULL, applies a ReLU in the same parallel region
+ *        (forward: after the kernel, on the output it produced; backward: on the input gradient computed by the kernel).
+ * @param kernel core function of the layer (parallelized with pi_cl_team_fork)
+ * @param kernel_args arguments of the core function of the layer
+ * @param act_args act_args structure of the ReLU (NULL if no ReLU is fused)
+ * @param backward 0 to apply the forward of the ReLU, 1 to apply its backward
+*/
+void pulp_relu_fp32_fused_fork( void (*kernel)(void *), void * kernel_args, void * act_args, int backward );
+
+/**
+ * @brief Core function which runs a layer kernel and then the forward of ReLU (parallelize with pi_cl_team_fork(NUM_CORES, relu_fw_fused_core_fp32, &args)).
+ * @param relu_fused_args Kernel, kernel arguments and ReLU arguments
+*/
+void relu_fw_fused_core_fp32( void * relu_fused_args );
+
+/**
+ * @brief Core function which runs a layer kernel and then the backward of ReLU (parallelize with pi_cl_team_fork(NUM_CORES, relu_bw_fused_core_fp32, &args)).
+ * @param relu_fused_args Kernel, kernel arguments and ReLU arguments
+*/
+void relu_bw_fused_core_fp32( void * relu_fused_args );
+
 
 
 /**
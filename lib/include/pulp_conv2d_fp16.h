@@ -94,6 +94,13 @@ struct Conv2D_args_fp16 {
  */
 void pulp_conv2d_fp16_fw_cl( void * Conv2D_args_fp16 );
 
+/**
+ * @brief Forward pass function fused with the forward of the ReLU which follows the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param Conv2D_args_fp16 arguments of the conv2d layer
+ * @param act_args act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv2d_fp16_fw_relu_cl( void * Conv2D_args_fp16, void * act_args );
+
 
 // BACKWARD FUNCTIONS
 
@@ -157,3 +164,10 @@ void pulp_conv2d_fp16_bw_param_grads_cl( void * Conv2D_args_fp16 );
  * @param USE_DMA_IM2COL in case the primitive uses IM2COL + MM, select if to perform im2col using DMA-managed transfers from L2 to L1 (output gradient tensor needs to be stored in L2, im2col_buffer in L1)
  */
 void pulp_conv2d_fp16_bw_input_grads_cl( void * Conv2D_args_fp16 );
+
+/**
+ * @brief Backward pass function which computes input's gradient fused with the backward of the ReLU which precedes the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param Conv2D_args_fp16 arguments of the conv2d layer
+ * @param act_args act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv2d_fp16_bw_input_grads_relu_cl( void * Conv2D_args_fp16, void * act_args );
@@ -70,6 +70,13 @@ struct DepthWise_Conv_args_fp16 {
  */
 void pulp_conv_dw_fp16_fw_cl( void * DepthWise_Conv_args_fp16 );
 
+/**
+ * @brief Forward pass function fused with the forward of the ReLU which follows the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param DepthWise_Conv_args_fp16 arguments of the depthwise convolution
+ * @param act_args act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv_dw_fp16_fw_relu_cl( void * DepthWise_Conv_args_fp16, void * act_args );
+
 
 // BACKWARD FUNCTIONS
 
@@ -112,3 +119,10 @@ void pulp_conv_dw_fp16_bw_param_grads_cl( void * DepthWise_Conv_args_fp16 );
  * @param HWC tells the DW Convolution if the output tensor is in CHW layout (HWC=0) or HWC format (HWC=1)
  */
 void pulp_conv_dw_fp16_bw_input_grads_cl( void * DepthWise_Conv_args_fp16 );
+
+/**
+ * @brief Backward pass function which computes input's gradient fused with the backward of the ReLU which precedes the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param DepthWise_Conv_args_fp16 arguments of the depthwise convolution
+ * @param act_args act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv_dw_fp16_bw_input_grads_relu_cl( void * DepthWise_Conv_args_fp16, void * act_args );
@@ -69,6 +69,13 @@ struct DepthWise_Conv_args {
  */
 void pulp_conv_dw_fp32_fw_cl( void * DepthWise_Conv_args );
 
+/**
+ * @brief Forward pass function fused with the forward of the ReLU which follows the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param DepthWise_Conv_args arguments of the depthwise convolution
+ * @param act_args act_args structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv_dw_fp32_fw_relu_cl( void * DepthWise_Conv_args, void * act_args );
+
 
 // BACKWARD FUNCTIONS
 
@@ -110,4 +117,11 @@ void pulp_conv_dw_fp32_bw_param_grads_cl( void * DepthWise_Conv_args );
  * @param Dpad lower padding
  * @param HWC tells the DW Convolution if the output tensor is in CHW layout (HWC=0) or HWC format (HWC=1)
  */
-void pulp_conv_dw_fp32_bw_input_grads_cl( void * DepthWise_Conv_args );
\ No newline at end of file
+void pulp_conv_dw_fp32_bw_input_grads_cl( void * DepthWise_Conv_args );
+
+/**
+ * @brief Backward pass function which computes input's gradient fused with the backward of the ReLU which precedes the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param DepthWise_Conv_args arguments of the depthwise convolution
+ * @param act_args act_args structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv_dw_fp32_bw_input_grads_relu_cl( void * DepthWise_Conv_args, void * act_args );
@@ -68,6 +68,13 @@ struct PointWise_Conv_args_fp16 {
  */
 void pulp_conv_pw_fp16_fw_cl( void * PointWise_Conv_args_fp16 );
 
+/**
+ * @brief Forward pass function fused with the forward of the ReLU which follows the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param PointWise_Conv_args_fp16 arguments of the pointwise convolution
+ * @param act_args act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv_pw_fp16_fw_relu_cl( void * PointWise_Conv_args_fp16, void * act_args );
+
 
 // BACKWARD FUNCTIONS
 
@@ -103,4 +110,11 @@ void pulp_conv_pw_fp16_bw_param_grads_cl( void * PointWise_Conv_args_fp16 );
  * @param transpose_buffer buffer for the momentary transposition of weights and output gradient
  * @param HWC parameter to set HWC (=1) or CHW (=0) primitive for the PointWise Convolution
  */
-void pulp_conv_pw_fp16_bw_input_grads_cl( void * PointWise_Conv_args_fp16 );
\ No newline at end of file
+void pulp_conv_pw_fp16_bw_input_grads_cl( void * PointWise_Conv_args_fp16 );
+
+/**
+ * @brief Backward pass function which computes input's gradient fused with the backward of the ReLU which precedes the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param PointWise_Conv_args_fp16 arguments of the pointwise convolution
+ * @param act_args act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv_pw_fp16_bw_input_grads_relu_cl( void * PointWise_Conv_args_fp16, void * act_args );
@@ -66,6 +66,13 @@ struct PointWise_Conv_args {
  */
 void pulp_conv_pw_fp32_fw_cl( void * PointWise_Conv_args );
 
+/**
+ * @brief Forward pass function fused with the forward of the ReLU which follows the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param PointWise_Conv_args arguments of the pointwise convolution
+ * @param act_args act_args structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv_pw_fp32_fw_relu_cl( void * PointWise_Conv_args, void * act_args );
+
 
 // BACKWARD FUNCTIONS
 
@@ -102,3 +109,10 @@ void pulp_conv_pw_fp32_bw_param_grads_cl( void * PointWise_Conv_args );
  * @param HWC parameter to set HWC (=1) or CHW (=0) primitive for the PointWise Convolution
  */
 void pulp_conv_pw_fp32_bw_input_grads_cl( void * PointWise_Conv_args );
+
+/**
+ * @brief Backward pass function which computes input's gradient fused with the backward of the ReLU which precedes the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param PointWise_Conv_args arguments of the pointwise convolution
+ * @param act_args act_args structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_conv_pw_fp32_bw_input_grads_relu_cl( void * PointWise_Conv_args, void * act_args );
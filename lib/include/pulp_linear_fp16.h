@@ -61,6 +61,13 @@ struct Linear_args_fp16 {
  */
 void pulp_linear_fp16_fw_cl( void * Linear_args_fp16 );
 
+/**
+ * @brief Forward pass function fused with the forward of the ReLU which follows the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param Linear_args_fp16 arguments of the linear layer
+ * @param act_args act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_linear_fp16_fw_relu_cl( void * Linear_args_fp16, void * act_args );
+
 
 // BACKWARD FUNCTIONS
 
@@ -91,4 +98,11 @@ void pulp_linear_fp16_bw_param_grads_cl( void * Linear_args_fp16 );
  * @param output  categorical output for the linear layer (from forward perspective)
  * @param opt_matmul_type_ig number of the optimizer matmul to be chosen by the mm_manager (see mm_manager_list.txt)
  */
-void pulp_linear_fp16_bw_input_grads_cl( void * Linear_args_fp16 );
\ No newline at end of file
+void pulp_linear_fp16_bw_input_grads_cl( void * Linear_args_fp16 );
+
+/**
+ * @brief Backward pass function which computes input's gradient fused with the backward of the ReLU which precedes the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param Linear_args_fp16 arguments of the linear layer
+ * @param act_args act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_linear_fp16_bw_input_grads_relu_cl( void * Linear_args_fp16, void * act_args );
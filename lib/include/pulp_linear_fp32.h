@@ -60,6 +60,13 @@ struct Linear_args {
  */
 void pulp_linear_fp32_fw_cl( void * Linear_args );
 
+/**
+ * @brief Forward pass function fused with the forward of the ReLU which follows the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param Linear_args arguments of the linear layer
+ * @param act_args act_args structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_linear_fp32_fw_relu_cl( void * Linear_args, void * act_args );
+
 
 // BACKWARD FUNCTIONS
 
@@ -91,3 +98,10 @@ void pulp_linear_fp32_bw_param_grads_cl( void * Linear_args );
  * @param opt_matmul_type_ig number of the optimizer matmul to be chosen by the mm_manager (see mm_manager_list.txt)
  */
 void pulp_linear_fp32_bw_input_grads_cl( void * Linear_args );
+
+/**
+ * @brief Backward pass function which computes input's gradient fused with the backward of the ReLU which precedes the layer, forked on PULP cluster (the ReLU runs in the same parallel region).
+ * @param Linear_args arguments of the linear layer
+ * @param act_args act_args structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_linear_fp32_bw_input_grads_relu_cl( void * Linear_args, void * act_args );
@@ -66,6 +66,14 @@ struct SkipConn_args_fp16 {
  */
 void pulp_residualconn_fp16_fw( void * SkipConn_args );
 
+/**
+ * @brief Sums the input activations to the output and applies the forward of the ReLU which follows the sum in the same parallel region
+ * 
+ * @param SkipConn_args: arguments of the residual connection (see pulp_residualconn_fp16_fw())
+ * @param act_args: act_args_fp16 structure of the ReLU (NULL to skip the ReLU)
+ */
+void pulp_residualconn_fp16_fw_relu( void * SkipConn_args, void * act_args );
+
 
 
 // BACKWARD FUNCTIONS
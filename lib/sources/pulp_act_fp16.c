@@ -126,6 +126,39 @@ void relu_core_bw_fp16( void * act_args_fp16 )
   }
 }
 
+void pulp_relu_fp16_fused_fork( void (*kernel)(void *), void * kernel_args, void * act_args, int backward )
+{
+  if (act_args == NULL) {
+    pi_cl_team_fork(NUM_CORES, kernel, kernel_args);
+  }
+  else {
+    struct relu_fused_args_fp16 fused_args;
+    fused_args.kernel = kernel;
+    fused_args.kernel_args = kernel_args;
+    fused_args.act_args = act_args;
+    if (backward == 0)  pi_cl_team_fork(NUM_CORES, relu_fw_fused_core_fp16, &fused_args);
+    else                pi_cl_team_fork(NUM_CORES, relu_bw_fused_core_fp16, &fused_args);
+  }
+}
+
+void relu_fw_fused_core_fp16( void * relu_fused_args_fp16 )
+{
+  struct relu_fused_args_fp16 * args = (struct relu_fused_args_fp16 *) relu_fused_args_fp16;
+  args->kernel(args->kernel_args);
+  // The ReLU reads the outputs of the other cores
+  pi_cl_team_barrier();
+  relu_core_fw_fp16(args->act_args);
+}
+
+void relu_bw_fused_core_fp16( void * relu_fused_args_fp16 )
+{
+  struct relu_fused_args_fp16 * args = (struct relu_fused_args_fp16 *) relu_fused_args_fp16;
+  args->kernel(args->kernel_args);
+  // The ReLU reads the input gradients of the other cores
+  pi_cl_team_barrier();
+  relu_core_bw_fp16(args->act_args);
+}
+
 
 
 
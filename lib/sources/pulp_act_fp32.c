@@ -127,6 +127,39 @@ void relu_core_bw_fp32( void * act_args )
   }
 }
 
+void pulp_relu_fp32_fused_fork( void (*kernel)(void *), void * kernel_args, void * act_args, int backward )
+{
+  if (act_args == NULL) {
+    pi_cl_team_fork(NUM_CORES, kernel, kernel_args);
+  }
+  else {
+    struct relu_fused_args fused_args;
+    fused_args.kernel = kernel;
+    fused_args.kernel_args = kernel_args;
+    fused_args.act_args = act_args;
+    if (backward == 0)  pi_cl_team_fork(NUM_CORES, relu_fw_fused_core_fp32, &fused_args);
+    else                pi_cl_team_fork(NUM_CORES, relu_bw_fused_core_fp32, &fused_args);
+  }
+}
+
+void relu_fw_fused_core_fp32( void * relu_fused_args )
+{
+  struct relu_fused_args * args = (struct relu_fused_args *) relu_fused_args;
+  args->kernel(args->kernel_args);
+  // The ReLU reads the outputs of the other cores
+  pi_cl_team_barrier();
+  relu_core_fw_fp32(args->act_args);
+}
+
+void relu_bw_fused_core_fp32( void * relu_fused_args )
+{
+  struct relu_fused_args * args = (struct relu_fused_args *) relu_fused_args;
+  args->kernel(args->kernel_args);
+  // The ReLU reads the input gradients of the other cores
+  pi_cl_team_barrier();
+  relu_core_bw_fp32(args->act_args);
+}
+
 
 
 
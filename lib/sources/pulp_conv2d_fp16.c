@@ -21,9 +21,15 @@
 #include "pulp_train_utils_fp16.h"
 #include "pulp_matmul_fp16.h"
 #include "pulp_im2col_fp16.h"
+#include "pulp_act_fp16.h"
 #include "pulp_conv2d_fp16.h"
 
 void pulp_conv2d_fp16_fw_cl( void * Conv2D_args_fp16 )
+{
+  pulp_conv2d_fp16_fw_relu_cl(Conv2D_args_fp16, NULL);
+}
+
+void pulp_conv2d_fp16_fw_relu_cl( void * Conv2D_args_fp16, void * act_args )
 {
     struct Conv2D_args_fp16 * C2D_args = (struct Conv2D_args_fp16 *) Conv2D_args_fp16;
     struct matMul_args_fp16 matMul_args;
@@ -91,14 +97,14 @@ void pulp_conv2d_fp16_fw_cl( void * Conv2D_args_fp16 )
       matMul_args.trans_B = 1;
 
       #ifndef OPTIMIZE
-      pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+      pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 0);
       #else
       struct mm_manager_args_fp16 man_args;
       man_args.mm_args = &matMul_args;
       man_args.layer_type = LAYER_CONV2D;
       man_args.step_type = STEP_FW;
       man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-      pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+      pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 0);
       #endif
     }
 
@@ -132,14 +138,14 @@ void pulp_conv2d_fp16_fw_cl( void * Conv2D_args_fp16 )
       matMul_args.trans_B = 1;
 
       #ifndef OPTIMIZE
-      pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+      pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 0);
       #else
       struct mm_manager_args_fp16 man_args;
       man_args.mm_args = &matMul_args;
       man_args.layer_type = LAYER_CONV2D;
       man_args.step_type = STEP_FW;
       man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-      pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+      pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 0);
       #endif    
     }
     else {
@@ -166,7 +172,7 @@ void pulp_conv2d_fp16_fw_cl( void * Conv2D_args_fp16 )
       matMul_args.pH = pH;
       matMul_args.pW = pW;
 
-      pi_cl_team_fork(NUM_CORES, naive_conv2d_fw_kernel_CHW_fp16, &matMul_args);
+      pulp_relu_fp16_fused_fork(naive_conv2d_fw_kernel_CHW_fp16, &matMul_args, act_args, 0);
     }
     
     /**
@@ -382,6 +388,11 @@ void pulp_conv2d_fp16_bw_param_grads_cl( void * Conv2D_args_fp16 )
 
 
 void pulp_conv2d_fp16_bw_input_grads_cl( void * Conv2D_args_fp16 )
+{
+  pulp_conv2d_fp16_bw_input_grads_relu_cl(Conv2D_args_fp16, NULL);
+}
+
+void pulp_conv2d_fp16_bw_input_grads_relu_cl( void * Conv2D_args_fp16, void * act_args )
 {
   struct Conv2D_args_fp16 * C2D_args = (struct Conv2D_args_fp16 *) Conv2D_args_fp16;
   struct matMul_args_fp16 matMul_args;
@@ -468,14 +479,14 @@ void pulp_conv2d_fp16_bw_input_grads_cl( void * Conv2D_args_fp16 )
       pi_cl_team_fork(NUM_CORES, pulp_blocktransp_fp16, &bt_args);
 
       #ifndef OPTIMIZE
-      pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+      pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 1);
       #else
       struct mm_manager_args_fp16 man_args;
       man_args.mm_args = &matMul_args;
       man_args.layer_type = LAYER_CONV2D;
       man_args.step_type = STEP_IN_GRAD;
       man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-      pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+      pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 1);
       #endif
     }
 
@@ -521,14 +532,14 @@ void pulp_conv2d_fp16_bw_input_grads_cl( void * Conv2D_args_fp16 )
       pi_cl_team_fork(NUM_CORES, pulp_blocktransp_fp16, &bt_args);
 
       #ifndef OPTIMIZE
-      pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+      pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 1);
       #else
       struct mm_manager_args_fp16 man_args;
       man_args.mm_args = &matMul_args;
       man_args.layer_type = LAYER_CONV2D;
       man_args.step_type = STEP_IN_GRAD;
       man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-      pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+      pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 1);
       #endif 
     }
     else {
@@ -556,7 +567,7 @@ void pulp_conv2d_fp16_bw_input_grads_cl( void * Conv2D_args_fp16 )
       matMul_args.pH = pH;
       matMul_args.pW = pW;
 
-      pi_cl_team_fork(NUM_CORES, naive_conv2d_in_grad_kernel_CHW_fp16, &matMul_args);
+      pulp_relu_fp16_fused_fork(naive_conv2d_in_grad_kernel_CHW_fp16, &matMul_args, act_args, 1);
     }
 
     /**
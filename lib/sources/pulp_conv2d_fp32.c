@@ -21,9 +21,15 @@
 #include "pulp_train_utils_fp32.h"
 #include "pulp_matmul_fp32.h"
 #include "pulp_im2col_fp32.h"
+#include "pulp_act_fp32.h"
 #include "pulp_conv2d_fp32.h"
 
 void pulp_conv2d_fp32_fw_cl( void * Conv2D_args )
+{
+  pulp_conv2d_fp32_fw_relu_cl(Conv2D_args, NULL);
+}
+
+void pulp_conv2d_fp32_fw_relu_cl( void * Conv2D_args, void * act_args )
 {
     struct Conv2D_args * C2D_args = (struct Conv2D_args *) Conv2D_args;
     struct matMul_args matMul_args;
@@ -91,14 +97,14 @@ void pulp_conv2d_fp32_fw_cl( void * Conv2D_args )
         matMul_args.trans_B = 1;
 
         #ifndef OPTIMIZE
-        pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+        pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 0);
         #else
         struct mm_manager_args man_args;
         man_args.mm_args = &matMul_args;
         man_args.layer_type = LAYER_CONV2D;
         man_args.step_type = STEP_FW;
         man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-        pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+        pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 0);
         #endif
       }
 
@@ -132,14 +138,14 @@ void pulp_conv2d_fp32_fw_cl( void * Conv2D_args )
       matMul_args.trans_B = 1;
 
       #ifndef OPTIMIZE
-      pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+      pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 0);
       #else
       struct mm_manager_args man_args;
       man_args.mm_args = &matMul_args;
       man_args.layer_type = LAYER_CONV2D;
       man_args.step_type = STEP_FW;
       man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-      pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+      pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 0);
       #endif     
     }
     else {
@@ -173,7 +179,7 @@ void pulp_conv2d_fp32_fw_cl( void * Conv2D_args )
       matMul_args.Upad = Upad;
       matMul_args.Dpad = Dpad;
 
-      pi_cl_team_fork(NUM_CORES, naive_conv2d_fw_kernel_CHW, &matMul_args);
+      pulp_relu_fp32_fused_fork(naive_conv2d_fw_kernel_CHW, &matMul_args, act_args, 0);
     }
 
     /**
@@ -394,6 +400,11 @@ void pulp_conv2d_fp32_bw_param_grads_cl( void * Conv2D_args )
 
 
 void pulp_conv2d_fp32_bw_input_grads_cl( void * Conv2D_args )
+{
+  pulp_conv2d_fp32_bw_input_grads_relu_cl(Conv2D_args, NULL);
+}
+
+void pulp_conv2d_fp32_bw_input_grads_relu_cl( void * Conv2D_args, void * act_args )
 {
   struct Conv2D_args * C2D_args = (struct Conv2D_args *) Conv2D_args;
   struct matMul_args matMul_args;
@@ -480,14 +491,14 @@ void pulp_conv2d_fp32_bw_input_grads_cl( void * Conv2D_args )
       pi_cl_team_fork(NUM_CORES, pulp_blocktransp_fp32, &bt_args);
 
       #ifndef OPTIMIZE
-      pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+      pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 1);
       #else
       struct mm_manager_args man_args;
       man_args.mm_args = &matMul_args;
       man_args.layer_type = LAYER_CONV2D;
       man_args.step_type = STEP_IN_GRAD;
       man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-      pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+      pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 1);
       #endif
     }
 
@@ -533,14 +544,14 @@ void pulp_conv2d_fp32_bw_input_grads_cl( void * Conv2D_args )
       pi_cl_team_fork(NUM_CORES, pulp_blocktransp_fp32, &bt_args);
 
       #ifndef OPTIMIZE
-      pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+      pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 1);
       #else
       struct mm_manager_args man_args;
       man_args.mm_args = &matMul_args;
       man_args.layer_type = LAYER_CONV2D;
       man_args.step_type = STEP_IN_GRAD;
       man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-      pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+      pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 1);
       #endif 
     }
     else {
@@ -575,7 +586,7 @@ void pulp_conv2d_fp32_bw_input_grads_cl( void * Conv2D_args )
       matMul_args.Upad = Upad;
       matMul_args.Dpad = Dpad;
 
-      pi_cl_team_fork(NUM_CORES, naive_conv2d_in_grad_kernel_CHW, &matMul_args);
+      pulp_relu_fp32_fused_fork(naive_conv2d_in_grad_kernel_CHW, &matMul_args, act_args, 1);
     }
 
     /**
@@ -21,10 +21,16 @@
 #include "pulp_train_utils_fp16.h"
 #include "pulp_matmul_fp16.h"
 #include "pulp_im2col_fp16.h"
+#include "pulp_act_fp16.h"
 #include "pulp_conv_dw_fp16.h"
 #include "pulp_train_defines.h"
 
-void pulp_conv_dw_fp16_fw_cl ( void * DepthWise_Conv_args_fp16 )
+void pulp_conv_dw_fp16_fw_cl( void * DepthWise_Conv_args_fp16 )
+{
+  pulp_conv_dw_fp16_fw_relu_cl(DepthWise_Conv_args_fp16, NULL);
+}
+
+void pulp_conv_dw_fp16_fw_relu_cl( void * DepthWise_Conv_args_fp16, void * act_args )
 {
   struct DepthWise_Conv_args_fp16 * DW_args = (struct DepthWise_Conv_args_fp16 *) DepthWise_Conv_args_fp16;
 
@@ -33,7 +39,7 @@ void pulp_conv_dw_fp16_fw_cl ( void * DepthWise_Conv_args_fp16 )
   ker_args.weights = DW_args->coeff;
   ker_args.output = DW_args->output;
 
-  pi_cl_team_fork(NUM_CORES, dw_kernel_forward_fp16, &ker_args);
+  pulp_relu_fp16_fused_fork(dw_kernel_forward_fp16, &ker_args, act_args, 0);
 
   return;
 }
@@ -70,6 +76,11 @@ void pulp_conv_dw_fp16_bw_param_grads_cl( void * DepthWise_Conv_args_fp16 )
 
 
 void pulp_conv_dw_fp16_bw_input_grads_cl( void * DepthWise_Conv_args_fp16 )
+{
+  pulp_conv_dw_fp16_bw_input_grads_relu_cl(DepthWise_Conv_args_fp16, NULL);
+}
+
+void pulp_conv_dw_fp16_bw_input_grads_relu_cl( void * DepthWise_Conv_args_fp16, void * act_args )
 {
   struct DepthWise_Conv_args_fp16 * DW_args = (struct DepthWise_Conv_args_fp16 *) DepthWise_Conv_args_fp16;
 
@@ -78,6 +89,6 @@ void pulp_conv_dw_fp16_bw_input_grads_cl( void * DepthWise_Conv_args_fp16 )
   ker_args.weights = DW_args->coeff;
   ker_args.output = DW_args->output;
 
-  pi_cl_team_fork(NUM_CORES, dw_kernel_input_grad_fp16, &ker_args);
+  pulp_relu_fp16_fused_fork(dw_kernel_input_grad_fp16, &ker_args, act_args, 1);
 
 }
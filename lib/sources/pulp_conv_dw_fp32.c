@@ -21,11 +21,17 @@
 #include "pulp_train_utils_fp32.h"
 #include "pulp_matmul_fp32.h"
 #include "pulp_im2col_fp32.h"
+#include "pulp_act_fp32.h"
 #include "pulp_conv_dw_fp32.h"
 #include "pulp_train_defines.h"
 
 
-void pulp_conv_dw_fp32_fw_cl ( void * DepthWise_Conv_args )
+void pulp_conv_dw_fp32_fw_cl( void * DepthWise_Conv_args )
+{
+  pulp_conv_dw_fp32_fw_relu_cl(DepthWise_Conv_args, NULL);
+}
+
+void pulp_conv_dw_fp32_fw_relu_cl( void * DepthWise_Conv_args, void * act_args )
 {
   struct DepthWise_Conv_args * DW_args = (struct DepthWise_Conv_args *) DepthWise_Conv_args;
 
@@ -34,7 +40,7 @@ void pulp_conv_dw_fp32_fw_cl ( void * DepthWise_Conv_args )
   ker_args.weights = DW_args->coeff;
   ker_args.output = DW_args->output;
 
-  pi_cl_team_fork(NUM_CORES, dw_kernel_forward, &ker_args);
+  pulp_relu_fp32_fused_fork(dw_kernel_forward, &ker_args, act_args, 0);
 
   return;
 }
@@ -71,6 +77,11 @@ void pulp_conv_dw_fp32_bw_param_grads_cl( void * DepthWise_Conv_args )
 
 
 void pulp_conv_dw_fp32_bw_input_grads_cl( void * DepthWise_Conv_args )
+{
+  pulp_conv_dw_fp32_bw_input_grads_relu_cl(DepthWise_Conv_args, NULL);
+}
+
+void pulp_conv_dw_fp32_bw_input_grads_relu_cl( void * DepthWise_Conv_args, void * act_args )
 {
   struct DepthWise_Conv_args * DW_args = (struct DepthWise_Conv_args *) DepthWise_Conv_args;
   
@@ -79,6 +90,6 @@ void pulp_conv_dw_fp32_bw_input_grads_cl( void * DepthWise_Conv_args )
   ker_args.weights = DW_args->coeff;
   ker_args.output = DW_args->output;
 
-  pi_cl_team_fork(NUM_CORES, dw_kernel_input_grad, &ker_args);
+  pulp_relu_fp32_fused_fork(dw_kernel_input_grad, &ker_args, act_args, 1);
 
 }
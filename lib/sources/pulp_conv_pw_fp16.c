@@ -20,11 +20,17 @@
 
 #include "pulp_train_utils_fp16.h"
 #include "pulp_matmul_fp16.h"
+#include "pulp_act_fp16.h"
 #include "pulp_conv_pw_fp16.h"
 #include "pulp_train_defines.h"
 
 
 void pulp_conv_pw_fp16_fw_cl( void * PointWise_Conv_args_fp16 )
+{
+  pulp_conv_pw_fp16_fw_relu_cl(PointWise_Conv_args_fp16, NULL);
+}
+
+void pulp_conv_pw_fp16_fw_relu_cl( void * PointWise_Conv_args_fp16, void * act_args )
 {
   struct PointWise_Conv_args_fp16 * PW_args = (struct PointWise_Conv_args_fp16 *) PointWise_Conv_args_fp16;
   struct matMul_args_fp16 matMul_args;
@@ -57,14 +63,14 @@ void pulp_conv_pw_fp16_fw_cl( void * PointWise_Conv_args_fp16 )
     matMul_args.trans_B = 0;
 
     #ifndef OPTIMIZE
-    pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+    pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 0);
     #else
     struct mm_manager_args_fp16 man_args;
     man_args.mm_args = &matMul_args;
     man_args.layer_type = LAYER_PW_CONV;
     man_args.step_type = STEP_FW;
     man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-    pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+    pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 0);
     #endif
   }
   // HWC format for both input and output
@@ -79,14 +85,14 @@ void pulp_conv_pw_fp16_fw_cl( void * PointWise_Conv_args_fp16 )
     matMul_args.trans_B = 1;
 
     #ifndef OPTIMIZE
-    pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+    pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 0);
     #else
     struct mm_manager_args_fp16 man_args;
     man_args.mm_args = &matMul_args;
     man_args.layer_type = LAYER_PW_CONV;
     man_args.step_type = STEP_FW;
     man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-    pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+    pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 0);
     #endif
   }
   else
@@ -240,6 +246,11 @@ void pulp_conv_pw_fp16_bw_param_grads_cl( void * PointWise_Conv_args_fp16 )
 
 
 void pulp_conv_pw_fp16_bw_input_grads_cl( void * PointWise_Conv_args_fp16 )
+{
+  pulp_conv_pw_fp16_bw_input_grads_relu_cl(PointWise_Conv_args_fp16, NULL);
+}
+
+void pulp_conv_pw_fp16_bw_input_grads_relu_cl( void * PointWise_Conv_args_fp16, void * act_args )
 {
   struct PointWise_Conv_args_fp16 * PW_args = (struct PointWise_Conv_args_fp16 *) PointWise_Conv_args_fp16;
   struct matMul_args_fp16 matMul_args;
@@ -293,14 +304,14 @@ void pulp_conv_pw_fp16_bw_input_grads_cl( void * PointWise_Conv_args_fp16 )
     matMul_args.trans_B = 0;
     
     #ifndef OPTIMIZE
-    pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+    pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 1);
     #else
     struct mm_manager_args_fp16 man_args;
     man_args.mm_args = &matMul_args;
     man_args.layer_type = LAYER_PW_CONV;
     man_args.step_type = STEP_IN_GRAD;
     man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-    pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+    pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 1);
     #endif
   }
   // HWC format for both input and output
@@ -323,14 +334,14 @@ void pulp_conv_pw_fp16_bw_input_grads_cl( void * PointWise_Conv_args_fp16 )
     matMul_args.trans_B = 1;
     
     #ifndef OPTIMIZE
-    pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+    pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 1);
     #else
     struct mm_manager_args_fp16 man_args;
     man_args.mm_args = &matMul_args;
     man_args.layer_type = LAYER_PW_CONV;
     man_args.step_type = STEP_IN_GRAD;
     man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-    pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+    pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 1);
     #endif
   }
   else
@@ -20,11 +20,17 @@
 
 #include "pulp_train_utils_fp32.h"
 #include "pulp_matmul_fp32.h"
+#include "pulp_act_fp32.h"
 #include "pulp_conv_pw_fp32.h"
 #include "pulp_train_defines.h"
 
 
 void pulp_conv_pw_fp32_fw_cl( void * PointWise_Conv_args )
+{
+  pulp_conv_pw_fp32_fw_relu_cl(PointWise_Conv_args, NULL);
+}
+
+void pulp_conv_pw_fp32_fw_relu_cl( void * PointWise_Conv_args, void * act_args )
 {
   struct PointWise_Conv_args * PW_args = (struct PointWise_Conv_args *) PointWise_Conv_args;
   struct matMul_args matMul_args;
@@ -55,14 +61,14 @@ void pulp_conv_pw_fp32_fw_cl( void * PointWise_Conv_args )
     matMul_args.trans_B = 0;
 
     #ifndef OPTIMIZE
-    pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+    pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 0);
     #else
     struct mm_manager_args man_args;
     man_args.mm_args = &matMul_args;
     man_args.layer_type = LAYER_PW_CONV;
     man_args.step_type = STEP_FW;
     man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-    pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+    pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 0);
     #endif
   }
   // HWC format for both input and output
@@ -77,14 +83,14 @@ void pulp_conv_pw_fp32_fw_cl( void * PointWise_Conv_args )
     matMul_args.trans_B = 0;
 
     #ifndef OPTIMIZE
-    pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+    pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 0);
     #else
     struct mm_manager_args man_args;
     man_args.mm_args = &matMul_args;
     man_args.layer_type = LAYER_PW_CONV;
     man_args.step_type = STEP_FW;
     man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-    pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+    pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 0);
     #endif
   }  
   else 
@@ -235,6 +241,11 @@ void pulp_conv_pw_fp32_bw_param_grads_cl( void * PointWise_Conv_args )
 
 
 void pulp_conv_pw_fp32_bw_input_grads_cl( void * PointWise_Conv_args )
+{
+  pulp_conv_pw_fp32_bw_input_grads_relu_cl(PointWise_Conv_args, NULL);
+}
+
+void pulp_conv_pw_fp32_bw_input_grads_relu_cl( void * PointWise_Conv_args, void * act_args )
 {
   struct PointWise_Conv_args * PW_args = (struct PointWise_Conv_args *) PointWise_Conv_args;
   struct matMul_args matMul_args;
@@ -290,14 +301,14 @@ void pulp_conv_pw_fp32_bw_input_grads_cl( void * PointWise_Conv_args )
     matMul_args.trans_B = 0;
     
     #ifndef OPTIMIZE
-    pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+    pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 1);
     #else
     struct mm_manager_args man_args;
     man_args.mm_args = &matMul_args;
     man_args.layer_type = LAYER_PW_CONV;
     man_args.step_type = STEP_IN_GRAD;
     man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-    pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+    pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 1);
     #endif
   }
   // HWC format for both input and output
@@ -321,14 +332,14 @@ void pulp_conv_pw_fp32_bw_input_grads_cl( void * PointWise_Conv_args )
     matMul_args.trans_B = 0;
     
     #ifndef OPTIMIZE
-    pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+    pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 1);
     #else
     struct mm_manager_args man_args;
     man_args.mm_args = &matMul_args;
     man_args.layer_type = LAYER_PW_CONV;
     man_args.step_type = STEP_IN_GRAD;
     man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-    pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+    pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 1);
     #endif
   }
   else
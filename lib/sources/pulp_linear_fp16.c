@@ -20,9 +20,15 @@
 
 #include "pulp_train_utils_fp16.h"
 #include "pulp_matmul_fp16.h"
+#include "pulp_act_fp16.h"
 #include "pulp_linear_fp16.h"
 
 void pulp_linear_fp16_fw_cl( void * Linear_args_fp16 )
+{
+  pulp_linear_fp16_fw_relu_cl(Linear_args_fp16, NULL);
+}
+
+void pulp_linear_fp16_fw_relu_cl( void * Linear_args_fp16, void * act_args )
 {
   struct Linear_args_fp16 * FC_args = (struct Linear_args_fp16 *) Linear_args_fp16;
   fp16 *coeffData = FC_args->coeff->data;
@@ -42,14 +48,14 @@ void pulp_linear_fp16_fw_cl( void * Linear_args_fp16 )
   matMul_args.trans_B = 0;
 
   #ifndef OPTIMIZE
-  pi_cl_team_fork(NUM_CORES, mm_fp16, &matMul_args);
+  pulp_relu_fp16_fused_fork(mm_fp16, &matMul_args, act_args, 0);
   #else
   struct mm_manager_args_fp16 man_args;
   man_args.mm_args = &matMul_args;
   man_args.layer_type = LAYER_LINEAR;
   man_args.step_type = STEP_FW;
   man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-  pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+  pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 0);
   #endif
 
   #ifdef DEBUG 
@@ -127,6 +133,11 @@ void pulp_linear_fp16_bw_param_grads_cl( void * Linear_args_fp16 )
 
 
 void pulp_linear_fp16_bw_input_grads_cl( void * Linear_args_fp16 )
+{
+  pulp_linear_fp16_bw_input_grads_relu_cl(Linear_args_fp16, NULL);
+}
+
+void pulp_linear_fp16_bw_input_grads_relu_cl( void * Linear_args_fp16, void * act_args )
 {
   struct Linear_args_fp16 * FC_args = (struct Linear_args_fp16 *) Linear_args_fp16;
   fp16 *coeffData = FC_args->coeff->data;
@@ -156,14 +167,14 @@ void pulp_linear_fp16_bw_input_grads_cl( void * Linear_args_fp16 )
   matMul_args.trans_B = 0;
 
   #ifndef OPTIMIZE
-  pi_cl_team_fork(NUM_CORES, mm_M_fp16, &matMul_args);
+  pulp_relu_fp16_fused_fork(mm_M_fp16, &matMul_args, act_args, 1);
   #else
   struct mm_manager_args_fp16 man_args;
   man_args.mm_args = &matMul_args;
   man_args.layer_type = LAYER_LINEAR;
   man_args.step_type = STEP_IN_GRAD;
   man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-  pi_cl_team_fork(NUM_CORES, mm_manager_fp16, &man_args);
+  pulp_relu_fp16_fused_fork(mm_manager_fp16, &man_args, act_args, 1);
   #endif
 
   #ifdef DEBUG 
@@ -20,9 +20,15 @@
 
 #include "pulp_train_utils_fp32.h"
 #include "pulp_matmul_fp32.h"
+#include "pulp_act_fp32.h"
 #include "pulp_linear_fp32.h"
 
 void pulp_linear_fp32_fw_cl( void * Linear_args )
+{
+  pulp_linear_fp32_fw_relu_cl(Linear_args, NULL);
+}
+
+void pulp_linear_fp32_fw_relu_cl( void * Linear_args, void * act_args )
 {
   struct Linear_args * FC_args = (struct Linear_args *) Linear_args;
   float *coeffData = FC_args->coeff->data;
@@ -42,14 +48,14 @@ void pulp_linear_fp32_fw_cl( void * Linear_args )
   matMul_args.trans_B = 0;
 
   #ifndef OPTIMIZE
-  pi_cl_team_fork(NUM_CORES, mm, &matMul_args);
+  pulp_relu_fp32_fused_fork(mm, &matMul_args, act_args, 0);
   #else
   struct mm_manager_args man_args;
   man_args.mm_args = &matMul_args;
   man_args.layer_type = LAYER_LINEAR;
   man_args.step_type = STEP_FW;
   man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-  pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+  pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 0);
   #endif
 
   #ifdef DEBUG 
@@ -127,6 +133,11 @@ void pulp_linear_fp32_bw_param_grads_cl( void * Linear_args )
 
 
 void pulp_linear_fp32_bw_input_grads_cl( void * Linear_args )
+{
+  pulp_linear_fp32_bw_input_grads_relu_cl(Linear_args, NULL);
+}
+
+void pulp_linear_fp32_bw_input_grads_relu_cl( void * Linear_args, void * act_args )
 {
   struct Linear_args * FC_args = (struct Linear_args *) Linear_args;
   float *coeffData = FC_args->coeff->data;
@@ -156,14 +167,14 @@ void pulp_linear_fp32_bw_input_grads_cl( void * Linear_args )
   matMul_args.trans_B = 0;
 
   #ifndef OPTIMIZE
-  pi_cl_team_fork(NUM_CORES, mm_M, &matMul_args);
+  pulp_relu_fp32_fused_fork(mm_M, &matMul_args, act_args, 1);
   #else
   struct mm_manager_args man_args;
   man_args.mm_args = &matMul_args;
   man_args.layer_type = LAYER_LINEAR;
   man_args.step_type = STEP_IN_GRAD;
   man_args.matmul_type = opt_matmul_type; //MATMUL_TYPE;
-  pi_cl_team_fork(NUM_CORES, mm_manager, &man_args);
+  pulp_relu_fp32_fused_fork(mm_manager, &man_args, act_args, 1);
   #endif
 
   #ifdef DEBUG 
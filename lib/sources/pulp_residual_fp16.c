@@ -20,6 +20,7 @@
 
 #include "pmsis.h"
 #include "pulp_train_utils_fp16.h"
+#include "pulp_act_fp16.h"
 #include "pulp_residual_fp16.h"
 
 
@@ -28,6 +29,11 @@
 
 
 void pulp_residualconn_fp16_fw( void * SkipConn_args_fp16 )
+{
+    pulp_residualconn_fp16_fw_relu(SkipConn_args_fp16, NULL);
+}
+
+void pulp_residualconn_fp16_fw_relu( void * SkipConn_args_fp16, void * act_args )
 {
     struct SkipConn_args_fp16 * args = (struct SkipConn_args_fp16 *) SkipConn_args_fp16;
     struct blob_fp16 * skip = args->skip;
@@ -47,7 +53,7 @@ void pulp_residualconn_fp16_fw( void * SkipConn_args_fp16 )
     args_sum.dest = out->data;
     args_sum.size = out->dim;
 
-    pi_cl_team_fork(NUM_CORES, vect_sum_fp16, &args_sum);
+    pulp_relu_fp16_fused_fork(vect_sum_fp16, &args_sum, act_args, 0);
 }
 
 
@@ -20,12 +20,18 @@
 
 #include "pmsis.h"
 #include "pulp_train_utils_fp32.h"
+#include "pulp_act_fp32.h"
 #include "pulp_residual_fp32.h"
 
 
 // FORWARD PRIMITIVES
 
 void pulp_residualconn_fp32_fw( void * SkipConn_args )
+{
+    pulp_residualconn_fp32_fw_relu(SkipConn_args, NULL);
+}
+
+void pulp_residualconn_fp32_fw_relu( void * SkipConn_args, void * act_args )
 {
     struct SkipConn_args * args = (struct SkipConn_args *) SkipConn_args;
     struct blob * skip = args->skip;
@@ -43,7 +49,7 @@ void pulp_residualconn_fp32_fw( void * SkipConn_args )
     args_sum.dest = out->data;
     args_sum.size = out->dim;
 
-    pi_cl_team_fork(NUM_CORES, vect_sum, &args_sum);
+    pulp_relu_fp32_fused_fork(vect_sum, &args_sum, act_args, 0);
 
 }
 
@@ -0,0 +1,131 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import os
+import json
+import hashlib
+
+"""
+Persistent cache of the profiled runs (JSON-lines, one record per run, tests/profile_cache.jsonl).
+Runs are identified by test, data type, make arguments (layer sizes, step, matmul, cores),
+by a hash of the library sources and by a hash of the sources of the test (C code, Makefile
+with its defaults and golden model), so that any change to them invalidates old results.
+Shared by tests/*/utils/profile_optimized.py and by the AutoTuner.
+"""
+
+# Performance counters stored for each run (keys of the records of log_utils)
+cache_counters = ['cycles', 'instr', 'ext_ld', 'TCDM_cont', 'ld_stalls', 'imiss']
+
+# Files of a test folder which change the profiled code or its data
+test_sources = ['Makefile', 'main.c', 'net.c', 'net.h', 'stats.h', 'utils/GM.py']
+
+
+
+# Computes a hash of the content of the library (sources and headers)
+def compute_lib_hash (lib_path):
+
+    lib_hash = hashlib.sha1()
+    for folder in ['sources', 'include']:
+        for root, dirs, files in sorted(os.walk(os.path.join(lib_path, folder))):
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                lib_hash.update(os.path.relpath(file_path, lib_path).encode())
+                f = open(file_path, "rb")
+                lib_hash.update(f.read())
+                f.close()
+
+    return lib_hash.hexdigest()
+
+
+
+# Computes a hash of the sources of a test folder (the Makefile holds the defaults of the make arguments)
+def compute_test_hash (test_path):
+
+    test_hash = hashlib.sha1()
+    for file_name in test_sources:
+        file_path = os.path.join(test_path, file_name)
+        if os.path.exists(file_path):
+            test_hash.update(file_name.encode())
+            f = open(file_path, "rb")
+            test_hash.update(f.read())
+            f.close()
+
+    return test_hash.hexdigest()
+
+
+
+# Computes the hash of the sources of each test folder (test_*) of the tests folder
+def compute_test_hashes (tests_path):
+
+    test_hashes = {}
+    for test_name in sorted(os.listdir(tests_path)):
+        test_path = os.path.join(tests_path, test_name)
+        if test_name.startswith('test_') and os.path.isdir(test_path):
+            test_hashes[test_name] = compute_test_hash(test_path)
+
+    return test_hashes
+
+
+
+# Builds the key of a run (make arguments are sorted, so that their order does not matter)
+def get_cache_key (test_name, data_type, make_args, lib_hash, test_hash):
+
+    args = sorted(set([arg.replace("'", "").replace('"', '') for arg in make_args.split()]))
+    return "{}|{}|{}|{}|{}".format(test_name, data_type.replace("'", "").lower(), " ".join(args), lib_hash, test_hash)
+
+
+
+# Loads the cache file into a dictionary (key -> record), the latest record of a key is kept
+def load_cache (cache_file):
+
+    cache = {}
+    if not os.path.exists(cache_file):
+        return cache
+    f = open(cache_file, "r")
+    for line in f:
+        try:
+            record = json.loads(line)
+            cache[record['key']] = record
+        except (ValueError, KeyError):
+            # Skip truncated records
+            pass
+    f.close()
+
+    return cache
+
+
+
+# Appends a record to the cache file (records with errors or missing counters are not stored)
+def store_record (cache_file, cache, cache_key, stats):
+
+    record = {'key': cache_key}
+    for counter in cache_counters:
+        if counter not in stats:
+            return
+        record[counter] = stats[counter]
+
+    # Single line appends, so that multiple processes can share the file
+    f = open(cache_file, "a")
+    f.write(json.dumps(record) + "\n")
+    f.close()
+    cache[cache_key] = record
+
+    return
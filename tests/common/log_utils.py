@@ -0,0 +1,114 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import re
+
+"""
+PARSER OF THE SIMULATOR OUTPUT (log.txt)
+A single pass with one compiled regular expression finds, line by line:
+- the performance counters printed by STOP_STATS() (stats.h), e.g. "[0] cycles = 1234",
+  grouped into one record for each profiled region and core;
+- the name of the profiled region, e.g. "-----> Profiling mm_u2:" (test_matmul);
+- the mismatches with the golden model ("Error at index: ...").
+The same file (tests/common) is used by the tests, by the CI test suite and by the AutoTuner.
+"""
+
+# Performance counters printed by STOP_STATS(), as [key of the record, text in the log]
+# (the "cycles" counter is printed first, so it opens a new record)
+COUNTERS = [['cycles', 'cycles'], ['instr', 'instr'], ['active', 'active cycles'], ['ext_ld', 'ext load'],
+            ['TCDM_cont', 'TCDM cont'], ['ld_stalls', 'ld stall'], ['imiss', 'imiss']]
+# Text of a mismatch with the golden model
+ERROR_TEXT = 'Error at index:'
+# Text which introduces the name of the profiled region
+REGION_TEXT = '-----> Profiling '
+
+COUNTER_KEYS = dict([[text, key] for key, text in COUNTERS])
+LOG_REGEX = re.compile(r'\[(\d+)\] (' + '|'.join([re.escape(text) for key, text in COUNTERS]) + r') = (\d+)'
+                       + '|(' + re.escape(ERROR_TEXT) + ')'
+                       + '|' + re.escape(REGION_TEXT) + r'(.*?):?\s*$')
+
+
+
+# Yields the content of the log line by line: ('counters', record) for each complete record,
+# ('error', line) for each mismatch and ('region', name) for each profiled region.
+# A record is a dictionary {'region': name, 'core': id, 'cycles': ..., 'instr': ..., ...}
+def iter_log (lines):
+
+    region = ''
+    record = None
+    for line in lines:
+        match = LOG_REGEX.search(line)
+        if match is None:
+            continue
+        core, text, value, error, name = match.groups()
+        if text is not None:
+            key = COUNTER_KEYS[text]
+            if key == 'cycles' or record is None or record['core'] != int(core) or key in record:
+                if record is not None:
+                    yield 'counters', record
+                record = {'region': region, 'core': int(core)}
+            record[key] = int(value)
+        elif error is not None:
+            yield 'error', line
+        else:
+            region = name
+            yield 'region', name
+    if record is not None:
+        yield 'counters', record
+
+
+
+# Parses the log (file object, list of lines or string), returns the list of the records and the number of errors
+def parse_log (lines):
+
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    records = []
+    errors = 0
+    for kind, content in iter_log(lines):
+        if kind == 'counters':
+            records.append(content)
+        elif kind == 'error':
+            errors += 1
+
+    return records, errors
+
+
+
+# Parses a log file (streamed, without loading it in memory), see parse_log
+def parse_log_file (log_file="log.txt"):
+
+    f = open(log_file, "r", errors='replace')
+    records, errors = parse_log(f)
+    f.close()
+
+    return records, errors
+
+
+
+# Returns the first record of a region (of any region if None), or an empty dictionary if not found
+def first_record (records, region=None):
+
+    for record in records:
+        if region is None or record['region'] == region:
+            return record
+
+    return {}
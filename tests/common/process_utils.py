@@ -0,0 +1,93 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import os
+import errno
+import signal
+import multiprocessing
+from subprocess import Popen, TimeoutExpired, PIPE
+
+"""
+Concurrent builds and simulations, shared by the size sweeps of the tests (size_sweep_utils.py),
+by the CI test suite and by the AutoTuner. Each command runs in its own process group, which is
+killed as a whole on timeout, and the commands are launched from a bounded process pool.
+Process handling follows tools/AutoTuner/server_execution_files/sw/bwruntest.py.
+"""
+
+
+
+# Runs a shell command in its own process group (killing the whole group on timeout).
+# If capture is True, the output is returned as text, otherwise it goes to the terminal (or where the command redirects it).
+# Returns the return code (1 on timeout), the output, the error output and whether the command timed out
+def run_command (command, cwd, timeout, env=None, capture=False):
+
+    pipe = PIPE if capture == True else None
+    with Popen(command, shell=True, cwd=cwd, env=env, stdout=pipe, stderr=pipe, preexec_fn=os.setpgrp) as process:
+        try:
+            # Child and parent are racing for setting/using the pgid so we have
+            # to set it in both processes
+            try:
+                os.setpgid(process.pid, process.pid)
+            except OSError as e:
+                if e.errno != errno.EACCES:
+                    raise
+            stdout, stderr = process.communicate(timeout=timeout)
+            returncode = process.poll()
+            timed_out = False
+        except TimeoutExpired:
+            # make -> gvsoc forks are killed with the whole process group
+            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+            stdout, stderr = process.communicate()
+            returncode = 1
+            timed_out = True
+        except:  # noqa: E722
+            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+            raise
+
+    if capture == True:
+        stdout = stdout.decode('utf-8', errors='replace')
+        stderr = stderr.decode('utf-8', errors='replace')
+
+    return returncode, stdout, stderr, timed_out
+
+
+
+# Runs func on each job in a bounded process pool and calls on_result on each result as soon as its job
+# is finished (in order of completion). On Ctrl-C the pool is terminated, message is printed and the program exits
+def run_pool (func, jobs, max_procs, on_result, message):
+
+    # Disable signals to prevent race. Child processes inherit SIGINT handler
+    original_sigint_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    pool = multiprocessing.Pool(processes=max_procs)
+    # Restore SIGINT handler
+    signal.signal(signal.SIGINT, original_sigint_handler)
+    try:
+        for result in pool.imap_unordered(func, jobs):
+            on_result(result)
+    except KeyboardInterrupt:
+        print("\n" + message)
+        pool.terminate()
+        pool.join()
+        exit(1)
+    pool.close()
+    pool.join()
+
+    return
@@ -0,0 +1,392 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import os
+import csv
+import json
+import time
+import shutil
+import itertools
+import multiprocessing
+
+import log_utils as logs
+from process_utils import run_command, run_pool
+
+"""
+SWEEP OVER THE NETWORK SIZES (utils/profile_sizes.py)
+The sizes to be profiled are a grid: each dimension (a variable of the Makefile,
+plus STEP and NUM_CORES) takes a list of values, and each combination of the
+values is a point of the sweep. The points which do not fit the L1 memory (memory
+occupation computed as in compute_memory_occupation() of net.c) are pruned, the
+other ones are built and simulated concurrently, each one in a scratch copy of the
+test folder. The results are written as a table, with one row for each point.
+The same file (tests/common) is used by all the tests which profile multiple sizes.
+"""
+
+# Performance counters of each point (keys of the records of log_utils)
+PERF_COUNTERS = ['cycles', 'instr', 'ext_ld', 'TCDM_cont', 'ld_stalls', 'imiss']
+# Columns of the table which follow the dimensions of the grid
+TABLE_FIELDS = ['MATMUL_TYPE', 'data_type', 'L1_bytes', 'status', 'errors'] + PERF_COUNTERS
+# Size (bytes) of the elements of each data type
+DATA_BYTES = {'fp32': 4, 'fp16': 2}
+
+# Status of a point:
+# OK         => profiled, results match the golden model
+# ERRORS     => profiled, results do not match the golden model
+# NO_PERF    => no performance counters in the output (failed build or simulation)
+# TIMEOUT    => killed after the timeout
+# L1_PRUNED  => not simulated, the sizes exceed the L1 memory
+# INVALID    => not simulated, the sizes are not coherent (e.g. kernel larger than the input)
+
+
+
+# Parses the values of a dimension:
+# "8,16,32" => [8, 16, 32]; "8:32:8" => [8, 16, 24, 32] (start:stop:step, stop included);
+# "8:64*2" => [8, 16, 32, 64] (start:stop*factor); "=IN_CH" => the value of the IN_CH dimension
+def parse_values (text):
+
+    if isinstance(text, list):
+        return text
+    text = str(text).strip().strip("'\"")
+    if text.startswith('='):
+        return text
+    values = []
+    for item in text.split(','):
+        item = item.strip()
+        if item == '':
+            continue
+        if ':' in item and '*' in item:
+            start, stop_factor = item.split(':')
+            stop, factor = stop_factor.split('*')
+            if int(start) <= 0 or int(factor) <= 1:
+                print("[size_sweep_utils.parse_values]: Invalid range \"{}\", start must be > 0 and factor > 1!!".format(item))
+                exit()
+            value = int(start)
+            while value <= int(stop):
+                values.append(value)
+                value *= int(factor)
+        elif ':' in item:
+            bounds = [int(bound) for bound in item.split(':')]
+            step = bounds[2] if len(bounds) > 2 else 1
+            if step <= 0:
+                print("[size_sweep_utils.parse_values]: Invalid range \"{}\", step must be > 0!!".format(item))
+                exit()
+            values += list(range(bounds[0], bounds[1]+1, step))
+        else:
+            try:
+                values.append(int(item))
+            except ValueError:
+                values.append(item)
+    if len(values) == 0:
+        print("[size_sweep_utils.parse_values]: No values in \"{}\"!!".format(text))
+        exit()
+
+    return values
+
+
+
+# Adds an option to the parser for each dimension of the grid (e.g. --IN_CH 8,16,32)
+def add_grid_arguments (parser, grid):
+
+    for dim in grid:
+        parser.add_argument( '--'+dim, type=str, default=None)
+
+    return
+
+
+
+# Builds the grid from its defaults, a JSON config file ({"IN_CH": [8, 16], "OUT_CH": "8:64*2", ...})
+# and the options of the command line (in increasing order of priority)
+def get_grid (grid, args, config_file=''):
+
+    sweep_grid = dict([[dim, parse_values(values)] for dim, values in grid.items()])
+    if config_file != '':
+        f = open(config_file, 'r')
+        config = json.load(f)
+        f.close()
+        for dim, values in config.items():
+            sweep_grid[dim] = parse_values(values)
+    for dim in grid:
+        if getattr(args, dim, None) is not None:
+            sweep_grid[dim] = parse_values(getattr(args, dim))
+
+    return sweep_grid
+
+
+
+# Expands the grid into the list of its points ({dimension: value}), in the order of the dimensions
+def expand_grid (grid):
+
+    dims = [dim for dim in grid if not isinstance(grid[dim], str)]
+    tied = [dim for dim in grid if isinstance(grid[dim], str)]
+    for dim in tied:
+        if grid[dim][1:] not in dims:
+            print("[size_sweep_utils.expand_grid]: {} refers to the unknown dimension {}!!".format(dim, grid[dim][1:]))
+            exit()
+
+    points = []
+    for values in itertools.product(*[grid[dim] for dim in dims]):
+        values = dict(zip(dims, values))
+        point = {}
+        for dim in grid:
+            if dim in tied:
+                point[dim] = values[grid[dim][1:]]
+            else:
+                point[dim] = values[dim]
+        points.append(point)
+
+    return points
+
+
+
+# Computes the L1 occupation of each point and prunes the ones which exceed the L1 size.
+# l1_footprint(point, data_bytes) returns the bytes of a point, or None if its sizes are not valid.
+# Returns the list of the results, one for each point (not simulated yet)
+def prune_points (points, l1_footprint, data_type, l1_size):
+
+    results = []
+    for point in points:
+        memocc = l1_footprint(point, DATA_BYTES[data_type])
+        result = {'point': point, 'L1_bytes': memocc, 'errors': 0, 'stats': {}}
+        if memocc is None:
+            result['status'] = 'INVALID'
+        elif memocc > l1_size:
+            result['status'] = 'L1_PRUNED'
+        else:
+            result['status'] = None
+        results.append(result)
+
+    return results
+
+
+
+# Command which builds and simulates a point
+def get_command (point, matmul_type):
+
+    make_args = " ".join(["{}={}".format(dim, value) for dim, value in point.items()])
+    return "make clean get_golden all run MATMUL_TYPE={} {}".format(matmul_type, make_args)
+
+
+
+# Creates the scratch tree of a point (<scratch>/<name>/tests/<test>, with the lib linked in <scratch>/<name>/lib)
+def prepare_scratch (name, scratch_folder, test_folder):
+
+    job_folder = os.path.join(scratch_folder, name)
+    if os.path.exists(job_folder):
+        shutil.rmtree(job_folder)
+    os.makedirs(os.path.join(job_folder, 'tests'))
+
+    # Test folder (outputs of previous runs are not needed)
+    scratch_test = os.path.join(job_folder, 'tests', os.path.basename(test_folder))
+    shutil.copytree(test_folder, scratch_test,
+                    ignore=shutil.ignore_patterns('BUILD', '__pycache__', 'log.txt', 'runs.txt', 'runs.csv', '.gm_cache'))
+    # Files which the tests read from the parent folder
+    for mm_list in ['mm_manager_list.txt', 'mm_manager_list_fp16.txt']:
+        shutil.copy2(os.path.join(test_folder, '..', mm_list), os.path.join(job_folder, 'tests'))
+    # The library sources and the shared utilities of the tests are only read, so they are shared
+    os.symlink(os.path.abspath(os.path.join(test_folder, '..', '..', 'lib')), os.path.join(job_folder, 'lib'))
+    os.symlink(os.path.abspath(os.path.join(test_folder, '..', 'common')), os.path.join(job_folder, 'tests', 'common'))
+
+    return scratch_test
+
+
+
+# Builds and simulates a point in its scratch folder (killing the whole process group on timeout)
+def run_point (job):
+
+    idx, result, matmul_type, scratch_folder, test_folder, timeout, keep_scratch = job
+    result = dict(result)
+    name = "point_{}".format(idx)
+    command = get_command(result['point'], matmul_type)
+    print("Running {}: {}".format(name, command))
+    start = time.time()
+
+    try:
+        cwd = prepare_scratch(name, scratch_folder, test_folder)
+    except (OSError, shutil.Error) as e:
+        print("[size_sweep_utils.run_point]: Unable to prepare scratch folder: {}".format(e))
+        result['status'] = 'NO_PERF'
+        result['errors'] = 1
+        return idx, result
+
+    # The golden model outputs are cached in the folder of the test (see dump_utils.restore_golden_model())
+    env = dict(os.environ, GM_CACHE_DIR=os.path.join(test_folder, '.gm_cache'))
+
+    _, stdout, _, timed_out = run_command(command, cwd, timeout, env=env, capture=True)
+
+    records, errors = logs.parse_log(stdout)
+    record = logs.first_record(records)
+    result['stats'] = dict([[counter, record[counter]] for counter in PERF_COUNTERS if counter in record])
+    result['errors'] = errors
+    if timed_out:
+        result['status'] = 'TIMEOUT'
+    elif len(result['stats']) < len(PERF_COUNTERS):
+        result['status'] = 'NO_PERF'
+    elif errors > 0:
+        result['status'] = 'ERRORS'
+    else:
+        result['status'] = 'OK'
+
+    if keep_scratch == False:
+        shutil.rmtree(os.path.join(scratch_folder, name), ignore_errors=True)
+
+    print("Finished {} in {:.2f}s ({}, {} cycles)".format(name, time.time() - start, result['status'], result['stats'].get('cycles', 0)))
+
+    return idx, result
+
+
+
+# Simulates the points which have not been pruned in a bounded process pool, the results keep their order
+def run_points (results, matmul_type, scratch_folder, max_procs, timeout, keep_scratch=False):
+
+    test_folder = os.getcwd()
+    jobs = [(idx, result, matmul_type, scratch_folder, test_folder, timeout, keep_scratch)
+            for idx, result in enumerate(results) if result['status'] is None]
+    if len(jobs) == 0:
+        return results
+    if not os.path.exists(scratch_folder):
+        os.makedirs(scratch_folder)
+
+    print("\nLaunching {} points on {} processes..\n".format(len(jobs), max_procs))
+    # Each result is stored in the place of its point
+    def store_result (indexed_result):
+        results[indexed_result[0]] = indexed_result[1]
+    run_pool(run_point, jobs, max_procs, store_result, "[size_sweep_utils.run_points]: Terminating sweep")
+
+    if keep_scratch == False:
+        shutil.rmtree(scratch_folder, ignore_errors=True)
+        # Folder of the scratch folders of all the tests (left if other sweeps are running)
+        try:
+            os.rmdir(os.path.dirname(scratch_folder))
+        except OSError:
+            pass
+
+    return results
+
+
+
+# Writes the results as a table (CSV), one row for each point: dimensions, L1 occupation, status and counters
+def write_table (table_file, dims, results, matmul_type, data_type):
+
+    f = open(table_file, 'w', newline='')
+    writer = csv.DictWriter(f, fieldnames=dims + TABLE_FIELDS)
+    writer.writeheader()
+    for result in results:
+        row = dict(result['point'])
+        row['MATMUL_TYPE'] = matmul_type
+        row['data_type'] = data_type
+        row['L1_bytes'] = result['L1_bytes']
+        row['status'] = result['status']
+        row['errors'] = result['errors']
+        for counter in PERF_COUNTERS:
+            row[counter] = result['stats'].get(counter, '')
+        writer.writerow(row)
+    f.close()
+
+    return
+
+
+
+# Appends the results to the performance file (text report, one entry for each point)
+def write_report (filename, results, matmul_type):
+
+    f = open(filename, "a")
+    for idx, result in enumerate(results):
+        sizes = ", ".join(["{}={}".format(dim, value) for dim, value in result['point'].items()])
+        f.write("\nRUN {}: MATMUL_ALG= {}, {}".format(idx, matmul_type, sizes))
+        stats = result['stats']
+        if result['status'] == 'OK':
+            f.write("\n{} => cycles: {}".format(result['point']['STEP'], stats['cycles']))
+            f.write(", instr = {}, ext_ld = {}, TCDM_cont = {}, ld_stalls = {}, imiss = {}\n".format(stats['instr'], stats['ext_ld'], stats['TCDM_cont'], stats['ld_stalls'], stats['imiss']))
+        elif result['status'] == 'ERRORS':
+            f.write("\n{} CONTAINS ERRORS!!!\n".format(result['point']['STEP']))
+        else:
+            f.write("\n{} NOT PROFILED: {} (L1 occupation: {} bytes)\n".format(result['point']['STEP'], result['status'], result['L1_bytes']))
+    f.close()
+
+    return
+
+
+
+# Profiles the points of a grid of sizes: the user grid of profile_sizes.py is extended with
+# the steps and the numbers of cores, overridden by the config file and by the command line,
+# pruned with l1_footprint(point, data_bytes) and simulated. The results are written
+# into the performance file (text) and into the table file (CSV)
+def profile_sizes (grid, l1_footprint, args):
+
+    sweep_grid = dict(grid)
+    sweep_grid['STEP'] = args.step
+    sweep_grid['NUM_CORES'] = args.cores
+    sweep_grid = get_grid(sweep_grid, args, args.config)
+    dims = list(sweep_grid.keys())
+
+    points = expand_grid(sweep_grid)
+    if args.num_sizes > 0:
+        points = points[0:args.num_sizes]
+    results = prune_points(points, l1_footprint, args.data_type, args.l1_size)
+    num_pruned = len([result for result in results if result['status'] is not None])
+
+    print("\n=====> ENTERING TEST SEQUENCE.. <=====\n")
+    print("{} points in the grid, {} pruned (L1 size: {} bytes)".format(len(results), num_pruned, args.l1_size))
+
+    # Prepare log file for the measured performances
+    f = open(args.perf_file_name, "w")
+    f.write("[ PERFORMANCES OVER DIFFERENT NETWORK SIZES ]\n")
+    f.write("---------------------------------------------\n")
+    f.write("STEP TYPE: {}\n".format(", ".join([str(step) for step in sweep_grid['STEP']])))
+    f.write("NUM_CORES: {}\n".format(", ".join([str(cores) for cores in sweep_grid['NUM_CORES']])))
+    f.write("DATA_TYPE: {}\n".format(args.data_type))
+    f.write("Number of different layer sizes: {} ({} pruned, L1 size: {} bytes)\n".format(len(results), num_pruned, args.l1_size))
+    f.write("---------------------------------------------\n")
+    f.write("\n=====> NETWORK RUNS <=====")
+    f.close()
+
+    scratch_folder = os.path.join(os.getcwd(), '..', '.sweep_scratch', os.path.basename(os.getcwd()))
+    results = run_points(results, args.matmul_type, scratch_folder, args.max_procs, args.timeout, args.keep_scratch == 1)
+
+    write_report(args.perf_file_name, results, args.matmul_type)
+    write_table(args.table_file, dims, results, args.matmul_type, args.data_type)
+
+    print("\n=====> TERMINATING TEST SEQUENCE.. <=====\n")
+    print("Results written to {} and {}".format(args.perf_file_name, args.table_file))
+
+    return results
+
+
+
+# Adds the options of the sweep to the parser of profile_sizes.py
+def add_sweep_arguments (parser, grid, step, data_type):
+
+    parser.add_argument( '--num_sizes', type=int, default=0)    # Profile only the first points of the grid (0 = all)
+    parser.add_argument( '--perf_file_name', type=str, default='runs.txt' )
+    parser.add_argument( '--table_file', type=str, default='runs.csv' )     # Table of the results, one row for each point
+    parser.add_argument( '--step', type=str, default=step)      # One or more steps (e.g. FORWARD,BACKWARD_GRAD)
+    parser.add_argument( '--cores', type=str, default="1")      # One or more numbers of cores (e.g. 1,2,4,8 or 1:8*2)
+    parser.add_argument( '--data_type', type=str, default=data_type)
+    parser.add_argument( '--matmul_type', type=int, default=0)  # Selects a matmul algorithm
+    parser.add_argument( '--config', type=str, default='')      # JSON file with the values of the dimensions
+    parser.add_argument( '--l1_size', type=int, default=64*1024)    # Points which exceed the L1 memory are not simulated
+    parser.add_argument( '--max_procs', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument( '--timeout', type=int, default=1800)   # Timeout of each build and simulation (seconds)
+    parser.add_argument( '--keep_scratch', type=int, default=0)
+    add_grid_arguments(parser, grid)
+
+    return
@@ -2,6 +2,9 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 from torch.utils.data import Dataset, DataLoader
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 import torchvision
 from torchvision import datasets
@@ -11,11 +14,23 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import torch.nn.functional as F
+import argparse
+parser = argparse.ArgumentParser("ResNet CIFAR10 Golden Model")
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
+args = parser.parse_args()
+
 # Define hyperparameters
 learning_rate = 0.01
 batch_size = 1
 epochs = 50
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 
 labels_map = {
     0: "Airplane",
@@ -654,45 +669,45 @@ loss_fn = nn.CrossEntropyLoss()
 f = open('io_data.h', 'w')
 f.write('// Init weights\n')
 f.write('#define WGT_SIZE_L0 '+str(l0_in_ch*l0_out_ch*l0_hk*l0_wk)+'\n')
-f.write('PI_L2 float init_WGT_l0[WGT_SIZE_L0] = {'+dump.tensor_to_string(net.l0.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l0', net.l0.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L0')
 f.write('#define WGT_SIZE_L1 '+str(l1_in_ch*l1_out_ch*l1_hk*l1_wk)+'\n')
-f.write('PI_L2 float init_WGT_l1[WGT_SIZE_L1] = {'+dump.tensor_to_string(net.l1.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l1', net.l1.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L1')
 f.write(f'#define WGT_SIZE_L2  2*{l2_in_ch}\n')
-f.write('PI_L2 float init_WGT_l2[WGT_SIZE_L2] = {'+dump.tensor_to_string(net.l2.weight.data)+dump.tensor_to_string(net.l2.bias.data)+'};\n')
+dump.write_array(f, 'init_WGT_l2', [net.l2.weight.data, net.l2.bias.data], 'float', 'PI_L2', 'WGT_SIZE_L2')
 f.write('#define WGT_SIZE_L3 '+str(l3_in_ch*l3_out_ch*l3_hk*l3_wk)+'\n')
 f.write('PI_L2 float init_WGT_l3[WGT_SIZE_L3];\n')
 f.write('#define WGT_SIZE_L4 '+str(l4_in_ch*l4_out_ch*l4_hk*l4_wk)+'\n')
-f.write('PI_L2 float init_WGT_l4[WGT_SIZE_L4] = {'+dump.tensor_to_string(net.l4.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l4', net.l4.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L4')
 f.write('#define WGT_SIZE_L5 '+str(l5_in_ch*l5_out_ch*l5_hk*l5_wk)+'\n')
-f.write('PI_L2 float init_WGT_l5[WGT_SIZE_L5] = {'+dump.tensor_to_string(net.l5.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l5', net.l5.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L5')
 f.write(f'#define WGT_SIZE_L6  2*{l6_in_ch}\n')
-f.write('PI_L2 float init_WGT_l6[WGT_SIZE_L6] = {'+dump.tensor_to_string(net.l6.weight.data)+dump.tensor_to_string(net.l6.bias.data)+'};\n')
+dump.write_array(f, 'init_WGT_l6', [net.l6.weight.data, net.l6.bias.data], 'float', 'PI_L2', 'WGT_SIZE_L6')
 f.write('#define WGT_SIZE_L7 '+str(l7_in_ch*l7_out_ch*l7_hk*l7_wk)+'\n')
 f.write('PI_L2 float init_WGT_l7[WGT_SIZE_L7];\n')
 f.write('#define WGT_SIZE_L8_1 '+str(l8_1_in_ch*l8_1_out_ch*l8_1_hk*l8_1_wk)+'\n')
-f.write('PI_L2 float init_WGT_l8_1[WGT_SIZE_L8_1] = {'+dump.tensor_to_string(net.l8_1.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l8_1', net.l8_1.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L8_1')
 f.write('#define WGT_SIZE_L8_2 '+str(l8_2_in_ch*l8_2_out_ch*l8_2_hk*l8_2_wk)+'\n')
-f.write('PI_L2 float init_WGT_l8_2[WGT_SIZE_L8_2] = {'+dump.tensor_to_string(net.l8_2.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l8_2', net.l8_2.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L8_2')
 f.write('#define WGT_SIZE_L9 '+str(l9_in_ch*l9_out_ch*l9_hk*l9_wk)+'\n')
-f.write('PI_L2 float init_WGT_l9[WGT_SIZE_L9] = {'+dump.tensor_to_string(net.l9.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l9', net.l9.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L9')
 f.write('#define WGT_SIZE_L10 '+str(l10_in_ch*l10_out_ch*l10_hk*l10_wk)+'\n')
-f.write('PI_L2 float init_WGT_l10[WGT_SIZE_L10] = {'+dump.tensor_to_string(net.l10.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l10', net.l10.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L10')
 f.write(f'#define WGT_SIZE_L11  2*{l11_in_ch}\n')
-f.write('PI_L2 float init_WGT_l11[WGT_SIZE_L11] = {'+dump.tensor_to_string(net.l11.weight.data)+dump.tensor_to_string(net.l11.bias.data)+'};\n')
+dump.write_array(f, 'init_WGT_l11', [net.l11.weight.data, net.l11.bias.data], 'float', 'PI_L2', 'WGT_SIZE_L11')
 f.write('#define WGT_SIZE_L12 '+str(l12_in_ch*l12_out_ch*l12_hk*l12_wk)+'\n')
 f.write('PI_L2 float init_WGT_l12[WGT_SIZE_L12];\n')
 f.write('#define WGT_SIZE_L13 '+str(l13_in_ch*l13_out_ch*l13_hk*l13_wk)+'\n')
-f.write('PI_L2 float init_WGT_l13[WGT_SIZE_L13] = {'+dump.tensor_to_string(net.l13.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l13', net.l13.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L13')
 f.write('#define WGT_SIZE_L14 '+str(l14_in_ch*l14_out_ch*l14_hk*l14_wk)+'\n')
-f.write('PI_L2 float init_WGT_l14[WGT_SIZE_L14] = {'+dump.tensor_to_string(net.l14.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l14', net.l14.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L14')
 f.write(f'#define WGT_SIZE_L15  2*{l15_in_ch}\n')
-f.write('PI_L2 float init_WGT_l15[WGT_SIZE_L15] = {'+dump.tensor_to_string(net.l15.weight.data)+dump.tensor_to_string(net.l15.bias.data)+'};\n')
+dump.write_array(f, 'init_WGT_l15', [net.l15.weight.data, net.l15.bias.data], 'float', 'PI_L2', 'WGT_SIZE_L15')
 f.write('#define WGT_SIZE_L16 '+str(l16_in_ch*l16_out_ch*l16_hk*l16_wk)+'\n')
 f.write('PI_L2 float init_WGT_l16[WGT_SIZE_L16];\n')
 f.write('#define WGT_SIZE_L17 '+str(l17_in_ch*l17_out_ch*l17_hk*l17_wk)+'\n')
 f.write('PI_L2 float init_WGT_l17[WGT_SIZE_L17];\n')
 f.write('#define WGT_SIZE_L18 '+str(l18_in_ch*l18_out_ch*l18_hk*l18_wk)+'\n')
-f.write('PI_L2 float init_WGT_l18[WGT_SIZE_L18] = {'+dump.tensor_to_string(net.l18.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l18', net.l18.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L18')
 f.close()
 
 INPUT_DATA = []
@@ -756,7 +771,11 @@ for e in range(epochs):
 f = open('io_data.h', 'a')
 f.write('// Input and Output data\n')
 f.write(f'#define IN_SIZE {(num_train + num_test)*len(classes)*3*32*32}\n')
-f.write('PI_L2 float INPUT[IN_SIZE] = {'+dump.tensor_to_string(torch.tensor(INPUT_DATA))+'};\n')
+dump.write_array(f, 'INPUT', torch.tensor(INPUT_DATA), 'float', 'PI_L2', 'IN_SIZE')
 f.write(f'#define OUT_SIZE {len(classes)}\n')
-f.write(f'PI_L2 float LABEL[{(num_train + num_test)*len(classes)}*OUT_SIZE] = '+'{'+dump.tensor_to_string(torch.tensor(label_list))+'};\n')
+dump.write_array(f, 'LABEL', torch.tensor(label_list), 'float', 'PI_L2', f'{(num_train + num_test)*len(classes)}*OUT_SIZE')
 f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
@@ -27,6 +27,9 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 
 
@@ -36,9 +39,17 @@ parser.add_argument( '--in_w', type=int, default=16 )
 parser.add_argument( '--in_c', type=int, default=8 )
 parser.add_argument( '--value', type=float, default=0.5 )
 parser.add_argument( '--data_type', type=str, default='FP32')
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 in_h = args.in_h
 in_w = args.in_w
 in_c = args.in_c
@@ -183,25 +194,25 @@ if data_type == 'FP32':
     f.write("#define OUT_SIZE "+str(in_c*int(in_h)*int(in_w))+"\n")
 
     f.write("PI_L2 float RELULOSS = {"+str(reluloss.data.item())+"};\n")
-    f.write("PI_L2 float RELUOUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(reluout)+"};\n")
-    f.write("PI_L2 float RELUOUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(reluout.grad)+"};\n")
-    f.write("PI_L1 float RELUIN[IN_SIZE] = {"+dump.tensor_to_string(reluinput)+"};\n")
-    f.write("PI_L2 float RELUIN_GRAD[IN_SIZE] = {"+dump.tensor_to_string(reluinput.grad)+"};\n")
-    f.write("PI_L1 float RELULABEL[OUT_SIZE] = {"+dump.tensor_to_string(relulabel)+"};\n")
+    dump.write_array(f, 'RELUOUTPUT', reluout, 'float', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'RELUOUTPUT_GRAD', reluout.grad, 'float', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'RELUIN', reluinput, 'float', 'PI_L1', 'IN_SIZE')
+    dump.write_array(f, 'RELUIN_GRAD', reluinput.grad, 'float', 'PI_L2', 'IN_SIZE')
+    dump.write_array(f, 'RELULABEL', relulabel, 'float', 'PI_L1', 'OUT_SIZE')
 
     f.write("PI_L2 float SOFTMLOSS = {"+str(softmloss.data.item())+"};\n")
-    f.write("PI_L2 float SOFTMOUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(softmout)+"};\n")
-    f.write("PI_L2 float SOFTMOUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(softmout.grad)+"};\n")
-    f.write("PI_L1 float SOFTMIN[IN_SIZE] = {"+dump.tensor_to_string(softminput)+"};\n")
-    f.write("PI_L2 float SOFTMIN_GRAD[IN_SIZE] = {"+dump.tensor_to_string(softminput.grad)+"};\n")
-    f.write("PI_L1 float SOFTMLABEL[OUT_SIZE] = {"+dump.tensor_to_string(softmlabel)+"};\n")
+    dump.write_array(f, 'SOFTMOUTPUT', softmout, 'float', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'SOFTMOUTPUT_GRAD', softmout.grad, 'float', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'SOFTMIN', softminput, 'float', 'PI_L1', 'IN_SIZE')
+    dump.write_array(f, 'SOFTMIN_GRAD', softminput.grad, 'float', 'PI_L2', 'IN_SIZE')
+    dump.write_array(f, 'SOFTMLABEL', softmlabel, 'float', 'PI_L1', 'OUT_SIZE')
 
     f.write("PI_L2 float SIGMOIDLOSS = {"+str(sigmoidloss.data.item())+"};\n")
-    f.write("PI_L2 float SIGMOIDOUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(sigmoidout)+"};\n")
-    f.write("PI_L2 float SIGMOIDOUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(sigmoidout.grad)+"};\n")
-    f.write("PI_L1 float SIGMOIDIN[IN_SIZE] = {"+dump.tensor_to_string(sigmoidinput)+"};\n")
-    f.write("PI_L2 float SIGMOIDIN_GRAD[IN_SIZE] = {"+dump.tensor_to_string(sigmoidinput.grad)+"};\n")
-    f.write("PI_L1 float SIGMOIDLABEL[OUT_SIZE] = {"+dump.tensor_to_string(sigmoidlabel)+"};\n")
+    dump.write_array(f, 'SIGMOIDOUTPUT', sigmoidout, 'float', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'SIGMOIDOUTPUT_GRAD', sigmoidout.grad, 'float', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'SIGMOIDIN', sigmoidinput, 'float', 'PI_L1', 'IN_SIZE')
+    dump.write_array(f, 'SIGMOIDIN_GRAD', sigmoidinput.grad, 'float', 'PI_L2', 'IN_SIZE')
+    dump.write_array(f, 'SIGMOIDLABEL', sigmoidlabel, 'float', 'PI_L1', 'OUT_SIZE')
 
     f.close()
 
@@ -343,24 +354,28 @@ if data_type == 'FP16':
     f.write("#define OUT_SIZE "+str(in_c*int(in_h)*int(in_w))+"\n")
 
     f.write("PI_L2 fp16 RELULOSS = {"+str(reluloss.data.item())+"};\n")
-    f.write("PI_L2 fp16 RELUOUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(reluout.half())+"};\n")
-    f.write("PI_L2 fp16 RELUOUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(reluout.grad.half())+"};\n")
-    f.write("PI_L1 fp16 RELUIN[IN_SIZE] = {"+dump.tensor_to_string(reluinput.half())+"};\n")
-    f.write("PI_L2 fp16 RELUIN_GRAD[IN_SIZE] = {"+dump.tensor_to_string(reluinput.grad.half())+"};\n")
-    f.write("PI_L1 fp16 RELULABEL[OUT_SIZE] = {"+dump.tensor_to_string(relulabel.half())+"};\n")
+    dump.write_array(f, 'RELUOUTPUT', reluout.half(), 'fp16', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'RELUOUTPUT_GRAD', reluout.grad.half(), 'fp16', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'RELUIN', reluinput.half(), 'fp16', 'PI_L1', 'IN_SIZE')
+    dump.write_array(f, 'RELUIN_GRAD', reluinput.grad.half(), 'fp16', 'PI_L2', 'IN_SIZE')
+    dump.write_array(f, 'RELULABEL', relulabel.half(), 'fp16', 'PI_L1', 'OUT_SIZE')
 
     f.write("PI_L2 fp16 SOFTMLOSS = {"+str(softmloss.data.item())+"};\n")
-    f.write("PI_L2 fp16 SOFTMOUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(softmout.half())+"};\n")
-    f.write("PI_L2 fp16 SOFTMOUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(softmout.grad.half())+"};\n")
-    f.write("PI_L1 fp16 SOFTMIN[IN_SIZE] = {"+dump.tensor_to_string(softminput.half())+"};\n")
-    f.write("PI_L2 fp16 SOFTMIN_GRAD[IN_SIZE] = {"+dump.tensor_to_string(softminput.grad.half())+"};\n")
-    f.write("PI_L1 fp16 SOFTMLABEL[OUT_SIZE] = {"+dump.tensor_to_string(softmlabel.half())+"};\n")
+    dump.write_array(f, 'SOFTMOUTPUT', softmout.half(), 'fp16', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'SOFTMOUTPUT_GRAD', softmout.grad.half(), 'fp16', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'SOFTMIN', softminput.half(), 'fp16', 'PI_L1', 'IN_SIZE')
+    dump.write_array(f, 'SOFTMIN_GRAD', softminput.grad.half(), 'fp16', 'PI_L2', 'IN_SIZE')
+    dump.write_array(f, 'SOFTMLABEL', softmlabel.half(), 'fp16', 'PI_L1', 'OUT_SIZE')
 
     f.write("PI_L2 fp16 SIGMOIDLOSS = {"+str(sigmoidloss.data.item())+"};\n")
-    f.write("PI_L2 fp16 SIGMOIDOUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(sigmoidout.half())+"};\n")
-    f.write("PI_L2 fp16 SIGMOIDOUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(sigmoidout.grad.half())+"};\n")
-    f.write("PI_L1 fp16 SIGMOIDIN[IN_SIZE] = {"+dump.tensor_to_string(sigmoidinput.half())+"};\n")
-    f.write("PI_L2 fp16 SIGMOIDIN_GRAD[IN_SIZE] = {"+dump.tensor_to_string(sigmoidinput.grad.half())+"};\n")
-    f.write("PI_L1 fp16 SIGMOIDLABEL[OUT_SIZE] = {"+dump.tensor_to_string(sigmoidlabel.half())+"};\n")
+    dump.write_array(f, 'SIGMOIDOUTPUT', sigmoidout.half(), 'fp16', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'SIGMOIDOUTPUT_GRAD', sigmoidout.grad.half(), 'fp16', 'PI_L2', 'OUT_SIZE')
+    dump.write_array(f, 'SIGMOIDIN', sigmoidinput.half(), 'fp16', 'PI_L1', 'IN_SIZE')
+    dump.write_array(f, 'SIGMOIDIN_GRAD', sigmoidinput.grad.half(), 'fp16', 'PI_L2', 'IN_SIZE')
+    dump.write_array(f, 'SIGMOIDLABEL', sigmoidlabel.half(), 'fp16', 'PI_L1', 'OUT_SIZE')
 
     f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
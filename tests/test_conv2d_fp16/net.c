@@ -28,6 +28,11 @@
 
 // DATA DEFINITION
 
+#ifdef MATMUL_SWEEP
+// Matmul profiled by the sweep
+int sweep_matmul_type = 0;
+#endif
+
 // CONV2D
 PI_L1 fp16 zero_init = 0.0f;
 PI_L1 struct Conv2D_args_fp16 C2D_args;
@@ -474,11 +479,25 @@ void net_step()
   printf("\nL2 memory occupation: %d bytes.\n", L2_memocc_bytes);
   #endif
 
+  #ifdef MATMUL_SWEEP
+  // Run the step with each matmul on the same data
+  for (sweep_matmul_type=0; sweep_matmul_type<NUM_MATMULS; sweep_matmul_type++) {
+    printf("\n-----> Profiling MM %d:\n", sweep_matmul_type);
+    RESET_STATS();
+
+    tensor_init();
+
+    connect_blobs();
+
+    train();
+  }
+  #else
   tensor_init();
 
   connect_blobs();
 
   train();
+  #endif
 
   #if defined(DEBUG) && defined(FORWARD) 
   print_data();
@@ -25,6 +25,9 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 import math
 
@@ -43,9 +46,17 @@ parser.add_argument( '--w_pad', type=int, default=0)
 parser.add_argument( '--h_str', type=int, default=1)
 parser.add_argument( '--w_str', type=int, default=1)
 parser.add_argument( '--HWC', type=int, default=0)
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 ker_h = args.ker_height
 ker_w = args.ker_width
 in_ch = args.ch_in
@@ -120,11 +131,11 @@ def hook_fn1(m, i, o):
         print("\n>>>>> INPUT GRAD: <<<<<")
         print(input_grad)
         if HWC_layout == 0:
-          f.write("PI_L2 fp16 INPUT_GRAD[G_IN_SIZE] = {"+dump.tensor_to_string(input_grad)+ "};\n")
+          dump.write_array(f, 'INPUT_GRAD', input_grad, 'fp16', 'PI_L2', 'G_IN_SIZE')
         elif HWC_layout == 1:
           ingrad = deepcopy(input_grad)
           ingrad = ingrad.permute(0,2,3,1)
-          f.write("PI_L2 fp16 INPUT_GRAD[G_IN_SIZE] = {"+dump.tensor_to_string(ingrad)+ "};\n")
+          dump.write_array(f, 'INPUT_GRAD', ingrad, 'fp16', 'PI_L2', 'G_IN_SIZE')
         else:
           print("[utils/GM.py] Invalid data layout!!")
           exit()
@@ -134,11 +145,11 @@ def hook_fn1(m, i, o):
         f.write('#define G_WGT_SIZE '+str(weight_grad.numel())+'\n')
         print(weight_grad)
         if HWC_layout == 0:
-          f.write('PI_L2 fp16 WEIGHT_GRAD[G_WGT_SIZE] = {'+dump.tensor_to_string(weight_grad)+'};\n')       
+          dump.write_array(f, 'WEIGHT_GRAD', weight_grad, 'fp16', 'PI_L2', 'G_WGT_SIZE')
         elif HWC_layout == 1:
           wgt_grad = deepcopy(weight_grad)
           wgt_grad = weight_grad.permute(0,2,3,1)
-          f.write('PI_L2 fp16 WEIGHT_GRAD[G_WGT_SIZE] = {'+dump.tensor_to_string(wgt_grad)+'};\n')
+          dump.write_array(f, 'WEIGHT_GRAD', wgt_grad, 'fp16', 'PI_L2', 'G_WGT_SIZE')
         else:
           print("[utils/GM.py] Invalid data layout!!")
           exit()
@@ -157,21 +168,21 @@ def hook_fn1(m, i, o):
       print(output_grad)
       if step=='BACKWARD_GRAD' or step=='BACKWARD_ERROR':
           if HWC_layout == 0:
-            f.write('PI_L2 fp16 OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+            dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'fp16', 'PI_L2', 'G_OUTPUT_SIZE')
           elif HWC_layout == 1:
             outgrad = deepcopy(output_grad)
             outgrad = outgrad.permute(0,2,3,1)
-            f.write('PI_L2 fp16 OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(outgrad)+'};\n')
+            dump.write_array(f, 'OUTPUT_GRAD', outgrad, 'fp16', 'PI_L2', 'G_OUTPUT_SIZE')
           else:
             print("[utils/GM.py] Invalid data layout!!")
             exit()
       else:
           if HWC_layout == 0:
-            f.write('PI_L2 fp16 OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+            dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'fp16', 'PI_L2', 'G_OUTPUT_SIZE')
           elif HWC_layout == 1:
             outgrad = deepcopy(output_grad)
             outgrad = outgrad.permute(0,2,3,1)
-            f.write('PI_L2 fp16 OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(outgrad)+'};\n')
+            dump.write_array(f, 'OUTPUT_GRAD', outgrad, 'fp16', 'PI_L2', 'G_OUTPUT_SIZE')
           else:
             print("[utils/GM.py] Invalid data layout!!")
             exit()
@@ -198,11 +209,11 @@ def hook_fn2(m, i, o):
           print("\n>>>>> OUTPUT DATA: <<<<<")
           print(output_data)
           if HWC_layout == 0:
-            f.write('PI_L2 fp16 OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(output_data)+'};\n')
+            dump.write_array(f, 'OUTPUT', output_data, 'fp16', 'PI_L2', 'OUTPUT_SIZE')
           elif HWC_layout == 1:
             outdata = output_data
             outdata = outdata.permute(1,2,0)
-            f.write('PI_L2 fp16 OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(outdata)+'};\n')
+            dump.write_array(f, 'OUTPUT', outdata, 'fp16', 'PI_L2', 'OUTPUT_SIZE')
           else:
             print("[utils/GM.py] Invalid data layout!!")
             exit()
@@ -240,21 +251,21 @@ print("\n>>>>>> INPUT DATA: <<<<<")
 print(inp)
 if step=='FORWARD':
   if HWC_layout == 0:
-    f.write('PI_L2 fp16 INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(inp)+'};\n')
+    dump.write_array(f, 'INPUT', inp, 'fp16', 'PI_L2', 'INPUT_SIZE')
   elif HWC_layout == 1:
     indata = deepcopy(inp)
     indata = indata.permute(0,2,3,1)
-    f.write('PI_L2 fp16 INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(indata)+'};\n')
+    dump.write_array(f, 'INPUT', indata, 'fp16', 'PI_L2', 'INPUT_SIZE')
   else:
     print("[utils/GM.py] Invalid data layout!!")
     exit()
 else:
   if HWC_layout == 0:
-    f.write('PI_L2 fp16 INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(inp)+'};\n')
+    dump.write_array(f, 'INPUT', inp, 'fp16', 'PI_L2', 'INPUT_SIZE')
   elif HWC_layout == 1:
     indata = deepcopy(inp)
     indata = indata.permute(0,2,3,1)
-    f.write('PI_L2 fp16 INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(indata)+'};\n')
+    dump.write_array(f, 'INPUT', indata, 'fp16', 'PI_L2', 'INPUT_SIZE')
   else:
     print("[utils/GM.py] Invalid data layout!!")
     exit()
@@ -295,11 +306,11 @@ f = open("init-defines.h", 'a')
 f.write("\n\n// Weight initialization\n")
 f.write("#define WGT_SIZE (Tout_C_l1*Tin_C_l1*Tker_H_l1*Tker_W_l1)\n")
 if HWC_layout == 0:
-  f.write('PI_L2 fp16 WEIGHTS[WGT_SIZE] = {'+dump.tensor_to_string(net.conv.weight.data)+'};\n')
+  dump.write_array(f, 'WEIGHTS', net.conv.weight.data, 'fp16', 'PI_L2', 'WGT_SIZE')
 elif HWC_layout == 1:
   weightdata = deepcopy(net.conv.weight.data)
   weightdata = net.conv.weight.data.permute(0,2,3,1)
-  f.write('PI_L2 fp16 WEIGHTS[WGT_SIZE] = {'+dump.tensor_to_string(weightdata)+'};\n')
+  dump.write_array(f, 'WEIGHTS', weightdata, 'fp16', 'PI_L2', 'WGT_SIZE')
 else:
   print("[utils/GM.py] Invalid data layout!!")
   exit()
@@ -324,4 +335,8 @@ elif HWC_layout == 1:
   print("Out Size: [{}, {}, {}] \t\t(GM CHW Data: {})\n\n".format(out_size_h, out_size_w, out_ch, out.size())) 
 else:
   print("[utils/GM.py] Invalid data layout!!")
-  exit()
\ No newline at end of file
+  exit()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
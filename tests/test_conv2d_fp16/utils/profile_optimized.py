@@ -21,7 +21,8 @@ Authors: Davide Nadalini, Leonardo Ravaglia
 
 '''
 Profile and sort all the available optimizations over the layers
-by compiling multiple times with all matmuls.
+by compiling multiple times with all matmuls
+(or once for all of them, with --sweep 1).
 '''
 
 import os
@@ -35,6 +36,9 @@ parser.add_argument( '--perf_file_name', type=str, default='runs.txt' )
 parser.add_argument( '--step', type=str, default="FORWARD")
 parser.add_argument( '--cores', type=int, default=1)
 parser.add_argument( '--data_type', type=str, default='fp16')
+parser.add_argument( '--cache_file', type=str, default='../profile_cache.jsonl')   # Persistent cache of the results
+parser.add_argument( '--use_cache', type=int, default=1)
+parser.add_argument( '--sweep', type=int, default=0)      # Profile all the matmuls with a single build and run (MATMUL_SWEEP)
 
 parser.add_argument( '--image_width', type=int, default=7)
 parser.add_argument( '--image_height', type=int, default=7)
@@ -50,6 +54,9 @@ step_type = args.step
 filename = args.perf_file_name
 cores = args.cores
 data_type = args.data_type
+cache_file = args.cache_file
+use_cache = args.use_cache
+sweep = args.sweep
 
 im_width = args.image_width
 im_height = args.image_height
@@ -73,14 +80,56 @@ f.write("------------------------------------------------\n")
 f.write("\n=====> UNSORTED RESULTS <=====")
 f.close()
 
+# Previous results of the same runs (same layer configuration, library and test sources)
+lib_hash = prof.compute_lib_hash("../../lib")
+test_hash = prof.compute_test_hash(".")
+test_name = os.path.basename(os.getcwd())
+cache = {}
+if use_cache == 1:
+    cache = prof.load_cache(cache_file)
+
+# Make arguments and cache key of the build of each matmul
+make_args = []
+cache_keys = []
+for compile_idx in range(num_matmuls) :
+    make_args.append("STEP={} NUM_CORES={} MATMUL_TYPE={} IMAGE_H={} IMAGE_W={} KER_H={} KER_W={} IN_CH={} OUT_CH={}".format(step_type, cores, compile_idx, im_height, im_width, ker_height, ker_width, ch_in, ch_out))
+    cache_keys.append(prof.get_cache_key(test_name, data_type, make_args[compile_idx], lib_hash, test_hash))
+
+# The golden model does not depend on the matmul: its data is generated by the first build only
+golden = "get_golden"
+
+# Matmul sweep: a single build and run profiles all the matmuls which are not in the cache
+sweep_results = {}
+if sweep == 1 and len([key for key in cache_keys if key not in cache]) > 0:
+    print("Executing sweep build of {} matmuls".format(num_matmuls))
+    os.system("rm -r BUILD/")
+    os.system("make clean {} all run {} MATMUL_SWEEP=1 NUM_MATMULS={} > log.txt".format(golden, make_args[0], num_matmuls))
+    golden = ""
+    sweep_results = prof.extract_sweep_results("log.txt")
+
 # Execute multiple make commands and report performances
+# (matmuls which the sweep could not profile are built one by one)
 for compile_idx in range(num_matmuls) :
+    cache_key = cache_keys[compile_idx]
+    if use_cache == 1 and cache_key in cache:
+        print("Build {} found in cache".format(compile_idx))
+        prof.write_cached_performance(cache[cache_key], compile_idx, filename)
+        continue
+    if prof.sweep_profiled(sweep_results, compile_idx):
+        print("Build {} profiled by the sweep".format(compile_idx))
+        prof.write_sweep_performance(sweep_results, compile_idx, filename)
+        if use_cache == 1:
+            prof.store_sweep_performance(cache_file, cache_key, cache, sweep_results, compile_idx)
+        continue
     print("Executing build {}".format(compile_idx))
     # Execute build
     os.system("rm -r BUILD/")
-    os.system("make clean get_golden all run STEP={} NUM_CORES={} MATMUL_TYPE={} IMAGE_H={} IMAGE_W={} KER_H={} KER_W={} IN_CH={} OUT_CH={} > log.txt".format(step_type, cores, compile_idx, im_height, im_width, ker_height, ker_width, ch_in, ch_out))
+    os.system("make clean {} all run {} MATMUL_SWEEP=0 > log.txt".format(golden, make_args[compile_idx]))
+    golden = ""
     # Find profiling and write it to file
     prof.extract_performance(compile_idx, filename)
+    if use_cache == 1:
+        prof.store_cached_performance(cache_file, cache_key, cache)
 
 print("\n=====> TERMINATING TEST SEQUENCE.. <=====\n")
 os.system("rm -r BUILD/")
@@ -24,77 +24,57 @@ Profile multiple network sizes in a single call
 '''
 
 # =====>    USER CODE    <=====
-# Arrays of the network sizes to be simulated. These arrays have to be all the same length, 
-# since the code compiles over the sequence of tests:
-# TEST 0: (im_size[0], ker_size[0],..)
-# TEST 1: (im_size[1], ker_size[1],..)
-# TEST 2: (im_size[2], ker_size[2],..)
-im_height = [3, 3, 7]
-im_width = [3, 3, 7]
-ker_height = [1, 3, 3]
-ker_width = [1, 3, 3]
-ch_in = [8, 8, 16]
-ch_out = [1, 8, 16]
+# Grid of the network sizes to be simulated (Makefile variable: values). Each combination
+# of the values is simulated, "=DIM" gives a dimension the value of the DIM dimension.
+# The values can be overridden from the command line (e.g. --IN_CH 8,16,32, --IN_CH 8:64:8
+# or --IN_CH 8:64*2) or by a JSON config file (--config), see size_sweep_utils.parse_values()
+grid = {
+    'IMAGE_H' : [3, 7],
+    'IMAGE_W' : '=IMAGE_H',
+    'KER_H'   : [1, 3],
+    'KER_W'   : '=KER_H',
+    'IN_CH'   : [8, 16],
+    'OUT_CH'  : [8, 16]
+}
 # =====> END OF USER CODE <=====
 
-array_size = len(im_height)
-if (len(im_width) != array_size) or (len(ker_height) != array_size) or(len(ker_width) != array_size) or (len(ch_in) != array_size) or (len(ch_out) != array_size):
-    print("Arrays for multiple size test are not equally sized!!")
-
 import os
-import subprocess
+import sys
 import argparse
-import profile_utils as prof
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+import size_sweep_utils as sweep
+
+# L1 memory occupation of a point of the grid (bytes), as in compute_memory_occupation() of net.c
+# (None if the kernel does not fit the input)
+def l1_footprint (point, data_bytes):
+
+    in_h, in_w, in_ch = point['IMAGE_H'], point['IMAGE_W'], point['IN_CH']
+    ker_h, ker_w, out_ch = point['KER_H'], point['KER_W'], point['OUT_CH']
+    out_h = (in_h - ker_h + point.get('PAD_U', 0) + point.get('PAD_D', 0)) // point.get('STRIDE_H', 1) + 1
+    out_w = (in_w - ker_w + point.get('PAD_L', 0) + point.get('PAD_R', 0)) // point.get('STRIDE_W', 1) + 1
+    if out_h <= 0 or out_w <= 0:
+        return None
+
+    in_act = in_h * in_w * in_ch
+    ker = ker_h * ker_w * in_ch * out_ch
+    out_act = out_h * out_w * out_ch
+    if point['STEP'] == 'BACKWARD_ERROR':
+        im2col = in_h * in_w * in_ch * out_ch * ker_h * ker_w
+        buffer = ker
+    elif point['STEP'] == 'BACKWARD_GRAD':
+        im2col = ker_h * ker_w * out_h * out_w * in_ch
+        buffer = out_act
+    else:
+        im2col = ker_h * ker_w * in_ch * out_h * out_w
+        buffer = 0
+
+    return (in_act + ker + out_act + im2col + buffer) * data_bytes
+
 
 # Take arguments for profiling
 parser = argparse.ArgumentParser("Multiple Sizes Layer Profiling")
-parser.add_argument( '--num_sizes', type=int, default=array_size)
-parser.add_argument( '--perf_file_name', type=str, default='runs.txt' )
-parser.add_argument( '--step', type=str, default="PW_FORWARD")
-parser.add_argument( '--cores', type=int, default=1)
-parser.add_argument( '--data_type', type=str, default='fp32')
-
-parser.add_argument( '--matmul_type', type=int, default=0)  # Selects a matmul algorithm
-
+sweep.add_sweep_arguments(parser, grid, step="FORWARD", data_type='fp32')
 args = parser.parse_args()
 
-num_sizes = args.num_sizes
-step_type = args.step
-filename = args.perf_file_name
-cores = args.cores
-data_type = args.data_type
-matmul_alg = args.matmul_type
-
-print("\n=====> ENTERING TEST SEQUENCE.. <=====\n")
-
-# Prepare log file for the measured performances
-f = open(filename, "w")
-f.write("[ PERFORMANCES OVER DIFFERENT NETWORK SIZES ]\n")
-f.write("---------------------------------------------\n")
-f.write("STEP TYPE: {}\n".format(step_type))
-f.write("NUM_CORES: {}\n".format(cores))
-f.write("DATA_TYPE: {}\n".format(data_type))
-f.write("Number of different layer sizes: {}\n".format(num_sizes))
-f.write("---------------------------------------------\n")
-f.write("\n=====> NETWORK RUNS <=====")
-f.close()
-
-# Execute multiple make commands and report performances
-for compile_idx in range(num_sizes) :
-    print("Executing build {}".format(compile_idx))
-    # Execute build
-    os.system("rm -r BUILD/")
-    if (step_type == "FORWARD" or "BACKWARD_GRAD" or "BW_ERROR"):
-        os.system("make clean get_golden all run STEP={} NUM_CORES={} MATMUL_TYPE={} IMAGE_W={} IMAGE_H={} KER_W={} KER_H={} IN_CH={} OUT_CH={} > log.txt".format(step_type, cores, matmul_alg, im_height[compile_idx], im_width[compile_idx], ker_height[compile_idx], ker_width[compile_idx], ch_in[compile_idx], ch_out[compile_idx]))
-    else: 
-        print("Invalid step!!")
-        exit()
-    # Find profiling and write it to file
-    f = open(filename, "a")
-    f.write("\nRUN {}: MATMUL_ALG= {}, IMAGE_H={}, IMAGE_W={}, KER_H={}, KER_W={}, IN_CH={}, OUT_CH={}".format(compile_idx, matmul_alg, im_height[compile_idx], im_width[compile_idx], ker_height[compile_idx], ker_width[compile_idx], ch_in[compile_idx], ch_out[compile_idx]))
-    f.close()
-    prof.extract_size_performance(step_type, filename)
-
-print("\n=====> TERMINATING TEST SEQUENCE.. <=====\n")
-os.system("rm -r BUILD/")
-
+# Build, simulate and report the points of the grid
+sweep.profile_sizes(grid, l1_footprint, args)
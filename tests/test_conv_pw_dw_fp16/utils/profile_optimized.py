@@ -35,6 +35,8 @@ parser.add_argument( '--perf_file_name', type=str, default='runs.txt' )
 parser.add_argument( '--step', type=str, default="PW_FORWARD")
 parser.add_argument( '--cores', type=int, default=1)
 parser.add_argument( '--data_type', type=str, default='fp16')
+parser.add_argument( '--cache_file', type=str, default='../profile_cache.jsonl')   # Persistent cache of the results
+parser.add_argument( '--use_cache', type=int, default=1)
 
 parser.add_argument( '--image_width', type=int, default=3)
 parser.add_argument( '--image_height', type=int, default=3)
@@ -50,6 +52,8 @@ step_type = args.step
 filename = args.perf_file_name
 cores = args.cores
 data_type = args.data_type
+cache_file = args.cache_file
+use_cache = args.use_cache
 
 im_width = args.image_width
 im_height = args.image_height
@@ -73,14 +77,34 @@ f.write("------------------------------------------------\n")
 f.write("\n=====> UNSORTED RESULTS <=====")
 f.close()
 
+# Previous results of the same runs (same layer configuration, library and test sources)
+lib_hash = prof.compute_lib_hash("../../lib")
+test_hash = prof.compute_test_hash(".")
+test_name = os.path.basename(os.getcwd())
+cache = {}
+if use_cache == 1:
+    cache = prof.load_cache(cache_file)
+
+# The golden model does not depend on the matmul: its data is generated by the first build only
+golden = "get_golden"
+
 # Execute multiple make commands and report performances
 for compile_idx in range(num_matmuls) :
+    make_args = "STEP={} NUM_CORES={} MATMUL_TYPE={} IMAGE_H={} IMAGE_W={} DW_KER_H={} DW_KER_W={} DW_IN_CH={} PW_OUT_CH={} BYPASS=1".format(step_type, cores, compile_idx, im_height, im_width, ker_height, ker_width, ch_DW, ch_PW)
+    cache_key = prof.get_cache_key(test_name, data_type, make_args, lib_hash, test_hash)
+    if use_cache == 1 and cache_key in cache:
+        print("Build {} found in cache".format(compile_idx))
+        prof.write_cached_performance(cache[cache_key], compile_idx, filename)
+        continue
     print("Executing build {}".format(compile_idx))
     # Execute build
     os.system("rm -r BUILD/")
-    os.system("make clean get_golden all run STEP={} NUM_CORES={} MATMUL_TYPE={} IMAGE_H={} IMAGE_W={} DW_KER_H={} DW_KER_W={} DW_IN_CH={} PW_OUT_CH={} BYPASS=1 > log.txt".format(step_type, cores, compile_idx, im_height, im_width, ker_height, ker_width, ch_DW, ch_PW))
+    os.system("make clean {} all run {} > log.txt".format(golden, make_args))
+    golden = ""
     # Find profiling and write it to file
     prof.extract_performance(compile_idx, filename)
+    if use_cache == 1:
+        prof.store_cached_performance(cache_file, cache_key, cache)
 
 print("\n=====> TERMINATING TEST SEQUENCE.. <=====\n")
 os.system("rm -r BUILD/")
@@ -25,6 +25,9 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 
 parser = argparse.ArgumentParser("Depthwise Separable Convolution - Layer Test")
@@ -39,9 +42,17 @@ parser.add_argument( '--step', default='DW_FORWARD') # options: // DW_FORWARD, D
 parser.add_argument( '--pad_h', type=int, default='0')
 parser.add_argument( '--pad_w', type=int, default='0')
 parser.add_argument( '--HWC_layout', type=int, default='0')
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 ker1 = 2
 ker2_w = args.ker_width
 ker2_h = args.ker_height
@@ -121,14 +132,14 @@ def hook_fn1(m, i, o):
           input_grad = grad
           f.write('#define IN_SIZE '+str(input_grad.numel())+'\n')
           print(weight_grad)
-          f.write('PI_L2 float INPUT_GRAD[IN_SIZE] = {'+dump.tensor_to_string(input_grad)+'};\n')
+          dump.write_array(f, 'INPUT_GRAD', input_grad, 'float', 'PI_L2', 'IN_SIZE')
 
       if cont==1:
           print("\n----------------DEPTHWISE WEIGHT GRAD-------------------")
           weight_grad = grad
           f.write('#define WGT_SIZE '+str(weight_grad.numel())+'\n')
           print(weight_grad)
-          f.write('PI_L2 float WEIGHT_GRAD[WGT_SIZE] = {'+dump.tensor_to_string(weight_grad)+'};\n')
+          dump.write_array(f, 'WEIGHT_GRAD', weight_grad, 'float', 'PI_L2', 'WGT_SIZE')
 
       cont += 1
     except AttributeError:
@@ -142,11 +153,11 @@ def hook_fn1(m, i, o):
       print(output_grad)
       if step=='DW_BACKWARD_GRAD' or step=='DW_BACKWARD_ERROR':
           if HWC_lay == 0:
-            f.write('PI_L2 float OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+            dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'float', 'PI_L2', 'G_OUTPUT_SIZE')
           elif HWC_lay == 1:
-            f.write('PI_L2 float OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad.permute(0,2,3,1))+'};\n')
+            dump.write_array(f, 'OUTPUT_GRAD', output_grad.permute(0,2,3,1), 'float', 'PI_L2', 'G_OUTPUT_SIZE')
       else:
-          f.write('PI_L2 float OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'float', 'PI_L2', 'G_OUTPUT_SIZE')
 
     except AttributeError:
       print ("None found for Gradient")
@@ -171,9 +182,9 @@ def hook_fn2(m, i, o):
         f.write('#define OUTPUT_SIZE '+str(output_grad.numel())+'\n')
         print(output_grad)
         if HWC_lay == 0:
-          f.write('PI_L2 float OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT', output_grad, 'float', 'PI_L2', 'OUTPUT_SIZE')
         elif HWC_lay == 1:
-          f.write('PI_L2 float OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad.permute(1,2,0))+'};\n')
+          dump.write_array(f, 'OUTPUT', output_grad.permute(1,2,0), 'float', 'PI_L2', 'OUTPUT_SIZE')
       except AttributeError:
         print ("None found for Gradient")
     f.close()
@@ -198,9 +209,9 @@ def hook_fn3(m, i, o):
           f.write('#define PW_IN_SIZE '+str(input_grad.numel())+'\n')
           print(weight_grad)
           if HWC_lay == 0:
-            f.write('PI_L2 float PW_INPUT_GRAD[PW_IN_SIZE] = {'+dump.tensor_to_string(input_grad)+'};\n')
+            dump.write_array(f, 'PW_INPUT_GRAD', input_grad, 'float', 'PI_L2', 'PW_IN_SIZE')
           elif HWC_lay == 1:
-            f.write('PI_L2 float PW_INPUT_GRAD[PW_IN_SIZE] = {'+dump.tensor_to_string(input_grad.permute(0,2,3,1))+'};\n')
+            dump.write_array(f, 'PW_INPUT_GRAD', input_grad.permute(0,2,3,1), 'float', 'PI_L2', 'PW_IN_SIZE')
 
       if cont==1:
           print("\n-------------------POINTWISE WEIGHT GRAD---------------------")
@@ -208,9 +219,9 @@ def hook_fn3(m, i, o):
           f.write('#define PW_WGT_G_SIZE '+str(weight_grad.numel())+'\n')
           print(weight_grad)
           if HWC_lay == 0:
-            f.write('PI_L2 float PW_WEIGHT_GRAD[PW_WGT_G_SIZE] = {'+dump.tensor_to_string(weight_grad)+'};\n')
+            dump.write_array(f, 'PW_WEIGHT_GRAD', weight_grad, 'float', 'PI_L2', 'PW_WGT_G_SIZE')
           elif HWC_lay == 1:
-            f.write('PI_L2 float PW_WEIGHT_GRAD[PW_WGT_G_SIZE] = {'+dump.tensor_to_string(weight_grad.permute(1,0,2,3))+'};\n')
+            dump.write_array(f, 'PW_WEIGHT_GRAD', weight_grad.permute(1,0,2,3), 'float', 'PI_L2', 'PW_WGT_G_SIZE')
 
       cont += 1
     except AttributeError:
@@ -224,9 +235,9 @@ def hook_fn3(m, i, o):
       print(output_grad)
       if step=='PW_FORWARD' or step=='PW_BACKWARD_GRAD' or step=='PW_BACKWARD_ERROR':
           if HWC_lay == 0:
-            f.write('PI_L2 float PW_OUTPUT_GRAD[PW_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+            dump.write_array(f, 'PW_OUTPUT_GRAD', output_grad, 'float', 'PI_L2', 'PW_OUTPUT_SIZE')
           elif HWC_lay == 1:
-            f.write('PI_L2 float PW_OUTPUT_GRAD[PW_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad.permute(0,2,3,1))+'};\n')
+            dump.write_array(f, 'PW_OUTPUT_GRAD', output_grad.permute(0,2,3,1), 'float', 'PI_L2', 'PW_OUTPUT_SIZE')
       else:
           #f.write('PI_L2 float PW_OUTPUT_GRAD[PW_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
           pass
@@ -252,11 +263,11 @@ def hook_fn4(m, i, o):
           print(output_grad)
           if step=='PW_FORWARD' or step=='PW_BACKWARD_GRAD' or step=='PW_BACKWARD_ERROR':
             if HWC_lay == 0:
-              f.write('PI_L2 float DW_OUTPUT[DW_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+              dump.write_array(f, 'DW_OUTPUT', output_grad, 'float', 'PI_L2', 'DW_OUTPUT_SIZE')
             elif HWC_lay == 1:
-              f.write('PI_L2 float DW_OUTPUT[DW_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad.permute(1,2,0))+'};\n')
+              dump.write_array(f, 'DW_OUTPUT', output_grad.permute(1,2,0), 'float', 'PI_L2', 'DW_OUTPUT_SIZE')
           else:
-            f.write('PI_L2 float DW_OUTPUT[DW_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+            dump.write_array(f, 'DW_OUTPUT', output_grad, 'float', 'PI_L2', 'DW_OUTPUT_SIZE')
         except AttributeError:
           print ("None found for Gradient")
       f.close()
@@ -278,9 +289,9 @@ def hook_fn5(m, i, o):
         f.write('#define PW_OUTPUT_SIZE '+str(output_grad.numel())+'\n')
         print(output_grad)
         if HWC_lay == 0:
-          f.write('PI_L2 float PW_OUTPUT[PW_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'PW_OUTPUT', output_grad, 'float', 'PI_L2', 'PW_OUTPUT_SIZE')
         elif HWC_lay == 1:
-          f.write('PI_L2 float PW_OUTPUT[PW_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad.permute(1,2,0))+'};\n')
+          dump.write_array(f, 'PW_OUTPUT', output_grad.permute(1,2,0), 'float', 'PI_L2', 'PW_OUTPUT_SIZE')
       except AttributeError:
         print ("None found for Gradient")
     f.close()
@@ -343,12 +354,12 @@ with torch.no_grad():
 f = open("init-defines.h", 'a')
 f.write("\n\n// Weight initialization\n")
 f.write("#define DW_WGT_SIZE (Tin_C_l1*Tker_H_l1*Tker_W_l1)\n")
-f.write('PI_L2 float DW_WEIGHTS[DW_WGT_SIZE] = {'+dump.tensor_to_string(net.convDW.weight.data)+'};\n')
+dump.write_array(f, 'DW_WEIGHTS', net.convDW.weight.data, 'float', 'PI_L2', 'DW_WGT_SIZE')
 f.write("#define PW_WGT_SIZE (Tin_C_l2*Tout_C_l2)\n")
 if HWC_lay == 0:
-  f.write('PI_L2 float PW_WEIGHTS[PW_WGT_SIZE] = {'+dump.tensor_to_string(net.convPW.weight.data)+'};\n')
+  dump.write_array(f, 'PW_WEIGHTS', net.convPW.weight.data, 'float', 'PI_L2', 'PW_WGT_SIZE')
 elif HWC_lay == 1:
-  f.write('PI_L2 float PW_WEIGHTS[PW_WGT_SIZE] = {'+dump.tensor_to_string(net.convPW.weight.data.permute(1,0,2,3))+'};\n')
+  dump.write_array(f, 'PW_WEIGHTS', net.convPW.weight.data.permute(1,0,2,3), 'float', 'PI_L2', 'PW_WGT_SIZE')
 f.close()
 
 criterion = nn.MSELoss()
@@ -357,4 +368,8 @@ loss = criterion(out, label)
 net.zero_grad()
 
 
-loss.backward()
\ No newline at end of file
+loss.backward()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
@@ -23,78 +23,55 @@ Profile multiple network sizes in a single call
 '''
 
 # =====>    USER CODE    <=====
-# Arrays of the network sizes to be simulated. These arrays have to be all the same length, 
-# since the code compiles over the sequence of tests:
-# TEST 0: (im_size[0], ker_size[0],..)
-# TEST 1: (im_size[1], ker_size[1],..)
-# TEST 2: (im_size[2], ker_size[2],..)
-im_height = [3, 3, 3]
-im_width = [3, 3, 3]
-ker_height = [3, 3, 3]
-ker_width = [3, 3, 3]
-ch_DW = [128, 256, 512]
-ch_PW = [8, 8, 8]
+# Grid of the network sizes to be simulated (Makefile variable: values). Each combination
+# of the values is simulated, "=DIM" gives a dimension the value of the DIM dimension.
+# The values can be overridden from the command line (e.g. --DW_IN_CH 8,16,32, --DW_IN_CH 8:64:8
+# or --DW_IN_CH 8:64*2) or by a JSON config file (--config), see size_sweep_utils.parse_values()
+grid = {
+    'IMAGE_H'   : [3],
+    'IMAGE_W'   : '=IMAGE_H',
+    'DW_KER_H'  : [3],
+    'DW_KER_W'  : '=DW_KER_H',
+    'DW_IN_CH'  : [128, 256, 512],
+    'PW_OUT_CH' : [8],
+    'BYPASS'    : [1]
+}
 # =====> END OF USER CODE <=====
 
-array_size = len(im_height)
-if (len(im_width) != array_size) or (len(ker_height) != array_size) or (len(ker_width) != array_size) or (len(ch_DW) != array_size) or (len(ch_PW) != array_size):
-    print("Arrays for multiple size test are not equally sized!!")
-
 import os
+import sys
 import argparse
-import profile_utils as prof
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+import size_sweep_utils as sweep
 
-# Take arguments for profiling
-parser = argparse.ArgumentParser("Multiple Sizes Layer Profiling")
-parser.add_argument( '--num_sizes', type=int, default=array_size)
-parser.add_argument( '--perf_file_name', type=str, default='runs.txt' )
-parser.add_argument( '--step', type=str, default="PW_FORWARD")
-parser.add_argument( '--cores', type=int, default=1)
-parser.add_argument( '--data_type', type=str, default='fp32')
+# L1 memory occupation of a point of the grid (bytes), as in compute_memory_occupation() of net.c
+# (None if the kernel does not fit the input)
+def l1_footprint (point, data_bytes):
 
-parser.add_argument( '--matmul_type', type=int, default=0)  # Selects a matmul algorithm
-
-args = parser.parse_args()
+    in_h, in_w, ch = point['IMAGE_H'], point['IMAGE_W'], point['DW_IN_CH']
+    out_h = in_h - point['DW_KER_H'] + 1
+    out_w = in_w - point['DW_KER_W'] + 1
+    if out_h <= 0 or out_w <= 0:
+        return None
 
-num_sizes = args.num_sizes
-step_type = args.step
-filename = args.perf_file_name
-cores = args.cores
-data_type = args.data_type
-matmul_alg = args.matmul_type
+    if str(point['STEP']).startswith('DW'):
+        elements = in_h*in_w*ch + point['DW_KER_H']*point['DW_KER_W']*ch + out_h*out_w*ch
+    else:
+        out_ch = point['PW_OUT_CH']
+        elements = out_h*out_w*ch + ch*out_ch + out_h*out_w*out_ch
+        # Transposition buffer
+        if point['STEP'] == 'PW_BACKWARD_ERROR':
+            elements += ch*out_ch
+        elif point['STEP'] == 'PW_BACKWARD_GRAD':
+            elements += ch*out_h*out_w
 
-print("\n=====> ENTERING TEST SEQUENCE.. <=====\n")
+    return elements * data_bytes
 
-# Prepare log file for the measured performances
-f = open(filename, "w")
-f.write("[ PERFORMANCES OVER DIFFERENT NETWORK SIZES ]\n")
-f.write("---------------------------------------------\n")
-f.write("STEP TYPE: {}\n".format(step_type))
-f.write("NUM_CORES: {}\n".format(cores))
-f.write("DATA_TYPE: {}\n".format(data_type))
-f.write("Number of different layer sizes: {}\n".format(num_sizes))
-f.write("---------------------------------------------\n")
-f.write("\n=====> NETWORK RUNS <=====")
-f.close()
 
-# Execute multiple make commands and report performances
-for compile_idx in range(num_sizes) :
-    print("Executing build {}".format(compile_idx))
-    # Execute build
-    os.system("rm -r BUILD/")
-    if (step_type == "DW_FORWARD" or "DW_BACKWARD_GRAD" or "DW_BW_ERROR"):
-        os.system("make clean get_golden all run STEP={} NUM_CORES={} MATMUL_TYPE={} IMAGE_H={} IMAGE_W={} DW_KER_H={} DW_KER_W={} DW_IN_CH={} PW_OUT_CH={} BYPASS=1 > log.txt".format(step_type, cores, matmul_alg, im_height[compile_idx], im_width[compile_idx], ker_height[compile_idx], ker_width[compile_idx], ch_DW[compile_idx], ch_PW[compile_idx]))
-    elif (step_type == "PW_FORWARD" or "PW_BACKWARD_GRAD" or "PW_BW_ERROR"):
-        os.system("make clean get_golden all run STEP={} NUM_CORES={} MATMUL_TYPE={} IMAGE_H={} IMAGE_W={} DW_KER_H={} DW_KER_W={} DW_IN_CH={} PW_OUT_CH={} BYPASS=1 > log.txt".format(step_type, cores, matmul_alg, im_height[compile_idx], im_width[compile_idx], ker_height[compile_idx], ker_width[compile_idx],ch_DW[compile_idx], ch_PW[compile_idx]))
-    else: 
-        print("Invalid step!!")
-        exit()
-    # Find profiling and write it to file
-    f = open(filename, "a")
-    f.write("\nRUN {}: MATMUL_ALG= {}, IMAGE_H={}, IMAGE_W={}, DW_KER_H={}, DW_KER_W={}, DW_IN_CH={}, PW_OUT_CH={}".format(compile_idx, matmul_alg, im_height[compile_idx], im_width[compile_idx], ker_height[compile_idx], ker_width[compile_idx], ch_DW[compile_idx], ch_PW[compile_idx]))
-    f.close()
-    prof.extract_size_performance(step_type, filename)
-
-print("\n=====> TERMINATING TEST SEQUENCE.. <=====\n")
-os.system("rm -r BUILD/")
+# Take arguments for profiling
+parser = argparse.ArgumentParser("Multiple Sizes Layer Profiling")
+sweep.add_sweep_arguments(parser, grid, step="PW_FORWARD", data_type='fp32')
+args = parser.parse_args()
 
+# Build, simulate and report the points of the grid
+sweep.profile_sizes(grid, l1_footprint, args)
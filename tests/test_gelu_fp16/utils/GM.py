@@ -21,6 +21,9 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 import numpy as np  # Matrix and vector computation package
 import random
@@ -43,9 +46,17 @@ parser.add_argument( '--ch_in', type=int, default=1)
 parser.add_argument( '--ch_out', type=int, default=1)  
 parser.add_argument( '--bf16_format', type=int, default=1) # if == 1, data format if bfloat16, if 0 is float16
 parser.add_argument( '--step', type=str, default='FORWARD')     # Possible steps: FORWARD, BACKWARD_GRAD, BACKWARD_ERROR
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 # Network parameters in_size
 in_h = args.in_height
 in_w = args.in_width
@@ -91,9 +102,9 @@ def hook_fn1(m, i, o):
       f.write('#define G_OUTPUT_SIZE '+str(output_grad.numel())+'\n')
       print(output_grad)
       if current_step=='BACKWARD_GRAD' or current_step=='BACKWARD_ERROR':
-          f.write('PI_L2 fp16 OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'fp16', 'PI_L2', 'G_OUTPUT_SIZE')
       else:
-          f.write('PI_L2 fp16 OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'fp16', 'PI_L2', 'G_OUTPUT_SIZE')
 
     except AttributeError:
       print ("None found for Gradient (output)")
@@ -116,7 +127,7 @@ def hook_fn2(m, i, o):
           output_grad = grad
           f.write('#define OUTPUT_SIZE '+str(output_grad.numel())+'\n')
           print(output_grad)
-          f.write('PI_L2 fp16 OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT', output_grad, 'fp16', 'PI_L2', 'OUTPUT_SIZE')
          cont+=1
        except AttributeError:
          print ("None found for Output")
@@ -144,9 +155,9 @@ else:
   inp_copy = inp.half()
 
 if current_step=='FORWARD':
-  f.write('PI_L2 fp16 INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(inp)+'};\n')
+  dump.write_array(f, 'INPUT', inp, 'fp16', 'PI_L2', 'INPUT_SIZE')
 else:
-  f.write('PI_L2 fp16 INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(inp)+'};\n')
+  dump.write_array(f, 'INPUT', inp, 'fp16', 'PI_L2', 'INPUT_SIZE')
 f.close()
 
 
@@ -163,5 +174,9 @@ else:
 
 f = open("gelu-output.h", "w")
 f.write('#define OUTPUT_SIZE '+str(out.numel())+'\n')
-f.write('PI_L2 fp16 OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(out_copy)+'};\n')
-f.close()
\ No newline at end of file
+dump.write_array(f, 'OUTPUT', out_copy, 'fp16', 'PI_L2', 'OUTPUT_SIZE')
+f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
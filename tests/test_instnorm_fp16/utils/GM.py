@@ -2,6 +2,9 @@ import torch
 from torch import nn
 import torch.optim as optim
 import numpy as np
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 import argparse
 import random
@@ -18,9 +21,17 @@ parser.add_argument("-STEP", type=str, default='FORWARD')
 parser.add_argument("-NUM_CORES", type=int, default=1)
 parser.add_argument("-HWC", type=int, default=0)
 parser.add_argument("-EPOCHS", type=int, default=0)
+parser.add_argument('--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 parser.parse_args()
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
 
 #Parameters for the layers
 
@@ -175,11 +186,11 @@ label = torch.ones_like(output_test)
 f = open('io_data.h', 'w')
 f.write('// Init weights\n')
 f.write('#define WGT_SIZE_L0 '+str(l0_in_ch*l0_out_ch*l0_hk*l0_wk)+'\n')
-f.write('PI_L2 fp16 init_WGT_l0[WGT_SIZE_L0] = {'+dump.tensor_to_string(net.l0.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l0', net.l0.weight.data, 'fp16', 'PI_L2', 'WGT_SIZE_L0')
 f.write(f'#define WGT_SIZE_L1  2*{l1_in_ch}\n')
-f.write('PI_L2 fp16 init_WGT_l1[WGT_SIZE_L1] = {'+dump.tensor_to_string(net.l1.weight.data)+dump.tensor_to_string(net.l1.bias.data)+'};\n')
+dump.write_array(f, 'init_WGT_l1', [net.l1.weight.data, net.l1.bias.data], 'fp16', 'PI_L2', 'WGT_SIZE_L1')
 f.write('#define WGT_SIZE_L2 '+str(l2_in_ch*l2_out_ch*l2_hk*l2_wk)+'\n')
-f.write('PI_L2 fp16 init_WGT_l2[WGT_SIZE_L2] = {'+dump.tensor_to_string(net.l2.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l2', net.l2.weight.data, 'fp16', 'PI_L2', 'WGT_SIZE_L2')
 f.close()
 
 optimizer = optim.SGD(net.parameters(), lr=learning_rate, momentum=0)
@@ -199,9 +210,13 @@ out = net(inp)
 f = open('io_data.h', 'a')
 f.write('// Input and Output data\n')
 f.write(f'#define IN_SIZE {CI*HI*WI}\n')
-f.write('PI_L1 fp16 INPUT[IN_SIZE] = {'+dump.tensor_to_string(inp)+'};\n')
+dump.write_array(f, 'INPUT', inp, 'fp16', 'PI_L1', 'IN_SIZE')
 out_size = (int(math.floor(l2_hin-l2_hk+2*l2_hpad+l2_hstr)/l2_hstr)) * (int(math.floor(l2_win-l2_wk+2*l2_wpad+l2_wstr)/l2_wstr)) * l2_out_ch
 f.write('#define OUT_SIZE '+str(out_size)+'\n')
-f.write('PI_L2 fp16 REFERENCE_OUTPUT[OUT_SIZE] = {'+dump.tensor_to_string(out)+'};\n')
-f.write('PI_L1 fp16 LABEL[OUT_SIZE] = {'+dump.tensor_to_string(label)+'};\n')
-f.close()
\ No newline at end of file
+dump.write_array(f, 'REFERENCE_OUTPUT', out, 'fp16', 'PI_L2', 'OUT_SIZE')
+dump.write_array(f, 'LABEL', label, 'fp16', 'PI_L1', 'OUT_SIZE')
+f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
@@ -2,6 +2,9 @@ import torch
 from torch import nn
 import torch.optim as optim
 import numpy as np
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 import argparse
 import random
@@ -18,9 +21,17 @@ parser.add_argument("-STEP", type=str, default='FORWARD')
 parser.add_argument("-NUM_CORES", type=int, default=1)
 parser.add_argument("-HWC", type=int, default=0)
 parser.add_argument("-EPOCHS", type=int, default=0)
+parser.add_argument('--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 parser.parse_args()
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
 
 #Parameters for the layers
 
@@ -146,7 +157,7 @@ def hook_fn(m, i, o):
 			print(grad.shape)
 			f = open('io_data.h', 'a')
 			f.write('#define INSTN_IN_G_SIZE '+str(grad.numel())+'\n')
-			f.write('PI_L2 float INSTN_IN_GRAD[INSTN_IN_G_SIZE] = {'+dump.tensor_to_string(grad)+'};\n')
+			dump.write_array(f, 'INSTN_IN_GRAD', grad, 'float', 'PI_L2', 'INSTN_IN_G_SIZE')
 			f.close()
 
 		except AttributeError: 
@@ -201,11 +212,11 @@ label = torch.ones_like(output_test)
 f = open('io_data.h', 'w')
 f.write('// Init weights\n')
 f.write('#define WGT_SIZE_L0 '+str(l0_in_ch*l0_out_ch*l0_hk*l0_wk)+'\n')
-f.write('PI_L2 float init_WGT_l0[WGT_SIZE_L0] = {'+dump.tensor_to_string(net.l0.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l0', net.l0.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L0')
 f.write(f'#define WGT_SIZE_L1  2*{l1_in_ch}\n')
-f.write('PI_L2 float init_WGT_l1[WGT_SIZE_L1] = {'+dump.tensor_to_string(net.l1.weight.data)+dump.tensor_to_string(net.l1.bias.data)+'};\n')
+dump.write_array(f, 'init_WGT_l1', [net.l1.weight.data, net.l1.bias.data], 'float', 'PI_L2', 'WGT_SIZE_L1')
 f.write('#define WGT_SIZE_L2 '+str(l2_in_ch*l2_out_ch*l2_hk*l2_wk)+'\n')
-f.write('PI_L2 float init_WGT_l2[WGT_SIZE_L2] = {'+dump.tensor_to_string(net.l2.weight.data)+'};\n')
+dump.write_array(f, 'init_WGT_l2', net.l2.weight.data, 'float', 'PI_L2', 'WGT_SIZE_L2')
 f.close()
 
 optimizer = optim.SGD(net.parameters(), lr=learning_rate, momentum=0)
@@ -220,7 +231,7 @@ for batch in range(epochs):
 	# Print data to golden model's file
 	f = open('io_data.h', 'a')
 	f.write('#define INSTN_WGT_G_SIZE 2*'+str(net.l1.weight.data.numel())+'\n')
-	f.write('PI_L2 float INSTN_WGT_GRAD[INSTN_WGT_G_SIZE] = {'+dump.tensor_to_string(net.l1.weight.grad)+dump.tensor_to_string(net.l1.bias.grad)+'};\n')
+	dump.write_array(f, 'INSTN_WGT_GRAD', [net.l1.weight.grad, net.l1.bias.grad], 'float', 'PI_L2', 'INSTN_WGT_G_SIZE')
 	f.close()
 	optimizer.step()
 
@@ -230,9 +241,13 @@ out = net(inp)
 f = open('io_data.h', 'a')
 f.write('// Input and Output data\n')
 f.write(f'#define IN_SIZE {CI*HI*WI}\n')
-f.write('PI_L1 float INPUT[IN_SIZE] = {'+dump.tensor_to_string(inp)+'};\n')
+dump.write_array(f, 'INPUT', inp, 'float', 'PI_L1', 'IN_SIZE')
 out_size = (int(math.floor(l2_hin-l2_hk+2*l2_hpad+l2_hstr)/l2_hstr)) * (int(math.floor(l2_win-l2_wk+2*l2_wpad+l2_wstr)/l2_wstr)) * l2_out_ch
 f.write('#define OUT_SIZE '+str(out_size)+'\n')
-f.write('PI_L2 float REFERENCE_OUTPUT[OUT_SIZE] = {'+dump.tensor_to_string(out)+'};\n')
-f.write('PI_L1 float LABEL[OUT_SIZE] = {'+dump.tensor_to_string(label)+'};\n')
-f.close()
\ No newline at end of file
+dump.write_array(f, 'REFERENCE_OUTPUT', out, 'float', 'PI_L2', 'OUT_SIZE')
+dump.write_array(f, 'LABEL', label, 'float', 'PI_L1', 'OUT_SIZE')
+f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
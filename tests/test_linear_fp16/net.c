@@ -30,6 +30,11 @@ PI_L1 struct blob_fp16 layer0_in, layer0_wgt, layer0_out;
 PI_L2 int L1_memocc_bytes = 0;
 PI_L2 int L2_memocc_bytes = 0;
 
+#ifdef MATMUL_SWEEP
+// Matmul profiled by the sweep
+int sweep_matmul_type = 0;
+#endif
+
 PI_L1 fp16 zero_init = 0.0f;
 
 #ifdef FORWARD
@@ -331,11 +336,25 @@ void net_step()
   printf("\nL2 memory occupation: %d bytes.\n", L2_memocc_bytes);
   #endif
 
+  #ifdef MATMUL_SWEEP
+  // Run the step with each matmul on the same data
+  for (sweep_matmul_type=0; sweep_matmul_type<NUM_MATMULS; sweep_matmul_type++) {
+    printf("\n-----> Profiling MM %d:\n", sweep_matmul_type);
+    RESET_STATS();
+
+    tensor_init();
+
+    connect_blobs();
+
+    train();
+  }
+  #else
   tensor_init();
 
   connect_blobs();
 
   train();
+  #endif
 
   return;
 }
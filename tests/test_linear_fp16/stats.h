@@ -63,12 +63,22 @@
     printf("[%d] ld stall = %lu\n", id, _ldstall); \
     printf("[%d] imiss = %lu\n", id, _imiss); 
 
+#define RESET_STATS() \
+    _cycles = 0; \
+    _instr = 0; \
+    _active = 0; \
+    _ldext = 0; \
+    _tcdmcont = 0; \
+    _ldstall = 0; \
+    _imiss = 0;
+
 #else // STATS
 
 #define INIT_STATS()
 #define PRE_START_STATS()
 #define START_STATS()
 #define STOP_STATS()
+#define RESET_STATS()
 
 #endif  // STATS
 
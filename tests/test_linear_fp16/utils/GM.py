@@ -24,6 +24,9 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 
 #Visualize data with more precision
@@ -35,9 +38,17 @@ parser.add_argument( '--out_size', type=int, default=8 )
 parser.add_argument( '--file_name', type=str, default='linear-data.h')
 parser.add_argument( '--step', type=str, default='FORWARD')     # Possible steps: FORWARD, BACKWARD_GRAD, BACKWARD_ERROR
 parser.add_argument( '--bf16_format', type=int, default=0) # if == 1, data needs to be bfloat16 (no fp16 on that target)
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 # Network parametersin_size
 in_size = args.in_size
 out_size = args.out_size
@@ -95,7 +106,7 @@ else:
     
 indata.requires_grad = True
 print("\nInput data is: ", indata, indata.shape, indata.dtype)
-f.write('PI_L2 fp16 INPUT_VECTOR[L0_IN_CH] = {'+dump.tensor_to_string(indata)+'};\n')
+dump.write_array(f, 'INPUT_VECTOR', indata, 'fp16', 'PI_L2', 'L0_IN_CH')
 
 if bf16_format == 1:
     label = torch.ones(out_size).bfloat16()
@@ -116,7 +127,7 @@ for name, parameter in net.named_parameters():
     print(name, parameter, parameter.shape)
 
 
-f.write('PI_L2 fp16 L0_WEIGHTS_params[L0_WEIGHTS] = {'+dump.tensor_to_string(net.lin.weight)+'};\n')
+dump.write_array(f, 'L0_WEIGHTS_params', net.lin.weight, 'fp16', 'PI_L2', 'L0_WEIGHTS')
 
 # Optimizer and criterion
 criterion = nn.MSELoss()
@@ -126,7 +137,7 @@ for i in range(1):
     net.zero_grad()
     output = net(indata)
     print("\nNet output is: ", output, output.shape, output.dtype)
-    f.write('PI_L2 fp16 L0_OUT_FW [L0_OUT_CH] = {'+dump.tensor_to_string(output)+'};\n')
+    dump.write_array(f, 'L0_OUT_FW', output, 'fp16', 'PI_L2', 'L0_OUT_CH')
 
     loss = criterion(output.float(), label.float())
     print("\nLoss is: ", loss, loss.shape, loss.dtype)
@@ -136,18 +147,22 @@ for i in range(1):
     loss_meanval = 1/out_size
     output_diff = loss_meanval * 2.0 * (output - label)
     print("\nOutput loss is: ", output_diff, output_diff.shape, output_diff.dtype)
-    f.write('PI_L2 fp16 L0_OUT_GRAD [L0_OUT_CH] = {'+dump.tensor_to_string(output_diff)+'};\n')
+    dump.write_array(f, 'L0_OUT_GRAD', output_diff, 'fp16', 'PI_L2', 'L0_OUT_CH')
 
     # Backward and show gradients
     loss.backward()
     print("\nNetwork gradients are: ")
     for name, parameter in net.named_parameters():
         print(name, parameter.grad, parameter.grad.shape, parameter.grad.dtype)
-    f.write('PI_L2 fp16 L0_WEIGHT_GRAD [L0_WEIGHTS] = {'+dump.tensor_to_string(parameter.grad)+'};\n')
+    dump.write_array(f, 'L0_WEIGHT_GRAD', parameter.grad, 'fp16', 'PI_L2', 'L0_WEIGHTS')
 
     print("\nInput grad is: ", indata.grad)
-    f.write('PI_L2 fp16 L0_IN_GRAD [L0_IN_CH] = {'+dump.tensor_to_string(indata.grad)+'};\n')
+    dump.write_array(f, 'L0_IN_GRAD', indata.grad, 'fp16', 'PI_L2', 'L0_IN_CH')
 
     f.write('\n\n')
 
-f.close()
\ No newline at end of file
+f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
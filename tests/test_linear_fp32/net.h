@@ -16,6 +16,14 @@
 
 #include "step-check.h"
 
+// Matmul sweep (MATMUL_SWEEP): all the matmuls are profiled by a single build,
+// the matmul is selected at runtime (see net_step() and utils/profile_optimized.py)
+#ifdef MATMUL_SWEEP
+extern int sweep_matmul_type;
+#undef MATMUL_TYPE
+#define MATMUL_TYPE sweep_matmul_type
+#endif
+
 // User profiling flags
 
 #if defined(FORWARD) && !defined(DEBUG) 
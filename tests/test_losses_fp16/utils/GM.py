@@ -26,6 +26,9 @@ Authors: Davide Nadalini, Leonardo Ravaglia
 import torch
 import torch.nn as nn
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 
 if torch.cuda.is_available():
@@ -38,9 +41,17 @@ parser.add_argument( '--out_size', type=int, default=16 )
 parser.add_argument( '--value', type=float, default=0.5 )
 parser.add_argument( '--loss_fn', type=str, default='MSE')
 parser.add_argument( '--format', type=str, default='bfloat16')
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 out_size = args.out_size
 value = args.value
 loss_type = args.loss_fn
@@ -100,8 +111,12 @@ f = open("loss_values.h", "w")
 
 f.write("#define OUT_SIZE "+str(out_size)+"\n")
 f.write("PI_L1 fp16 LOSS = {"+str(loss.data.item())+"};\n")
-f.write("PI_L1 fp16 OUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(output)+"};\n")
-f.write("PI_L1 fp16 OUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(output.grad)+"};\n")
-f.write("PI_L1 fp16 LABEL[OUT_SIZE] = {"+dump.tensor_to_string(label)+"};\n")
+dump.write_array(f, 'OUTPUT', output, 'fp16', 'PI_L1', 'OUT_SIZE')
+dump.write_array(f, 'OUTPUT_GRAD', output.grad, 'fp16', 'PI_L1', 'OUT_SIZE')
+dump.write_array(f, 'LABEL', label, 'fp16', 'PI_L1', 'OUT_SIZE')
 
 f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
@@ -26,6 +26,9 @@ Authors: Davide Nadalini, Leonardo Ravaglia
 import torch
 import torch.nn as nn
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 
 
@@ -45,8 +48,16 @@ parser.add_argument( '--file_name', type=str, default='matmul_data.h')
 parser.add_argument( '--type', type=str, default='float')       # float, fp16 to select the desired format
 parser.add_argument( '--init_value_div', type=float, default=1)
 parser.add_argument( '--transpose', type=str, default=0)    # Matrix B is transposed if = 1
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 # Network parametersin_size
 in_size = args.in_size
 out_size = args.out_size
@@ -167,14 +178,18 @@ if matmul_alg == 'STANDARD':
 
     print("\nInput Data: ")
     print("\nA is: ", A, A.shape, A.dtype)
-    f.write('PI_L1 ' + data_type + ' A[IN_CH*MID_CH] = {'+dump.tensor_to_string(A)+'};\n')
+    dump.write_array(f, 'A', A, data_type, 'PI_L1', 'IN_CH*MID_CH')
 
     print("\nB is: ", B, B.shape, B.dtype)
-    f.write('PI_L1 ' + data_type + ' B[MID_CH*OUT_CH] = {'+dump.tensor_to_string(B)+'};\n')
+    dump.write_array(f, 'B', B, data_type, 'PI_L1', 'MID_CH*OUT_CH')
 
     print("\nC is: ", C, C.shape, C.dtype)
-    f.write('PI_L2 ' + data_type + ' C[IN_CH*OUT_CH] = {'+dump.tensor_to_string(C)+'};\n')
+    dump.write_array(f, 'C', C, data_type, 'PI_L2', 'IN_CH*OUT_CH')
 
     print("\n\n")
 
     f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
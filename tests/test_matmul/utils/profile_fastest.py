@@ -23,30 +23,27 @@ Authors: Davide Nadalini, Leonardo Ravaglia
 Sort available matmuls from the fastest to the slowest
 """
 
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+import log_utils as logs
+
 # Set to 1 to see the read values during the execution
 DEBUG = 0
 
 # Open the og file to find the performances of all matmuls
 f = open("log.txt", "r")
 Lines = f.readlines()
+f.close()
 
-# Phrases to be found 
-alg_text = '-----> Profiling '
-perf_text = '] cycles = '
+# Phrase to be found
 size_text = 'Matmul sizes are:'
-error_text = 'Error at index:'
 
 # Entries
 sizes = ''
 data_type = ''
 transp = ''
 num_cores = ''
-algorithm = []
-performances = []
-
-num_alg = 0
-num_perf = 0
-error_flag = 0
 
 for idx, line in enumerate(Lines):
     if (line.find(size_text) != -1) :
@@ -60,24 +57,21 @@ for idx, line in enumerate(Lines):
             print(transp)
             print(num_cores)
 
-    if (line.find(alg_text) != -1) :
-        num_alg += 1
-        index = line.find(alg_text)
-        algorithm.append(str(line[index+len(alg_text):-2]))
-        if DEBUG == 1:
-            print(num_alg)
-            print(line)
-
-    if (line.find(perf_text) != -1) :
-        num_perf += 1
-        index = line.find(perf_text)
-        performances.append(int(line[index+len(perf_text):-1]))
-        if DEBUG == 1:
-            print(num_perf)
-            print(line)
-
-    if (line.find(error_text) != -1) :
+# Profiled matmuls, their cycles and errors (single pass over the log)
+algorithm = []
+performances = []
+error_flag = 0
+for kind, content in logs.iter_log(Lines):
+    if kind == 'region':
+        algorithm.append(content)
+    elif kind == 'counters':
+        performances.append(content['cycles'])
+    elif kind == 'error':
         error_flag = 1
+    if DEBUG == 1:
+        print(content)
+num_alg = len(algorithm)
+num_perf = len(performances)
 
 
 # Check entries' correctness
@@ -94,8 +88,6 @@ def take_perf (e) :
     return e[-1]
 sorted_performances = sorted(zip_iter, key=take_perf, reverse=False)
 
-f.close()
-
 
 
 # Print results to new file
@@ -21,6 +21,9 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 import numpy as np  # Matrix and vector computation package
 import random
@@ -46,9 +49,17 @@ parser.add_argument( '--weight', type=float, default=0.1)
 parser.add_argument( '--att_dim', type=int, default=8)
 parser.add_argument( '--bf16_format', type=int, default=1) # if == 1, data format if bfloat16, if 0 is float16
 parser.add_argument( '--step', type=str, default='FORWARD')     # Possible steps: FORWARD, BACKWARD_GRAD, BACKWARD_ERROR
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 # Network parameters in_size
 in_h = args.in_height
 in_w = args.in_width
@@ -109,9 +120,9 @@ def hook_fn1(m, i, o):
       f.write('#define G_OUTPUT_SIZE '+str(output_grad.numel())+'\n')
       print(output_grad)
       if current_step=='BACKWARD_GRAD' or current_step=='BACKWARD_ERROR':
-          f.write('PI_L2 fp16 OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'fp16', 'PI_L2', 'G_OUTPUT_SIZE')
       else:
-          f.write('PI_L2 fp16 OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'fp16', 'PI_L2', 'G_OUTPUT_SIZE')
 
     except AttributeError:
       print ("None found for Gradient (output)")
@@ -134,7 +145,7 @@ def hook_fn2(m, i, o):
           output_grad = grad
           f.write('#define OUTPUT_SIZE '+str(output_grad.numel())+'\n')
           print(output_grad)
-          f.write('PI_L2 fp16 OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT', output_grad, 'fp16', 'PI_L2', 'OUTPUT_SIZE')
          cont+=1
        except AttributeError:
          print ("None found for Output")
@@ -184,9 +195,9 @@ else:
   inp_copy = torch.transpose(inp, -1, -2).half()
 
 if current_step=='FORWARD':
-  f.write('PI_L2 fp16 INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(inp_copy)+'};\n')
+  dump.write_array(f, 'INPUT', inp_copy, 'fp16', 'PI_L2', 'INPUT_SIZE')
 else:
-  f.write('PI_L2 fp16 INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(inp_copy)+'};\n')
+  dump.write_array(f, 'INPUT', inp_copy, 'fp16', 'PI_L2', 'INPUT_SIZE')
 f.close()
 
 
@@ -224,7 +235,7 @@ with torch.no_grad():
 f = open("init-defines.h", 'a')
 f.write("\n\n// Input Projections Weigth Initialization\n")
 f.write("#define INPUT_WGT_SIZE (3*Tatt_dim_l1*Tin_W_l1)\n")
-f.write('PI_L2 fp16 INPUT_WEIGHTS[INPUT_WGT_SIZE] = {'+dump.tensor_to_string(in_wgt_init_tensor)+'};\n')
+dump.write_array(f, 'INPUT_WEIGHTS', in_wgt_init_tensor, 'fp16', 'PI_L2', 'INPUT_WGT_SIZE')
 f.close()
 
 
@@ -264,7 +275,7 @@ with torch.no_grad():
 f = open("init-defines.h", 'a')
 f.write("\n\n")
 f.write("#define OUTPUT_WGT_SIZE (Tatt_dim_l1*Tin_W_l1)\n")
-f.write('PI_L2 fp16 OUTPUT_WEIGHTS[OUTPUT_WGT_SIZE] = {'+dump.tensor_to_string(output_proj_wgt_init_tensor)+'};\n')
+dump.write_array(f, 'OUTPUT_WEIGHTS', output_proj_wgt_init_tensor, 'fp16', 'PI_L2', 'OUTPUT_WGT_SIZE')
 f.close()
 
 criterion = nn.MSELoss()
@@ -282,7 +293,7 @@ else:
 
 f = open("mhsa-output.h", "w")
 f.write('#define OUTPUT_SIZE '+str(out.numel())+'\n')
-f.write('PI_L2 fp16 OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(out_copy)+'};\n')
+dump.write_array(f, 'OUTPUT', out_copy, 'fp16', 'PI_L2', 'OUTPUT_SIZE')
 f.close()
 
 
@@ -296,14 +307,18 @@ input_grad = inp.grad
 
 f = open("mhsa-grads.h", 'a')
 f.write('#define G_INPUT_WGT_SIZE '+str(input_wgt_grad.numel())+'\n')
-f.write("PI_L2 fp16 INPUT_WGT_GRAD[G_INPUT_WGT_SIZE] = {"+dump.tensor_to_string(input_wgt_grad)+"};\n")
+dump.write_array(f, 'INPUT_WGT_GRAD', input_wgt_grad, 'fp16', 'PI_L2', 'G_INPUT_WGT_SIZE')
 f.write('#define G_OUTPUT_WGT_SIZE '+str(output_wgt_grad.numel())+'\n')
-f.write("PI_L2 fp16 OUTPUT_WGT_GRAD[G_OUTPUT_WGT_SIZE] = {"+dump.tensor_to_string(output_wgt_grad)+"};\n")
+dump.write_array(f, 'OUTPUT_WGT_GRAD', output_wgt_grad, 'fp16', 'PI_L2', 'G_OUTPUT_WGT_SIZE')
 f.write("#define G_IN_SIZE "+str(input_grad.numel())+ '\n')
-f.write("PI_L2 fp16 INPUT_GRAD[G_IN_SIZE] = {"+dump.tensor_to_string(input_grad)+ "};\n")
+dump.write_array(f, 'INPUT_GRAD', input_grad, 'fp16', 'PI_L2', 'G_IN_SIZE')
 f.close()
 
 f = open("attention_scores.h", "w")
 f.write('#define ATTENTION_S_LENGTH '+str(net.mhsa.scores.numel())+'\n')
-f.write('PI_L2 fp16 ATTENTION_SCORES[ATTENTION_S_LENGTH] = {'+dump.tensor_to_string(torch.transpose(net.mhsa.scores, 0, 1))+'};\n')
-f.close()
\ No newline at end of file
+dump.write_array(f, 'ATTENTION_SCORES', torch.transpose(net.mhsa.scores, 0, 1), 'fp16', 'PI_L2', 'ATTENTION_S_LENGTH')
+f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
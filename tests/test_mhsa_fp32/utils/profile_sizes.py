@@ -24,75 +24,41 @@ Profile multiple network sizes in a single call
 '''
 
 # =====>    USER CODE    <=====
-# Arrays of the network sizes to be simulated. These arrays have to be all the same length, 
-# since the code compiles over the sequence of tests:
-# TEST 0: (in_size[0], out_size[0],..)
-# TEST 1: (in_size[1], out_size[1],..)
-# TEST 2: (in_size[2], out_size[2],..)
-in_height = [10, 32, 64]
-in_width = [10, 16, 32]
-out_width = [16, 32, 64]
-ch_in = [1, 1, 1]
-ch_out = [1, 1, 1]
+# Grid of the network sizes to be simulated (Makefile variable: values). Each combination
+# of the values is simulated, "=DIM" gives a dimension the value of the DIM dimension.
+# The values can be overridden from the command line (e.g. --IN_H 8,16,32, --IN_H 8:64:8
+# or --IN_H 8:64*2) or by a JSON config file (--config), see size_sweep_utils.parse_values()
+grid = {
+    'IN_H'    : [16, 32, 64],
+    'IN_W'    : [16],
+    'N_HEADS' : [8],
+    'ATT_DIM' : [16]
+}
 # =====> END OF USER CODE <=====
 
-array_size = len(in_size)
-if (len(out_size) != array_size):
-    print("Arrays for multiple size test are not equally sized!!")
-
 import os
+import sys
 import argparse
-import profile_utils as prof
-
-# Take arguments for profiling
-parser = argparse.ArgumentParser("Multiple Sizes Layer Profiling")
-parser.add_argument( '--num_sizes', type=int, default=array_size)
-parser.add_argument( '--perf_file_name', type=str, default='runs.txt' )
-parser.add_argument( '--step', type=str, default="PW_FORWARD")
-parser.add_argument( '--cores', type=int, default=1)
-parser.add_argument( '--data_type', type=str, default='fp32')
-
-parser.add_argument( '--matmul_type', type=int, default=0)  # Selects a matmul algorithm
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+import size_sweep_utils as sweep
 
-args = parser.parse_args()
-
-num_sizes = args.num_sizes
-step_type = args.step
-filename = args.perf_file_name
-cores = args.cores
-data_type = args.data_type
-matmul_alg = args.matmul_type
+# L1 memory occupation of a point of the grid (bytes), as in compute_memory_occupation() of net.c
+def l1_footprint (point, data_bytes):
 
-print("\n=====> ENTERING TEST SEQUENCE.. <=====\n")
+    seq, token, heads, att = point['IN_H'], point['IN_W'], point['N_HEADS'], point['ATT_DIM']
+    if point['STEP'] == 'BACKWARD':
+        elements = (seq*token + 3*token*att + token*att + 2*3*att*seq + 2*token*seq + 2*att*seq
+                    + 2*seq*seq*heads + 3*seq*att + seq*seq + seq*seq*heads)
+    else:
+        elements = seq*token + 3*token*att + token*att + 3*att*seq + token*seq + att*seq + 2*seq*seq + 2*seq
 
-# Prepare log file for the measured performances
-f = open(filename, "w")
-f.write("[ PERFORMANCES OVER DIFFERENT NETWORK SIZES ]\n")
-f.write("---------------------------------------------\n")
-f.write("STEP TYPE: {}\n".format(step_type))
-f.write("NUM_CORES: {}\n".format(cores))
-f.write("DATA_TYPE: {}\n".format(data_type))
-f.write("Number of different layer sizes: {}\n".format(num_sizes))
-f.write("---------------------------------------------\n")
-f.write("\n=====> NETWORK RUNS <=====")
-f.close()
+    return elements * data_bytes
 
-# Execute multiple make commands and report performances
-for compile_idx in range(num_sizes) :
-    print("Executing build {}".format(compile_idx))
-    # Execute build
-    os.system("rm -r BUILD/")
-    if (step_type == "FORWARD" or "BACKWARD_GRAD" or "BW_ERROR"):
-        os.system("make clean get_golden all run STEP={} NUM_CORES={} MATMUL_TYPE={} IN_H={} IN_W={} OUT_W={} IN_CH={} OUT_CH={} > log.txt".format(step_type, cores, matmul_alg, in_height[compile_idx], in_width[compile_idx], out_width[compile_idx], ch_in[compile_idx], ch_out[compile_idx]))
-    else: 
-        print("Invalid step!!")
-        exit()
-    # Find profiling and write it to file
-    f = open(filename, "a")
-    f.write("\nRUN {}: MATMUL_ALG= {}, IN_H={}, IN_W={}, OUT_W={}, IN_CH={}, OUT_CH={}".format(compile_idx, matmul_alg, in_height[compile_idx], in_width[compile_idx], out_width[compile_idx], ch_in[compile_idx], ch_out[compile_idx]))
-    f.close()
-    prof.extract_size_performance(step_type, filename)
 
-print("\n=====> TERMINATING TEST SEQUENCE.. <=====\n")
-os.system("rm -r BUILD/")
+# Take arguments for profiling
+parser = argparse.ArgumentParser("Multiple Sizes Layer Profiling")
+sweep.add_sweep_arguments(parser, grid, step="FORWARD", data_type='fp32')
+args = parser.parse_args()
 
+# Build, simulate and report the points of the grid
+sweep.profile_sizes(grid, l1_footprint, args)
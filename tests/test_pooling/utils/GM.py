@@ -26,6 +26,9 @@ Authors: Davide Nadalini, Leonardo Ravaglia
 import torch
 import torch.nn as nn
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 
 
@@ -38,9 +41,17 @@ parser.add_argument( '--ker_w', type=int, default=2 )
 parser.add_argument( '--stride_h', type=int, default=1 )
 parser.add_argument( '--stride_w', type=int, default=1 )
 parser.add_argument( '--value', type=float, default=0.5 )
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 in_h = args.in_h
 in_w = args.in_w
 in_c = args.in_c
@@ -153,17 +164,21 @@ f.write("#define IN_SIZE "+str(in_c*in_h*in_w)+"\n")
 f.write("#define OUT_SIZE "+str(in_c*int((in_h-ker_h+stride_h)/stride_h)*int((in_w-ker_w+stride_w)/stride_w))+"\n")
 
 f.write("PI_L2 float MAXLOSS = {"+str(maxloss.data.item())+"};\n")
-f.write("PI_L2 float MAXOUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(maxout)+"};\n")
-f.write("PI_L2 float MAXOUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(maxout.grad)+"};\n")
-f.write("PI_L1 float MAXIN[IN_SIZE] = {"+dump.tensor_to_string(maxinput)+"};\n")
-f.write("PI_L2 float MAXIN_GRAD[IN_SIZE] = {"+dump.tensor_to_string(maxinput.grad)+"};\n")
-f.write("PI_L1 float MAXLABEL[OUT_SIZE] = {"+dump.tensor_to_string(maxlabel)+"};\n")
+dump.write_array(f, 'MAXOUTPUT', maxout, 'float', 'PI_L2', 'OUT_SIZE')
+dump.write_array(f, 'MAXOUTPUT_GRAD', maxout.grad, 'float', 'PI_L2', 'OUT_SIZE')
+dump.write_array(f, 'MAXIN', maxinput, 'float', 'PI_L1', 'IN_SIZE')
+dump.write_array(f, 'MAXIN_GRAD', maxinput.grad, 'float', 'PI_L2', 'IN_SIZE')
+dump.write_array(f, 'MAXLABEL', maxlabel, 'float', 'PI_L1', 'OUT_SIZE')
 
 f.write("PI_L2 float AVGLOSS = {"+str(avgloss.data.item())+"};\n")
-f.write("PI_L2 float AVGOUTPUT[OUT_SIZE] = {"+dump.tensor_to_string(avgout)+"};\n")
-f.write("PI_L2 float AVGOUTPUT_GRAD[OUT_SIZE] = {"+dump.tensor_to_string(avgout.grad)+"};\n")
-f.write("PI_L1 float AVGIN[IN_SIZE] = {"+dump.tensor_to_string(avginput)+"};\n")
-f.write("PI_L2 float AVGIN_GRAD[IN_SIZE] = {"+dump.tensor_to_string(avginput.grad)+"};\n")
-f.write("PI_L1 float AVGLABEL[OUT_SIZE] = {"+dump.tensor_to_string(avglabel)+"};\n")
+dump.write_array(f, 'AVGOUTPUT', avgout, 'float', 'PI_L2', 'OUT_SIZE')
+dump.write_array(f, 'AVGOUTPUT_GRAD', avgout.grad, 'float', 'PI_L2', 'OUT_SIZE')
+dump.write_array(f, 'AVGIN', avginput, 'float', 'PI_L1', 'IN_SIZE')
+dump.write_array(f, 'AVGIN_GRAD', avginput.grad, 'float', 'PI_L2', 'IN_SIZE')
+dump.write_array(f, 'AVGLABEL', avglabel, 'float', 'PI_L1', 'OUT_SIZE')
 
 f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
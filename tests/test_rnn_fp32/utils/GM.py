@@ -21,6 +21,9 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
 import dump_utils as dump
 import numpy as np  # Matrix and vector computation package
 import random
@@ -42,9 +45,17 @@ parser.add_argument( '--ch_out', type=int, default=1)
 parser.add_argument( '--out_width', type=int, default=8)
 parser.add_argument( '--weight', type=float, default=0.1)
 parser.add_argument( '--step', type=str, default='FORWARD')     # Possible steps: FORWARD, BACKWARD_GRAD, BACKWARD_ERROR
+parser.add_argument( '--bin_data', type=int, default=0)    # 1 to dump data in io_data.bin instead of C initializers
 
 args = parser.parse_args()
 
+# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())
+if dump.restore_golden_model(args):
+    exit()
+
+if args.bin_data == 1:
+    dump.set_output_mode('bin')
+
 # Network parameters in_size
 in_h = args.in_height
 in_w = args.in_width
@@ -98,13 +109,13 @@ def hook_fn1(m, i, o):
         f.write("#define G_IN_SIZE "+str(input_grad.numel())+ '\n')
         print("IN GRAD:")
         print(input_grad)
-        f.write("PI_L2 float INPUT_GRAD[G_IN_SIZE] = {"+dump.tensor_to_string(input_grad)+ "};\n")
+        dump.write_array(f, 'INPUT_GRAD', input_grad, 'float', 'PI_L2', 'G_IN_SIZE')
 
       if cont==1:
         weight_grad = grad
         f.write('#define G_WGT_SIZE '+str(weight_grad.numel())+'\n')
         print(weight_grad)
-        f.write('PI_L2 float WEIGHT_GRAD[G_WGT_SIZE] = {'+dump.tensor_to_string(weight_grad)+'};\n')       
+        dump.write_array(f, 'WEIGHT_GRAD', weight_grad, 'float', 'PI_L2', 'G_WGT_SIZE')
 
       cont += 1
 
@@ -120,9 +131,9 @@ def hook_fn1(m, i, o):
       f.write('#define G_OUTPUT_SIZE '+str(output_grad.numel())+'\n')
       print(output_grad)
       if current_step=='BACKWARD_GRAD' or current_step=='BACKWARD_ERROR':
-          f.write('PI_L2 float OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'float', 'PI_L2', 'G_OUTPUT_SIZE')
       else:
-          f.write('PI_L2 float OUTPUT_GRAD[G_OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT_GRAD', output_grad, 'float', 'PI_L2', 'G_OUTPUT_SIZE')
 
     except AttributeError:
       print ("None found for Gradient (output)")
@@ -145,7 +156,7 @@ def hook_fn2(m, i, o):
           output_grad = grad
           f.write('#define OUTPUT_SIZE '+str(output_grad.numel())+'\n')
           print(output_grad)
-          f.write('PI_L2 float OUTPUT[OUTPUT_SIZE] = {'+dump.tensor_to_string(output_grad)+'};\n')
+          dump.write_array(f, 'OUTPUT', output_grad, 'float', 'PI_L2', 'OUTPUT_SIZE')
          cont+=1
        except AttributeError:
          print ("None found for Gradient")
@@ -179,15 +190,15 @@ f = open("input-sequence.h", "w")
 f.write("#define INPUT_SIZE "+str(inp.numel())+'\n')
 print(inp)
 if current_step=='FORWARD':
-  f.write('PI_L2 float INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(inp)+'};\n')
+  dump.write_array(f, 'INPUT', inp, 'float', 'PI_L2', 'INPUT_SIZE')
 else:
-  f.write('PI_L2 float INPUT[INPUT_SIZE] = {'+dump.tensor_to_string(inp)+'};\n')
+  dump.write_array(f, 'INPUT', inp, 'float', 'PI_L2', 'INPUT_SIZE')
 
 
 print("------------Initial State------------")
 f.write("#define STATE_SIZE "+str(state_0.numel())+'\n')
 print(state_0)
-f.write('PI_L2 float STATE[STATE_SIZE] = {'+dump.tensor_to_string(state_0)+'};\n')
+dump.write_array(f, 'STATE', state_0, 'float', 'PI_L2', 'STATE_SIZE')
 
 f.close()
 
@@ -214,7 +225,7 @@ in_wgt_init_tensor = torch.transpose(in_wgt_init_tensor, 0, 1)
 f = open("init-defines.h", 'a')
 f.write("\n\n// Weight initialization\n")
 f.write("#define INPUT_WGT_SIZE (Tin_W_l1*Tout_W_l1)\n")
-f.write('PI_L2 float INPUT_WEIGHTS[INPUT_WGT_SIZE] = {'+dump.tensor_to_string(in_wgt_init_tensor)+'};\n')
+dump.write_array(f, 'INPUT_WEIGHTS', in_wgt_init_tensor, 'float', 'PI_L2', 'INPUT_WGT_SIZE')
 f.close()
 
 
@@ -240,7 +251,7 @@ state_wgt_init_tensor = torch.transpose(state_wgt_init_tensor, 0, 1)
 f = open("init-defines.h", 'a')
 f.write("\n\n")
 f.write("#define STATE_WGT_SIZE (Tout_W_l1*Tout_W_l1)\n")
-f.write('PI_L2 float STATE_WEIGHTS[STATE_WGT_SIZE] = {'+dump.tensor_to_string(state_wgt_init_tensor)+'};\n')
+dump.write_array(f, 'STATE_WEIGHTS', state_wgt_init_tensor, 'float', 'PI_L2', 'STATE_WGT_SIZE')
 f.close()
 
 criterion = nn.MSELoss()
@@ -261,9 +272,13 @@ input_grad = inp.grad
 
 f = open("rnn-grads.h", 'a')
 f.write('#define G_IH_WGT_SIZE '+str(ih_wgt_grad.numel())+'\n')
-f.write("PI_L2 float IH_WGT_GRAD[G_IH_WGT_SIZE] = {"+dump.tensor_to_string(ih_wgt_grad)+"};\n")
+dump.write_array(f, 'IH_WGT_GRAD', ih_wgt_grad, 'float', 'PI_L2', 'G_IH_WGT_SIZE')
 f.write('#define G_HH_WGT_SIZE '+str(hh_wgt_grad.numel())+'\n')
-f.write("PI_L2 float HH_WGT_GRAD[G_HH_WGT_SIZE] = {"+dump.tensor_to_string(hh_wgt_grad)+"};\n")
+dump.write_array(f, 'HH_WGT_GRAD', hh_wgt_grad, 'float', 'PI_L2', 'G_HH_WGT_SIZE')
 f.write("#define G_IN_SIZE "+str(input_grad.numel())+ '\n')
-f.write("PI_L2 float INPUT_GRAD[G_IN_SIZE] = {"+dump.tensor_to_string(input_grad)+ "};\n")
-f.close()
\ No newline at end of file
+dump.write_array(f, 'INPUT_GRAD', input_grad, 'float', 'PI_L2', 'G_IN_SIZE')
+f.close()
+dump.close_output()
+
+# Store the outputs for the next runs with the same configuration
+dump.store_golden_model()
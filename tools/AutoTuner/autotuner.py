@@ -19,8 +19,9 @@ Authors: Davide Nadalini, Leonardo Ravaglia
 '''
 
 
-from math import floor
 import os
+import sys
+import multiprocessing
 
 from tiling_utils import get_tiling
 from tiling_utils import find_best_perf
@@ -28,6 +29,27 @@ from tiling_utils import sort_results
 from tiling_utils import compute_memory_footprint
 from tiling_utils import write_error_file
 from tiling_utils import write_raw_file
+from tiling_geometry import get_tile_schedule
+from tiling_geometry import write_tile_schedule
+from sweep_utils import expand_jobs
+from sweep_utils import run_sweep
+from sweep_utils import get_matmul_group
+from sweep_utils import get_matmul_names
+from sweep_utils import write_raw_results
+from sweep_utils import collect_best_results
+from sweep_utils import split_cached_jobs
+from sweep_utils import cache_results
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tests', 'common'))
+from cache_utils import compute_lib_hash
+from cache_utils import compute_test_hashes
+from cache_utils import load_cache
+from results_utils import init_results_file
+from results_utils import write_sweep_result
+from results_utils import write_runs_results
+from cost_model import load_samples
+from cost_model import fit_cost_model
+from cost_model import prune_jobs
+from cost_model import get_prediction_error
 
 """
 Tiler (Naive or DORY-based) which finds tiling schemes depending on the problem, and then finds the fastest one for the problem
@@ -66,6 +88,18 @@ IGNORE_IN_GRAD = False
 USE_NAIVE_TILER = True
 # Select if to compile locally after finding the tiling
 FIND_FASTEST_MATMUL = True
+# Select if to run the local compilations in parallel, each one in a scratch copy of the test folder
+PARALLEL_SWEEP      = True
+MAX_PROCS           = multiprocessing.cpu_count()
+JOB_TIMEOUT         = 1800              # Timeout of each build and simulation (seconds)
+SWEEP_CORES         = [NUM_CORES]       # Number of cores to be profiled for each solution
+KEEP_SCRATCH        = False             # Keep the scratch folders of the jobs (for debugging)
+# Select if to reuse the results of previous runs (same layer configuration, library and test sources)
+USE_CACHE           = True
+# Select if to simulate only the runs with the lowest cycles predicted by the cost model (fitted on the cached runs),
+# instead of all the runs (by default, the search is exhaustive)
+USE_COST_MODEL      = False
+COST_MODEL_TOP_K    = 3                 # Number of matmuls to be simulated for each tiling solution, pass and number of cores
 # Select if to write the file for server execution (specify trainlib's folder location on server)
 WRITE_YML_FILE = True
 trainlib_path = '/home/Work/pulp-trainlib'
@@ -95,6 +129,7 @@ os.chdir('tools/')
 sim_result_file = str(base_path + '/tools/AutoTuner/fastest_tiling.txt')
 raw_result_file = str(base_path + '/tools/AutoTuner/raw_data_tiling.txt')
 err_log_file = str(base_path + '/tools/AutoTuner/error_log.txt')
+results_file = str(base_path + '/tools/AutoTuner/tiling_results.jsonl')
 source_file = 'runs.txt'
 temp_file = 'temp.txt'
 # For server execution
@@ -167,6 +202,15 @@ print('W_in: '+str(W_in))
 print('W_out: '+str(W_out))
 print('OBJECTIVE: '+str(Obj))
 
+# Sizes, memory footprint and tile schedule of each solution
+if NUM_FOUND_SOLUTIONS == 1 and not isinstance(C_in, list):
+    tile_list = [[C_in, H_in, W_in, C_out, H_out, W_out]]
+else:
+    tile_list = [[C_in[idx], H_in[idx], W_in[idx], C_out[idx], H_out[idx], W_out[idx]] for idx in range(NUM_FOUND_SOLUTIONS)]
+memocc_list = [compute_memory_footprint(layer_type, *tile, int(NUM_INPUT_BITS/8), int(NUM_KERNEL_BITS/8), int(NUM_OUTPUT_BITS/8)) for tile in tile_list]
+schedule_list = [get_tile_schedule(layer_type, IN_CH, INPUT_H, INPUT_W, KER_H, KER_W, OUT_CH, tile[0], tile[1], tile[2], tile[3],
+                                   int(NUM_INPUT_BITS/8), int(NUM_KERNEL_BITS/8), int(NUM_OUTPUT_BITS/8)) for tile in tile_list]
+
 # Once the solutions are found, list them on the output file
 f = open(sim_result_file, 'w')
 f.write("=====> TILING SCHEMES WITH OPTIMIZED MATMULS <=====\n\n")
@@ -180,62 +224,13 @@ f.write("---------------- TILING CANDIDATES ----------------\n")
 print("\nWriting {} solutions to file..".format(NUM_FOUND_SOLUTIONS))
 for idx in range(NUM_FOUND_SOLUTIONS):
     # Write solutions to file
-    if NUM_FOUND_SOLUTIONS == 1:
-        # Compute the memory occupation of the layer
-        memocc_bytes = compute_memory_footprint(layer_type, C_in, H_in, W_in, C_out, H_out, W_out, int(NUM_INPUT_BITS/8), int(NUM_KERNEL_BITS/8), int(NUM_OUTPUT_BITS/8))
-        f.write("{})\tInput: C={}, H={}, W={},\t\tOutput: C={}, H={}, W={}\t\t\tMemory footprint (bytes): FW={}, WGT_G={}, IN_G={}".format(idx, C_in, H_in, W_in, C_out, H_out, W_out, memocc_bytes[0], memocc_bytes[1], memocc_bytes[2]))
-        # Compute the total number of tiles
-        Cin_pieces = int(floor(IN_CH/C_in)); Cin_remainder = IN_CH % C_in
-        if layer_type == 'CONV2D' or layer_type == 'DW':
-            if INPUT_H == H_in:
-                H_pieces = 1 ; H_remainder = 0 # TO BE FIXED THE REMAINDER
-            else :
-                H_pieces = 1 + (INPUT_H - H_in) / (H_in - KER_H + 1) ; H_remainder = 0 # TO BE FIXED THE REMAINDER
-            if INPUT_W == W_in:
-                W_pieces = 1 ; W_remainder = 0 # TO BE FIXED THE REMAINDER
-            else :
-                W_pieces = 1 + (INPUT_W - W_in) / (W_in - KER_W + 1) ; W_remainder = 0 # TO BE FIXED THE REMAINDER
-        else :
-            H_pieces = int(floor(INPUT_H/H_in)); H_remainder = INPUT_H % H_in
-            W_pieces = int(floor(INPUT_W/W_in)); W_remainder = INPUT_W % W_in
-        if (layer_type == 'DW'):
-            Cout_pieces = 1; Cout_remainder = 0
-        else:
-            Cout_pieces = int(floor(OUT_CH/C_out)); Cout_remainder = OUT_CH % C_out
-        total_full_tiles = Cin_pieces * H_pieces * W_pieces * Cout_pieces
-        if Cin_remainder != 0 or H_remainder != 0 or W_remainder != 0 or Cout_remainder != 0:
-            total_border_tiles = 'PRESENT'
-        else: 
-            total_border_tiles = 'NONE'
-        f.write("\t\tNUM_FULL_TILES={}, BORDER_TILES={}\n".format(total_full_tiles, total_border_tiles))
-    else:
-        # Compute the memory occupation of the layer
-        memocc_bytes = compute_memory_footprint(layer_type, C_in[idx], H_in[idx], W_in[idx], C_out[idx], H_out[idx], W_out[idx], int(NUM_INPUT_BITS/8), int(NUM_KERNEL_BITS/8), int(NUM_OUTPUT_BITS/8))
-        f.write("{})\t\tInput: C={}, H={}, W={},\t\tOutput: C={}, H={}, W={}\t\t\tMemory footprint (bytes): FW={}, WGT_G={}, IN_G={}".format(idx, C_in[idx], H_in[idx], W_in[idx], C_out[idx], H_out[idx], W_out[idx], memocc_bytes[0], memocc_bytes[1], memocc_bytes[2]))
-        # Compute the total number of tiles
-        Cin_pieces = int(floor(IN_CH/C_in[idx])); Cin_remainder = IN_CH % C_in[idx]
-        if layer_type == 'CONV2D' or layer_type == 'DW':
-            if INPUT_H == H_in[idx]:
-                H_pieces = 1 ; H_remainder = 0 # TO BE FIXED THE REMAINDER
-            else :
-                H_pieces = int(1 + (INPUT_H - H_in[idx]) / (H_in[idx] - KER_H + 1)) ; H_remainder = 0 # TO BE FIXED THE REMAINDER 
-            if INPUT_W == W_in[idx]:
-                W_pieces = 1 ; W_remainder = 0 # TO BE FIXED THE REMAINDER
-            else :
-                W_pieces = int(1 + (INPUT_W - W_in[idx]) / (W_in[idx] - KER_W + 1)) ; W_remainder = 0 # TO BE FIXED THE REMAINDER
-        else :
-            H_pieces = int(floor(INPUT_H/H_in[idx])); H_remainder = INPUT_H % H_in[idx]
-            W_pieces = int(floor(INPUT_W/W_in[idx])); W_remainder = INPUT_W % W_in[idx]
-        if (layer_type == 'DW'):
-            Cout_pieces = 1; Cout_remainder = 0
-        else:
-            Cout_pieces = int(floor(OUT_CH/C_out[idx])); Cout_remainder = OUT_CH % C_out[idx]
-        total_full_tiles = Cin_pieces * H_pieces * W_pieces * Cout_pieces
-        if Cin_remainder != 0 or H_remainder != 0 or W_remainder != 0 or Cout_remainder != 0:
-            total_border_tiles = 'PRESENT'    
-        else:
-            total_border_tiles = 'NONE'   
-        f.write("\t\tNUM_FULL_TILES={}, BORDER_TILES={}\n".format(total_full_tiles, total_border_tiles))
+    C_in_t, H_in_t, W_in_t, C_out_t, H_out_t, W_out_t = tile_list[idx]
+    memocc_bytes = memocc_list[idx]
+    f.write("{})\t\tInput: C={}, H={}, W={},\t\tOutput: C={}, H={}, W={}\t\t\tMemory footprint (bytes): FW={}, WGT_G={}, IN_G={}".format(idx, C_in_t, H_in_t, W_in_t, C_out_t, H_out_t, W_out_t, memocc_bytes[0], memocc_bytes[1], memocc_bytes[2]))
+    # Compute the number of full and border tiles, and their transfers
+    schedule = schedule_list[idx]
+    f.write("\t\tNUM_FULL_TILES={}, BORDER_TILES={}\n".format(schedule['num_full_tiles'], schedule['num_border_tiles']))
+    write_tile_schedule(f, schedule)
 f.write("---------------------------------------------------\n\n\n")
 f.write("------------- SINGLE TILE PERFORMANCES ------------\n")
 f.write("-------- (Best matmul with relative cycles) -------\n")
@@ -254,6 +249,12 @@ err_f.write("      (Notify broken matmuls)     \n\n")
 err_f.close()
 
 
+# Structured results (one record per tiling, pass, cores and matmul)
+init_results_file(results_file)
+layer = [layer_type, IN_CH, INPUT_H, INPUT_W, KER_H, KER_W, OUT_CH]
+mm_list_file = str(base_path + '/tests/mm_manager_list.txt')
+
+
 
 
 
@@ -442,8 +443,67 @@ if WRITE_YML_FILE == True:
 test_base_folder = "../tests/"
 return_folder = "../../tools"
 
-# Select if to compile layers or not
-if FIND_FASTEST_MATMUL == True:
+# Parallel sweep over (tiling, step, matmul, cores)
+if FIND_FASTEST_MATMUL == True and PARALLEL_SWEEP == True:
+    passes = []
+    if IGNORE_FW == False:
+        passes.append('FW')
+    if IGNORE_WGT_GRAD == False:
+        passes.append('WGT_G')
+    if IGNORE_IN_GRAD == False:
+        passes.append('IN_G')
+    scratch_folder = str(base_path + '/tools/AutoTuner/scratch')
+    cache_file = str(base_path + '/tests/profile_cache.jsonl')
+    lib_hash = compute_lib_hash(str(base_path + '/lib'))
+    test_hashes = compute_test_hashes(str(base_path + '/tests'))
+    cache = {}
+    if USE_CACHE == True:
+        cache = load_cache(cache_file)
+    cost_model = None
+    if USE_COST_MODEL == True:
+        cost_model = fit_cost_model(load_samples(cache_file, lib_hash), mm_list_file)
+        if cost_model is None:
+            print("\nNot enough cached runs to fit the cost model, simulating all the runs..")
+        else:
+            print("\nCost model fitted on {} cached runs".format(cost_model['num_samples']))
+
+    for layer_pass in passes:
+        num_matmuls = NUM_STD_MATMUL
+        if layer_type == 'DW':
+            num_matmuls = NUM_DW_MATMUL
+        jobs = expand_jobs(layer_type, C_in, H_in, W_in, C_out, KER_H, KER_W, [layer_pass], num_matmuls, SWEEP_CORES)
+        cached_results, jobs = split_cached_jobs(jobs, cache, lib_hash, test_hashes)
+        if cost_model is not None:
+            num_jobs = len(jobs)
+            jobs = prune_jobs(cost_model, jobs, layer_type, tile_list, KER_H, KER_W, COST_MODEL_TOP_K)
+            print("\n{} pass: {} of {} runs selected by the cost model".format(layer_pass, len(jobs), num_jobs))
+        print("\n{} pass: {} runs found in cache, {} runs to be simulated".format(layer_pass, len(cached_results), len(jobs)))
+        matmul_names = get_matmul_names(mm_list_file, get_matmul_group(layer_type, layer_pass))
+        for result in cached_results:
+            write_sweep_result(results_file, layer, tile_list, memocc_list, matmul_names, result)
+        results = []
+        if len(jobs) > 0:
+            # Records are written as soon as each job is finished
+            results = run_sweep(jobs, scratch_folder, base_path, MAX_PROCS, JOB_TIMEOUT, KEEP_SCRATCH,
+                                lambda result: write_sweep_result(results_file, layer, tile_list, memocc_list, matmul_names, result))
+        if USE_CACHE == True:
+            cache_results(results, cache_file, cache, lib_hash, test_hashes)
+        results = cached_results + results
+        write_raw_results(raw_result_file, results, matmul_names)
+        if cost_model is not None:
+            num_predicted, mean_error, max_error = get_prediction_error(results)
+            print("{} pass: cost model error on {} runs: mean {:.1f}%, max {:.1f}%".format(layer_pass, num_predicted, 100*mean_error, 100*max_error))
+            raw_f = open(raw_result_file, 'a')
+            raw_f.write("\nCOST MODEL ({} pass): error on {} simulated runs: mean {:.1f}%, max {:.1f}%\n".format(layer_pass, num_predicted, 100*mean_error, 100*max_error))
+            raw_f.close()
+        tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, errors_list, broken_mm_list = collect_best_results(results, layer_pass, matmul_names)
+        for idx in range(len(tiling_idx_list)):
+            if (errors_list[idx] > 0):
+                write_error_file(err_log_file, layer_pass, tiling_idx_list[idx], errors_list[idx], broken_mm_list[idx])
+        sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
+
+# Select if to compile layers or not (serial execution inside the test folder)
+if FIND_FASTEST_MATMUL == True and PARALLEL_SWEEP == False:
     # Launch simulations on GVSOC to test the tiling schemes
     if layer_type == 'DW' or layer_type == 'PW':
         os.chdir(test_base_folder+"test_conv_pw_dw_fp32")
@@ -458,11 +518,12 @@ if FIND_FASTEST_MATMUL == True:
                     # FWD
                     os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IMAGE_H={} IMAGE_W={} DW_KER_H={} DW_KER_W={} DW_IN_CH={} PW_OUT_CH=1 STEP='DW_FORWARD' BYPASS=1".format(NUM_CORES, NUM_DW_MATMUL, H_in[idx], W_in[idx], KER_H, KER_W, C_in[idx]))
                     write_raw_file(source_file, raw_result_file)
+                    write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'FW', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'FW')))
                     tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                     if (errors > 0):
                         write_error_file(err_log_file, 'FW', tiling_idx, errors, broken_mm)
                     tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('FW')
-                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
             # Lists for output data
             if IGNORE_WGT_GRAD == False:
@@ -471,11 +532,12 @@ if FIND_FASTEST_MATMUL == True:
                     # WGT GRAD
                     os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IMAGE_H={} IMAGE_W={} DW_KER_H={} DW_KER_W={} DW_IN_CH={} PW_OUT_CH=1 STEP='DW_BACKWARD_GRAD' BYPASS=1".format(NUM_CORES, NUM_DW_MATMUL, H_in[idx], W_in[idx], KER_H, KER_W, C_in[idx]))
                     write_raw_file(source_file, raw_result_file)
+                    write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'WGT_G', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'WGT_G')))
                     tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                     if (errors > 0):
                         write_error_file(err_log_file, 'WGT_G', tiling_idx, errors, broken_mm)
                     tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('WGT_G')
-                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
             # Lists for output data
             if IGNORE_IN_GRAD == False:
@@ -484,11 +546,12 @@ if FIND_FASTEST_MATMUL == True:
                     # IN GRAD
                     os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IMAGE_H={} IMAGE_W={} DW_KER_H={} DW_KER_W={} DW_IN_CH={} PW_OUT_CH=1 STEP='DW_BACKWARD_ERROR' BYPASS=1".format(NUM_CORES, NUM_DW_MATMUL, H_in[idx], W_in[idx], KER_H, KER_W, C_in[idx]))
                     write_raw_file(source_file, raw_result_file)
+                    write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'IN_G', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'IN_G')))
                     tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                     if (errors > 0):
                         write_error_file(err_log_file, 'IN_G', tiling_idx, errors, broken_mm)
                     tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('IN_G')
-                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
             os.chdir(return_folder)
         
@@ -503,11 +566,12 @@ if FIND_FASTEST_MATMUL == True:
                     # FWD
                     os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IMAGE_H={} IMAGE_W={} DW_KER_H=1 DW_KER_W=1 DW_IN_CH={} PW_OUT_CH={} STEP='PW_FORWARD' BYPASS=1".format(NUM_CORES, NUM_STD_MATMUL, H_in[idx], W_in[idx], C_in[idx], C_out[idx]))
                     write_raw_file(source_file, raw_result_file)
+                    write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'FW', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'FW')))
                     tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                     if (errors > 0):
                         write_error_file(err_log_file, 'FW', tiling_idx, errors, broken_mm)
                     tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('FW')
-                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
             if IGNORE_WGT_GRAD == False:
                 # Lists for output data
@@ -516,11 +580,12 @@ if FIND_FASTEST_MATMUL == True:
                     # WGT GRAD
                     os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IMAGE_H={} IMAGE_W={} DW_KER_H=1 DW_KER_W=1 DW_IN_CH={} PW_OUT_CH={} STEP='PW_BACKWARD_GRAD' BYPASS=1".format(NUM_CORES, NUM_STD_MATMUL, H_in[idx], W_in[idx], C_in[idx], C_out[idx]))
                     write_raw_file(source_file, raw_result_file)
+                    write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'WGT_G', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'WGT_G')))
                     tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                     if (errors > 0):
                         write_error_file(err_log_file, 'WGT_G', tiling_idx, errors, broken_mm)
                     tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('WGT_G')
-                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
             # Lists for output data
             if IGNORE_IN_GRAD == False:
@@ -529,11 +594,12 @@ if FIND_FASTEST_MATMUL == True:
                     # IN GRAD
                     os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IMAGE_H={} IMAGE_W={} DW_KER_H=1 DW_KER_W=1 DW_IN_CH={} PW_OUT_CH={} STEP='PW_BACKWARD_ERROR' BYPASS=1".format(NUM_CORES, NUM_STD_MATMUL, H_in[idx], W_in[idx], C_in[idx], C_out[idx]))
                     write_raw_file(source_file, raw_result_file)
+                    write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'IN_G', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'IN_G')))
                     tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                     if (errors > 0):
                         write_error_file(err_log_file, 'IN_G', tiling_idx, errors, broken_mm)
                     tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('IN_G')
-                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+                sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
             os.chdir(return_folder)
 
@@ -550,11 +616,12 @@ if FIND_FASTEST_MATMUL == True:
                 # FWD
                 os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IN_CH={} OUT_CH={} STEP='FORWARD'".format(NUM_CORES, NUM_STD_MATMUL, C_in[idx], C_out[idx]))
                 write_raw_file(source_file, raw_result_file)
+                write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'FW', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'FW')))
                 tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                 if (errors > 0):
                     write_error_file(err_log_file, 'FW', tiling_idx, errors, broken_mm)
                 tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('FW')
-            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
         if IGNORE_WGT_GRAD == False:
             # Lists for output data
@@ -563,11 +630,12 @@ if FIND_FASTEST_MATMUL == True:
                 # WGT GRAD
                 os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IN_CH={} OUT_CH={} STEP='BACKWARD_GRAD'".format(NUM_CORES, NUM_STD_MATMUL, C_in[idx], C_out[idx]))
                 write_raw_file(source_file, raw_result_file)
+                write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'WGT_G', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'WGT_G')))
                 tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                 if (errors > 0):
                     write_error_file(err_log_file, 'WGT_G', tiling_idx, errors, broken_mm)
                 tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('WGT_G')
-            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
         # Lists for output data
         if IGNORE_IN_GRAD == False:
@@ -576,11 +644,12 @@ if FIND_FASTEST_MATMUL == True:
                 # IN GRAD
                 os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IN_CH={} OUT_CH={} STEP='BACKWARD_ERROR'".format(NUM_CORES, NUM_STD_MATMUL, C_in[idx], C_out[idx]))
                 write_raw_file(source_file, raw_result_file)
+                write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'IN_G', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'IN_G')))
                 tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                 if (errors > 0):
                     write_error_file(err_log_file, 'IN_G', tiling_idx, errors, broken_mm)
                 tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('IN_G')
-            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
         os.chdir(return_folder)
 
@@ -597,11 +666,12 @@ if FIND_FASTEST_MATMUL == True:
                 # FWD
                 os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IN_CH={} OUT_CH={} IMAGE_H={} IMAGE_W={} KER_H={} KER_W={} STEP='FORWARD'".format(NUM_CORES, NUM_STD_MATMUL, C_in[idx], C_out[idx], H_in[idx], W_in[idx], KER_H, KER_W))
                 write_raw_file(source_file, raw_result_file)
+                write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'FW', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'FW')))
                 tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                 if (errors > 0):
                     write_error_file(err_log_file, 'FW', tiling_idx, errors, broken_mm)
                 tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('FW')
-            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
         if IGNORE_WGT_GRAD == False:
             # Lists for output data
@@ -610,11 +680,12 @@ if FIND_FASTEST_MATMUL == True:
                 # WGT GRAD
                 os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IN_CH={} OUT_CH={} IMAGE_H={} IMAGE_W={} KER_H={} KER_W={} STEP='BACKWARD_GRAD'".format(NUM_CORES, NUM_STD_MATMUL, C_in[idx], C_out[idx], H_in[idx], W_in[idx], KER_H, KER_W))
                 write_raw_file(source_file, raw_result_file)
+                write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'WGT_G', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'WGT_G')))
                 tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                 if (errors > 0):
                     write_error_file(err_log_file, 'WGT_G', tiling_idx, errors, broken_mm)
                 tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('WGT_G')
-            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
         if IGNORE_IN_GRAD == False:
             # Lists for output data
@@ -623,11 +694,12 @@ if FIND_FASTEST_MATMUL == True:
                 # IN GRAD
                 os.system("make profile_all_optim NUM_CORES={} NUM_MATMULS={} IN_CH={} OUT_CH={} IMAGE_H={} IMAGE_W={} KER_H={} KER_W={} STEP='BACKWARD_ERROR'".format(NUM_CORES, NUM_STD_MATMUL, C_in[idx], C_out[idx], H_in[idx], W_in[idx], KER_H, KER_W))
                 write_raw_file(source_file, raw_result_file)
+                write_runs_results(results_file, source_file, layer, tile_list[idx], idx, memocc_list[idx], 'IN_G', NUM_CORES, get_matmul_names(mm_list_file, get_matmul_group(layer_type, 'IN_G')))
                 tiling_idx, mm, cyc, cores, errors, broken_mm = find_best_perf(source_file, idx, NUM_CORES)
                 if (errors > 0):
                     write_error_file(err_log_file, 'IN_G', tiling_idx, errors, broken_mm)
                 tiling_idx_list.append(tiling_idx); matmul_names_list.append(mm); matmul_cycles_list.append(cyc); num_cores_list.append(cores); passes_list.append('IN_G')
-            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list)
+            sort_results(sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list)
 
         os.chdir(return_folder)
 
@@ -0,0 +1,273 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import os
+import re
+import sys
+import math
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tests', 'common'))
+from cache_utils import load_cache
+from sweep_utils import TEST_FOLDERS
+from sweep_utils import get_matmul_group
+from sweep_utils import get_matmul_names
+
+"""
+Analytical cycle-cost model of the matmul kernels, used by the AutoTuner to simulate only
+the most promising (tile, matmul, cores) runs.
+The cycles are modeled as a linear combination of features of the matmul executed by each core
+(MACs, operand loads depending on the unrolling, loop iterations, leftovers of the unrolling),
+fitted with least squares on the runs of the current library sources stored in the persistent cache
+(tests/profile_cache.jsonl).
+A multiplicative correction is then fitted for each matmul kernel.
+"""
+
+# Minimum number of runs to fit the model
+MIN_SAMPLES = 16
+
+# Pass of each step of the Makefiles
+STEP_PASSES = {'FORWARD': 'FW', 'BACKWARD_GRAD': 'WGT_G', 'BACKWARD_ERROR': 'IN_G'}
+
+
+
+# Returns the sizes (N, K, M) of the matmul of a layer step (as set up in lib/sources, CHW layout)
+def get_matmul_sizes (layer_type, layer_pass, C_in, H_in, W_in, C_out, KER_H, KER_W):
+
+    H_out = H_in - KER_H + 1
+    W_out = W_in - KER_W + 1
+
+    if layer_type == 'LINEAR':
+        sizes = {'FW': (C_out, C_in, 1), 'WGT_G': (C_out, 1, C_in), 'IN_G': (1, C_out, C_in)}
+    elif layer_type == 'CONV2D':
+        sizes = {'FW': (C_out, KER_H*KER_W*C_in, H_out*W_out), 'WGT_G': (C_out, H_out*W_out, KER_H*KER_W*C_in), 'IN_G': (C_in, KER_H*KER_W*C_out, H_in*W_in)}
+    elif layer_type == 'PW':
+        sizes = {'FW': (C_out, C_in, H_in*W_in), 'WGT_G': (C_out, H_in*W_in, C_in), 'IN_G': (C_in, C_out, H_in*W_in)}
+    elif layer_type == 'DW':
+        sizes = {'FW': (C_in, KER_H*KER_W, H_out*W_out), 'WGT_G': (C_in, H_out*W_out, KER_H*KER_W), 'IN_G': (C_in, KER_H*KER_W, H_in*W_in)}
+    else:
+        print("[cost_model.get_matmul_sizes]: Invalid layer type {}!".format(layer_type))
+        exit()
+
+    return sizes[layer_pass]
+
+
+
+# Returns the parallelization and the unrolling of a matmul from its name
+# (parallel on M, unrolling on N, unrolling on M, unrolling on K)
+def get_unrolling (matmul_name):
+
+    par_on_M = matmul_name.startswith('mm_M')
+    unroll_N = 1; unroll_M = 1; unroll_K = 1
+    unroll = re.search(r'unroll_(\d+)x(\d+)', matmul_name)
+    if unroll is not None:
+        unroll_N = int(unroll.group(1))
+        unroll_M = int(unroll.group(2))
+    elif matmul_name.endswith('_u2'):
+        unroll_K = 2
+
+    return par_on_M, unroll_N, unroll_M, unroll_K
+
+
+
+# Computes the features of the matmul executed by each core
+def get_features (N, K, M, num_cores, unrolling):
+
+    par_on_M, unroll_N, unroll_M, unroll_K = unrolling
+    if par_on_M == True:
+        par_size, other_size, unroll_par, unroll_other = M, N, unroll_M, unroll_N
+    else:
+        par_size, other_size, unroll_par, unroll_other = N, M, unroll_N, unroll_M
+
+    par_per_core = math.ceil(par_size / num_cores)
+    core_macs = par_per_core * other_size * K
+    # Each step of the inner loop loads (unroll_par + unroll_other) operands for (unroll_par * unroll_other) MACs
+    core_loads = core_macs * (unroll_par + unroll_other) / (unroll_par * unroll_other)
+    outer_iters = math.ceil(par_per_core / unroll_par) * math.ceil(other_size / unroll_other)
+    inner_iters = outer_iters * math.ceil(K / unroll_K)
+    # Rows and columns which are not covered by the unrolled loop
+    leftover_macs = ((par_size % unroll_par) * other_size + (other_size % unroll_other) * par_size) * K / num_cores
+
+    return [1.0, core_macs, core_loads, outer_iters, inner_iters, leftover_macs]
+
+
+
+# Builds a run from a key of the persistent cache (None if the run is not supported by the model,
+# or if it was profiled with other library sources)
+def parse_cache_key (cache_key, lib_hash):
+
+    fields = cache_key.split('|')
+    if len(fields) != 5 or fields[1] != 'fp32' or fields[0] not in TEST_FOLDERS.values() or fields[3] != lib_hash:
+        return None
+    args = {}
+    for arg in fields[2].split():
+        if arg.find('=') != -1:
+            name, value = arg.split('=', 1)
+            args[name] = value
+    if 'STEP' not in args or 'MATMUL_TYPE' not in args or 'NUM_CORES' not in args:
+        return None
+
+    step = args['STEP']
+    run = {'cores': int(args['NUM_CORES']), 'matmul': int(args['MATMUL_TYPE'])}
+    try:
+        if fields[0] == 'test_linear_fp32':
+            run.update({'layer_type': 'LINEAR', 'C_in': int(args['IN_CH']), 'H_in': 1, 'W_in': 1, 'C_out': int(args['OUT_CH']), 'KER_H': 1, 'KER_W': 1})
+        elif fields[0] == 'test_conv2d_fp32':
+            run.update({'layer_type': 'CONV2D', 'C_in': int(args['IN_CH']), 'H_in': int(args['IMAGE_H']), 'W_in': int(args['IMAGE_W']),
+                        'C_out': int(args['OUT_CH']), 'KER_H': int(args['KER_H']), 'KER_W': int(args['KER_W'])})
+        elif step.startswith('DW_'):
+            run.update({'layer_type': 'DW', 'C_in': int(args['DW_IN_CH']), 'H_in': int(args['IMAGE_H']), 'W_in': int(args['IMAGE_W']),
+                        'C_out': int(args['DW_IN_CH']), 'KER_H': int(args['DW_KER_H']), 'KER_W': int(args['DW_KER_W'])})
+            step = step[3:]
+        elif step.startswith('PW_'):
+            run.update({'layer_type': 'PW', 'C_in': int(args['DW_IN_CH']), 'H_in': int(args['IMAGE_H']), 'W_in': int(args['IMAGE_W']),
+                        'C_out': int(args['PW_OUT_CH']), 'KER_H': 1, 'KER_W': 1})
+            step = step[3:]
+        else:
+            return None
+    except (KeyError, ValueError):
+        return None
+    if step not in STEP_PASSES:
+        return None
+    run['pass'] = STEP_PASSES[step]
+
+    return run
+
+
+
+# Loads the runs of the persistent cache which can be used to fit the model (only the runs of the current library)
+def load_samples (cache_file, lib_hash):
+
+    samples = []
+    cache = load_cache(cache_file)
+    for cache_key, record in cache.items():
+        run = parse_cache_key(cache_key, lib_hash)
+        if run is not None and record.get('cycles', 0) > 0:
+            run['cycles'] = record['cycles']
+            samples.append(run)
+
+    return samples
+
+
+
+# Gets the name of the matmul of a run (its index, if the name is not listed)
+def get_run_matmul_name (model, layer_type, layer_pass, matmul):
+
+    group = get_matmul_group(layer_type, layer_pass)
+    if group not in model['mm_names']:
+        model['mm_names'][group] = get_matmul_names(model['mm_list_file'], group)
+    names = model['mm_names'][group]
+    if matmul < len(names):
+        return group, names[matmul]
+    return group, 'MM {}'.format(matmul)
+
+
+
+# Computes the features of a run
+def get_run_features (model, run):
+
+    N, K, M = get_matmul_sizes(run['layer_type'], run['pass'], run['C_in'], run['H_in'], run['W_in'], run['C_out'], run['KER_H'], run['KER_W'])
+    group, matmul_name = get_run_matmul_name(model, run['layer_type'], run['pass'], run['matmul'])
+
+    return group + '|' + str(run['matmul']), get_features(N, K, M, run['cores'], get_unrolling(matmul_name))
+
+
+
+# Fits the model on a list of runs (returns None if the runs are not enough)
+def fit_cost_model (samples, mm_list_file):
+
+    if len(samples) < MIN_SAMPLES:
+        return None
+
+    model = {'mm_list_file': mm_list_file, 'mm_names': {}, 'coeffs': [], 'scale': {}, 'num_samples': len(samples)}
+    kernels = []; features = []
+    for run in samples:
+        kernel, run_features = get_run_features(model, run)
+        kernels.append(kernel)
+        features.append(run_features)
+    X = np.array(features, dtype=np.float64)
+    y = np.array([run['cycles'] for run in samples], dtype=np.float64)
+
+    # Normalize the columns, since the features have very different magnitudes
+    norm = np.abs(X).max(axis=0)
+    norm[norm == 0] = 1.0
+    coeffs = np.linalg.lstsq(X / norm, y, rcond=None)[0] / norm
+    model['coeffs'] = coeffs.tolist()
+
+    # Correction of each kernel (median ratio between measured and predicted cycles)
+    predicted = np.maximum(X @ coeffs, 1.0)
+    ratios = {}
+    for idx, kernel in enumerate(kernels):
+        ratios.setdefault(kernel, []).append(y[idx] / predicted[idx])
+    for kernel, kernel_ratios in ratios.items():
+        model['scale'][kernel] = float(np.median(kernel_ratios))
+
+    return model
+
+
+
+# Predicts the cycles of a run
+def predict_cycles (model, run):
+
+    kernel, run_features = get_run_features(model, run)
+    cycles = max(float(np.dot(model['coeffs'], run_features)), 1.0)
+
+    return cycles * model['scale'].get(kernel, 1.0)
+
+
+
+# Predicts the cycles of the jobs of a sweep (see sweep_utils.expand_jobs) and keeps the top_k fastest matmuls
+# of each (tiling solution, pass, cores). The tiles of different solutions have different sizes, so their
+# predicted cycles are not compared: each solution keeps simulated runs for all of its passes.
+# tile_list contains the tile sizes [C_in, H_in, W_in, C_out, H_out, W_out] of each tiling solution
+def prune_jobs (model, jobs, layer_type, tile_list, KER_H, KER_W, top_k):
+
+    for job in jobs:
+        tile = tile_list[job['tiling_idx']]
+        run = {'layer_type': layer_type, 'pass': job['pass'], 'C_in': tile[0], 'H_in': tile[1], 'W_in': tile[2], 'C_out': tile[3],
+               'KER_H': KER_H, 'KER_W': KER_W, 'cores': job['cores'], 'matmul': job['matmul']}
+        job['predicted_cycles'] = int(predict_cycles(model, run))
+
+    groups = {}
+    for job in jobs:
+        groups.setdefault((job['tiling_idx'], job['pass'], job['cores']), []).append(job)
+    kept = set()
+    for group_jobs in groups.values():
+        group_jobs.sort(key=lambda job: job['predicted_cycles'])
+        kept.update([job['name'] for job in group_jobs[:top_k]])
+    # The order of the sweep is kept
+    pruned_jobs = [job for job in jobs if job['name'] in kept]
+
+    return pruned_jobs
+
+
+
+# Computes the relative error of the predictions on the simulated runs (number of runs, mean error, max error)
+def get_prediction_error (results):
+
+    errors = []
+    for result in results:
+        if 'predicted_cycles' in result and result['cycles'] > 0:
+            errors.append(abs(result['predicted_cycles'] - result['cycles']) / result['cycles'])
+    if len(errors) == 0:
+        return 0, 0.0, 0.0
+
+    return len(errors), sum(errors) / len(errors), max(errors)
@@ -0,0 +1,238 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import os
+import sys
+import multiprocessing
+
+from tiling_utils import get_tiling
+from tiling_utils import compute_memory_footprint
+from tiling_geometry import get_tile_schedule
+from sweep_utils import expand_jobs
+from sweep_utils import run_sweep
+from sweep_utils import get_matmul_group
+from sweep_utils import get_matmul_names
+from sweep_utils import write_raw_results
+from sweep_utils import split_cached_jobs
+from sweep_utils import cache_results
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tests', 'common'))
+from cache_utils import compute_lib_hash
+from cache_utils import compute_test_hashes
+from cache_utils import load_cache
+from results_utils import init_results_file
+from results_utils import write_sweep_result
+from cost_model import load_samples
+from cost_model import fit_cost_model
+from cost_model import prune_jobs
+from network_utils import read_deployer_graph
+from network_utils import get_unique_layers
+from network_utils import select_layer_setup
+from network_utils import build_deployer_lists
+from network_utils import write_network_report
+from network_utils import write_deployer_lists
+
+"""
+Network-level AutoTuner: reads the graph of a TrainLib_Deployer network, tunes all of its unique
+layer shapes (FW, WGT_G, IN_G) in a single parallel sweep and writes back the fastest matmuls
+of each layer.
+Launch from tools/ with: python ./AutoTuner/network_autotuner.py
+"""
+
+
+# =====> USER SETTINGS <=====
+# Deployer file which contains the network graph (relative to pulp-trainlib/)
+DEPLOYER_FILE       = 'tools/TrainLib_Deployer/TrainLib_Deployer.py'
+# Select if to write the fastest matmuls into the lists of the Deployer file (opt_mm_fw_list, opt_mm_wg_list, opt_mm_ig_list)
+WRITE_TO_DEPLOYER   = False
+NUM_CORES           = 8
+# Tiler settings
+NUM_TILING_SOLUTIONS    = 3
+USE_NAIVE_TILER         = True
+TILING_BUFFER_SIZE      = 28*1024
+# Sweep settings
+MAX_PROCS           = multiprocessing.cpu_count()
+JOB_TIMEOUT         = 1800              # Timeout of each build and simulation (seconds)
+KEEP_SCRATCH        = False             # Keep the scratch folders of the jobs (for debugging)
+USE_CACHE           = True
+USE_COST_MODEL      = False             # Prune the fp32 runs with the cost model (see autotuner.py)
+COST_MODEL_TOP_K    = 3
+# PULP settings
+NUM_STD_MATMUL      = 24
+NUM_DW_MATMUL       = 7
+NUM_MATMUL_FP16     = 6
+# =====> END OF USER SETTINGS <=====
+
+
+
+
+
+
+
+
+# -------------------------
+# ----- BACKEND CODE ------
+# -------------------------
+
+# Starting path
+os.chdir('..')
+base_path = os.getcwd()
+os.chdir('tools/')
+# Output files
+report_file = str(base_path + '/tools/AutoTuner/network_tiling.txt')
+raw_result_file = str(base_path + '/tools/AutoTuner/raw_data_network.txt')
+results_file = str(base_path + '/tools/AutoTuner/network_results.jsonl')
+scratch_folder = str(base_path + '/tools/AutoTuner/scratch')
+cache_file = str(base_path + '/tests/profile_cache.jsonl')
+mm_list_file = str(base_path + '/tests/mm_manager_list.txt')
+mm_list_file_fp16 = str(base_path + '/tests/mm_manager_list_fp16.txt')
+deployer_file = str(base_path + '/' + DEPLOYER_FILE)
+
+passes = ['FW', 'WGT_G', 'IN_G']
+
+# Read the network and find its unique layers
+graph = read_deployer_graph(deployer_file)
+unique_layers, layer_map = get_unique_layers(graph)
+print("\nFound {} unique layer shapes in {} layers".format(len(unique_layers), len(graph['layer_list'])))
+
+
+# Tile each unique layer
+tile_lists = []
+memocc_lists = []
+schedule_lists = []
+for layer_idx, layer in enumerate(unique_layers):
+    num_bits = 16 if layer['data_type'] == 'fp16' else 32
+    print("\nTiling layer {} ({}, C_in={}, H={}, W={}, KER={}x{}, C_out={})..".format(layer_idx, layer['layer_type'], layer['IN_CH'],
+          layer['INPUT_H'], layer['INPUT_W'], layer['KER_H'], layer['KER_W'], layer['OUT_CH']))
+    C_in, C_out, H_in, H_out, W_in, W_out, Obj, NUM_FOUND_SOLUTIONS = get_tiling(
+                                                                DW=1 if layer['layer_type'] == 'DW' else 0,
+                                                                filter_size1=layer['KER_H'],
+                                                                filter_size2=layer['KER_W'],
+                                                                stride=1,
+                                                                padding_top=0,
+                                                                padding_bottom=0,
+                                                                padding_left=0,
+                                                                padding_right=0,
+                                                                groups=layer['IN_CH'] if layer['layer_type'] == 'DW' else 1,
+                                                                BN=0,
+                                                                in_channels=layer['IN_CH'],
+                                                                out_channels=layer['OUT_CH'],
+                                                                x_shape=layer['INPUT_W'],
+                                                                y_shape=layer['INPUT_H'],
+                                                                buffer_size=TILING_BUFFER_SIZE,
+                                                                BitIn=num_bits,
+                                                                BitW=num_bits,
+                                                                BitActivation=num_bits,
+                                                                BitOut=num_bits,
+                                                                NUM_RESULTS=NUM_TILING_SOLUTIONS,
+                                                                name='MatMul' if layer['layer_type'] == 'LINEAR' else 'conv',
+                                                                layer_type=layer['layer_type'],
+                                                                NAIVE=USE_NAIVE_TILER,
+                                                                NUM_CORES=NUM_CORES
+                                                                )
+    if NUM_FOUND_SOLUTIONS == 1 and not isinstance(C_in, list):
+        tile_list = [[C_in, H_in, W_in, C_out, H_out, W_out]]
+    else:
+        tile_list = [[C_in[idx], H_in[idx], W_in[idx], C_out[idx], H_out[idx], W_out[idx]] for idx in range(NUM_FOUND_SOLUTIONS)]
+    tile_lists.append(tile_list)
+    memocc_lists.append([compute_memory_footprint(layer['layer_type'], *tile, int(num_bits/8), int(num_bits/8), int(num_bits/8)) for tile in tile_list])
+    schedule_lists.append([get_tile_schedule(layer['layer_type'], layer['IN_CH'], layer['INPUT_H'], layer['INPUT_W'], layer['KER_H'], layer['KER_W'], layer['OUT_CH'],
+                                             tile[0], tile[1], tile[2], tile[3], int(num_bits/8), int(num_bits/8), int(num_bits/8)) for tile in tile_list])
+
+
+# Expand the jobs of all the unique layers
+lib_hash = compute_lib_hash(str(base_path + '/lib'))
+test_hashes = compute_test_hashes(str(base_path + '/tests'))
+cache = {}
+if USE_CACHE == True:
+    cache = load_cache(cache_file)
+cost_model = None
+if USE_COST_MODEL == True:
+    cost_model = fit_cost_model(load_samples(cache_file, lib_hash), mm_list_file)
+    if cost_model is None:
+        print("\nNot enough cached runs to fit the cost model, simulating all the runs..")
+
+cached_results = []
+jobs = []
+for layer_idx, layer in enumerate(unique_layers):
+    if len(tile_lists[layer_idx]) == 0:
+        print("\nNo tiling solution found for layer {}!".format(layer_idx))
+        continue
+    if layer['data_type'] == 'fp16':
+        num_matmuls = NUM_MATMUL_FP16
+    elif layer['layer_type'] == 'DW':
+        num_matmuls = NUM_DW_MATMUL
+    else:
+        num_matmuls = NUM_STD_MATMUL
+    tiles = tile_lists[layer_idx]
+    layer_jobs = expand_jobs(layer['layer_type'], [tile[0] for tile in tiles], [tile[1] for tile in tiles], [tile[2] for tile in tiles], [tile[3] for tile in tiles],
+                             layer['KER_H'], layer['KER_W'], passes, num_matmuls, [NUM_CORES], layer['data_type'], "L{}_".format(layer_idx), layer['hwc'])
+    for job in layer_jobs:
+        job['layer_idx'] = layer_idx
+    layer_cached_results, layer_jobs = split_cached_jobs(layer_jobs, cache, lib_hash, test_hashes)
+    if cost_model is not None and layer['data_type'] == 'fp32':
+        layer_jobs = prune_jobs(cost_model, layer_jobs, layer['layer_type'], tiles, layer['KER_H'], layer['KER_W'], COST_MODEL_TOP_K)
+    print("Layer {}: {} runs found in cache, {} runs to be simulated".format(layer_idx, len(layer_cached_results), len(layer_jobs)))
+    cached_results += layer_cached_results
+    jobs += layer_jobs
+
+
+# Structured results of each run
+def get_layer_matmul_names (layer_idx, layer_pass):
+    layer = unique_layers[layer_idx]
+    if layer['data_type'] == 'fp16':
+        return get_matmul_names(mm_list_file_fp16, get_matmul_group(layer['layer_type'], layer_pass))
+    return get_matmul_names(mm_list_file, get_matmul_group(layer['layer_type'], layer_pass))
+
+def write_network_result (result):
+    layer = unique_layers[result['layer_idx']]
+    write_sweep_result(results_file, [layer['layer_type'], layer['IN_CH'], layer['INPUT_H'], layer['INPUT_W'], layer['KER_H'], layer['KER_W'], layer['OUT_CH']],
+                       tile_lists[result['layer_idx']], memocc_lists[result['layer_idx']], get_layer_matmul_names(result['layer_idx'], result['pass']), result)
+
+init_results_file(results_file)
+for result in cached_results:
+    write_network_result(result)
+
+
+# Run all the layers in the same sweep
+results = []
+if len(jobs) > 0:
+    results = run_sweep(jobs, scratch_folder, base_path, MAX_PROCS, JOB_TIMEOUT, KEEP_SCRATCH, write_network_result)
+if USE_CACHE == True:
+    cache_results(results, cache_file, cache, lib_hash, test_hashes)
+results = cached_results + results
+
+raw_f = open(raw_result_file, 'w')
+raw_f.write("=====> RAW RESULT FILE FOR NETWORK {} <=====\n\n".format(DEPLOYER_FILE))
+raw_f.close()
+for layer_idx in range(len(unique_layers)):
+    for layer_pass in passes:
+        write_raw_results(raw_result_file, [result for result in results if result['layer_idx'] == layer_idx and result['pass'] == layer_pass],
+                          get_layer_matmul_names(layer_idx, layer_pass))
+
+
+# Select the setup of each layer and write it back
+setups = [select_layer_setup(results, layer_idx, passes, schedule_lists[layer_idx]) for layer_idx in range(len(unique_layers))]
+lists = build_deployer_lists(graph, layer_map, setups)
+write_network_report(report_file, graph, unique_layers, layer_map, setups, tile_lists, lists)
+print("\nNetwork tuning results written to {}".format(report_file))
+if WRITE_TO_DEPLOYER == True:
+    write_deployer_lists(deployer_file, lists)
+    print("Matmul lists written to {}".format(deployer_file))
@@ -0,0 +1,219 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import re
+
+from tiling_geometry import project_layer_cycles
+
+"""
+Utilities of the network-level AutoTuner: reading the graph of a TrainLib_Deployer network,
+finding its unique layer shapes and writing back the fastest matmuls of each layer.
+"""
+
+# AutoTuner layer type of each Deployer layer which uses matmuls
+DEPLOYER_LAYER_TYPES = {
+    'linear'    : 'LINEAR',
+    'conv2d'    : 'CONV2D',
+    'PW'        : 'PW',
+    'DW'        : 'DW'
+}
+
+# Lists of the NETWORK GRAPH section of the Deployer
+GRAPH_LISTS = ['layer_list', 'in_ch_list', 'out_ch_list', 'hk_list', 'wk_list', 'hin_list', 'win_list',
+               'opt_mm_fw_list', 'opt_mm_wg_list', 'opt_mm_ig_list', 'data_type_list', 'data_layout_list']
+
+# Lists written back to the Deployer
+MATMUL_LISTS = {'FW': 'opt_mm_fw_list', 'WGT_G': 'opt_mm_wg_list', 'IN_G': 'opt_mm_ig_list'}
+
+
+
+# Reads the lists of the NETWORK GRAPH section of TrainLib_Deployer.py
+def read_deployer_graph (deployer_file):
+
+    f = open(deployer_file, 'r')
+    text = f.read()
+    f.close()
+
+    start = text.find('# ------- NETWORK GRAPH --------')
+    end = text.find('# ----- END OF NETWORK GRAPH -----')
+    if start == -1 or end == -1:
+        print("[network_utils.read_deployer_graph]: NETWORK GRAPH section not found in {}!".format(deployer_file))
+        exit()
+    graph = {}
+    exec(text[start:end], {}, graph)
+    for list_name in GRAPH_LISTS:
+        if list_name not in graph:
+            print("[network_utils.read_deployer_graph]: {} not found in {}!".format(list_name, deployer_file))
+            exit()
+
+    return graph
+
+
+
+# Finds the unique shapes of the layers which use matmuls
+# Returns the list of unique layers and, for each layer of the graph, the index of its unique layer (None if not tuned)
+def get_unique_layers (graph):
+
+    unique_layers = []
+    layer_map = []
+    for idx, layer in enumerate(graph['layer_list']):
+        if layer not in DEPLOYER_LAYER_TYPES:
+            layer_map.append(None)
+            continue
+        layer_type = DEPLOYER_LAYER_TYPES[layer]
+        unique_layer = {
+            'layer_type'    : layer_type,
+            'IN_CH'         : graph['in_ch_list'][idx],
+            'INPUT_H'       : graph['hin_list'][idx],
+            'INPUT_W'       : graph['win_list'][idx],
+            'KER_H'         : graph['hk_list'][idx],
+            'KER_W'         : graph['wk_list'][idx],
+            'OUT_CH'        : graph['out_ch_list'][idx],
+            'data_type'     : graph['data_type_list'][idx].lower(),
+            'hwc'           : 1 if graph['data_layout_list'][idx] == 'HWC' else 0
+        }
+        if layer_type == 'DW':
+            unique_layer['OUT_CH'] = unique_layer['IN_CH']
+        if unique_layer in unique_layers:
+            layer_map.append(unique_layers.index(unique_layer))
+        else:
+            layer_map.append(len(unique_layers))
+            unique_layers.append(unique_layer)
+
+    return unique_layers, layer_map
+
+
+
+# Selects the setup of a unique layer from the results of the sweep: the tiling with the lowest cycles of
+# the whole layer over the passes, with the fastest matmul of each pass (None if no tiling works on all passes).
+# The cycles of a tile are projected to the whole layer with the tile schedule of its tiling (schedule_list),
+# since smaller tiles are faster but need more tiles and transfers.
+# Each pass of the setup is (matmul, cycles of a tile, cycles of the layer)
+def select_layer_setup (results, layer_idx, passes, schedule_list):
+
+    best_cycles = {}
+    for result in results:
+        if result['layer_idx'] != layer_idx or result['cycles'] == 0:
+            continue
+        point = (result['tiling_idx'], result['pass'])
+        if point not in best_cycles or result['cycles'] < best_cycles[point][1]:
+            best_cycles[point] = (result['matmul'], result['cycles'])
+
+    tiling_idx_list = sorted(set([point[0] for point in best_cycles]))
+    best_setup = None
+    best_total = 0
+    for tiling_idx in tiling_idx_list:
+        if all([(tiling_idx, layer_pass) in best_cycles for layer_pass in passes]) == False:
+            continue
+        schedule = schedule_list[tiling_idx]
+        layer_cycles = {}
+        for layer_pass in passes:
+            layer_cycles[layer_pass] = project_layer_cycles(schedule, best_cycles[(tiling_idx, layer_pass)][1], layer_pass)
+        total = sum(layer_cycles.values())
+        if best_setup is None or total < best_total:
+            best_total = total
+            best_setup = {'tiling_idx': tiling_idx, 'cycles': total, 'num_tiles': schedule['num_tiles']}
+            for layer_pass in passes:
+                best_setup[layer_pass] = best_cycles[(tiling_idx, layer_pass)] + (layer_cycles[layer_pass],)
+
+    return best_setup
+
+
+
+# Builds the matmul lists of the Deployer with the setup of each layer (layers which are not tuned keep their matmuls)
+def build_deployer_lists (graph, layer_map, setups):
+
+    lists = {}
+    for list_name in MATMUL_LISTS.values():
+        lists[list_name] = list(graph[list_name])
+
+    for idx, layer_idx in enumerate(layer_map):
+        if layer_idx is None or setups[layer_idx] is None:
+            continue
+        setup = setups[layer_idx]
+        for layer_pass, list_name in MATMUL_LISTS.items():
+            if layer_pass in setup:
+                lists[list_name][idx] = setup[layer_pass][0]
+
+    return lists
+
+
+
+# Formats a list as in the NETWORK GRAPH section of the Deployer
+def format_list (list_name, values):
+
+    return "{:<20}= [ {} ]".format(list_name, ", ".join([str(value) for value in values]))
+
+
+
+# Writes the report of the network tuning, with the lists to be used in the Deployer.
+# The tile of each layer is only reported: the Deployer tiles the network on its own (DNN_Tiler)
+def write_network_report (report_file, graph, unique_layers, layer_map, setups, tile_lists, lists):
+
+    f = open(report_file, 'w')
+    f.write("=====> NETWORK TUNING RESULTS <=====\n\n")
+    f.write("------------------ UNIQUE LAYERS ------------------\n")
+    for layer_idx, layer in enumerate(unique_layers):
+        layers = [str(idx) for idx, unique_idx in enumerate(layer_map) if unique_idx == layer_idx]
+        f.write("{}) {} ({}): C_in={}, H={}, W={}, KER={}x{}, C_out={} - layers {}\n".format(layer_idx, layer['layer_type'], layer['data_type'],
+                layer['IN_CH'], layer['INPUT_H'], layer['INPUT_W'], layer['KER_H'], layer['KER_W'], layer['OUT_CH'], ", ".join(layers)))
+        setup = setups[layer_idx]
+        if setup is None:
+            f.write("\tNO VALID SETUP FOUND (matmuls not modified)\n")
+        else:
+            for layer_pass in MATMUL_LISTS:
+                if layer_pass in setup:
+                    f.write("\t{} pass: MATMUL_TYPE={} with {} cycles per tile, {} cycles for the layer\n".format(layer_pass, setup[layer_pass][0],
+                            setup[layer_pass][1], setup[layer_pass][2]))
+            tile = tile_lists[layer_idx][setup['tiling_idx']]
+            f.write("\tTiling solution {} (tile C_in={}, H={}, W={}, C_out={}, {} tiles), total {} cycles for the layer\n".format(setup['tiling_idx'],
+                    tile[0], tile[1], tile[2], tile[3], setup['num_tiles'], setup['cycles']))
+    f.write("---------------------------------------------------\n\n")
+    f.write("--------------- DEPLOYER LISTS --------------------\n")
+    for list_name in MATMUL_LISTS.values():
+        f.write(format_list(list_name, lists[list_name]) + '\n')
+    f.write("---------------------------------------------------\n")
+    f.close()
+
+    return
+
+
+
+# Replaces the matmul lists of the NETWORK GRAPH section of TrainLib_Deployer.py
+def write_deployer_lists (deployer_file, lists):
+
+    f = open(deployer_file, 'r', newline='')
+    text = f.read()
+    f.close()
+
+    for list_name in MATMUL_LISTS.values():
+        # Keep the alignment and the comments of the line
+        pattern = re.compile(r'^({}\s*=\s*)\[[^\]]*\]'.format(list_name), re.MULTILINE)
+        if pattern.search(text) is None:
+            print("[network_utils.write_deployer_lists]: {} not found in {}!".format(list_name, deployer_file))
+            exit()
+        text = pattern.sub(lambda match: match.group(1) + "[ " + ", ".join([str(value) for value in lists[list_name]]) + " ]", text, count=1)
+
+    f = open(deployer_file, 'w', newline='')
+    f.write(text)
+    f.close()
+
+    return
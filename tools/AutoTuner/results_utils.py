@@ -0,0 +1,231 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import os
+import csv
+import json
+
+"""
+Structured results of the AutoTuner: one JSON record per (tiling, pass, cores, matmul) run,
+appended to the results file as soon as the run is finished.
+The loader functions allow to query the best configurations without parsing the text reports.
+"""
+
+# Fields of each record
+RESULT_FIELDS = ['layer_type', 'IN_CH', 'INPUT_H', 'INPUT_W', 'KER_H', 'KER_W', 'OUT_CH', 'data_type',
+                 'tiling_idx', 'pass', 'cores', 'matmul', 'matmul_name',
+                 'C_in', 'H_in', 'W_in', 'C_out', 'H_out', 'W_out', 'memocc_bytes',
+                 'cycles', 'instr', 'ext_ld', 'TCDM_cont', 'ld_stalls', 'imiss',
+                 'errors', 'cached']
+
+# Index of each pass in the list returned by compute_memory_footprint
+PASS_INDEX = {'FW': 0, 'WGT_G': 1, 'IN_G': 2}
+
+
+
+# Creates an empty results file
+def init_results_file (results_file):
+
+    f = open(results_file, 'w')
+    f.close()
+
+    return
+
+
+
+# Builds the record of a run
+# layer is [layer_type, IN_CH, INPUT_H, INPUT_W, KER_H, KER_W, OUT_CH], tile is [C_in, H_in, W_in, C_out, H_out, W_out]
+def make_record (layer, tile, tiling_idx, layer_pass, cores, matmul, matmul_name, memocc_bytes, stats, errors, cached, data_type='fp32'):
+
+    record = {}
+    for idx, field in enumerate(RESULT_FIELDS[0:7]):
+        record[field] = layer[idx]
+    record['data_type'] = data_type
+    record['tiling_idx'] = tiling_idx
+    record['pass'] = layer_pass
+    record['cores'] = cores
+    record['matmul'] = matmul
+    record['matmul_name'] = matmul_name
+    for idx, field in enumerate(['C_in', 'H_in', 'W_in', 'C_out', 'H_out', 'W_out']):
+        record[field] = tile[idx]
+    record['memocc_bytes'] = memocc_bytes
+    for field in ['cycles', 'instr', 'ext_ld', 'TCDM_cont', 'ld_stalls', 'imiss']:
+        record[field] = stats.get(field, None)
+    if errors > 0:
+        record['cycles'] = None
+    record['errors'] = errors
+    record['cached'] = cached
+
+    return record
+
+
+
+# Appends a record to the results file
+def append_result (results_file, record):
+
+    f = open(results_file, 'a')
+    f.write(json.dumps(record) + '\n')
+    f.close()
+
+    return
+
+
+
+# Reads the performances of each matmul from a runs.txt file written by profile_optimized.py
+def read_runs_file (source_file):
+
+    f = open(source_file, 'r')
+    Lines = f.readlines()
+    f.close()
+
+    runs = []
+    for idx, line in enumerate(Lines):
+        if line.startswith('MM ') and line.find('=> cycles:') != -1:
+            stats = {'cycles': int(Lines[idx+1])}
+            counters = Lines[idx+2].strip().split(', ')
+            for counter in counters:
+                name, value = counter.split(' = ')
+                stats[name] = int(value)
+            runs.append([int(line.split()[1]), stats, 0])
+        elif line.startswith('MM ') and (idx+1 < len(Lines)) and Lines[idx+1].find('CONTAINS ERRORS') != -1:
+            runs.append([int(line.split()[1]), {}, 1])
+
+    return runs
+
+
+
+# Gets the name of a matmul (index, if the name is not listed)
+def get_matmul_name (matmul_names, matmul):
+
+    if matmul < len(matmul_names):
+        return matmul_names[matmul]
+    return 'MM {}'.format(matmul)
+
+
+
+# Appends the record of a result of the parallel sweep (see sweep_utils.run_job)
+# tile_list and memocc_list contain the tile sizes and the memory footprints of each tiling solution
+def write_sweep_result (results_file, layer, tile_list, memocc_list, matmul_names, result):
+
+    tiling_idx = result['tiling_idx']
+    record = make_record(layer, tile_list[tiling_idx], tiling_idx, result['pass'], result['cores'], result['matmul'],
+                         get_matmul_name(matmul_names, result['matmul']), memocc_list[tiling_idx][PASS_INDEX[result['pass']]],
+                         result['stats'], result['errors'], result.get('cached', False), result.get('data_type', 'fp32'))
+    append_result(results_file, record)
+
+    return
+
+
+
+# Appends the records of all the matmuls of a runs.txt file (serial execution)
+def write_runs_results (results_file, source_file, layer, tile, tiling_idx, memocc_bytes, layer_pass, cores, matmul_names):
+
+    for matmul, stats, errors in read_runs_file(source_file):
+        record = make_record(layer, tile, tiling_idx, layer_pass, cores, matmul, get_matmul_name(matmul_names, matmul),
+                             memocc_bytes[PASS_INDEX[layer_pass]], stats, errors, False)
+        append_result(results_file, record)
+
+    return
+
+
+
+"""
+LOADER API
+"""
+
+# Loads all the records of a results file
+def load_results (results_file):
+
+    records = []
+    if not os.path.exists(results_file):
+        print("[results_utils.load_results]: File {} not found!".format(results_file))
+        return records
+    f = open(results_file, 'r')
+    for line in f:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # Skip records which are being written
+            pass
+    f.close()
+
+    return records
+
+
+
+# Returns the records matching all the given fields (e.g. query_results(records, layer_type='LINEAR', cores=8))
+def query_results (records, **fields):
+
+    matching = []
+    for record in records:
+        match = True
+        for field, value in fields.items():
+            if record.get(field) != value:
+                match = False
+                break
+        if match == True:
+            matching.append(record)
+
+    return matching
+
+
+
+# Returns the fastest error-free record matching the given fields (None if not found)
+def get_best_result (records, **fields):
+
+    best = None
+    for record in query_results(records, **fields):
+        if record['errors'] == 0 and record['cycles'] is not None:
+            if best is None or record['cycles'] < best['cycles']:
+                best = record
+
+    return best
+
+
+
+# Returns the best matmul of each pass of a layer, as {pass: record}
+def get_best_layer_setup (records, layer_type, IN_CH, INPUT_H, INPUT_W, KER_H, KER_W, OUT_CH, cores, data_type='fp32'):
+
+    layer_records = query_results(records, layer_type=layer_type, IN_CH=IN_CH, INPUT_H=INPUT_H, INPUT_W=INPUT_W,
+                                  KER_H=KER_H, KER_W=KER_W, OUT_CH=OUT_CH, cores=cores, data_type=data_type)
+    best_setup = {}
+    for layer_pass in PASS_INDEX:
+        # 'pass' is a keyword, so it is given through a dictionary
+        best = get_best_result(layer_records, **{'pass': layer_pass})
+        if best is not None:
+            best_setup[layer_pass] = best
+
+    return best_setup
+
+
+
+# Exports the records of a results file to CSV
+def write_csv (results_file, csv_file):
+
+    records = load_results(results_file)
+    f = open(csv_file, 'w', newline='')
+    writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+    f.close()
+
+    return
@@ -0,0 +1,367 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tests', 'common'))
+import log_utils as logs
+from cache_utils import get_cache_key
+from cache_utils import store_record
+from process_utils import run_command, run_pool
+
+"""
+Parallel sweep engine for the AutoTuner: the (tiling, step, matmul, cores) grid is expanded into
+independent jobs, which are built and simulated concurrently in a bounded process pool.
+Each job runs in its own scratch copy of the test folder, so that builds never overlap.
+Processes are handled by tests/common/process_utils.py.
+"""
+
+# Test folder used to profile each layer type
+TEST_FOLDERS = {
+    'DW'        : 'test_conv_pw_dw_fp32',
+    'PW'        : 'test_conv_pw_dw_fp32',
+    'LINEAR'    : 'test_linear_fp32',
+    'CONV2D'    : 'test_conv2d_fp32'
+}
+TEST_FOLDERS_FP16 = {
+    'DW'        : 'test_conv_pw_dw_fp16',
+    'PW'        : 'test_conv_pw_dw_fp16',
+    'LINEAR'    : 'test_linear_fp16',
+    'CONV2D'    : 'test_conv2d_fp16'
+}
+
+# Name of the STEP variable of the Makefile for each pass
+STEP_NAMES = {
+    'DW'        : {'FW': 'DW_FORWARD', 'WGT_G': 'DW_BACKWARD_GRAD', 'IN_G': 'DW_BACKWARD_ERROR'},
+    'PW'        : {'FW': 'PW_FORWARD', 'WGT_G': 'PW_BACKWARD_GRAD', 'IN_G': 'PW_BACKWARD_ERROR'},
+    'LINEAR'    : {'FW': 'FORWARD',    'WGT_G': 'BACKWARD_GRAD',    'IN_G': 'BACKWARD_ERROR'},
+    'CONV2D'    : {'FW': 'FORWARD',    'WGT_G': 'BACKWARD_GRAD',    'IN_G': 'BACKWARD_ERROR'}
+}
+
+# Performance counters kept from the simulation output (keys of the records of log_utils)
+perf_counters = ['cycles', 'instr', 'ext_ld', 'TCDM_cont', 'ld_stalls', 'imiss']
+
+
+
+# Returns the Makefile variables which define the layer sizes of a tile
+def get_layer_args (layer_type, C_in, H_in, W_in, C_out, KER_H, KER_W):
+
+    if layer_type == 'DW':
+        layer_args = "IMAGE_H={} IMAGE_W={} DW_KER_H={} DW_KER_W={} DW_IN_CH={} PW_OUT_CH=1 BYPASS=1".format(H_in, W_in, KER_H, KER_W, C_in)
+    elif layer_type == 'PW':
+        layer_args = "IMAGE_H={} IMAGE_W={} DW_KER_H=1 DW_KER_W=1 DW_IN_CH={} PW_OUT_CH={} BYPASS=1".format(H_in, W_in, C_in, C_out)
+    elif layer_type == 'LINEAR':
+        layer_args = "IN_CH={} OUT_CH={}".format(C_in, C_out)
+    elif layer_type == 'CONV2D':
+        layer_args = "IN_CH={} OUT_CH={} IMAGE_H={} IMAGE_W={} KER_H={} KER_W={}".format(C_in, C_out, H_in, W_in, KER_H, KER_W)
+    else:
+        print("[sweep_utils.get_layer_args]: Invalid layer type {}!".format(layer_type))
+        exit()
+
+    return layer_args
+
+
+
+# Returns the group of matmuls (as listed in mm_manager_list.txt) profiled in a step
+def get_matmul_group (layer_type, layer_pass):
+
+    matmul_group = "STANDARD"
+    if layer_type == 'DW':
+        if layer_pass == 'IN_G':
+            matmul_group = "DW_IN_GRAD"
+        else:
+            matmul_group = "DW"
+
+    return matmul_group
+
+
+
+# Gets the names of the matmul algorithms of a group from the library list file
+def get_matmul_names (filename, matmul_group):
+
+    name_list = []
+    start_listing = False
+
+    if not os.path.exists(filename):
+        return name_list
+
+    f = open(filename, "r")
+    Lines = f.readlines()
+    f.close()
+    matmul_text = "matmul_type =="
+
+    for idx, line in enumerate(Lines):
+        if (line.find(matmul_group+" MATMULS") != -1):
+            start_listing = True
+        if (line.find("END "+matmul_group) != -1):
+            start_listing = False
+        if start_listing == True:
+            if (line.find(matmul_text) != -1):
+                name_list.append(Lines[idx+1].strip())
+
+    return name_list
+
+
+
+# Expands the (tiling, step, matmul, cores) grid into a list of jobs
+# data_type selects the fp32 or fp16 test, prefix is added to the job names (e.g. to tune multiple layers in the same sweep),
+# hwc (if not None) sets the data layout of CONV2D layers
+def expand_jobs (layer_type, C_in, H_in, W_in, C_out, KER_H, KER_W, passes, num_matmuls, cores_list, data_type='fp32', prefix='', hwc=None):
+
+    # Single solutions can be given as scalars
+    if not isinstance(C_in, list):
+        C_in = [C_in]; H_in = [H_in]; W_in = [W_in]; C_out = [C_out]
+
+    jobs = []
+    for layer_pass in passes:
+        for tiling_idx in range(len(C_in)):
+            layer_args = get_layer_args(layer_type, C_in[tiling_idx], H_in[tiling_idx], W_in[tiling_idx], C_out[tiling_idx], KER_H, KER_W)
+            if hwc is not None and layer_type == 'CONV2D':
+                layer_args += " HWC_LAYOUT={}".format(hwc)
+            for num_cores in cores_list:
+                for matmul in range(num_matmuls):
+                    job = {}
+                    job['name'] = "{}TIL{}_PASS{}_CORES{}_MM{}".format(prefix, tiling_idx, layer_pass, num_cores, matmul)
+                    job['tiling_idx'] = tiling_idx
+                    job['pass'] = layer_pass
+                    job['cores'] = num_cores
+                    job['matmul'] = matmul
+                    if data_type == 'fp16':
+                        job['test_folder'] = TEST_FOLDERS_FP16[layer_type]
+                    else:
+                        job['test_folder'] = TEST_FOLDERS[layer_type]
+                    job['data_type'] = data_type
+                    job['make_args'] = "STEP='{}' NUM_CORES={} MATMUL_TYPE={} {}".format(STEP_NAMES[layer_type][layer_pass], num_cores, matmul, layer_args)
+                    job['command'] = "make clean get_golden all run " + job['make_args']
+                    jobs.append(job)
+
+    return jobs
+
+
+
+# Creates the scratch tree of a job (<scratch>/<job>/tests/<test>, with the lib linked in <scratch>/<job>/lib)
+def prepare_scratch (job, scratch_folder, trainlib_path):
+
+    job_folder = os.path.join(scratch_folder, job['name'])
+    if os.path.exists(job_folder):
+        shutil.rmtree(job_folder)
+    os.makedirs(os.path.join(job_folder, 'tests'))
+
+    # Test folder (outputs of previous runs are not needed)
+    test_folder = os.path.join(job_folder, 'tests', job['test_folder'])
+    shutil.copytree(os.path.join(trainlib_path, 'tests', job['test_folder']), test_folder,
+                    ignore=shutil.ignore_patterns('BUILD', '__pycache__', 'log.txt', 'runs.txt', '.gm_cache'))
+    # Files which the tests read from the parent folder
+    for mm_list in ['mm_manager_list.txt', 'mm_manager_list_fp16.txt']:
+        shutil.copy2(os.path.join(trainlib_path, 'tests', mm_list), os.path.join(job_folder, 'tests'))
+    # The library sources and the shared utilities of the tests are only read, so they are shared
+    os.symlink(os.path.join(trainlib_path, 'lib'), os.path.join(job_folder, 'lib'))
+    os.symlink(os.path.join(trainlib_path, 'tests', 'common'), os.path.join(job_folder, 'tests', 'common'))
+
+    return test_folder
+
+
+
+# Finds the performance counters of a run inside its output (first profiled region)
+def extract_stats (stdout):
+
+    records, errors = logs.parse_log(stdout)
+    record = logs.first_record(records)
+    stats = dict([[counter, record[counter]] for counter in perf_counters if counter in record])
+
+    return stats, errors
+
+
+
+# Runs a job in its scratch folder and returns its results (killing the whole process group on timeout)
+def run_job (job, scratch_folder, trainlib_path, timeout, keep_scratch):
+
+    print("Running {}".format(job['name']))
+    result = dict(job)
+    start = time.time()
+
+    try:
+        cwd = prepare_scratch(job, scratch_folder, trainlib_path)
+    except (OSError, shutil.Error) as e:
+        result['returncode'] = 1
+        result['stdout'] = ''
+        result['stderr'] = "Unable to prepare scratch folder: {}\n".format(e)
+        result['stats'] = {}
+        result['cycles'] = 0
+        result['errors'] = 1
+        result['time'] = time.time() - start
+        return result
+
+    # The golden model outputs are cached in a folder shared by all the jobs (see dump_utils.restore_golden_model())
+    env = dict(os.environ, GM_CACHE_DIR=os.path.join(os.path.abspath(trainlib_path), 'tests', '.gm_cache'))
+
+    returncode, stdout, stderr, timed_out = run_command(job['command'], cwd, timeout, env=env, capture=True)
+    timeoutmsg = 'TIMEOUT after {:f}s\n'.format(timeout) if timed_out == True else ''
+
+    result['returncode'] = returncode
+    result['stdout'] = stdout
+    result['stderr'] = timeoutmsg + stderr
+    result['stats'], result['errors'] = extract_stats(result['stdout'])
+    result['cycles'] = result['stats'].get('cycles', 0)
+    if returncode != 0 and result['errors'] == 0:
+        # Failed build or simulation
+        result['errors'] = 1
+    if result['errors'] > 0:
+        result['cycles'] = 0
+    result['time'] = time.time() - start
+
+    if keep_scratch == False:
+        shutil.rmtree(os.path.join(scratch_folder, job['name']), ignore_errors=True)
+
+    print("Finished {} in {:.2f}s ({} cycles{})".format(job['name'], result['time'], result['cycles'], ', '+timeoutmsg.strip() if timeoutmsg != '' else ''))
+
+    return result
+
+
+
+# Runs a job given as (job index, run_job arguments), to keep track of the order of the jobs
+def run_indexed_job (job_args):
+
+    return job_args[0], run_job(*job_args[1:])
+
+
+
+# Runs all the jobs in a bounded process pool, results are returned in the same order of the jobs
+# on_result (if given) is called on each result as soon as its job is finished.
+# The jobs run in a folder of their own under the scratch root, so that concurrent sweeps
+# (e.g. autotuner.py and network_autotuner.py) never remove the jobs of each other
+def run_sweep (jobs, scratch_folder, trainlib_path, max_procs, timeout, keep_scratch=False, on_result=None):
+
+    if not os.path.exists(scratch_folder):
+        os.makedirs(scratch_folder)
+    sweep_folder = tempfile.mkdtemp(prefix='sweep_', dir=scratch_folder)
+
+    print("\nLaunching {} jobs on {} processes (scratch folder: {})..\n".format(len(jobs), max_procs, sweep_folder))
+    job_args = [(job_idx, job, sweep_folder, trainlib_path, timeout, keep_scratch) for job_idx, job in enumerate(jobs)]
+    results = [None] * len(jobs)
+
+    # Each result is stored in the place of its job
+    def store_result (indexed_result):
+        results[indexed_result[0]] = indexed_result[1]
+        if on_result is not None:
+            on_result(indexed_result[1])
+    run_pool(run_indexed_job, job_args, max_procs, store_result, "[sweep_utils.run_sweep]: Terminating sweep")
+
+    if keep_scratch == False:
+        shutil.rmtree(sweep_folder, ignore_errors=True)
+        # The scratch root is left if other sweeps are running
+        try:
+            os.rmdir(scratch_folder)
+        except OSError:
+            pass
+
+    return results
+
+
+
+# Splits the jobs into the ones which are answered by the cache and the ones to be simulated
+def split_cached_jobs (jobs, cache, lib_hash, test_hashes):
+
+    cached_results = []
+    jobs_to_run = []
+    for job in jobs:
+        cache_key = get_cache_key(job['test_folder'], job['data_type'], job['make_args'], lib_hash, test_hashes[job['test_folder']])
+        if cache_key in cache:
+            result = dict(job)
+            result['returncode'] = 0
+            result['stdout'] = ''
+            result['stderr'] = ''
+            result['stats'] = cache[cache_key]
+            result['cycles'] = cache[cache_key]['cycles']
+            result['errors'] = 0
+            result['time'] = 0.0
+            result['cached'] = True
+            cached_results.append(result)
+        else:
+            jobs_to_run.append(job)
+
+    return cached_results, jobs_to_run
+
+
+
+# Stores the results of the simulated jobs into the cache (runs with errors are not stored)
+def cache_results (results, cache_file, cache, lib_hash, test_hashes):
+
+    for result in results:
+        if result['errors'] == 0 and result['cycles'] > 0:
+            cache_key = get_cache_key(result['test_folder'], result['data_type'], result['make_args'], lib_hash, test_hashes[result['test_folder']])
+            store_record(cache_file, cache, cache_key, result['stats'])
+
+    return
+
+
+
+# Writes the outcome of every job into the raw result file
+def write_raw_results (raw_result_file, results, matmul_names):
+
+    f = open(raw_result_file, 'a')
+    for result in results:
+        mm_name = matmul_names[result['matmul']] if result['matmul'] < len(matmul_names) else 'MM {}'.format(result['matmul'])
+        f.write("\nTILING TEST {} ({} pass, {} cores) - {} (MATMUL_TYPE={}), {:.2f}s\n".format(result['tiling_idx'], result['pass'], result['cores'], mm_name, result['matmul'], result['time']))
+        f.write("COMMAND: {}\n".format(result['command']))
+        if result['cycles'] > 0:
+            f.write(" => {} cycles\n".format(result['cycles']))
+        else:
+            f.write("CONTAINS ERRORS!!!\n")
+            if result['stderr'] != '':
+                f.write(result['stderr'][-2000:] + '\n')
+    f.close()
+
+    return
+
+
+
+# Selects the fastest matmul of each (tiling, pass, cores) point of the sweep
+# (the returned lists can be passed to sort_results and write_error_file)
+def collect_best_results (results, layer_pass, matmul_names):
+
+    tiling_idx_list = []; matmul_names_list = []; matmul_cycles_list = []; num_cores_list = []; passes_list = []
+    errors_list = []; broken_mm_list = []
+
+    points = []
+    for result in results:
+        if result['pass'] == layer_pass and (result['tiling_idx'], result['cores']) not in points:
+            points.append((result['tiling_idx'], result['cores']))
+
+    for tiling_idx, num_cores in points:
+        best_mm = ''; best_cycles = 0; broken_mm = []
+        for result in results:
+            if result['pass'] != layer_pass or result['tiling_idx'] != tiling_idx or result['cores'] != num_cores:
+                continue
+            mm_name = matmul_names[result['matmul']] if result['matmul'] < len(matmul_names) else 'MM {}'.format(result['matmul'])
+            if result['cycles'] == 0:
+                broken_mm.append(mm_name)
+            elif best_cycles == 0 or result['cycles'] < best_cycles:
+                best_mm = mm_name
+                best_cycles = result['cycles']
+        tiling_idx_list.append(tiling_idx); matmul_names_list.append(best_mm); matmul_cycles_list.append(best_cycles); num_cores_list.append(num_cores); passes_list.append(layer_pass)
+        errors_list.append(len(broken_mm)); broken_mm_list.append(broken_mm)
+
+    return tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, errors_list, broken_mm_list
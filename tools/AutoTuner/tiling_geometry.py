@@ -0,0 +1,181 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+"""
+Exact geometry of the tiling of a layer: number and shapes of the full and border tiles,
+halo overlap of the convolutions, bytes moved between L2 and L1 by each tile in each pass,
+and projection of the cycles of the whole layer from the cycles of a single (full) tile.
+Convolutions are tiled with stride 1 and no padding: consecutive tiles of the input overlap
+by (kernel - 1) rows/columns, so that each tile computes (tile - kernel + 1) output rows/columns.
+"""
+
+# Passes of each layer
+PASSES = ['FW', 'WGT_G', 'IN_G']
+
+
+
+# Returns the number of output rows/columns which are not covered by full tiles
+# (in_size, tile_size and ker_size can also be numpy arrays)
+def get_output_remainder (in_size, tile_size, ker_size=1):
+
+    return (in_size - ker_size + 1) % (tile_size - ker_size + 1)
+
+
+
+# Splits a dimension into tiles, returning [[input size, output size, number of tiles], ...]
+# with the full tiles first and the border tile (if any) last
+def split_dimension (in_size, tile_size, ker_size=1):
+
+    out_size = in_size - ker_size + 1
+    tile_out = tile_size - ker_size + 1
+    if tile_size >= in_size or tile_out <= 0:
+        return [[in_size, out_size, 1]]
+
+    segments = [[tile_size, tile_out, out_size // tile_out]]
+    remainder = out_size % tile_out
+    if remainder > 0:
+        segments.append([remainder + ker_size - 1, remainder, 1])
+
+    return segments
+
+
+
+# Returns the number of elements of the input, the kernel and the output of a tile
+def get_tile_elements (layer_type, C_in, H_in, W_in, C_out, H_out, W_out, KER_H, KER_W):
+
+    in_elements = C_in * H_in * W_in
+    out_elements = C_out * H_out * W_out
+    if layer_type == 'CONV2D':
+        ker_elements = C_out * C_in * KER_H * KER_W
+    elif layer_type == 'DW':
+        ker_elements = C_in * KER_H * KER_W
+    else:
+        ker_elements = C_in * C_out
+
+    return in_elements, ker_elements, out_elements
+
+
+
+# Returns the number of MACs of a tile (the same for each pass)
+def get_tile_macs (layer_type, C_in, H_in, W_in, C_out, H_out, W_out, KER_H, KER_W):
+
+    if layer_type == 'CONV2D':
+        return C_out * C_in * KER_H * KER_W * H_out * W_out
+    elif layer_type == 'DW':
+        return C_in * KER_H * KER_W * H_out * W_out
+    elif layer_type == 'PW':
+        return C_in * C_out * H_in * W_in
+    else:
+        return C_in * C_out
+
+
+
+# Computes the full tile schedule of a layer of sizes (IN_CH, INPUT_H, INPUT_W, KER_H, KER_W, OUT_CH)
+# split into tiles of (C_in, H_in, W_in, C_out) input sizes.
+# Tensors which are accumulated over multiple tiles (partial sums) are counted twice (read and write).
+def get_tile_schedule (layer_type, IN_CH, INPUT_H, INPUT_W, KER_H, KER_W, OUT_CH, C_in, H_in, W_in, C_out, IN_BYTES=4, KER_BYTES=4, OUT_BYTES=4):
+
+    if layer_type == 'LINEAR':
+        INPUT_H = 1; INPUT_W = 1; H_in = 1; W_in = 1
+    if layer_type == 'LINEAR' or layer_type == 'PW':
+        KER_H = 1; KER_W = 1
+
+    cin_segments = split_dimension(IN_CH, C_in)
+    h_segments = split_dimension(INPUT_H, H_in, KER_H)
+    w_segments = split_dimension(INPUT_W, W_in, KER_W)
+    if layer_type == 'DW':
+        # Output channels follow the input channels
+        cout_segments = [[0, 0, 1]]
+    else:
+        cout_segments = split_dimension(OUT_CH, C_out)
+
+    splits = [sum([s[2] for s in segments]) for segments in [cin_segments, h_segments, w_segments, cout_segments]]
+    num_cin, num_h, num_w, num_cout = splits
+    # Partial sums
+    out_accumulated = (layer_type != 'DW' and num_cin > 1)
+    ker_accumulated = (num_h * num_w > 1)
+    in_accumulated = (layer_type != 'DW' and num_cout > 1) or ((KER_H > 1 and num_h > 1) or (KER_W > 1 and num_w > 1))
+
+    schedule = {'tiles': [], 'num_tiles': 0, 'num_full_tiles': 0, 'num_border_tiles': 0,
+                'halo': [KER_H - 1, KER_W - 1], 'splits': splits, 'bytes': {}}
+    for layer_pass in PASSES:
+        schedule['bytes'][layer_pass] = [0, 0, 0]
+
+    for cin_idx, (c_in, _, cin_count) in enumerate(cin_segments):
+        for h_idx, (h_in, h_out, h_count) in enumerate(h_segments):
+            for w_idx, (w_in, w_out, w_count) in enumerate(w_segments):
+                for cout_idx, (c_out, _, cout_count) in enumerate(cout_segments):
+                    if layer_type == 'DW':
+                        c_out = c_in
+                    count = cin_count * h_count * w_count * cout_count
+                    border = (cin_idx > 0 or h_idx > 0 or w_idx > 0 or cout_idx > 0)
+                    in_el, ker_el, out_el = get_tile_elements(layer_type, c_in, h_in, w_in, c_out, h_out, w_out, KER_H, KER_W)
+                    tile_bytes = {
+                        'FW'    : [in_el * IN_BYTES, ker_el * KER_BYTES, out_el * OUT_BYTES * (2 if out_accumulated else 1)],
+                        'WGT_G' : [in_el * IN_BYTES, ker_el * KER_BYTES * (2 if ker_accumulated else 1), out_el * OUT_BYTES],
+                        'IN_G'  : [in_el * IN_BYTES * (2 if in_accumulated else 1), ker_el * KER_BYTES, out_el * OUT_BYTES]
+                    }
+                    tile = {'shape': [c_in, h_in, w_in, c_out, h_out, w_out], 'count': count, 'border': border,
+                            'macs': get_tile_macs(layer_type, c_in, h_in, w_in, c_out, h_out, w_out, KER_H, KER_W), 'bytes': tile_bytes}
+                    schedule['tiles'].append(tile)
+                    schedule['num_tiles'] += count
+                    if border:
+                        schedule['num_border_tiles'] += count
+                    else:
+                        schedule['num_full_tiles'] += count
+                    for layer_pass in PASSES:
+                        for idx in range(3):
+                            schedule['bytes'][layer_pass][idx] += count * tile_bytes[layer_pass][idx]
+
+    return schedule
+
+
+
+# Projects the cycles of the whole layer from the cycles of its full tile, scaling each tile by its MACs.
+# If dma_bytes_per_cycle is given, the (non-overlapped) transfers of the pass are added.
+def project_layer_cycles (schedule, tile_cycles, layer_pass=None, dma_bytes_per_cycle=0):
+
+    full_macs = schedule['tiles'][0]['macs']
+    if full_macs == 0:
+        return 0
+    cycles = 0
+    for tile in schedule['tiles']:
+        cycles += tile['count'] * tile_cycles * tile['macs'] / full_macs
+    if dma_bytes_per_cycle > 0 and layer_pass is not None:
+        cycles += sum(schedule['bytes'][layer_pass]) / dma_bytes_per_cycle
+
+    return int(round(cycles))
+
+
+
+# Writes the description of a tile schedule (one line per group of tiles, then the bytes of each pass)
+def write_tile_schedule (f, schedule, indent="\t\t\t"):
+
+    for tile in schedule['tiles']:
+        c_in, h_in, w_in, c_out, h_out, w_out = tile['shape']
+        f.write("{}{} x Input: C={}, H={}, W={}, Output: C={}, H={}, W={}{}\n".format(indent, tile['count'], c_in, h_in, w_in, c_out, h_out, w_out,
+                " (border)" if tile['border'] else ""))
+    f.write("{}Halo (H, W): {}, {}\n".format(indent, schedule['halo'][0], schedule['halo'][1]))
+    f.write("{}L2-L1 bytes (input/kernel/output): FW={}, WGT_G={}, IN_G={}\n".format(indent,
+            "/".join([str(b) for b in schedule['bytes']['FW']]), "/".join([str(b) for b in schedule['bytes']['WGT_G']]),
+            "/".join([str(b) for b in schedule['bytes']['IN_G']])))
+
+    return
@@ -20,7 +20,14 @@ Authors: Davide Nadalini
 
 import math
 import os
+import numpy as np
 from ortools.constraint_solver import pywrapcp
+from tiling_geometry import get_output_remainder
+from tiling_geometry import get_tile_schedule
+from tiling_geometry import project_layer_cycles
+
+# Largest divider used by the naive tiler to split each dimension
+TILER_MAX_DIVIDER = 1000
 
 # Frontend function for the computation of the tiles
 def get_tiling (DW,
@@ -96,6 +103,7 @@ def get_tiling (DW,
                                                                             NUM_CORES=NUM_CORES
                                                                             )        
 
+        print_tile_schedules(layer_type, in_channels, y_shape, x_shape, filter_size1, filter_size2, out_channels, N_input, H_input, W_input, N_output)
         return (N_input, N_output, H_input, H_output, W_input, W_output, Obj_values, NUM_FOUND_SOLUTIONS)
 
 
@@ -167,6 +175,7 @@ def get_tiling (DW,
                 Obj_values.append(int(Obj))    
                 
 
+            print_tile_schedules(layer_type, in_channels, y_shape, x_shape, filter_size1, filter_size2, out_channels, N_input, H_input, W_input, N_output)
             return (N_input, N_output, H_input, H_output, W_input, W_output, Obj_values, NUM_FOUND_SOLUTIONS)
 
         # TILER FOR DW CONV
@@ -234,6 +243,7 @@ def get_tiling (DW,
                 Obj_values.append(int(Obj))    
                 
 
+            print_tile_schedules(layer_type, in_channels, y_shape, x_shape, filter_size1, filter_size2, out_channels, N_input, H_input, W_input, N_output)
             return (N_input, N_output, H_input, H_output, W_input, W_output, Obj_values, NUM_FOUND_SOLUTIONS)
 
 
@@ -774,15 +784,7 @@ def steven_the_tiler (DW=0,
                       ):
 
     # Size of the divider array to define the number of tiling elements
-    divider_list = range(1000)
-    # Lists of the subdivided layer sizes
-    C_list = []
-    H_list = []
-    W_list = []
-    Cout_list = []
-    # Tile configuration and size variable
-    tile_list = []
-    max_memocc_list = []
+    dividers = np.arange(1, TILER_MAX_DIVIDER+1)
     # Output variables
     NUM_FOUND_SOLUTIONS = 0
     N_input = []
@@ -796,156 +798,132 @@ def steven_the_tiler (DW=0,
 
     # TIle convolutions
     if layer_type == 'CONV2D' or layer_type == 'DW':
-        for divider in range(len(divider_list)):
-            divider += 1
-            # In Channels
-            if in_channels % divider == 0:
-                C_list.append(int(in_channels/divider))
-            # Height
-            if divider == y_shape:
-                H_list.append(int(divider))
-            elif divider == filter_size1:
-                H_list.append(int(divider))
-            elif divider >= filter_size1 and divider < y_shape:
-                dynasize = divider
-                remainder = 0
-                iterator = 0
-                while dynasize <= y_shape:
-                    dynasize = divider
-                    dynasize += iterator * (divider - filter_size1 + 1)
-                    remainder = y_shape - dynasize
-                    iterator += 1
-                if remainder == 0:
-                    H_list.append(int(divider))
-            # Width
-            if divider == x_shape:
-                W_list.append(int(divider))
-            elif divider == filter_size2:
-                W_list.append(int(divider))
-            elif divider >= filter_size2 and divider <= x_shape:
-                dynasize = divider
-                remainder = 0
-                iterator = 0
-                while dynasize <= x_shape:
-                    dynasize = divider
-                    dynasize += iterator * (divider - filter_size2 + 1)
-                    remainder = x_shape - dynasize
-                    iterator += 1
-                if remainder == 0:
-                    W_list.append(int(divider))
-            # Out Channels
-            if out_channels % divider == 0:
-                Cout_list.append(int(out_channels/divider))
-            pass
+        C_list = in_channels // dividers[in_channels % dividers == 0]
+        # Height and width: the overlapping tiles (stride = tile - filter + 1) must cover the input without remainder
+        H_list = dividers[get_overlap_mask(dividers, y_shape, filter_size1)]
+        W_list = dividers[get_overlap_mask(dividers, x_shape, filter_size2)]
+        Cout_list = out_channels // dividers[out_channels % dividers == 0]
 
     # Tile other layers
     else :
         # Find the list of dividers (without remainder to avoid border tiles)
-        for divider in range(len(divider_list)):
-            divider += 1
-            if in_channels % divider == 0:
-                C_list.append(int(in_channels/divider))
-            if y_shape % divider == 0 and int(y_shape/divider) > filter_size1:
-                H_list.append(int(y_shape/divider))
-            if x_shape % divider == 0 and int(x_shape/divider) > filter_size2:
-                W_list.append(int(x_shape/divider))
-            if out_channels % divider == 0:
-                Cout_list.append(int(out_channels/divider))
+        C_list = in_channels // dividers[in_channels % dividers == 0]
+        H_list = y_shape // dividers[y_shape % dividers == 0]
+        H_list = H_list[H_list > filter_size1]
+        W_list = x_shape // dividers[x_shape % dividers == 0]
+        W_list = W_list[W_list > filter_size2]
+        Cout_list = out_channels // dividers[out_channels % dividers == 0]
 
     # Avoid empty lists 
     if len(C_list) == 0:
-        C_list.append(in_channels) 
+        C_list = np.array([in_channels])
     if len(H_list) == 0:
-        H_list.append(y_shape)
+        H_list = np.array([y_shape])
     if len(W_list) == 0:
-        W_list.append(x_shape)
+        W_list = np.array([x_shape])
     if len(Cout_list) == 0:
-        Cout_list.append(out_channels)
+        Cout_list = np.array([out_channels])
 
     print("Raw lists..\n")
-    print("C_list: " + str(C_list))
-    print("H_list: " + str(H_list))
-    print("W_list: " + str(W_list))
-    print("Cout_list: " + str(Cout_list))
+    print("C_list: " + str(C_list.tolist()))
+    print("H_list: " + str(H_list.tolist()))
+    print("W_list: " + str(W_list.tolist()))
+    print("Cout_list: " + str(Cout_list.tolist()))
 
-    # Build all the possible tile configurations by combining the tile sizes
+    # Build all the possible tile configurations by combining the tile sizes (same order of the nested loops chin > height > width > chout)
     # General case
     if DW == 0:
-        for chin in C_list:
-            for height in H_list:
-                for width in W_list:
-                    for chout in Cout_list:
-                        tile_config = []
-                        tile_config.append(chin)
-                        tile_config.append(height)
-                        tile_config.append(width)
-                        tile_config.append(chout)
-                        # Compute memocc for the new tile
-                        memocc_raw = compute_memory_footprint(layer_type=layer_type, C_in=chin, H_in=height, 
-                                                    W_in=width, C_out=chout, H_out=height-filter_size1+1, W_out=width-filter_size2+1,
-                                                    IN_BYTES=int(BitIn/8), KER_BYTES=int(BitW/8), OUT_BYTES=int(BitOut/8))
-                        if ignore_in_grads:
-                            max_memocc = max(memocc_raw[0], memocc_raw[1])
-                        else:
-                            max_memocc = max(memocc_raw[0], memocc_raw[1], memocc_raw[2])
-                        # Add new configuration to the lists
-                        tile_list.append(tile_config)
-                        max_memocc_list.append(max_memocc)
+        chin, height, width, chout = [grid.ravel() for grid in np.meshgrid(C_list, H_list, W_list, Cout_list, indexing='ij')]
     # Special case for DW conv
     else:
-        for chin in C_list:
-            for height in H_list:
-                for width in W_list:
-                        tile_config = []
-                        # TEMPORARY FIX DUE TO BROKEN PARALLELIZATION IF (ch % NUM_CORES != 0)
-                        if chin % NUM_CORES == 0:
-                        # END OF TEMPORARY FIX
-                            tile_config.append(chin)
-                            tile_config.append(height)
-                            tile_config.append(width)
-                            tile_config.append(chin)
-                            # Compute memocc for the new tile
-                            memocc_raw = compute_memory_footprint(layer_type, chin, height, width, chin, 
-                                                    height-filter_size1+1, width-filter_size2+1, 
-                                                    int(BitIn/8), int(BitW/8), int(BitOut/8))
-                            if ignore_in_grads:
-                                max_memocc = max(memocc_raw[0], memocc_raw[1])
-                            else:
-                                max_memocc = max(memocc_raw[0], memocc_raw[1], memocc_raw[2])
-                            # Add new configuration to the lists
-                            tile_list.append(tile_config)
-                            max_memocc_list.append(max_memocc)
+        chin, height, width = [grid.ravel() for grid in np.meshgrid(C_list, H_list, W_list, indexing='ij')]
+        # TEMPORARY FIX DUE TO BROKEN PARALLELIZATION IF (ch % NUM_CORES != 0)
+        valid = (chin % NUM_CORES == 0)
+        chin = chin[valid]; height = height[valid]; width = width[valid]
+        # END OF TEMPORARY FIX
+        chout = chin
+
+    # Compute memocc for all the tiles at once (the model only uses element-wise arithmetics)
+    memocc_raw = compute_memory_footprint(layer_type=layer_type, C_in=chin, H_in=height, 
+                                        W_in=width, C_out=chout, H_out=height-filter_size1+1, W_out=width-filter_size2+1,
+                                        IN_BYTES=int(BitIn/8), KER_BYTES=int(BitW/8), OUT_BYTES=int(BitOut/8))
+    if ignore_in_grads:
+        max_memocc = np.maximum(memocc_raw[0], memocc_raw[1])
+    else:
+        max_memocc = np.maximum(np.maximum(memocc_raw[0], memocc_raw[1]), memocc_raw[2])
 
     # Report that N solutions were found
-    num_found_solutions_print = len(max_memocc_list)
+    num_found_solutions_print = len(max_memocc)
     print("\nFound {} solutions..\n".format(num_found_solutions_print))
-    
-    # Create dictionary to find best fitting solutions
-    zip_iter = zip(tile_list, max_memocc_list)
-    def take_largest (e):
-        return e[-1]
-    # Sort results by the highest memocc
-    sorted_tiles = sorted(zip_iter, key=take_largest, reverse=True)
-    
-    # Extract the first best results which fit the memory
-    for tile_t, memocc_t in sorted_tiles:
-        if NUM_FOUND_SOLUTIONS < NUM_RESULTS and memocc_t < buffer_size:
-            NUM_FOUND_SOLUTIONS += 1
-            N_input.append(tile_t[0])
-            H_input.append(tile_t[1])
-            W_input.append(tile_t[2])
-            N_output.append(tile_t[3])
-            H_output.append(tile_t[1]-filter_size1+1)
-            W_output.append(tile_t[2]-filter_size2+1)
-            memocc_reread = compute_memory_footprint(layer_type, tile_t[0], tile_t[1], tile_t[2], tile_t[3],
-                                                    tile_t[1]-filter_size1+1, tile_t[2]-filter_size2+1, 4, 4, 4)
-            print("Solution " + str(NUM_FOUND_SOLUTIONS) + " has a memocc of " + str(memocc_reread[0]) + ", " + str(memocc_reread[1]) + ", "
-                                + str(memocc_reread[2]) + " bytes.")
-            Obj_values.append(memocc_t)
+
+    # Extract the first best results which fit the memory (sorted by the highest memocc)
+    best_idx = select_largest(max_memocc, max_memocc < buffer_size, NUM_RESULTS)
+    for idx in best_idx:
+        tile_t = [int(chin[idx]), int(height[idx]), int(width[idx]), int(chout[idx])]
+        memocc_t = int(max_memocc[idx])
+        NUM_FOUND_SOLUTIONS += 1
+        N_input.append(tile_t[0])
+        H_input.append(tile_t[1])
+        W_input.append(tile_t[2])
+        N_output.append(tile_t[3])
+        H_output.append(tile_t[1]-filter_size1+1)
+        W_output.append(tile_t[2]-filter_size2+1)
+        memocc_reread = compute_memory_footprint(layer_type, tile_t[0], tile_t[1], tile_t[2], tile_t[3],
+                                                tile_t[1]-filter_size1+1, tile_t[2]-filter_size2+1, 4, 4, 4)
+        print("Solution " + str(NUM_FOUND_SOLUTIONS) + " has a memocc of " + str(memocc_reread[0]) + ", " + str(memocc_reread[1]) + ", "
+                            + str(memocc_reread[2]) + " bytes.")
+        Obj_values.append(memocc_t)
 
     return (N_input, N_output, H_input, H_output, W_input, W_output, Obj_values, NUM_FOUND_SOLUTIONS)
 
 
+# Selects the tile sizes of a convolution dimension (input size, filter size) among the dividers:
+# the full size, the filter size, or any size whose overlapping tiles (stride = size - filter + 1)
+# cover the input without remainder
+def get_overlap_mask (dividers, in_size, filter_size):
+
+    # Sizes smaller than the filter are excluded (and clipped, to avoid divisions by zero)
+    remainder = get_output_remainder(in_size, np.maximum(dividers, filter_size), filter_size)
+    overlap_mask = (dividers >= filter_size) & (dividers < in_size) & (remainder == 0)
+
+    return (dividers == in_size) | (dividers == filter_size) | overlap_mask
+
+
+
+# Returns the indices of the (up to) num_results largest values among the valid ones, sorted from the largest.
+# Equal values are kept in index order (as a stable sort would do), but only the top values are sorted.
+def select_largest (values, valid, num_results):
+
+    valid_idx = np.flatnonzero(valid)
+    if len(valid_idx) == 0 or num_results <= 0:
+        return valid_idx[0:0]
+    valid_values = values[valid_idx]
+    if len(valid_idx) > num_results:
+        # Value of the num_results-th largest element
+        threshold = np.partition(valid_values, len(valid_values)-num_results)[len(valid_values)-num_results]
+        above = np.flatnonzero(valid_values > threshold)
+        ties = np.flatnonzero(valid_values == threshold)[:num_results-len(above)]
+        selected = np.concatenate((above, ties))
+    else:
+        selected = np.arange(len(valid_idx))
+    # Sort by decreasing value, then by index
+    order = np.lexsort((selected, -valid_values[selected]))
+
+    return valid_idx[selected[order]]
+
+
+
+
+# Reports the number of full and border tiles of each solution of the tiler
+def print_tile_schedules (layer_type, in_channels, y_shape, x_shape, filter_size1, filter_size2, out_channels, N_input, H_input, W_input, N_output):
+
+    for idx in range(len(N_input)):
+        schedule = get_tile_schedule(layer_type, in_channels, y_shape, x_shape, filter_size1, filter_size2, out_channels,
+                                     N_input[idx], H_input[idx], W_input[idx], N_output[idx])
+        print("Solution {}: {} full tiles, {} border tiles (splits C_in/H/W/C_out: {})".format(idx+1, schedule['num_full_tiles'], schedule['num_border_tiles'], schedule['splits']))
+
+    return
+
 
 
 # Finds the best matmul and its performance relatively to an experiment
@@ -1024,7 +1002,8 @@ def write_error_file (err_log_file, layer_step, tiling_idx, errors, broken_mm):
 
 
 # Sort the tiling results in the final log file selecting the best one
-def sort_results (sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list):
+# If the tile schedules are given (see tiling_geometry.py), the cycles of the whole layer are also projected
+def sort_results (sim_result_file, tiling_idx_list, matmul_names_list, matmul_cycles_list, num_cores_list, passes_list, schedule_list=None):
 
     # GENERAL CHOICE
     #if (len(tiling_idx_list) == 1):
@@ -1057,7 +1036,14 @@ def sort_results (sim_result_file, tiling_idx_list, matmul_names_list, matmul_cy
         # Open destination file
         f = open(sim_result_file, 'a')
         for idx in range(len(tiling_idx_list)):
-            f.write("TILING TEST {} ({} pass):\t{} with {} cycles on {} cores\n".format(tiling_idx_list[idx], passes_list[idx], matmul_names_list[idx], matmul_cycles_list[idx], num_cores_list[idx]))
+            f.write("TILING TEST {} ({} pass):\t{} with {} cycles on {} cores".format(tiling_idx_list[idx], passes_list[idx], matmul_names_list[idx], matmul_cycles_list[idx], num_cores_list[idx]))
+            if schedule_list is not None:
+                tile_cycles = matmul_cycles_list[idx]
+                if isinstance(tile_cycles, list):
+                    tile_cycles = tile_cycles[0]
+                schedule = schedule_list[tiling_idx_list[idx]]
+                f.write("\t(projected layer cycles: {} over {} tiles)".format(project_layer_cycles(schedule, tile_cycles, passes_list[idx]), schedule['num_tiles']))
+            f.write("\n")
         f.close()
 
     return
@@ -43,6 +43,8 @@ Available optimizers:
 
 import deployer_utils.DNN_Reader     as reader
 import deployer_utils.DNN_Composer   as composer
+import deployer_utils.DNN_Graph      as dnn_graph
+import deployer_utils.DNN_Precision  as precision
 
 # ---------------------
 # --- USER SETTINGS ---
@@ -55,7 +57,7 @@ proj_folder     = project_path + project_name + '/'
 
 # TRAINING PROPERTIES
 epochs          = 5
-batch_size      = 1                   # BATCHING NOT IMPLEMENTED!!
+batch_size      = 1                   # Samples per training step (batch_size > 1 supported with USE_DMA = 'NO' only)
 learning_rate   = 0.001
 optimizer       = "SGD"                # Name of PyTorch's optimizer
 loss_fn         = "MSELoss"            # Name of PyTorch's loss function
@@ -86,6 +88,9 @@ opt_mm_ig_list      = [ 1, 12, 12, 12, 12, 12, 12, 12, 12, 1, 12, 1, 10 ]
 # Data type list for layer-by-layer deployment (mixed precision)
 data_type_list      = ['FP16', 'FP16', 'FP16', 'FP16', 'FP16', 'FP16', 'FP16', 'FP16', 'FP16', 'FP16', 'FP16', 'FP16', 'FP16']
 #data_type_list     = ['FP32', 'FP32', 'FP32', 'FP32', 'FP32', 'FP32', 'FP32', 'FP32', 'FP32', 'FP32', 'FP32', 'FP32', 'FP32']
+# Automatic mixed precision: replaces data_type_list with the fastest per-layer data types which keep the golden model accurate
+AUTO_MIXED_PRECISION = False
+MIXED_PRECISION_TOLERANCE = 1e-2        # Maximum relative error of the output after training, with respect to FP32
 # Data layout list (CHW or HWC) 
 data_layout_list    = ['CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW']   # TO DO
 # ----- END OF NETWORK GRAPH -----
@@ -97,13 +102,20 @@ data_layout_list    = ['CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', 'CHW', '
 NUM_CORES       = 8
 L1_SIZE_BYTES   = 60*(2**10)
 USE_DMA = 'DB'                          # choose whether to load all structures in L1 ('NO') or in L2 and use Single Buffer mode ('SB') or Double Buffer mode ('DB') 
+USE_L1_PLANNER = True                   # If True (USE_DMA = 'NO'), activations, gradients and buffers share a single L1 arena, based on their lifetime
+USE_TILING = True                       # If True (USE_DMA = 'SB'), layers which do not fit L1 are split into tiles of output channels and rows
+FUSE_LAYERS = True                      # If True (USE_DMA = 'NO'), ReLUs are computed in the same parallel region of the previous (forward) or next (backward) layer
 # BACKWARD SETTINGS
 SEPARATE_BACKWARD_STEPS = False          # If True, writes separate weight and input gradient in backward step
 # PROFILING OPTIONS
 PROFILE_SINGLE_LAYERS = False           # If True, profiles forward and backward layer-by-layer
+# GOLDEN MODEL DATA
+DATA_OUTPUT = 'TEXT'                    # Write golden model data as C initializers in io_data.h ('TEXT') or as raw binary in io_data.bin ('BIN')
 # OTHER PROPERTIES
-# Select if to read the network from an external source
-READ_MODEL_ARCH = False                # NOT IMPLEMENTED!!
+# Select if to read the network from an external source (replaces the NETWORK GRAPH lists)
+READ_MODEL_ARCH = False
+MODEL_SOURCE    = './model.onnx'        # ONNX file ('model.onnx') or PyTorch nn.Module built without arguments ('model.py:ClassName')
+MODEL_INPUT_SHAPE = [3, 32, 32]         # Input size without batch ([C, H, W], or [F] for fully-connected networks)
 
 # ---------------------------
 # --- END OF USER SETTING ---
@@ -118,34 +130,51 @@ BACKEND
 
 # Call the DNN Reader and then the DNN Composer 
 if READ_MODEL_ARCH :
-    pass
 
+    # Read the graph of the model (all layers take the data type of the first layer of data_type_list)
+    model_lists = reader.DNN_Reader(MODEL_SOURCE, MODEL_INPUT_SHAPE, data_type_list[0])
+    layer_list          = model_lists['layer_list']
+    sumnode_connections = model_lists['sumnode_connections']
+    in_ch_list          = model_lists['in_ch_list']
+    out_ch_list         = model_lists['out_ch_list']
+    hk_list             = model_lists['hk_list']
+    wk_list             = model_lists['wk_list']
+    hin_list            = model_lists['hin_list']
+    win_list            = model_lists['win_list']
+    h_str_list          = model_lists['h_str_list']
+    w_str_list          = model_lists['w_str_list']
+    h_pad_list          = model_lists['h_pad_list']
+    w_pad_list          = model_lists['w_pad_list']
+    opt_mm_fw_list      = model_lists['opt_mm_fw_list']
+    opt_mm_wg_list      = model_lists['opt_mm_wg_list']
+    opt_mm_ig_list      = model_lists['opt_mm_ig_list']
+    data_type_list      = model_lists['data_type_list']
+    data_layout_list    = model_lists['data_layout_list']
+
+
+print("Generating project at location "+proj_folder)
+
+# Build the layer graph of the network
+graph = dnn_graph.BuildGraph(layer_list, sumnode_connections, in_ch_list, out_ch_list, hk_list, wk_list,
+                            hin_list, win_list, h_str_list, w_str_list, h_pad_list, w_pad_list,
+                            opt_mm_fw_list, opt_mm_wg_list, opt_mm_ig_list, data_type_list, data_layout_list, batch_size)
 
-else:
-
-    print("Generating project at location "+proj_folder)
-
-    # Check if Residual Connections are valid
-    
-    sumnode_connections = composer.AdjustResConnList(sumnode_connections)
-
-    composer.CheckResConn(layer_list, in_ch_list, out_ch_list, hin_list, win_list, sumnode_connections) 
+# Check if Residual Connections are valid
+composer.CheckResConn(graph)
 
-    # Check if the network training fits L1
-    memocc = composer.DNN_Size_Checker(layer_list, in_ch_list, out_ch_list, hk_list, wk_list, hin_list, win_list, 
-                                h_str_list, w_str_list, h_pad_list, w_pad_list,
-                                data_type_list, L1_SIZE_BYTES, USE_DMA)
+# Plan the data type of each layer
+if AUTO_MIXED_PRECISION:
+    data_type_list = precision.PlanPrecision(graph, MIXED_PRECISION_TOLERANCE, epochs, learning_rate, loss_fn)
+    precision.ApplyPrecision(graph, data_type_list) 
 
-    print("DNN memory occupation: {} bytes of {} available L1 bytes ({}%).".format(memocc, L1_SIZE_BYTES, (memocc/L1_SIZE_BYTES)*100))
+# Check if the network training fits L1
+memocc = composer.DNN_Size_Checker(graph, L1_SIZE_BYTES, USE_DMA, USE_L1_PLANNER, USE_TILING, FUSE_LAYERS)
 
-    # Call DNN Composer on the user-provided graph
-    composer.DNN_Composer(proj_folder, project_name, 
-                            layer_list, in_ch_list, out_ch_list, hk_list, wk_list, 
-                            hin_list, win_list, h_str_list, w_str_list, h_pad_list, w_pad_list,
-                            epochs, batch_size, learning_rate, optimizer, loss_fn,
-                            NUM_CORES, data_type_list, opt_mm_fw_list, opt_mm_wg_list, opt_mm_ig_list, sumnode_connections, 
-                            USE_DMA, PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS)
+print("DNN memory occupation: {} bytes of {} available L1 bytes ({}%).".format(memocc, L1_SIZE_BYTES, (memocc/L1_SIZE_BYTES)*100))
 
-    print("PULP project generation successful!")
+# Call DNN Composer on the user-provided graph
+composer.DNN_Composer(proj_folder, project_name, graph,
+                        epochs, batch_size, learning_rate, optimizer, loss_fn,
+                        NUM_CORES, USE_DMA, USE_L1_PLANNER, PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS, DATA_OUTPUT)
 
-    pass
+print("PULP project generation successful!")
@@ -0,0 +1,122 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini
+'''
+
+import deployer_utils.net_templates as ntemp
+
+"""
+Mini-batch training (batch_size > 1, USE_DMA = 'NO'). The activations and
+their gradients of net.c hold the samples of the batch one after the other
+(BATCH_SIZE x C x H x W), while the blobs describe a single sample. Each layer
+is computed by a loop over the batch which moves the blobs of the layer to the
+next sample (shift_blob()) and back to the first one at the end. The weight
+gradient of the first sample is written in the gradient of the layer, the ones
+of the other samples are computed in batch_grad_buffer and summed to it, so
+that the weights are updated once per batch. The loss, the casts and the sums
+of the residual connections work on the whole batch.
+"""
+
+# Layers which compute a weight gradient
+BATCH_WGT_LAYERS = ['linear', 'conv2d', 'PW', 'DW', 'InstNorm']
+
+
+
+# Returns True if the network is trained on more than one sample per step
+def IsBatched(graph):
+    return graph.batch_size > 1
+
+
+# Prefix of the C sizes of the tensors which hold the whole batch
+def BatchPrefix(graph):
+    if IsBatched(graph):
+        return "BATCH_SIZE*"
+    return ""
+
+
+# Number of elements of the weight gradient of a layer (dim of its weight blob)
+def GradElements(graph, layer):
+    l = graph[layer]
+    if l.type not in BATCH_WGT_LAYERS:
+        return 0
+    elif l.type == 'DW':
+        return l.in_ch * l.hk * l.wk
+    return l.wgt_size()
+
+
+# Size (bytes) of the buffer of the weight gradients of the samples after the first one
+def BatchGradBytes(graph):
+    if not IsBatched(graph):
+        return 0
+    return max([GradElements(graph, layer) * graph[layer].byte_size for layer in range(len(graph))] + [0])
+
+
+# Blob read by a Sumnode as skip connection
+def SkipBlob(graph, sumnode):
+    skip = graph.sumnode_connections[sumnode]
+    if graph[skip].type == 'Skipnode':
+        return "layer{}_in".format(skip)
+    return "layer{}_out".format(skip)
+
+
+# Blobs used by the computation of a layer in a step ('FW' or 'BW'), to be moved over the batch
+def LayerBlobs(graph, layer, step, fusion):
+    l = graph[layer]
+    if l.type == 'Skipnode':
+        if step == 'FW':
+            return []
+        # The backward of the Skipnode uses the blobs of its Sumnode
+        sumnode = graph.sumnode_connections[layer]
+        return ["layer{}_in".format(sumnode), "layer{}_out".format(sumnode), SkipBlob(graph, sumnode)]
+    blobs = ["layer{}_in".format(layer), "layer{}_out".format(layer)]
+    if l.type == 'Sumnode':
+        blobs.append(SkipBlob(graph, layer))
+    if layer in fusion[step]:
+        relu = fusion[step][layer]
+        blobs += ["layer{}_in".format(relu), "layer{}_out".format(relu)]
+    return blobs
+
+
+# Wraps the computation of a layer (template) into a loop over the batch
+def BatchLoop(graph, layer, step, template, fusion):
+
+    blobs = LayerBlobs(graph, layer, step, fusion)
+    if len(blobs) == 0:
+        return template
+    data_type = graph[layer].data_type
+    accumulate = step == 'BW' and GradElements(graph, layer) > 0
+
+    body = template
+    if accumulate:
+        body = ntemp.batch_grad_select_template(layer, data_type) + body + ntemp.batch_grad_sum_template(layer, data_type)
+    body += ntemp.shift_blobs_template(blobs, "1", data_type)
+
+    loop  = "  for (int b=0; b<BATCH_SIZE; b++) {\n"
+    loop += "".join(["  "+line+"\n" for line in body.splitlines()])
+    loop += "  }\n"
+    loop += ntemp.shift_blobs_template(blobs, "-BATCH_SIZE", data_type)
+    if accumulate:
+        loop += "  layer{}_wgt.diff = l{}_ker_diff;\n".format(layer, layer)
+
+    return loop
+
+
+# Prints the batch configuration
+def PrintBatch(graph):
+    print("Training on batches of {} samples: weight gradients accumulated in a buffer of {} bytes, weights updated once per batch".format(
+          graph.batch_size, BatchGradBytes(graph)))
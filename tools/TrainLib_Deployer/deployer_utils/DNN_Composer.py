@@ -21,6 +21,11 @@ Authors: Davide Nadalini
 import deployer_utils.deployment_utils_single_buffer as utilsSB
 import deployer_utils.deployment_utils_double_buffer as utilsDB
 import deployer_utils.deployment_utils as utils
+import deployer_utils.DNN_Planner as planner
+import deployer_utils.DNN_Tiler as tiler
+import deployer_utils.DNN_Fusion as fusion_pass
+import deployer_utils.DNN_Batch as batching
+import deployer_utils.DNN_Files as files
 
 """
 The DNN Size Checker checks if the DNN fits the available PULP
@@ -30,28 +35,37 @@ memory
 
 
 MAX_LAYER_DIM = 0
+TILES = {}
+FUSION = fusion_pass.NoFusion()
 
-def DNN_Size_Checker (layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_str_list, w_str_list, h_pad_list, w_pad_list,
-                        data_type_l, avail_mem_bytes, USE_DMA):
+def DNN_Size_Checker (graph, avail_mem_bytes, USE_DMA, USE_L1_PLANNER, USE_TILING, FUSE_LAYERS):
 
     total_memory_occupation_bytes = 0
     l2_occupation = 0
     global MAX_LAYER_DIM 
+    global TILES
+    global FUSION
     l1_structs_mem = 0
+    data_type_l = graph.data_type_l
+
+    # The batch is supported when training fully in L1
+    if batching.IsBatched(graph):
+        if USE_DMA != 'NO':
+            print("[DNN_Size_Checker]: Batch sizes greater than 1 are only supported when training fully in L1 (USE_DMA = 'NO')!")
+            exit()
+        batching.PrintBatch(graph)
+
     # Compute activation and weight memory occupation
     
-    for layer in range(len(layers_l)):
-        is_last_layer = False
-        if layer == len(layers_l) - 1:
-            is_last_layer = True
+    for layer in range(len(graph)):
         if USE_DMA == 'NO':
-            total_memory_occupation_bytes += utils.compute_wgt_act_memocc_bytes(layer, layers_l[layer], in_ch_l[layer], out_ch_l[layer], hk_l[layer], wk_l[layer], hin_l[layer], win_l[layer], h_pad_list[layer], w_pad_list[layer], h_str_list[layer], w_str_list[layer], data_type_l[layer], is_last_layer)
+            total_memory_occupation_bytes += utils.compute_wgt_act_memocc_bytes(graph, layer)
         elif USE_DMA in ['SB', 'DB']:
-            l2_occupation +=  utils.compute_wgt_act_memocc_bytes(layer, layers_l[layer], in_ch_l[layer], out_ch_l[layer], hk_l[layer], wk_l[layer], hin_l[layer], win_l[layer], h_pad_list[layer], w_pad_list[layer], h_str_list[layer], w_str_list[layer], data_type_l[layer], is_last_layer)
+            l2_occupation +=  utils.compute_wgt_act_memocc_bytes(graph, layer)
     # Compute im2col memory occupation
     mem_im2col = 0
     idx_im2col = 0
-    mem_im2col, idx_im2col = utils.compute_im2col_memocc_bytes(layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_pad_list, w_pad_list, h_str_list, w_str_list, data_type_l)
+    mem_im2col, idx_im2col = graph.cached('im2col_bytes', lambda: utils.compute_im2col_memocc_bytes(graph))
     total_memory_occupation_bytes += mem_im2col
 
     if mem_im2col > 0:
@@ -60,7 +74,7 @@ def DNN_Size_Checker (layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_s
     # Compute transpose and blocktranspose memory occupation 
     mem_blocktransp = 0
     idx_blocktransp = 0
-    mem_blocktransp, idx_blocktransp = utils.compute_bt_memocc_bytes(layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, data_type_l)
+    mem_blocktransp, idx_blocktransp = graph.cached('bt_bytes', lambda: utils.compute_bt_memocc_bytes(graph))
     total_memory_occupation_bytes += mem_blocktransp
 
     if mem_blocktransp > 0:
@@ -68,18 +82,34 @@ def DNN_Size_Checker (layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_s
 
     # Compute additional mixed precision buffer memory occupation
     mem_cast_buffer = 0
-    mem_cast_buffer, idx_max_act, max_act_inout = utils.compute_cast_buffer_memocc_bytes(layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_pad_list, w_pad_list, h_str_list, w_str_list, data_type_l)
+    mem_cast_buffer, idx_max_act, max_act_inout = graph.cached('cast_buffer_bytes', lambda: utils.compute_cast_buffer_memocc_bytes(graph))
     total_memory_occupation_bytes += mem_cast_buffer
 
     #if mem_cast_buffer > 0:
     print("Additional {} bytes allocated for mixed precision management (size @layer {}, {})".format(mem_cast_buffer, idx_max_act, max_act_inout))
 
+    # Weight gradients of the samples of the batch
+    total_memory_occupation_bytes += batching.BatchGradBytes(graph)
+
+    # Fuse the ReLUs with the neighbouring layers
+    FUSION = fusion_pass.NoFusion()
+    if FUSE_LAYERS == True:
+        if USE_DMA == 'NO':
+            FUSION = fusion_pass.PlanFusion(graph)
+            fusion_pass.PrintFusion(graph, FUSION)
+        else:
+            print("[DNN_Size_Checker]: Layer fusion is only supported when training fully in L1 (USE_DMA = 'NO'), layers are not fused!")
+
+    # Activations, gradients and buffers placed in the L1 arena by the memory planner
+    if USE_DMA == 'NO' and USE_L1_PLANNER == True:
+        l1_plan = graph.cached('l1_plan', lambda: planner.PlanL1Memory(graph, FUSION))
+        planner.PrintL1Plan(l1_plan)
+        print("L1 memory planner: {} bytes instead of {} bytes with static buffers".format(l1_plan['wgt_bytes'] + l1_plan['arena_bytes'], total_memory_occupation_bytes))
+        total_memory_occupation_bytes = l1_plan['wgt_bytes'] + l1_plan['arena_bytes']
+
     # Buffer memory allocation for Single Buffer mode
     l1_buff_size = 0
     if USE_DMA == 'SB':
-        MAX_LAYER_DIM = utilsSB.max_layer_dim(layers_l, in_ch_l, hin_l, win_l, out_ch_l, hk_l, wk_l, data_type_l[0], h_str_list, w_str_list, h_pad_list, w_pad_list)
-        l1_buff_size = MAX_LAYER_DIM
-        
 
         l1_structs_mem = 0
         l1_structs_mem += 6*4 # 6 pointers IN_DATA, IN_DIFF ...
@@ -96,12 +126,46 @@ def DNN_Size_Checker (layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_s
         if data_type_l[0] == 'FP32':
             l1_structs_mem += 2 # loss in fp32
         l1_structs_mem += 2*16 # 2 vect_sum_args
+
+        # Split the layers which do not fit L1 into tiles
+        TILES = {}
+        if USE_TILING == True:
+            budget_bytes = avail_mem_bytes - l1_structs_mem - mem_cast_buffer
+            for iteration in range(tiler.MAX_TILING_ITERATIONS):
+                TILES, untiled = tiler.PlanTiles(graph, budget_bytes)
+                tiled_im2col, idx_im2col, tiled_blocktransp, idx_blocktransp = tiler.BufferBytes(graph, TILES)
+                tiled_occupation = tiler.BuffBytes(graph, TILES) + tiled_im2col + tiled_blocktransp + l1_structs_mem + mem_cast_buffer
+                # The biggest buffers may come from different layers: reduce the budget of the tiles until everything fits
+                # (a smaller budget cannot help if a layer already does not fit it)
+                if tiled_occupation <= avail_mem_bytes or len(untiled) > 0:
+                    break
+                budget_bytes -= tiled_occupation - avail_mem_bytes
+                if budget_bytes <= 0:
+                    break
+            for message in untiled:
+                print("[DNN_Size_Checker]: " + message)
+            if tiled_occupation > avail_mem_bytes:
+                print("[DNN_Size_Checker]: Unable to tile the DNN into {} bytes of L1 (expected occupation with tiles: {} bytes)!".format(avail_mem_bytes, tiled_occupation))
+                exit()
+            if len(TILES) > 0:
+                tiler.PrintTiles(graph, TILES)
+                print("Max IM2COL size of {} bytes @layer {}, max transposition / block transposition buffer size of {} @layer {} (with tiles)".format(tiled_im2col, idx_im2col, tiled_blocktransp, idx_blocktransp))
+                total_memory_occupation_bytes += tiled_im2col + tiled_blocktransp - mem_im2col - mem_blocktransp
+                l1_structs_mem += 4 # ACC pointer
+
+        if len(TILES) > 0:
+            MAX_LAYER_DIM = utilsSB.max_layer_dim(graph, TILES)
+        else:
+            MAX_LAYER_DIM = graph.cached('max_layer_dim_SB', lambda: utilsSB.max_layer_dim(graph))
+        l1_buff_size = MAX_LAYER_DIM
         print(f"Size of structures in L1 (Single Buffer Mode): {l1_structs_mem} bytes")
         total_memory_occupation_bytes += l1_buff_size + l1_structs_mem
 
     elif USE_DMA == 'DB':
-        
-        MAX_LAYER_DIM = utilsDB.max_layer_dim(layers_l, in_ch_l, hin_l, win_l, out_ch_l, hk_l, wk_l, data_type_l[0], h_str_list, w_str_list, h_pad_list, w_pad_list)
+
+        if USE_TILING == True:
+            print("[DNN_Size_Checker]: Layer tiling is only supported in Single Buffer mode (USE_DMA = 'SB'), layers are not tiled!")
+        MAX_LAYER_DIM = graph.cached('max_layer_dim_DB', lambda: utilsDB.max_layer_dim(graph))
         l1_buff_size = MAX_LAYER_DIM
         
 
@@ -113,7 +177,8 @@ def DNN_Size_Checker (layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_s
         l1_structs_mem += 36 # DW_args
         l1_structs_mem += 8 # act_args
         l1_structs_mem += 16 # Skipconn_args
-        l1_structs_mem += 3*4 # 3 pi_cl_dma_cmd_t cmd_load, cmd_store and cmd_struct
+        l1_structs_mem += 6*4 # 6 pointers cmd_load, cmd_store, cmd_struct, cmd_prefetch, cmd_prefetch_wgt and cmd_wgt
+        l1_structs_mem += 6*8 # 6 pi_cl_dma_cmd_t DMA command slots
         l1_structs_mem += 2 # loss in fp16
         if data_type_l[0] == 'FP32':
             l1_structs_mem += 2 # loss in fp32
@@ -137,19 +202,13 @@ def DNN_Size_Checker (layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_s
 
 
 
-def AdjustResConnList(sumnode_connections):
-    res = []
-    for layer in range(len(sumnode_connections)):
-        if sumnode_connections[layer] == 0:
-            res.append(-1)
-        else:
-            my_value = sumnode_connections[layer]
-            for scanned_layer in range(len(sumnode_connections)):
-                if sumnode_connections[scanned_layer] == my_value and layer != scanned_layer:
-                    res.append(scanned_layer)
-    return res
-
-def CheckResConn(layer_list, in_ch_list, out_ch_list, hin_list, win_list, sumnode_connections):
+def CheckResConn(graph):
+    layer_list = graph.layers_l
+    in_ch_list = graph.in_ch_l
+    out_ch_list = graph.out_ch_l
+    hin_list = graph.hin_l
+    win_list = graph.win_l
+    sumnode_connections = graph.sumnode_connections
     # Check same number of Skipnodes and Sumnodes
     num_skip = 0
     num_sum = 0
@@ -180,56 +239,43 @@ def CheckResConn(layer_list, in_ch_list, out_ch_list, hin_list, win_list, sumnod
 
         
 """
-The DNN Composer takes the lists representing the DNN graph and 
+The DNN Composer takes the graph representing the DNN (see DNN_Graph) and 
 generates the code for PULP
 """
-def DNN_Composer (proj_folder_path, project_name,
-                  layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                  h_str_l, w_str_l, h_pad_l, w_pad_l,
+def DNN_Composer (proj_folder_path, project_name, graph,
                   epochs, batch_size, learning_rate, optimizer, loss_fn,
-                  NUM_CORES, data_type_l, opt_mm_fw_list, opt_mm_wg_list, opt_mm_ig_list, sumnode_connections, 
-                  USE_DMA, PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS):
+                  NUM_CORES, USE_DMA, USE_L1_PLANNER, PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS, DATA_OUTPUT):
 
-    # Initialize project (copy the prefab files and create folder)
+    # Initialize project (copy the prefab files and create folder), only changed files are written
+    files.ResetGenerated()
     utils.InitProject(proj_folder_path)
 
     # Generate Makefile
-    utils.GenerateMakefile(proj_folder_path, project_name, layers_l, NUM_CORES, data_type_l, opt_mm_fw_list, opt_mm_wg_list, opt_mm_ig_list)
+    utils.GenerateMakefile(proj_folder_path, project_name, graph, NUM_CORES, DATA_OUTPUT)
 
     # Generate Golden Model
-    utils.GenerateGM(proj_folder_path, project_name,
-                        layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                        h_str_l, w_str_l, h_pad_l, w_pad_l,
+    utils.GenerateGM(proj_folder_path, project_name, graph,
                         epochs, batch_size, learning_rate, optimizer, loss_fn,
-                        data_type_l, sumnode_connections, USE_DMA)
+                        USE_DMA, DATA_OUTPUT)
 
 
     global MAX_LAYER_DIM
     # Generate the net.c and net.h files to run the training in L1
     if USE_DMA == 'NO':
-        utils.GenerateNet(proj_folder_path, project_name,
-                    layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                    h_str_l, w_str_l, h_pad_l, w_pad_l,
+        utils.GenerateNet(proj_folder_path, project_name, graph,
                     epochs, batch_size, learning_rate, optimizer, loss_fn,
-                    data_type_l, sumnode_connections, 
-                    PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS)
+                    PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS, USE_L1_PLANNER, FUSION)
         
     elif USE_DMA == 'SB':
-        utilsSB.GenerateNet(proj_folder_path, project_name,
-                    layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                    h_str_l, w_str_l, h_pad_l, w_pad_l,
+        utilsSB.GenerateNet(proj_folder_path, project_name, graph,
                     epochs, batch_size, learning_rate, optimizer, loss_fn,
-                    data_type_l, sumnode_connections, MAX_LAYER_DIM,
-                    PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS)
+                    MAX_LAYER_DIM, TILES, PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS)
         
     elif USE_DMA == 'DB':
-        utilsDB.GenerateNet(proj_folder_path, project_name,
-                    layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                    h_str_l, w_str_l, h_pad_l, w_pad_l,
+        utilsDB.GenerateNet(proj_folder_path, project_name, graph,
                     epochs, batch_size, learning_rate, optimizer, loss_fn,
-                    data_type_l, sumnode_connections, MAX_LAYER_DIM,
-                    PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS)
+                    MAX_LAYER_DIM, PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS)
     else:
         print(f"[DNN_Composer]: Not supported argument for USE_DMA: '{USE_DMA}' given")
 
-    return
\ No newline at end of file
+    files.PrintGenerated()
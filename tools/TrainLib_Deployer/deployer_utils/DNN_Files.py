@@ -0,0 +1,108 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini
+'''
+
+import os
+import io
+import shutil
+import hashlib
+
+"""
+The files of the project are rendered in memory and written to disk only
+if their content changed, so that generating a project again after a small
+change (e.g. of a hyperparameter or of a matmul) leaves the other files, and
+the objects which are built from them, untouched. The prefab files and the
+library are copied in the same way.
+"""
+
+# Files written and left untouched by the generation of the project
+GENERATED = {'written': [], 'unchanged': []}
+
+
+
+# Hash of the content of a file (None if the file does not exist)
+def FileHash(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# Writes the content (bytes) into path if it differs from the one on disk, returns True if written
+def WriteIfChanged(path, content):
+    if FileHash(path) == hashlib.sha256(content).hexdigest():
+        GENERATED['unchanged'].append(path)
+        return False
+    with open(path, 'wb') as f:
+        f.write(content)
+    GENERATED['written'].append(path)
+    return True
+
+
+# File of the project rendered in memory, written by close() only if its content changed
+class GeneratedFile(io.StringIO):
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def close(self):
+        if not self.closed:
+            WriteIfChanged(self.path, self.getvalue().encode())
+        super().close()
+
+
+# Opens a file of the project for writing (use instead of open(path, 'w'))
+def OpenGenerated(path):
+    return GeneratedFile(path)
+
+
+# Copies a file if its content differs from the one of the destination
+def CopyIfChanged(src, dst):
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if FileHash(src) == FileHash(dst):
+        GENERATED['unchanged'].append(dst)
+        return False
+    shutil.copy2(src, dst)
+    GENERATED['written'].append(dst)
+    return True
+
+
+# Copies the files of a folder (recursively) which differ from the ones of the destination
+def CopyTreeIfChanged(src, dst):
+    for root, dirs, names in os.walk(src):
+        dst_root = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(dst_root, exist_ok=True)
+        for name in names:
+            CopyIfChanged(os.path.join(root, name), os.path.join(dst_root, name))
+
+
+# Clears the list of the generated files
+def ResetGenerated():
+    GENERATED['written'] = []
+    GENERATED['unchanged'] = []
+
+
+# Prints the files which have been written
+def PrintGenerated():
+    print("Project files: {} written, {} unchanged".format(len(GENERATED['written']), len(GENERATED['unchanged'])))
+    if len(GENERATED['written']) <= 10:
+        for path in GENERATED['written']:
+            print("  written: {}".format(path))
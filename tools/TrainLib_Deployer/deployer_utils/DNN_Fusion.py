@@ -0,0 +1,81 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini
+'''
+
+from deployer_utils.DNN_Graph import IsSkipDerivation
+
+"""
+The fusion pass finds the ReLUs which can be computed in the same parallel
+region (pi_cl_team_fork) of a neighbouring layer, to save the fork, the
+barrier and a loop over the activations of the ReLU:
+- forward: a conv2d, PW, DW, linear or Sumnode followed by a ReLU writes its
+  output and applies the ReLU before leaving the parallel region
+  (e.g. pulp_conv2d_fp32_fw_relu_cl(), pulp_residualconn_fp32_fw_relu());
+- backward: the input gradient of a conv2d, PW, DW or linear which follows a
+  ReLU is computed together with the backward of the ReLU
+  (e.g. pulp_conv2d_fp32_bw_input_grads_relu_cl()).
+The ReLUs which belong to a residual connection are not fused in the backward
+step, since their gradient is summed to the one of the skip connection.
+"""
+
+# Layers which can be fused with the forward of the ReLU which follows them
+FW_FUSED_LAYERS = ['conv2d', 'PW', 'DW', 'linear', 'Sumnode']
+# Layers which can be fused with the backward of the ReLU which precedes them
+BW_FUSED_LAYERS = ['conv2d', 'PW', 'DW', 'linear']
+
+
+
+# Returns an empty fusion plan
+def NoFusion():
+    return {'FW': {}, 'BW': {}}
+
+
+# Finds the layers to be fused: returns {'FW': {layer: relu}, 'BW': {layer: relu}}, where the
+# forward (backward) of relu is computed in the forward (input gradient) of layer
+def PlanFusion(graph):
+
+    fusion = NoFusion()
+    for relu in range(1, len(graph)):
+        if graph[relu].type != 'ReLU':
+            continue
+        prev = relu - 1
+        if graph[prev].type in FW_FUSED_LAYERS and graph[prev].data_type == graph[relu].data_type:
+            fusion['FW'][prev] = relu
+        succ = relu + 1
+        if (succ < len(graph) and graph[succ].type in BW_FUSED_LAYERS and graph[succ].data_type == graph[relu].data_type
+            and not IsSkipDerivation(graph, relu) and not IsSkipDerivation(graph, succ)):
+            fusion['BW'][succ] = relu
+
+    return fusion
+
+
+# Returns True if the ReLU is computed by another layer (in the given step, 'FW' or 'BW')
+def IsFused(fusion, layer, step):
+    return layer in fusion[step].values()
+
+
+# Prints the fused layers
+def PrintFusion(graph, fusion):
+
+    for layer, relu in fusion['FW'].items():
+        print("Layer {} ({}) fused with the forward of layer {} (ReLU)".format(layer, graph[layer].type, relu))
+    for layer, relu in fusion['BW'].items():
+        print("Layer {} ({}) fused with the backward of layer {} (ReLU)".format(layer, graph[layer].type, relu))
+    print("{} forward and {} backward ReLUs fused ({} team forks saved per training step)".format(len(fusion['FW']), len(fusion['BW']),
+          len(fusion['FW']) + len(fusion['BW'])))
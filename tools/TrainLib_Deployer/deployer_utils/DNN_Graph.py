@@ -0,0 +1,223 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini
+'''
+
+"""
+The DNN Graph is the intermediate representation of the Deployer: one Layer
+record for each layer of the NETWORK GRAPH lists, with its derived sizes computed
+once. The Graph caches the per-layer lists and the buffer sizes, which are used by
+the size checker and by all the generators (optimization passes which modify the
+layers must call invalidate()).
+"""
+
+# Layers without weights
+NO_WEIGHT_LAYERS = ['ReLU', 'MaxPool', 'AvgPool', 'Skipnode', 'Sumnode']
+
+
+
+# Output size of a layer along one dimension
+def OutputSize(in_size, ker_size, pad, stride):
+    return (in_size - ker_size + 2*pad + stride) // stride
+
+
+# Bytes of each element of a data type
+def DataTypeBytes(data_type):
+    if data_type == 'FP32':
+        return 4
+    elif data_type == 'FP16':
+        return 2
+    else:
+        print("[DNN_Graph.DataTypeBytes]: Invalid data type {}!!".format(data_type))
+        exit()
+
+
+# Translates the Skipnode/Sumnode values of the NETWORK GRAPH into the index of the connected layer (-1 if not connected)
+def AdjustResConnList(sumnode_connections):
+    res = []
+    for layer in range(len(sumnode_connections)):
+        if sumnode_connections[layer] == 0:
+            res.append(-1)
+        else:
+            my_value = sumnode_connections[layer]
+            for scanned_layer in range(len(sumnode_connections)):
+                if sumnode_connections[scanned_layer] == my_value and layer != scanned_layer:
+                    res.append(scanned_layer)
+    return res
+
+
+# Returns True if the layer is a skip derivation: a Skipnode, or a layer whose output is also used by a Sumnode
+# (same condition of the generators of the backward step)
+def IsSkipDerivation(graph, layer):
+    return graph[layer].type != 'Sumnode' and graph.sumnode_connections[layer] > -1
+
+
+
+class Layer:
+
+    __slots__ = ('index', 'type', 'in_ch', 'out_ch', 'hk', 'wk', 'hin', 'win', 'h_str', 'w_str', 'h_pad', 'w_pad',
+                 'data_type', 'layout', 'mm_fw', 'mm_wg', 'mm_ig', 'skip', 'hout', 'wout', 'byte_size')
+
+    def __init__(self, index, layer_type, in_ch, out_ch, hk, wk, hin, win, h_str=1, w_str=1, h_pad=0, w_pad=0,
+                 data_type='FP32', layout='CHW', mm_fw=0, mm_wg=0, mm_ig=0, skip=-1):
+        self.index = index
+        self.type = layer_type
+        self.in_ch = in_ch
+        self.out_ch = out_ch
+        self.hk = hk
+        self.wk = wk
+        self.hin = hin
+        self.win = win
+        self.h_str = h_str
+        self.w_str = w_str
+        self.h_pad = h_pad
+        self.w_pad = w_pad
+        self.data_type = data_type
+        self.layout = layout
+        self.mm_fw = mm_fw
+        self.mm_wg = mm_wg
+        self.mm_ig = mm_ig
+        # Index of the connected Skipnode/Sumnode (-1 if none)
+        self.skip = skip
+        self.update()
+
+    # Computes the derived sizes (to be called if the layer is modified)
+    def update(self):
+        self.hout = OutputSize(self.hin, self.hk, self.h_pad, self.h_str)
+        self.wout = OutputSize(self.win, self.wk, self.w_pad, self.w_str)
+        self.byte_size = DataTypeBytes(self.data_type)
+
+    # Number of elements of the input, weights and output
+    def in_size(self):
+        return self.in_ch * self.hin * self.win
+
+    def wgt_size(self):
+        if self.type in NO_WEIGHT_LAYERS:
+            return 0
+        if self.type == 'InstNorm':
+            return 2 * self.in_ch
+        return self.in_ch * self.out_ch * self.hk * self.wk
+
+    def out_size(self):
+        return self.out_ch * self.hout * self.wout
+
+    def __repr__(self):
+        return "Layer {}: {} {}, in=[{}, {}, {}], wgt=[{}, {}, {}, {}], out=[{}, {}, {}]".format(self.index, self.data_type, self.type,
+                self.in_ch, self.hin, self.win, self.out_ch, self.hk, self.wk, self.in_ch, self.out_ch, self.hout, self.wout)
+
+
+
+class Graph:
+
+    def __init__(self, layers, batch_size=1):
+        self.layers = layers
+        # Samples of a training step (the layers are described for a single sample)
+        self.batch_size = batch_size
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.layers)
+
+    def __getitem__(self, index):
+        return self.layers[index]
+
+    def __iter__(self):
+        return iter(self.layers)
+
+    # Clears the cached values (to be called after modifying the layers)
+    def invalidate(self):
+        for layer in self.layers:
+            layer.update()
+        self.cache = {}
+
+    # Returns a cached value, computing it at the first call
+    def cached(self, key, compute):
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    # List of a field of all the layers
+    def column(self, field):
+        return self.cached('column_'+field, lambda: [getattr(layer, field) for layer in self.layers])
+
+    # Per-layer lists, as in the NETWORK GRAPH section
+    @property
+    def layers_l(self):             return self.column('type')
+    @property
+    def in_ch_l(self):              return self.column('in_ch')
+    @property
+    def out_ch_l(self):             return self.column('out_ch')
+    @property
+    def hk_l(self):                 return self.column('hk')
+    @property
+    def wk_l(self):                 return self.column('wk')
+    @property
+    def hin_l(self):                return self.column('hin')
+    @property
+    def win_l(self):                return self.column('win')
+    @property
+    def h_str_l(self):              return self.column('h_str')
+    @property
+    def w_str_l(self):              return self.column('w_str')
+    @property
+    def h_pad_l(self):              return self.column('h_pad')
+    @property
+    def w_pad_l(self):              return self.column('w_pad')
+    @property
+    def data_type_l(self):          return self.column('data_type')
+    @property
+    def data_layout_l(self):        return self.column('layout')
+    @property
+    def opt_mm_fw_l(self):          return self.column('mm_fw')
+    @property
+    def opt_mm_wg_l(self):          return self.column('mm_wg')
+    @property
+    def opt_mm_ig_l(self):          return self.column('mm_ig')
+    @property
+    def sumnode_connections(self):  return self.column('skip')
+    # Derived sizes
+    @property
+    def hout_l(self):               return self.column('hout')
+    @property
+    def wout_l(self):               return self.column('wout')
+
+
+
+# Builds the graph from the lists of the NETWORK GRAPH section
+def BuildGraph(layer_list, sumnode_connections, in_ch_list, out_ch_list, hk_list, wk_list, hin_list, win_list,
+               h_str_list, w_str_list, h_pad_list, w_pad_list, opt_mm_fw_list, opt_mm_wg_list, opt_mm_ig_list,
+               data_type_list, data_layout_list, batch_size=1):
+
+    lists = [sumnode_connections, in_ch_list, out_ch_list, hk_list, wk_list, hin_list, win_list, h_str_list, w_str_list,
+             h_pad_list, w_pad_list, opt_mm_fw_list, opt_mm_wg_list, opt_mm_ig_list, data_type_list, data_layout_list]
+    for values in lists:
+        if len(values) != len(layer_list):
+            print("[DNN_Graph.BuildGraph]: The lists of the NETWORK GRAPH have different lengths ({} layers, {} values)!".format(len(layer_list), len(values)))
+            exit()
+
+    skip_list = AdjustResConnList(sumnode_connections)
+    if len(skip_list) != len(layer_list):
+        print("[DNN_Graph.BuildGraph]: Each value of sumnode_connections must be assigned to one Skipnode and one Sumnode!")
+        exit()
+    layers = []
+    for idx in range(len(layer_list)):
+        layers.append(Layer(idx, layer_list[idx], in_ch_list[idx], out_ch_list[idx], hk_list[idx], wk_list[idx], hin_list[idx], win_list[idx],
+                            h_str_list[idx], w_str_list[idx], h_pad_list[idx], w_pad_list[idx], data_type_list[idx], data_layout_list[idx],
+                            opt_mm_fw_list[idx], opt_mm_wg_list[idx], opt_mm_ig_list[idx], skip_list[idx]))
+
+    return Graph(layers, batch_size)
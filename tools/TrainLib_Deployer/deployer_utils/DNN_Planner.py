@@ -0,0 +1,355 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini
+'''
+
+from deployer_utils.DNN_Graph import DataTypeBytes
+import deployer_utils.DNN_Batch as batching
+
+"""
+The L1 memory planner places the activations, the gradients and the im2col,
+transposition and cast buffers of a network trained fully in L1 (USE_DMA = 'NO')
+into a single arena. The lifetime of each tensor is computed on the schedule of a
+training step (forward, loss, backward, weight update) and tensors which are never
+alive at the same time share the same addresses. The activations and their
+gradients hold all the samples of the batch (see DNN_Batch).
+"""
+
+# Alignment of the tensors inside the arena (bytes)
+ARENA_ALIGNMENT = 4
+
+# Layers which use the im2col and the transposition buffers
+IM2COL_LAYERS = ['conv2d']
+BT_LAYERS = ['conv2d', 'PW']
+
+
+
+# Steps of the schedule of a training step (N layers):
+# forward of layer i -> i, loss -> N, backward of layer i -> 2N-i, weight update -> 2N+1
+def FwStep(graph, layer):
+    return layer
+
+def LossStep(graph):
+    return len(graph)
+
+def BwStep(graph, layer):
+    return 2*len(graph) - layer
+
+def UpdateStep(graph):
+    return 2*len(graph) + 1
+
+
+# C type of a data type
+def CType(data_type):
+    if data_type == 'FP32':
+        return 'float'
+    elif data_type == 'FP16':
+        return 'fp16'
+    else:
+        print("[DNN_Planner.CType]: Invalid data type {}!!".format(data_type))
+        exit()
+
+
+
+# Lists the tensors which GenerateNet defines statically: {name: [C type, bytes]}
+def NetTensors(graph):
+
+    layers_l = graph.layers_l
+    data_type_l = graph.data_type_l
+    last = len(graph) - 1
+    batch_size = graph.batch_size
+    tensors = {}
+
+    # Activations and gradients (layers after a Skipnode share the tensors of the Skipnode)
+    for layer in graph:
+        if layer.index > 0 and layers_l[layer.index-1] == 'Skipnode':
+            continue
+        in_bytes = layer.in_size() * layer.byte_size * batch_size
+        tensors['l{}_in'.format(layer.index)] = [CType(layer.data_type), in_bytes]
+        if layer.index > 0:
+            tensors['l{}_in_diff'.format(layer.index)] = [CType(layer.data_type), in_bytes]
+        if layer.index == last:
+            tensors['l{}_out'.format(last)] = [CType(layer.data_type), layer.out_size() * layer.byte_size * batch_size]
+            tensors['l{}_out_diff'.format(last)] = [CType(layer.data_type), layer.out_size() * layer.byte_size * batch_size]
+
+    # Weight gradients
+    for layer in graph:
+        if layer.type in ['Skipnode', 'Sumnode']:
+            continue
+        elif layer.type in ['MaxPool', 'AvgPool']:
+            wgt_size = 1
+        else:
+            wgt_size = layer.wgt_size()
+        tensors['l{}_ker_diff'.format(layer.index)] = [CType(layer.data_type), wgt_size * layer.byte_size]
+
+    # Shared im2col buffer (the largest between forward and backward of each convolution)
+    im2col_bytes = 0
+    for layer in graph:
+        if layer.type in IM2COL_LAYERS:
+            i2c_fw = layer.in_ch * layer.hk * layer.wk * layer.hout * layer.wout
+            i2c_bw = layer.out_ch * layer.hk * layer.wk * layer.hin * layer.win
+            im2col_bytes = max(im2col_bytes, max(i2c_fw, i2c_bw) * layer.byte_size)
+    if im2col_bytes > 0:
+        tensors['im2col_buffer'] = ['float', im2col_bytes]
+
+    # Shared transposition buffer (the first layer does not compute the input gradient)
+    bt_bytes = 0
+    bt_present = False
+    for layer in graph:
+        if layer.type in BT_LAYERS:
+            bt_present = True
+            if layer.index > 0:
+                bt_bytes = max(bt_bytes, layer.in_ch * layer.hk * layer.wk * layer.out_ch * layer.byte_size)
+    if bt_present:
+        tensors['bt_buffer'] = ['float', max(bt_bytes, 4)]
+
+    # Shared cast buffer for mixed precision
+    cast_bytes = 0
+    for layer in graph:
+        if layer.index > 0 and data_type_l[layer.index] != data_type_l[layer.index-1]:
+            cast_size = max(layer.in_size(), layer.out_size())
+            cast_bytes = max(cast_bytes, cast_size * DataTypeBytes(data_type_l[layer.index-1]) * batch_size)
+    if cast_bytes > 0:
+        tensors['cast_buffer'] = ['float', cast_bytes]
+
+    # Weight gradients of the samples of the batch after the first one
+    if batching.IsBatched(graph):
+        tensors['batch_grad_buffer'] = ['float', batching.BatchGradBytes(graph)]
+
+    return tensors
+
+
+
+# Finds the tensors connected to the blobs of each layer by GenerateNet:
+# [{'in': [data, diff], 'out': [data, diff], 'wgt': [data, diff]}, ...] (None if not connected)
+def BlobTensors(graph):
+
+    layers_l = graph.layers_l
+    data_type_l = graph.data_type_l
+    sumnode_connections = graph.sumnode_connections
+    last = len(graph) - 1
+    blobs = []
+
+    previous_was_skip_data = 0
+    previous_was_skip_diff = 0
+    for layer in range(len(graph)):
+        blob = {'in': [None, None], 'out': [None, None], 'wgt': [None, None]}
+        wgt = ['l{}_ker'.format(layer), 'l{}_ker_diff'.format(layer)]
+        if data_type_l[layer] != data_type_l[min(layer+1, last)]:
+            next_in = ['cast_buffer', 'cast_buffer']
+        else:
+            next_in = ['l{}_in'.format(layer+1), 'l{}_in_diff'.format(layer+1)]
+        # DNN is 1 layer long
+        if len(graph) == 1:
+            blob['in'] = ['l0_in', None]
+            blob['wgt'] = wgt
+            blob['out'] = ['l0_out', 'l0_out_diff']
+        # First layer connection
+        elif layer == 0:
+            blob['in'] = ['l0_in', None]
+            if layers_l[0] != 'Skipnode':
+                blob['wgt'] = wgt
+                blob['out'] = next_in
+        # Hidden layers
+        elif layer < last:
+            blob['in'] = ['l{}_in'.format(layer - previous_was_skip_data), 'l{}_in_diff'.format(layer - previous_was_skip_diff)]
+            if layers_l[layer] != 'Skipnode':
+                if layers_l[layer] != 'Sumnode':
+                    blob['wgt'] = wgt
+                blob['out'] = next_in
+                if next_in[0] != 'cast_buffer' and sumnode_connections[layer] != -1 and layers_l[layer] != 'Sumnode':
+                    blob['out'][1] = 'l{}_in_diff'.format(sumnode_connections[layer])
+        # Last layer
+        else:
+            blob['in'] = ['l{}_in'.format(layer - previous_was_skip_data), 'l{}_in_diff'.format(layer - previous_was_skip_diff)]
+            if layers_l[layer] != 'Sumnode':
+                blob['wgt'] = wgt
+            blob['out'] = ['l{}_out'.format(layer), 'l{}_out_diff'.format(layer)]
+        blobs.append(blob)
+
+        if sumnode_connections[layer] != -1 and layers_l[layer] != 'Sumnode':
+            previous_was_skip_data += 1
+            if layers_l[layer] == 'Skipnode':
+                previous_was_skip_diff += 1
+            else:
+                previous_was_skip_diff = 0
+        else:
+            previous_was_skip_data = 0
+            previous_was_skip_diff = 0
+
+    return blobs
+
+
+
+# Finds the steps of the training schedule in which each tensor is accessed: {name: set of steps}
+# (the ReLUs fused with another layer, see DNN_Fusion, are computed in the steps of that layer)
+def TensorAccesses(graph, tensors, fusion=None):
+
+    layers_l = graph.layers_l
+    data_type_l = graph.data_type_l
+    sumnode_connections = graph.sumnode_connections
+    last = len(graph) - 1
+    blobs = BlobTensors(graph)
+    accesses = {}
+    for name in tensors:
+        accesses[name] = set()
+
+    def access(names, step):
+        for name in names:
+            if name in accesses:
+                accesses[name].add(step)
+
+    # Tensors of a blob: data in forward and backward, gradients in backward
+    def access_blob(blob, fw_step, bw_step):
+        if fw_step is not None:
+            access([blob[0]], fw_step)
+        access(blob, bw_step)
+
+    for layer in range(len(graph)):
+        fw_step = FwStep(graph, layer)
+        bw_step = BwStep(graph, layer)
+        blob_list = [blobs[layer]['in'], blobs[layer]['out'], blobs[layer]['wgt']]
+        # Residual connections: the Sumnode reads the blob of its Skipnode, while
+        # the backward of the Skipnode uses the blobs of the Sumnode
+        if layers_l[layer] == 'Sumnode':
+            skip_layer = sumnode_connections[layer]
+            if layers_l[skip_layer] == 'Skipnode':
+                blob_list.append(blobs[skip_layer]['in'])
+            else:
+                blob_list.append(blobs[skip_layer]['out'])
+        elif layers_l[layer] == 'Skipnode' and sumnode_connections[layer] != -1:
+            sum_layer = sumnode_connections[layer]
+            for blob in [blobs[sum_layer]['in'], blobs[sum_layer]['out'], blobs[layer]['in']]:
+                access_blob(blob, None, bw_step)
+        for blob in blob_list:
+            access_blob(blob, fw_step, bw_step)
+        # Gradient of the skip derivation, summed to the input gradient
+        if sumnode_connections[layer] != -1 and layers_l[layer] not in ['Sumnode', 'Skipnode'] and layer > 0:
+            access([blobs[layer]['in'][1]], bw_step)
+            if layer < last:
+                access([blobs[layer+1]['in'][1]], bw_step)
+        # Casts between layers of different data types
+        if layer < last and data_type_l[layer] != data_type_l[layer+1]:
+            access(['cast_buffer', blobs[layer+1]['in'][0]], fw_step)
+        if layer > 0 and layer < last and data_type_l[layer] != data_type_l[layer-1]:
+            access(['cast_buffer', blobs[layer]['in'][1]], bw_step)
+        # Scratch buffers
+        if layers_l[layer] in IM2COL_LAYERS:
+            access(['im2col_buffer'], fw_step)
+            access(['im2col_buffer'], bw_step)
+        if layers_l[layer] in BT_LAYERS:
+            access(['bt_buffer'], fw_step)
+            access(['bt_buffer'], bw_step)
+        if batching.GradElements(graph, layer) > 0:
+            access(['batch_grad_buffer'], bw_step)
+        # Weight gradients are read by the optimizer
+        access([blobs[layer]['wgt'][1]], UpdateStep(graph))
+
+    # Fused ReLUs
+    if fusion is not None:
+        for layer, relu in fusion['FW'].items():
+            access_blob(blobs[relu]['in'], FwStep(graph, layer), BwStep(graph, relu))
+            access_blob(blobs[relu]['out'], FwStep(graph, layer), BwStep(graph, relu))
+        for layer, relu in fusion['BW'].items():
+            access(blobs[relu]['in'] + blobs[relu]['out'], BwStep(graph, layer))
+
+    # Loss and output gradient
+    access(blobs[last]['out'], LossStep(graph))
+
+    return accesses
+
+
+
+# Computes the lifetime of each tensor and assigns its offset in the L1 arena
+# (greedy by size: each tensor takes the lowest offset which does not overlap the
+# tensors already placed and alive at the same time)
+def PlanL1Memory(graph, fusion=None):
+
+    tensors = NetTensors(graph)
+    accesses = TensorAccesses(graph, tensors, fusion)
+    all_steps = set(range(UpdateStep(graph) + 1))
+
+    plan = []
+    for name in tensors:
+        steps = accesses[name]
+        if name == 'l0_in':
+            # The input is loaded once by DNN_init()
+            steps = all_steps
+        elif name in ['im2col_buffer', 'bt_buffer', 'batch_grad_buffer']:
+            # Scratch buffers, only alive during the layers which use them
+            pass
+        elif len(steps) > 0:
+            steps = set(range(min(steps), max(steps) + 1))
+        else:
+            # Not used by the training step (still allocated, as in the static allocation)
+            steps = all_steps
+        size = tensors[name][1]
+        size = ((size + ARENA_ALIGNMENT - 1) // ARENA_ALIGNMENT) * ARENA_ALIGNMENT
+        plan.append({'name': name, 'type': tensors[name][0], 'bytes': size, 'steps': steps, 'offset': 0})
+
+    placed = []
+    for tensor in sorted(plan, key=lambda t: (-t['bytes'], min(t['steps']), t['name'])):
+        conflicts = sorted([other for other in placed if len(other['steps'] & tensor['steps']) > 0], key=lambda t: t['offset'])
+        offset = 0
+        for other in conflicts:
+            if offset + tensor['bytes'] <= other['offset']:
+                break
+            offset = max(offset, other['offset'] + other['bytes'])
+        tensor['offset'] = offset
+        placed.append(tensor)
+
+    arena_bytes = 0
+    static_bytes = 0
+    for tensor in plan:
+        arena_bytes = max(arena_bytes, tensor['offset'] + tensor['bytes'])
+        static_bytes += tensor['bytes']
+
+    # Weights are not placed in the arena
+    wgt_bytes = 0
+    for layer in graph:
+        if layer.type in ['MaxPool', 'AvgPool']:
+            wgt_bytes += layer.byte_size
+        else:
+            wgt_bytes += layer.wgt_size() * layer.byte_size
+
+    return {'tensors': plan, 'arena_bytes': arena_bytes, 'static_bytes': static_bytes, 'wgt_bytes': wgt_bytes}
+
+
+
+# Prints the offsets and the lifetimes of the tensors in the arena
+def PrintL1Plan(plan):
+
+    print("L1 arena: {} bytes ({} bytes with static buffers), weights: {} bytes".format(plan['arena_bytes'], plan['static_bytes'], plan['wgt_bytes']))
+    for tensor in sorted(plan['tensors'], key=lambda t: t['offset']):
+        print("  {:<16} offset {:>7}, {:>7} bytes, steps {}-{}".format(tensor['name'], tensor['offset'], tensor['bytes'],
+              min(tensor['steps']), max(tensor['steps'])))
+
+    return
+
+
+
+# Writes the declaration of the arena and of the tensors it contains
+def ArenaDeclarations(plan):
+
+    declarations  = "\n// L1 arena for activations, gradients and buffers (see DNN_Planner.py)\n"
+    declarations += "#define L1_ARENA_SIZE {}\n".format(plan['arena_bytes'])
+    declarations += "PI_L1 float l1_arena[L1_ARENA_SIZE/4];\n"
+    for tensor in sorted(plan['tensors'], key=lambda t: t['offset']):
+        declarations += "#define {} (({} *) ((char *) l1_arena + {}))\n".format(tensor['name'], tensor['type'], tensor['offset'])
+
+    return declarations
@@ -0,0 +1,318 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini
+'''
+
+import torch
+import torch.nn as nn
+
+from deployer_utils.DNN_Scheduler import LayerMACs, MACS_PER_CYCLE
+
+"""
+The mixed precision planner chooses the data type of each layer (data_type_list).
+The cycles of a training step are predicted for each layer in FP32 and FP16, and
+each change of data type between two layers adds the casts of the activations
+(forward) and of the gradients (backward), plus a fixed overhead. The cheapest
+assignment is found with a dynamic programming over the layers, which also
+prefers the solutions with fewer switches; the layers of a residual connection
+share the same data type.
+The accuracy of an assignment is checked by replaying the training of the
+golden model (GM.py) on the CPU, in FP32 and with the FP16 layers emulated by
+rounding their activations, weights and gradients to FP16 (the GM itself falls
+back to FP32 when CUDA is not available). If the relative error of the output
+after training exceeds the tolerance, the FP16 layer with the largest error is
+moved to FP32 and the assignment is computed again.
+"""
+
+# Rough estimates of the cluster throughput: FP16 kernels use 2-way SIMD, casts convert elements at CAST_ELEMENTS_PER_CYCLE
+FP16_SPEEDUP = 2
+CAST_ELEMENTS_PER_CYCLE = 4
+# Fixed overhead of each change of data type (two team forks, forward and backward)
+SWITCH_OVERHEAD_CYCLES = 500
+# Format of the emulated FP16 (float16alt on PULP, use torch.float16 to match the GM executed on GPU)
+FP16_EMULATION_DTYPE = torch.bfloat16
+# Seed of the weights and input of the accuracy check
+ACCURACY_SEED = 0
+
+
+
+# Predicted cycles of a training step of a layer (forward, weight gradient and input gradient)
+def LayerCycles(graph, layer, data_type):
+    l = graph[layer]
+    passes = 1
+    if l.wgt_size() > 0:
+        passes += 1
+    if layer > 0:
+        passes += 1
+    cycles = passes * LayerMACs(graph, layer) / MACS_PER_CYCLE
+    if data_type == 'FP16':
+        cycles = cycles / FP16_SPEEDUP
+    return cycles
+
+
+# Predicted cycles of the casts between layer and layer+1 (forward: output of layer, backward: input gradient of layer+1)
+def CastCycles(graph, layer):
+    elements = graph[layer].out_size() + graph[layer+1].in_size()
+    return elements / CAST_ELEMENTS_PER_CYCLE + SWITCH_OVERHEAD_CYCLES
+
+
+# Returns, for each layer, True if it must have the same data type of the next one
+# (the layers from a Skipnode to its Sumnode, since the skip data is not cast)
+def TiedLayers(graph):
+    tied = [False] * len(graph)
+    for layer in range(len(graph)):
+        skip = graph.sumnode_connections[layer]
+        if graph[layer].type == 'Sumnode' and skip != -1:
+            for tied_layer in range(skip, layer):
+                tied[tied_layer] = True
+    return tied
+
+
+# Predicted cycles, casts and switches of an assignment of data types
+def AssignmentCost(graph, data_types):
+    cycles = 0; cast_cycles = 0; switches = 0
+    for layer in range(len(graph)):
+        cycles += LayerCycles(graph, layer, data_types[layer])
+        if layer > 0 and data_types[layer] != data_types[layer-1]:
+            cast_cycles += CastCycles(graph, layer-1)
+            switches += 1
+    return {'cycles': int(cycles + cast_cycles), 'cast_cycles': int(cast_cycles), 'switches': switches}
+
+
+# Size (bytes) of the cast buffer of an assignment of data types (see compute_cast_buffer_memocc_bytes)
+def CastBufferBytes(graph, data_types):
+    max_bytes = 0
+    for layer in range(1, len(graph)):
+        if data_types[layer] != data_types[layer-1]:
+            byte_size = 4 if data_types[layer] == 'FP32' else 2
+            max_bytes = max(max_bytes, max(graph[layer].in_size(), graph[layer].out_size()) * byte_size)
+    return max_bytes
+
+
+
+# Finds the assignment of data types with the lowest predicted cycles (and then the lowest number of switches),
+# where allowed[layer] is the list of the data types which the layer can take
+def CheapestAssignment(graph, allowed):
+
+    tied = TiedLayers(graph)
+    # best[layer][data_type] = (cycles, switches, previous data type)
+    best = [{} for layer in range(len(graph))]
+    for data_type in allowed[0]:
+        best[0][data_type] = (LayerCycles(graph, 0, data_type), 0, None)
+    for layer in range(1, len(graph)):
+        for data_type in allowed[layer]:
+            candidates = []
+            for prev_type, (cycles, switches, _) in best[layer-1].items():
+                if prev_type != data_type:
+                    if tied[layer-1]:
+                        continue
+                    cycles += CastCycles(graph, layer-1)
+                    switches += 1
+                candidates.append((cycles, switches, prev_type))
+            if len(candidates) > 0:
+                cycles, switches, prev_type = min(candidates)
+                best[layer][data_type] = (cycles + LayerCycles(graph, layer, data_type), switches, prev_type)
+
+    if len(best[-1]) == 0:
+        print("[DNN_Precision.CheapestAssignment]: No valid assignment of data types!")
+        exit()
+    data_type = min(best[-1], key=lambda t: best[-1][t][:2])
+    data_types = [data_type]
+    for layer in range(len(graph)-1, 0, -1):
+        data_type = best[layer][data_type][2]
+        data_types.insert(0, data_type)
+
+    return data_types
+
+
+
+# Rounds a tensor to the emulated FP16 in the forward and its gradient in the backward
+class RoundFP16(torch.autograd.Function):
+
+    @staticmethod
+    def forward(ctx, x):
+        return x.to(FP16_EMULATION_DTYPE).to(x.dtype)
+
+    @staticmethod
+    def backward(ctx, grad):
+        return grad.to(FP16_EMULATION_DTYPE).to(grad.dtype)
+
+
+# Rounds a tensor to the emulated FP16 (no gradient)
+def RoundTensor(x):
+    return x.to(FP16_EMULATION_DTYPE).to(x.dtype)
+
+
+# Layers of the golden model (see GM_templates)
+def GMLayer(layer):
+    if layer.type == 'linear':
+        return nn.Linear(in_features=layer.in_ch, out_features=layer.out_ch, bias=False)
+    elif layer.type == 'conv2d':
+        return nn.Conv2d(in_channels=layer.in_ch, out_channels=layer.out_ch, kernel_size=(layer.hk, layer.wk),
+                         padding=(layer.h_pad, layer.w_pad), stride=(layer.h_str, layer.w_str), bias=False)
+    elif layer.type == 'DW':
+        return nn.Conv2d(in_channels=layer.in_ch, out_channels=layer.in_ch, kernel_size=(layer.hk, layer.wk), stride=1, groups=layer.in_ch, bias=False)
+    elif layer.type == 'PW':
+        return nn.Conv2d(in_channels=layer.in_ch, out_channels=layer.out_ch, kernel_size=1, stride=1, bias=False)
+    elif layer.type == 'ReLU':
+        return nn.ReLU()
+    elif layer.type == 'MaxPool':
+        return nn.MaxPool2d(kernel_size=(layer.hk, layer.wk), stride=(layer.h_str, layer.w_str))
+    elif layer.type == 'AvgPool':
+        return nn.AvgPool2d(kernel_size=(layer.hk, layer.wk), stride=(layer.h_str, layer.w_str))
+    elif layer.type == 'InstNorm':
+        return nn.InstanceNorm2d(num_features=layer.in_ch, eps=1e-10, momentum=0, affine=True)
+    elif layer.type in ['Skipnode', 'Sumnode']:
+        return nn.Identity()
+    else:
+        print("[DNN_Precision.GMLayer]: Layer {} not recognized!!".format(layer.type))
+        exit()
+
+
+# Golden model with the FP16 layers emulated on FP32 tensors
+class EmulatedDNN(nn.Module):
+
+    def __init__(self, graph, data_types):
+        super().__init__()
+        self.graph = graph
+        self.data_types = data_types
+        self.l = nn.ModuleList([GMLayer(layer) for layer in graph])
+
+    # Rounds the weights of the FP16 layers (as stored on the device)
+    def round_weights(self):
+        with torch.no_grad():
+            for layer in range(len(self.graph)):
+                if self.data_types[layer] == 'FP16':
+                    for p in self.l[layer].parameters():
+                        p.copy_(RoundTensor(p))
+                        if p.grad is not None:
+                            p.grad.copy_(RoundTensor(p.grad))
+
+    def forward(self, x):
+        skip_data = {}
+        sumnode_connections = self.graph.sumnode_connections
+        for layer in range(len(self.graph)):
+            fp16 = self.data_types[layer] == 'FP16'
+            if fp16:
+                x = RoundFP16.apply(x)
+            if self.graph[layer].type == 'linear':
+                x = torch.reshape(x, (self.graph.batch_size, -1))
+            # Residual connections (as in the forward of the GM)
+            if self.graph[layer].type == 'Sumnode':
+                skip = skip_data[layer]
+                if fp16:
+                    skip = RoundFP16.apply(skip)
+                x = skip + x
+            elif sumnode_connections[layer] != -1:
+                skip_data[sumnode_connections[layer]] = self.l[layer](x)
+                continue
+            else:
+                x = self.l[layer](x)
+            if fp16:
+                x = RoundFP16.apply(x)
+        return x
+
+
+# Relative error of the output of the golden model after training, with data_types with respect to FP32
+def PrecisionError(graph, data_types, epochs, learning_rate, loss_fn):
+
+    outputs = []
+    for types in [['FP32'] * len(graph), data_types]:
+        # Same weights and input of the golden model
+        torch.manual_seed(ACCURACY_SEED)
+        net = EmulatedDNN(graph, types)
+        for p in net.parameters():
+            nn.init.normal_(p, mean=0.0, std=1.0)
+        if graph[0].type == 'linear':
+            inp = torch.div(torch.ones(graph.batch_size, graph[0].in_ch), 1e6)
+        else:
+            inp = torch.div(torch.rand(graph.batch_size, graph[0].in_ch, graph[0].hin, graph[0].win), 1e6)
+        net.round_weights()
+        label = torch.ones_like(net(inp))
+        optimizer = torch.optim.SGD(net.parameters(), lr=learning_rate, momentum=0)
+        criterion = getattr(nn, loss_fn)()
+        for epoch in range(epochs):
+            optimizer.zero_grad()
+            loss = criterion(net(inp), label)
+            loss.backward()
+            net.round_weights()
+            optimizer.step()
+            net.round_weights()
+        with torch.no_grad():
+            outputs.append(net(inp))
+
+    reference_norm = torch.linalg.norm(outputs[0]).item()
+    error = torch.linalg.norm(outputs[1] - outputs[0]).item()
+    if reference_norm > 0:
+        error = error / reference_norm
+    return error
+
+
+
+# Plans the data type of each layer: returns the data_type_list with the lowest predicted cycles
+# whose error (see PrecisionError) does not exceed tolerance
+def PlanPrecision(graph, tolerance, epochs, learning_rate, loss_fn):
+
+    num_layers = len(graph)
+    # Error of each layer alone in FP16
+    sensitivity = []
+    for layer in range(num_layers):
+        data_types = ['FP32'] * num_layers
+        data_types[layer] = 'FP16'
+        sensitivity.append(PrecisionError(graph, data_types, epochs, learning_rate, loss_fn))
+
+    allowed = [['FP32', 'FP16'] for layer in range(num_layers)]
+    while True:
+        data_types = CheapestAssignment(graph, allowed)
+        error = PrecisionError(graph, data_types, epochs, learning_rate, loss_fn)
+        fp16_layers = [layer for layer in range(num_layers) if data_types[layer] == 'FP16']
+        if error <= tolerance or len(fp16_layers) == 0:
+            break
+        # Move the most sensitive FP16 layer to FP32
+        worst = max(fp16_layers, key=lambda layer: sensitivity[layer])
+        allowed[worst] = ['FP32']
+
+    PrintPrecision(graph, data_types, sensitivity, error, epochs, learning_rate, loss_fn)
+
+    return data_types
+
+
+# Sets the data type of the layers of the graph
+def ApplyPrecision(graph, data_types):
+    for layer in range(len(graph)):
+        graph[layer].data_type = data_types[layer]
+    graph.invalidate()
+
+
+# Prints the report of the mixed precision planner and the planned data_type_list
+def PrintPrecision(graph, data_types, sensitivity, error, epochs, learning_rate, loss_fn):
+
+    print("---------- MIXED PRECISION PLAN ----------")
+    for layer in range(len(graph)):
+        cast = ""
+        if layer > 0 and data_types[layer] != data_types[layer-1]:
+            cast = ", cast from {}: {} cycles".format(data_types[layer-1], int(CastCycles(graph, layer-1)))
+        print("Layer {} ({}): {}, FP32={} cycles, FP16={} cycles, FP16 error alone={:.3e}{}".format(layer, graph[layer].type,
+              data_types[layer], int(LayerCycles(graph, layer, 'FP32')), int(LayerCycles(graph, layer, 'FP16')), sensitivity[layer], cast))
+    for name, types in [['All FP32', ['FP32'] * len(graph)], ['All FP16', ['FP16'] * len(graph)], ['Planned', data_types]]:
+        cost = AssignmentCost(graph, types)
+        types_error = error if types == data_types else PrecisionError(graph, types, epochs, learning_rate, loss_fn)
+        print("{}: {} cycles ({} for casts), {} switches, cast buffer {} bytes, error {:.3e}".format(name, cost['cycles'],
+              cost['cast_cycles'], cost['switches'], CastBufferBytes(graph, types), types_error))
+    print("data_type_list      = {}".format(data_types))
+    print("------------------------------------------")
@@ -16,4 +16,454 @@ limitations under the License.
 
 '''
 Authors: Davide Nadalini
-'''
\ No newline at end of file
+'''
+
+import os
+import math
+import importlib.util
+
+"""
+The DNN Reader imports a PyTorch model (traced with torch.fx) or an ONNX model
+and translates it into the lists of the NETWORK GRAPH of TrainLib_Deployer.
+The sizes of each layer are inferred with a dry forward (PyTorch) or with ONNX's
+shape inference, skip connections are translated into Skipnode/Sumnode couples
+and all the operators which are not supported by the Deployer are reported.
+Neither of the readers requires network access.
+"""
+
+# Lists of the NETWORK GRAPH section of TrainLib_Deployer.py (in order)
+GRAPH_LISTS = ['layer_list', 'sumnode_connections', 'in_ch_list', 'out_ch_list', 'hk_list', 'wk_list', 'hin_list', 'win_list',
+               'h_str_list', 'w_str_list', 'h_pad_list', 'w_pad_list', 'opt_mm_fw_list', 'opt_mm_wg_list', 'opt_mm_ig_list',
+               'data_type_list', 'data_layout_list']
+
+# Layers with kernel, stride and padding (the output sizes are checked against the Deployer's formula)
+KERNEL_LAYERS = ['conv2d', 'DW', 'PW', 'MaxPool', 'AvgPool']
+
+# ONNX operators which only change the shape of the data
+ONNX_PASS_OPS = ['Flatten', 'Reshape', 'Identity', 'Dropout', 'Squeeze', 'Unsqueeze']
+
+
+
+"""
+Common node format of the readers
+"""
+
+def MakeNode(name, op, inputs, in_shape, out_shape, target, hk=1, wk=1, h_str=1, w_str=1, h_pad=0, w_pad=0, bias=False):
+    # Shapes do not include the batch size ([C, H, W] or [F])
+    return {'name': name, 'op': op, 'inputs': inputs, 'in_shape': in_shape, 'out_shape': out_shape, 'target': str(target),
+            'hk': hk, 'wk': wk, 'h_str': h_str, 'w_str': w_str, 'h_pad': h_pad, 'w_pad': w_pad, 'bias': bias}
+
+
+# Returns the Deployer layer of a convolution (None if not supported)
+def ConvLayerType(in_ch, out_ch, groups, kernel, stride, padding, dilation):
+    if list(dilation) != [1, 1]:
+        return None
+    if groups > 1 and groups == in_ch and out_ch == in_ch:
+        # DW template has stride 1 and no padding
+        if list(stride) == [1, 1] and list(padding) == [0, 0]:
+            return 'DW'
+        return None
+    if groups != 1:
+        return None
+    if list(kernel) == [1, 1] and list(stride) == [1, 1] and list(padding) == [0, 0]:
+        return 'PW'
+    return 'conv2d'
+
+
+def Pair(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value, value]
+
+
+
+"""
+PyTorch reader
+"""
+
+# Loads an nn.Module from "path/to/file.py:ClassName" (the class is built without arguments)
+def LoadTorchModel(model_source):
+    model_file, class_name = model_source.rsplit(':', 1)
+    if not os.path.exists(model_file):
+        print("[DNN_Reader.LoadTorchModel]: Model file {} not found!".format(model_file))
+        exit()
+    spec = importlib.util.spec_from_file_location("deployer_model", model_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, class_name):
+        print("[DNN_Reader.LoadTorchModel]: Class {} not found in {}!".format(class_name, model_file))
+        exit()
+    return getattr(module, class_name)()
+
+
+# Traces an nn.Module and returns its nodes (input_shape is [C, H, W] or [F])
+def ReadTorchModel(model, input_shape):
+    import operator
+    import torch
+    import torch.nn as nn
+    import torch.nn.functional as F
+    import torch.fx
+    from torch.fx.passes.shape_prop import ShapeProp
+
+    model.eval()
+    try:
+        gm = torch.fx.symbolic_trace(model)
+    except Exception as e:
+        print("[DNN_Reader.ReadTorchModel]: The model cannot be traced with torch.fx ({})!".format(e))
+        exit()
+    # Dry forward to infer the sizes of each tensor
+    with torch.no_grad():
+        ShapeProp(gm).propagate(torch.zeros([1] + list(input_shape)))
+    modules = dict(gm.named_modules())
+
+    def shape_of(node):
+        meta = node.meta.get('tensor_meta', None)
+        if meta is None or not hasattr(meta, 'shape'):
+            return None
+        return list(meta.shape)[1:]
+
+    nodes = []
+    for node in gm.graph.nodes:
+        out_shape = shape_of(node)
+        # Activations only (parameters and sizes are not part of the graph)
+        inputs = [arg.name for arg in node.all_input_nodes if arg.op != 'get_attr' and shape_of(arg) is not None]
+        in_shape = shape_of(node.all_input_nodes[0]) if len(node.all_input_nodes) > 0 else None
+
+        if node.op == 'placeholder':
+            nodes.append(MakeNode(node.name, 'input', [], out_shape, out_shape, 'input'))
+        elif node.op == 'output':
+            nodes.append(MakeNode(node.name, 'output', inputs, in_shape, in_shape, 'output'))
+        elif node.op == 'get_attr' or out_shape is None:
+            continue
+        elif node.op == 'call_module':
+            mod = modules[node.target]
+            target = "{} ({})".format(node.target, type(mod).__name__)
+            if isinstance(mod, nn.Conv2d):
+                padding = [-1, -1] if isinstance(mod.padding, str) else Pair(mod.padding)
+                layer = ConvLayerType(mod.in_channels, mod.out_channels, mod.groups, Pair(mod.kernel_size), Pair(mod.stride), padding, Pair(mod.dilation))
+                if layer is None:
+                    nodes.append(MakeNode(node.name, 'unsupported', inputs, in_shape, out_shape, target+" with unsupported groups, stride, padding or dilation"))
+                else:
+                    kernel = Pair(mod.kernel_size); stride = Pair(mod.stride)
+                    nodes.append(MakeNode(node.name, layer, inputs, in_shape, out_shape, target, kernel[0], kernel[1], stride[0], stride[1],
+                                          padding[0], padding[1], mod.bias is not None))
+            elif isinstance(mod, nn.Linear):
+                nodes.append(MakeNode(node.name, 'linear', inputs, in_shape, out_shape, target, bias=mod.bias is not None))
+            elif isinstance(mod, nn.ReLU):
+                nodes.append(MakeNode(node.name, 'ReLU', inputs, in_shape, out_shape, target))
+            elif isinstance(mod, (nn.MaxPool2d, nn.AvgPool2d)):
+                kernel = Pair(mod.kernel_size)
+                stride = kernel if mod.stride is None else Pair(mod.stride)
+                padding = Pair(mod.padding)
+                if padding != [0, 0] or mod.ceil_mode == True or Pair(getattr(mod, 'dilation', 1)) != [1, 1]:
+                    nodes.append(MakeNode(node.name, 'unsupported', inputs, in_shape, out_shape, target+" with padding, dilation or ceil_mode"))
+                else:
+                    layer = 'MaxPool' if isinstance(mod, nn.MaxPool2d) else 'AvgPool'
+                    nodes.append(MakeNode(node.name, layer, inputs, in_shape, out_shape, target, kernel[0], kernel[1], stride[0], stride[1]))
+            elif isinstance(mod, nn.InstanceNorm2d):
+                nodes.append(MakeNode(node.name, 'InstNorm', inputs, in_shape, out_shape, target))
+            elif isinstance(mod, (nn.Flatten, nn.Dropout, nn.Identity)):
+                nodes.append(MakeNode(node.name, 'pass', inputs, in_shape, out_shape, target))
+            else:
+                nodes.append(MakeNode(node.name, 'unsupported', inputs, in_shape, out_shape, target))
+        elif node.op == 'call_function':
+            target = getattr(node.target, '__name__', str(node.target))
+            if node.target in [F.relu, torch.relu]:
+                nodes.append(MakeNode(node.name, 'ReLU', inputs, in_shape, out_shape, target))
+            elif node.target in [operator.add, operator.iadd, torch.add] and len(inputs) == 2:
+                nodes.append(MakeNode(node.name, 'add', inputs, in_shape, out_shape, target))
+            elif node.target in [torch.flatten, torch.reshape, F.dropout]:
+                nodes.append(MakeNode(node.name, 'pass', inputs, in_shape, out_shape, target))
+            else:
+                nodes.append(MakeNode(node.name, 'unsupported', inputs, in_shape, out_shape, target))
+        elif node.op == 'call_method':
+            if node.target == 'relu':
+                nodes.append(MakeNode(node.name, 'ReLU', inputs, in_shape, out_shape, node.target))
+            elif node.target in ['add', 'add_'] and len(inputs) == 2:
+                nodes.append(MakeNode(node.name, 'add', inputs, in_shape, out_shape, node.target))
+            elif node.target in ['view', 'reshape', 'flatten', 'contiguous', 'squeeze']:
+                nodes.append(MakeNode(node.name, 'pass', inputs, in_shape, out_shape, node.target))
+            else:
+                nodes.append(MakeNode(node.name, 'unsupported', inputs, in_shape, out_shape, node.target))
+
+    return nodes
+
+
+
+"""
+ONNX reader
+"""
+
+# Loads an ONNX file and returns its nodes (input_shape, if given, overrides the sizes of the input)
+def ReadOnnxModel(model_file, input_shape=None):
+    import onnx
+
+    if not os.path.exists(model_file):
+        print("[DNN_Reader.ReadOnnxModel]: Model file {} not found!".format(model_file))
+        exit()
+    model = onnx.load(model_file)
+    graph = model.graph
+    constants = set([init.name for init in graph.initializer])
+    for onnx_node in graph.node:
+        if onnx_node.op_type == 'Constant':
+            constants.update(onnx_node.output)
+    graph_inputs = [value for value in graph.input if value.name not in constants]
+    if len(graph_inputs) != 1:
+        print("[DNN_Reader.ReadOnnxModel]: Only models with one input are supported ({} found)!".format(len(graph_inputs)))
+        exit()
+    # Fix the input sizes (batch size of 1) before inferring the shapes
+    if input_shape is not None:
+        dims = graph_inputs[0].type.tensor_type.shape.dim
+        for idx, size in enumerate([1] + list(input_shape)):
+            if idx < len(dims):
+                dims[idx].ClearField('dim_param')
+                dims[idx].dim_value = size
+    model = onnx.shape_inference.infer_shapes(model)
+    graph = model.graph
+
+    shapes = {}
+    for value in list(graph.input) + list(graph.value_info) + list(graph.output):
+        shapes[value.name] = [dim.dim_value for dim in value.type.tensor_type.shape.dim][1:]
+    weights = {}
+    for init in graph.initializer:
+        weights[init.name] = list(init.dims)
+
+    def get_attrs(onnx_node):
+        return dict([(attr.name, onnx.helper.get_attribute_value(attr)) for attr in onnx_node.attribute])
+
+    nodes = [MakeNode(graph_inputs[0].name, 'input', [], shapes.get(graph_inputs[0].name), shapes.get(graph_inputs[0].name), 'input')]
+    for onnx_node in graph.node:
+        if onnx_node.op_type == 'Constant':
+            continue
+        name = onnx_node.output[0]
+        inputs = [value for value in onnx_node.input if value != '' and value not in constants]
+        in_shape = shapes.get(inputs[0]) if len(inputs) > 0 else None
+        out_shape = shapes.get(name)
+        target = "{} ({})".format(onnx_node.name, onnx_node.op_type)
+        attrs = get_attrs(onnx_node)
+        bias = len(onnx_node.input) > 2
+
+        if onnx_node.op_type == 'Conv':
+            kernel = list(attrs.get('kernel_shape', weights.get(onnx_node.input[1], [0, 0, 1, 1])[2:]))
+            stride = list(attrs.get('strides', [1, 1]))
+            pads = list(attrs.get('pads', [0, 0, 0, 0]))
+            layer = None
+            if attrs.get('auto_pad', b'NOTSET') in [b'NOTSET', 'NOTSET'] and pads[0:2] == pads[2:4] and in_shape is not None and out_shape is not None:
+                layer = ConvLayerType(in_shape[0], out_shape[0], attrs.get('group', 1), kernel, stride, pads[0:2], list(attrs.get('dilations', [1, 1])))
+            if layer is None:
+                nodes.append(MakeNode(name, 'unsupported', inputs, in_shape, out_shape, target+" with unsupported groups, stride, padding or dilation"))
+            else:
+                nodes.append(MakeNode(name, layer, inputs, in_shape, out_shape, target, kernel[0], kernel[1], stride[0], stride[1], pads[0], pads[1], bias))
+        elif onnx_node.op_type == 'Gemm' or (onnx_node.op_type == 'MatMul' and len(inputs) == 1):
+            nodes.append(MakeNode(name, 'linear', inputs, in_shape, out_shape, target, bias=bias))
+        elif onnx_node.op_type == 'Relu':
+            nodes.append(MakeNode(name, 'ReLU', inputs, in_shape, out_shape, target))
+        elif onnx_node.op_type in ['MaxPool', 'AveragePool']:
+            kernel = list(attrs.get('kernel_shape', [1, 1]))
+            stride = list(attrs.get('strides', [1, 1]))
+            if list(attrs.get('pads', [0, 0, 0, 0])) != [0, 0, 0, 0] or attrs.get('ceil_mode', 0) != 0:
+                nodes.append(MakeNode(name, 'unsupported', inputs, in_shape, out_shape, target+" with padding or ceil_mode"))
+            else:
+                layer = 'MaxPool' if onnx_node.op_type == 'MaxPool' else 'AvgPool'
+                nodes.append(MakeNode(name, layer, inputs, in_shape, out_shape, target, kernel[0], kernel[1], stride[0], stride[1]))
+        elif onnx_node.op_type == 'InstanceNormalization':
+            nodes.append(MakeNode(name, 'InstNorm', inputs, in_shape, out_shape, target))
+        elif onnx_node.op_type == 'Add' and len(inputs) == 2:
+            nodes.append(MakeNode(name, 'add', inputs, in_shape, out_shape, target))
+        elif onnx_node.op_type == 'Add' and len(inputs) == 1:
+            # Bias of a MatMul (biases are not supported by the Deployer)
+            nodes.append(MakeNode(name, 'pass', inputs, in_shape, out_shape, target, bias=True))
+        elif onnx_node.op_type in ONNX_PASS_OPS:
+            nodes.append(MakeNode(name, 'pass', inputs[0:1], in_shape, out_shape, target))
+        else:
+            nodes.append(MakeNode(name, 'unsupported', inputs, in_shape, out_shape, target))
+    for value in graph.output:
+        nodes.append(MakeNode('__output__', 'output', [value.name], shapes.get(value.name), shapes.get(value.name), 'output'))
+
+    return nodes
+
+
+
+"""
+Graph builder
+"""
+
+# Returns True if node "ancestor" is an input (direct or not) of node "name"
+def IsAncestor(nodes_dict, ancestor, name):
+    visited = set()
+    stack = [name]
+    while len(stack) > 0:
+        current = stack.pop()
+        if current == ancestor:
+            return True
+        if current in visited or current not in nodes_dict:
+            continue
+        visited.add(current)
+        stack += nodes_dict[current]['inputs']
+    return False
+
+
+# Translates the nodes of a reader into the lists of the Deployer
+def BuildGraph(nodes, data_type):
+
+    errors = []
+    warnings = []
+
+    # Shape-only nodes are replaced by their input
+    alias = {}
+    graph_nodes = []
+    for node in nodes:
+        node['inputs'] = [alias.get(name, name) for name in node['inputs']]
+        if node['op'] == 'pass':
+            if node['bias'] == True:
+                warnings.append("{}: bias is ignored (not supported by the Deployer)".format(node['target']))
+            if len(node['inputs']) > 0:
+                alias[node['name']] = node['inputs'][0]
+            continue
+        if node['op'] == 'unsupported':
+            errors.append("Unsupported operator: {}".format(node['target']))
+            continue
+        if node['bias'] == True:
+            warnings.append("{}: bias is ignored (not supported by the Deployer)".format(node['target']))
+        graph_nodes.append(node)
+    nodes_dict = dict([(node['name'], node) for node in graph_nodes])
+    users = {}
+    for node in graph_nodes:
+        for name in node['inputs']:
+            users.setdefault(name, []).append(node['name'])
+
+    # Find the skip connections (skip derivation, main branch) of each sum
+    skips = {}          # Node -> list of (sum, skip layer or None for Skipnode)
+    skip_layers = {}    # Skip layer -> sum
+    main_inputs = {}    # Sum -> input of the main branch
+    for node in graph_nodes:
+        if node['op'] != 'add':
+            continue
+        a, b = node['inputs']
+        if IsAncestor(nodes_dict, a, b) or IsAncestor(nodes_dict, b, a):
+            # Identity skip connection (the derivation is an input of the other branch)
+            fork, main = (a, b) if IsAncestor(nodes_dict, a, b) else (b, a)
+            skips.setdefault(fork, []).append((node['name'], None))
+        else:
+            # Skip connection with a single layer (e.g. downsampling convolution)
+            skip_layer = None
+            for candidate, main in [(b, a), (a, b)]:
+                candidate_node = nodes_dict.get(candidate, None)
+                if candidate_node is not None and candidate_node['op'] not in ['input', 'add'] and len(users.get(candidate, [])) == 1 \
+                        and IsAncestor(nodes_dict, candidate_node['inputs'][0], main):
+                    skip_layer = candidate
+                    break
+            if skip_layer is None:
+                errors.append("Sum of two branches which is not a skip connection: {}".format(node['target']))
+                continue
+            fork = nodes_dict[skip_layer]['inputs'][0]
+            skips.setdefault(fork, []).append((node['name'], skip_layer))
+            skip_layers[skip_layer] = node['name']
+        main_inputs[node['name']] = main
+
+    if len(errors) > 0:
+        return None, errors, warnings
+
+    # Linearize the graph: the skip derivations are placed right after the layer they take the output from
+    graph = dict([(list_name, []) for list_name in GRAPH_LISTS])
+    connection_ids = {}
+
+    def add_layer(node, layer_type, connection):
+        in_shape = node['in_shape']
+        out_shape = node['out_shape']
+        if layer_type in ['linear'] or len(in_shape) == 1:
+            in_ch = math.prod(in_shape); hin = 1; win = 1
+        else:
+            in_ch, hin, win = in_shape[0:3]
+        out_ch = math.prod(out_shape) if layer_type == 'linear' or len(out_shape) == 1 else out_shape[0]
+        if layer_type in KERNEL_LAYERS:
+            # Check the output sizes with the Deployer's formula
+            hout = math.floor((hin - node['hk'] + 2*node['h_pad'] + node['h_str']) / node['h_str'])
+            wout = math.floor((win - node['wk'] + 2*node['w_pad'] + node['w_str']) / node['w_str'])
+            if [hout, wout] != list(out_shape[1:3]):
+                errors.append("{}: output size {}x{} does not match the traced size {}x{}".format(node['target'], hout, wout, out_shape[1], out_shape[2]))
+        if layer_type == 'Sumnode' and in_ch != out_ch:
+            errors.append("{}: sum of tensors with different sizes".format(node['target']))
+        values = {'layer_list': layer_type, 'sumnode_connections': connection, 'in_ch_list': in_ch, 'out_ch_list': out_ch,
+                  'hk_list': node['hk'], 'wk_list': node['wk'], 'hin_list': hin, 'win_list': win,
+                  'h_str_list': node['h_str'], 'w_str_list': node['w_str'], 'h_pad_list': node['h_pad'], 'w_pad_list': node['w_pad'],
+                  'opt_mm_fw_list': 0, 'opt_mm_wg_list': 0, 'opt_mm_ig_list': 0, 'data_type_list': data_type, 'data_layout_list': 'CHW'}
+        for list_name in GRAPH_LISTS:
+            graph[list_name].append(values[list_name])
+
+    def add_skips(fork):
+        for sum_name, skip_layer in skips.get(fork, []):
+            connection_ids[sum_name] = len(connection_ids) + 1
+            if skip_layer is None:
+                shape = nodes_dict[fork]['out_shape']
+                add_layer(MakeNode(fork, 'Skipnode', [fork], shape, shape, 'Skipnode'), 'Skipnode', connection_ids[sum_name])
+            else:
+                add_layer(nodes_dict[skip_layer], nodes_dict[skip_layer]['op'], connection_ids[sum_name])
+
+    current = None
+    for node in graph_nodes:
+        if node['op'] == 'input':
+            current = node['name']
+            add_skips(current)
+            continue
+        if node['name'] in skip_layers:
+            continue
+        if node['op'] == 'output':
+            if node['inputs'][0] != current:
+                errors.append("The output of the model is not the output of the last layer")
+            continue
+        if node['op'] == 'add':
+            if main_inputs[node['name']] != current:
+                errors.append("Branches are not supported: {} does not follow the previous layer".format(node['target']))
+            add_layer(node, 'Sumnode', connection_ids.get(node['name'], 0))
+        else:
+            if len(node['inputs']) != 1 or node['inputs'][0] != current:
+                errors.append("Branches are not supported: {} does not follow the previous layer".format(node['target']))
+            add_layer(node, node['op'], 0)
+        current = node['name']
+        add_skips(current)
+
+    if len(graph['layer_list']) == 0:
+        errors.append("No layers found in the model")
+
+    return graph, errors, warnings
+
+
+# Prints the lists of the graph as in the NETWORK GRAPH section of the Deployer
+def PrintGraph(graph):
+    print("# ------- NETWORK GRAPH --------")
+    for list_name in GRAPH_LISTS:
+        values = [("'"+value+"'" if isinstance(value, str) else str(value)) for value in graph[list_name]]
+        print("{:<20}= [ {} ]".format(list_name, ", ".join(values)))
+    print("# ----- END OF NETWORK GRAPH -----")
+
+
+
+"""
+The DNN Reader reads the model from model_source, which is either an ONNX file ("model.onnx")
+or a PyTorch nn.Module ("model.py:ClassName"), and returns the lists of the Deployer's graph
+"""
+def DNN_Reader(model_source, input_shape, data_type):
+
+    print("Reading model from "+model_source)
+    if model_source.endswith('.onnx'):
+        nodes = ReadOnnxModel(model_source, input_shape)
+    elif model_source.find('.py:') != -1:
+        nodes = ReadTorchModel(LoadTorchModel(model_source), input_shape)
+    else:
+        print("[DNN_Reader]: Invalid model source '{}' (expected 'model.onnx' or 'model.py:ClassName')!".format(model_source))
+        exit()
+
+    graph, errors, warnings = BuildGraph(nodes, data_type)
+    for warning in warnings:
+        print("[DNN_Reader]: Warning: "+warning)
+    if len(errors) > 0:
+        print("[DNN_Reader]: The model cannot be deployed:")
+        for error in errors:
+            print("\t"+error)
+        exit()
+
+    print("Read {} layers ({} skip connections)".format(len(graph['layer_list']), len([value for value in graph['layer_list'] if value == 'Sumnode'])))
+    PrintGraph(graph)
+
+    return graph
@@ -0,0 +1,161 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini
+'''
+
+from deployer_utils.DNN_Graph import IsSkipDerivation
+from deployer_utils.DNN_Tiler import WgtElements
+
+"""
+The DMA scheduler of the Double Buffer mode (USE_DMA = 'DB') computes the
+transfers of each layer and decides which of them can be issued ahead of
+time. In the forward step, the coefficients of layer N+1 are loaded while
+layer N computes. In the backward step, the input and the coefficients of
+layer N-1 are prefetched while layer N computes, if they do not overwrite
+the output gradient of layer N in its half of BUFF; otherwise they are
+loaded at the end of layer N, and the coefficients are only waited for
+before the input gradient of layer N-1 (its weight gradient does not need
+them). The scheduler also estimates the overlap between transfers and
+computation.
+"""
+
+# Layers whose backward kernels do not read the output data (it can be overwritten by a prefetch)
+BW_PREFETCH_LAYERS = ['conv2d', 'PW', 'DW', 'linear', 'ReLU']
+# Layers whose coefficients are not loaded in the backward step
+BW_NO_WGT_LAYERS = ['Skipnode', 'Sumnode', 'ReLU']
+# Layers which need their coefficients to compute the weight gradient
+WG_WGT_LAYERS = ['InstNorm']
+# Rough estimates of the cluster throughput to compute the overlap: bytes moved by the DMA and MACs per cycle
+DMA_BYTES_PER_CYCLE = 8
+MACS_PER_CYCLE = 4
+
+
+
+# Number of MACs (or elementwise operations) of a layer in a pass
+def LayerMACs(graph, layer):
+    l = graph[layer]
+    if l.type == 'DW':
+        return l.in_ch * l.hk * l.wk * l.hout * l.wout
+    elif l.type in ['conv2d', 'PW', 'linear']:
+        return l.out_ch * l.in_ch * l.hk * l.wk * l.hout * l.wout
+    return l.in_size()
+
+
+
+# Decides the transfers of the backward step of each layer (lay > 0) which are prefetched during its computation:
+# returns {lay: {'in': bool, 'wgt': bool, 'deferred_wgt': bool}}
+def ScheduleBackward(graph):
+
+    schedule = {}
+    for lay in range(1, len(graph)):
+        l = graph[lay]; prev = graph[lay-1]
+        plain = (l.type not in ['Sumnode', 'Skipnode'] and prev.type not in ['Sumnode', 'Skipnode'] and
+                 not IsSkipDerivation(graph, lay) and not IsSkipDerivation(graph, lay-1) and l.data_type == prev.data_type)
+        has_wgt = prev.type not in BW_NO_WGT_LAYERS
+        # Layout of the half of BUFF of the output of lay: [out.data | out.diff | ...],
+        # the input of lay-1 is placed at 0 and its coefficients at 2*in.dim
+        in_elements = prev.in_size(); out_elements = l.out_size()
+        prefetch_in = plain and l.type in BW_PREFETCH_LAYERS and in_elements <= out_elements
+        prefetch_wgt = plain and has_wgt and in_elements >= out_elements
+        schedule[lay] = {'in': prefetch_in, 'wgt': prefetch_wgt, 'deferred_wgt': plain and has_wgt and not prefetch_wgt}
+
+    return schedule
+
+
+
+# Estimates the transfers which are overlapped with the computation in the forward and backward steps:
+# returns {'FW': [[layer, dma bytes, overlapped bytes, compute cycles, hidden cycles], ...], 'BW': [...]}
+def EstimateOverlap(graph, schedule):
+
+    estimate = {'FW': [], 'BW': []}
+    last = len(graph) - 1
+
+    # Forward: the output of layer N-1 is stored and the coefficients of layer N+1 are loaded while layer N computes
+    for layer in range(len(graph)):
+        l = graph[layer]
+        total = 0; overlapped = 0
+        if layer == 0:
+            total += (l.in_size() + WgtElements(graph, 0)) * l.byte_size
+        else:
+            overlapped += graph[layer-1].out_size() * graph[layer-1].byte_size
+        if layer < last and graph[layer+1].type not in ['Skipnode', 'ReLU']:
+            overlapped += WgtElements(graph, layer+1) * graph[layer+1].byte_size
+        if layer == last:
+            total += l.out_size() * l.byte_size
+        total += overlapped
+        compute = LayerMACs(graph, layer) / MACS_PER_CYCLE
+        hidden = min(overlapped / DMA_BYTES_PER_CYCLE, compute)
+        estimate['FW'].append([layer, total, overlapped, int(compute), int(hidden)])
+
+    # Backward: the output gradient and the weight gradient are stored during the computation, the input and the coefficients
+    # of layer N-1 are either prefetched, or loaded at the end of layer N (the coefficients overlap the weight gradient of layer N-1)
+    deferred = 0
+    for lay in range(last, -1, -1):
+        l = graph[lay]
+        wg = 0 if l.type in ['Skipnode', 'Sumnode', 'ReLU'] else LayerMACs(graph, lay) / MACS_PER_CYCLE
+        ig = 0 if lay == 0 else LayerMACs(graph, lay) / MACS_PER_CYCLE
+        total = 0; overlapped = 0
+        # Coefficients loaded at the end of layer N+1, hidden by the weight gradient
+        hidden = 0 if l.type in WG_WGT_LAYERS else min(deferred / DMA_BYTES_PER_CYCLE, wg)
+        total += deferred; overlapped += deferred
+        deferred = 0
+        # Output gradient and weight gradient stores, prefetches of layer N-1
+        issued = l.out_size() * l.byte_size
+        if l.type not in BW_NO_WGT_LAYERS:
+            issued += WgtElements(graph, lay) * l.byte_size
+        if lay > 0:
+            prev = graph[lay-1]
+            in_bytes = prev.in_size() * prev.byte_size
+            wgt_bytes = 0 if prev.type in BW_NO_WGT_LAYERS else WgtElements(graph, lay-1) * prev.byte_size
+            if schedule[lay]['in']:
+                issued += in_bytes
+            else:
+                total += in_bytes
+            if schedule[lay]['wgt']:
+                issued += wgt_bytes
+            elif schedule[lay]['deferred_wgt']:
+                deferred = wgt_bytes
+            else:
+                total += wgt_bytes
+        total += issued; overlapped += issued
+        hidden += min(issued / DMA_BYTES_PER_CYCLE, wg + ig - hidden)
+        estimate['BW'].append([lay, total, overlapped, int(wg + ig), int(hidden)])
+
+    return estimate
+
+
+
+# Prints the DMA schedule of the Double Buffer mode and the estimated overlap between transfers and computation
+def PrintSchedule(graph, schedule):
+
+    estimate = EstimateOverlap(graph, schedule)
+    print("DMA schedule (Double Buffer mode), estimated with {} bytes/cycle (DMA) and {} MACs/cycle:".format(DMA_BYTES_PER_CYCLE, MACS_PER_CYCLE))
+    for step in ['FW', 'BW']:
+        dma_cycles = 0; hidden_cycles = 0; total_bytes = 0; overlapped_bytes = 0
+        for layer, total, overlapped, compute, hidden in estimate[step]:
+            prefetch = ""
+            if step == 'BW' and layer > 0:
+                wgt = 'prefetched' if schedule[layer]['wgt'] else ('deferred' if schedule[layer]['deferred_wgt'] else 'loaded')
+                prefetch = " (layer {}: input {}, coefficients {})".format(layer-1, 'prefetched' if schedule[layer]['in'] else 'loaded', wgt)
+            print("{} Layer {} ({}): DMA={} bytes, overlapped={} bytes, compute={} cycles, hidden DMA={} cycles{}".format(step, layer,
+                  graph[layer].type, total, overlapped, compute, hidden, prefetch))
+            dma_cycles += total / DMA_BYTES_PER_CYCLE; hidden_cycles += hidden
+            total_bytes += total; overlapped_bytes += overlapped
+        overlap = 100 * hidden_cycles / dma_cycles if dma_cycles > 0 else 0
+        print("{}: {} of {} bytes issued during the computation, estimated DMA/compute overlap: {:.1f}% ({} of {} DMA cycles hidden)".format(step,
+              overlapped_bytes, total_bytes, overlap, int(hidden_cycles), int(dma_cycles)))
@@ -0,0 +1,253 @@
+'''
+Copyright (C) 2021-2022 ETH Zurich and University of Bologna
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+
+'''
+Authors: Davide Nadalini
+'''
+
+from deployer_utils.DNN_Graph import DataTypeBytes
+
+"""
+The layer tiler splits the layers which do not fit the L1 buffer of the
+Single Buffer mode (USE_DMA = 'SB') into tiles of output channels and
+output rows. The tiles are streamed between L2 and L1 by the tile loops
+of net.c: the input tiles of the convolutions overlap by a halo of
+(KER_H - 1) rows, the weight gradients are accumulated over the row tiles
+and the input gradients over the output channel tiles and the halos.
+The element-wise layers (ReLU) are split in the same way, each tile of
+the output being computed from the same channels and rows of the input.
+The other layers (pooling, instance norm, residual connections) are kept
+whole: if one of them does not fit L1, the network cannot be deployed in
+Single Buffer mode.
+"""
+
+# Layers which can be tiled
+TILED_LAYERS = ['conv2d', 'PW', 'DW', 'linear', 'ReLU']
+# Tiled layers whose output elements only depend on the input element at the same position
+ELEMENTWISE_LAYERS = ['ReLU']
+# Maximum number of iterations to fit the tiles, the im2col and the transposition buffers in L1
+MAX_TILING_ITERATIONS = 8
+
+
+
+# Returns True if the layer can be split into tiles
+def CanTile(graph, layer):
+    # Layers of a residual connection are kept whole (see the skip derivation in GenerateNet)
+    return graph[layer].type in TILED_LAYERS and graph[layer].skip == -1
+
+
+# Returns True if the output rows of the layer can be split into tiles
+# (the halo of the convolutions is computed for stride 1 and no padding, as in the AutoTuner's tiling_geometry.py)
+def CanTileRows(graph, layer):
+    l = graph[layer]
+    if l.type == 'linear':
+        return False
+    elif l.type == 'PW' or l.type in ELEMENTWISE_LAYERS:
+        return True
+    return l.h_str == 1 and l.h_pad == 0
+
+
+# Candidate tile sizes of a dimension (one for each number of tiles)
+def TileCandidates(size):
+    return sorted(set([-(-size // num_tiles) for num_tiles in range(1, size+1)]), reverse=True)
+
+
+# Number of elements of the weights of a layer in the L1 buffer (the skip input of the Sumnodes is loaded as weights)
+def WgtElements(graph, layer):
+    l = graph[layer]
+    if l.type == 'DW':
+        return l.in_ch * l.hk * l.wk
+    elif l.type == 'Sumnode':
+        return l.in_size()
+    return l.wgt_size()
+
+
+# Number of elements of the im2col buffer of a layer (or of its biggest tile)
+def Im2colElements(graph, layer, tile=None):
+    l = graph[layer]
+    if l.type != 'conv2d':
+        return 0
+    if tile is None:
+        return max(l.in_ch * l.hk * l.wk * l.hout * l.wout, l.out_ch * l.hk * l.wk * l.hin * l.win)
+    return max(l.in_ch * l.hk * l.wk * tile['tile_ho'] * l.wout, tile['tile_co'] * l.hk * l.wk * tile['tile_hi'] * l.win)
+
+
+# Number of elements of the transposition / blocktransposition buffer of a layer (or of its biggest tile)
+def BtElements(graph, layer, tile=None):
+    l = graph[layer]
+    if l.type not in ['conv2d', 'PW'] or layer == 0:
+        return 0
+    if tile is None:
+        return l.in_ch * l.out_ch * l.hk * l.wk
+    return l.in_ch * tile['tile_co'] * l.hk * l.wk
+
+
+
+# Computes the sizes of the tiles of (tile_co) output channels and (tile_ho) output rows of a layer
+def TileSizes(graph, layer, tile_co, tile_ho):
+
+    l = graph[layer]
+    num_co = -(-l.out_ch // tile_co)
+    num_ho = -(-l.hout // tile_ho)
+    rows_tiled = num_ho > 1
+    halo = 0 if l.type in ELEMENTWISE_LAYERS else l.hk - 1
+    # Input rows of a tile (with halo)
+    if rows_tiled:
+        tile_hi = tile_ho + halo
+        in_rows = l.hout + (num_ho - 1) * halo
+    else:
+        tile_hi = l.hin
+        in_rows = l.hin
+
+    tile = {'type': l.type, 'tile_co': tile_co, 'tile_ho': tile_ho, 'tile_hi': tile_hi,
+            'num_co': num_co, 'num_ho': num_ho, 'rows_tiled': rows_tiled}
+
+    # Elements of the biggest tile
+    if l.type in ELEMENTWISE_LAYERS:
+        tile['in'] = tile_co * tile_hi * l.win
+        tile['wgt'] = 0
+        in_traffic = l.in_ch * in_rows * l.win
+    elif l.type == 'DW':
+        tile['in'] = tile_co * tile_hi * l.win
+        tile['wgt'] = tile_co * l.hk * l.wk
+        in_traffic = l.in_ch * in_rows * l.win
+    else:
+        tile['in'] = l.in_ch * tile_hi * l.win
+        tile['wgt'] = tile_co * l.in_ch * l.hk * l.wk
+        in_traffic = num_co * l.in_ch * in_rows * l.win
+    tile['out'] = tile_co * tile_ho * l.wout
+
+    # Partial sums: weight gradient over the row tiles, input gradient over the output channel tiles and the halos
+    tile['wg_acc'] = num_ho > 1 and tile['wgt'] > 0
+    tile['ig_acc'] = layer > 0 and l.type not in ELEMENTWISE_LAYERS and ((l.type != 'DW' and num_co > 1) or (rows_tiled and halo > 0))
+    tile['acc'] = max(tile['in'] if tile['ig_acc'] else 0, tile['wgt'] if tile['wg_acc'] else 0)
+    tile['i2c'] = Im2colElements(graph, layer, tile)
+    tile['bt'] = BtElements(graph, layer, tile)
+
+    # Elements moved between L2 and L1 by a training step (forward and backward),
+    # the weights and their gradient stay in L1 for all the row tiles of an output channel tile
+    wgt_traffic = WgtElements(graph, layer)
+    out_traffic = l.out_size()
+    fw = in_traffic + wgt_traffic + out_traffic
+    bw = in_traffic + 2 * wgt_traffic + out_traffic
+    if layer > 0:
+        bw += in_traffic
+    if tile['ig_acc']:
+        bw += in_traffic + l.in_size()
+    tile['traffic'] = fw + bw
+
+    return tile
+
+
+# Memory occupation (bytes) of a tile in L1: data and gradients of input, weights and output,
+# partial sums, im2col and transposition buffers
+def TileBytes(tile, byte_size):
+    return (2 * (tile['in'] + tile['wgt'] + tile['out']) + tile['acc'] + tile['i2c'] + tile['bt']) * byte_size
+
+
+# Memory occupation (bytes) of a whole layer in L1
+def LayerBytes(graph, layer, byte_size):
+    l = graph[layer]
+    return (2 * (l.in_size() + WgtElements(graph, layer) + l.out_size()) + Im2colElements(graph, layer) + BtElements(graph, layer)) * byte_size
+
+
+
+# Finds the tiles of a layer which fit budget_bytes with the lowest L2-L1 traffic
+def PlanLayerTiles(graph, layer, budget_bytes):
+
+    l = graph[layer]
+    byte_size = DataTypeBytes(graph.data_type_l[0])
+    ho_candidates = [l.hout]
+    if CanTileRows(graph, layer):
+        ho_candidates = TileCandidates(l.hout)
+
+    best = None
+    for tile_co in TileCandidates(l.out_ch):
+        for tile_ho in ho_candidates:
+            tile = TileSizes(graph, layer, tile_co, tile_ho)
+            if TileBytes(tile, byte_size) > budget_bytes:
+                continue
+            if best is None or (tile['traffic'], tile['num_co'] * tile['num_ho']) < (best['traffic'], best['num_co'] * best['num_ho']):
+                best = tile
+
+    return best
+
+
+# Tiles all the layers which do not fit budget_bytes: returns {layer: tile} and the messages
+# of the layers which do not fit budget_bytes and cannot be tiled
+def PlanTiles(graph, budget_bytes):
+
+    byte_size = DataTypeBytes(graph.data_type_l[0])
+    tiles = {}
+    untiled = []
+    for layer in range(len(graph)):
+        if LayerBytes(graph, layer, byte_size) <= budget_bytes:
+            continue
+        if not CanTile(graph, layer):
+            untiled.append("Layer {} ({}) needs {} bytes, does not fit L1 and cannot be tiled!".format(layer, graph[layer].type, LayerBytes(graph, layer, byte_size)))
+            continue
+        tile = PlanLayerTiles(graph, layer, budget_bytes)
+        if tile is None:
+            untiled.append("Unable to tile layer {} ({}) into {} bytes!".format(layer, graph[layer].type, budget_bytes))
+            continue
+        tiles[layer] = tile
+
+    return tiles, untiled
+
+
+# Computes the size (bytes) of the L1 buffer of the Single Buffer mode with the tiles (see max_layer_dim)
+def BuffBytes(graph, tiles):
+
+    max_elements = 0
+    for layer in range(len(graph)):
+        l = graph[layer]
+        elements = 2 * (l.in_size() + WgtElements(graph, layer) + l.out_size())
+        if layer in tiles:
+            tile = tiles[layer]
+            elements = 2 * (tile['in'] + tile['wgt'] + tile['out']) + tile['acc']
+            if layer == len(graph)-1:
+                elements = max(elements, 2 * l.out_size())
+        max_elements = max(max_elements, elements)
+
+    return max_elements * DataTypeBytes(graph.data_type_l[0])
+
+
+# Computes the sizes (bytes) of the im2col and transposition buffers with the tiles: [im2col, im2col layer, bt, bt layer]
+def BufferBytes(graph, tiles):
+
+    im2col_bytes = 0; im2col_idx = 0
+    bt_bytes = 0; bt_idx = 0
+    for layer in range(len(graph)):
+        byte_size = graph[layer].byte_size
+        i2c = Im2colElements(graph, layer, tiles.get(layer)) * byte_size
+        bt = BtElements(graph, layer, tiles.get(layer)) * byte_size
+        if i2c > im2col_bytes:
+            im2col_bytes = i2c; im2col_idx = layer
+        if bt > bt_bytes:
+            bt_bytes = bt; bt_idx = layer
+
+    return im2col_bytes, im2col_idx, bt_bytes, bt_idx
+
+
+# Prints the tiles of the network
+def PrintTiles(graph, tiles):
+
+    byte_size = DataTypeBytes(graph.data_type_l[0])
+    for layer, tile in tiles.items():
+        l = graph[layer]
+        print("Layer {} ({}) tiled in {} x {} tiles (output channels x output rows): Tile C_out={}, H_out={}, H_in={}, L1 bytes={} instead of {}, L2-L1 elements per training step={}".format(
+              layer, l.type, tile['num_co'], tile['num_ho'], tile['tile_co'], tile['tile_ho'], tile['tile_hi'],
+              TileBytes(tile, byte_size), LayerBytes(graph, layer, byte_size), tile['traffic']))
@@ -19,23 +19,32 @@ Authors: Davide Nadalini, Giacomo Saporetti
 '''
 
 import os
-import shutil
-import math
 
 import torch 
 from torch import mm
 import deployer_utils.GM_templates as Gtemp
 import deployer_utils.net_templates as ntemp
+import deployer_utils.DNN_Planner as planner
+import deployer_utils.DNN_Fusion as fusion_pass
+import deployer_utils.DNN_Batch as batching
+import deployer_utils.DNN_Files as files
 
 
 """
 DNN Size Checker backend functions
 """
 
-def compute_wgt_act_memocc_bytes(layer_number, layer_type, chin, chout, hk, wk, hin, win, h_pad, w_pad, h_str, w_str, DATA_TYPE, is_last_layer):
+def compute_wgt_act_memocc_bytes(graph, layer_number):
 
     memocc_bytes = 0
 
+    layer = graph[layer_number]
+    layer_type = layer.type
+    chin = layer.in_ch; chout = layer.out_ch
+    hk = layer.hk; wk = layer.wk
+    hin = layer.hin; win = layer.win
+    is_last_layer = (layer_number == len(graph) - 1)
+
     # First layer does not have in grad
     in_grad_present = 1
     if layer_number == 0:
@@ -51,46 +60,47 @@ def compute_wgt_act_memocc_bytes(layer_number, layer_type, chin, chout, hk, wk,
     if layer_type in ['ReLu', 'Skipnode', 'Sumnode']:
         wgt_present = 0
 
-    byte_size = 4
-    if DATA_TYPE == 'FP32':
-        byte_size = 4
-    elif DATA_TYPE == 'FP16':
-        byte_size = 2
-    else:
-        print("[deployment_utils.compute_wgt_act_memocc_bytes]: Invalid data type!!")
-        exit()
+    byte_size = layer.byte_size
+    # Activations and their gradients hold all the samples of the batch
+    batch_size = graph.batch_size
 
     # Output H and W
-    hout = math.floor( (hin-hk+2*h_pad+h_str)/h_str )
-    wout = math.floor( (win-wk+2*w_pad+w_str)/w_str )
+    hout = layer.hout
+    wout = layer.wout
 
     # FORWARD
     # Input act
-    memocc_bytes += chin * hin * win * byte_size
+    memocc_bytes += chin * hin * win * byte_size * batch_size
     # Weights
     if  layer_type == 'InstNorm':
         memocc_bytes += 2 * chin * byte_size
     else:    
         memocc_bytes += chin * chout * hk * wk * byte_size * wgt_present
     # Out act
-    memocc_bytes += chout * hout * wout * byte_size * output_separate_occupation
+    memocc_bytes += chout * hout * wout * byte_size * batch_size * output_separate_occupation
 
     # BACKWARD
     # Input act grad
-    memocc_bytes += chin * hin * win * byte_size * in_grad_present
+    memocc_bytes += chin * hin * win * byte_size * batch_size * in_grad_present
     # Weight grad
     memocc_bytes += chin * chout * hk * wk * byte_size * wgt_present
     # Output grad
-    memocc_bytes += chout * hout * wout * byte_size * output_separate_occupation
+    memocc_bytes += chout * hout * wout * byte_size * batch_size * output_separate_occupation
 
 
     return memocc_bytes
 
 
-def compute_im2col_memocc_bytes(layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, h_pad_l, w_pad_l, h_str_l, w_str_l, data_type_l):
+def compute_im2col_memocc_bytes(graph):
 
     memocc_bytes = 0
 
+    layers_l = graph.layers_l
+    in_ch_l = graph.in_ch_l; out_ch_l = graph.out_ch_l
+    hk_l = graph.hk_l; wk_l = graph.wk_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    data_type_l = graph.data_type_l
+
     max_im2col_size = 0
     max_im2col_index = 0
     for layer in range(len(layers_l)):
@@ -104,8 +114,8 @@ def compute_im2col_memocc_bytes(layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l,
             print("[deployment_utils.compute_im2col_memocc_bytes]: Invalid data type @Layer{}!!".format(layer))
             exit()      
         # Output H and W
-        hout = math.floor( (hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer] )
-        wout = math.floor( (win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer] )
+        hout = graph.hout_l[layer]
+        wout = graph.wout_l[layer]
         # Find max im2col size
         if layers_l[layer] == 'conv2d': # or layers_l[layer] == 'DW':
             im2col_size = 0
@@ -125,10 +135,15 @@ def compute_im2col_memocc_bytes(layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l,
     return memocc_bytes, max_im2col_index
 
 
-def compute_cast_buffer_memocc_bytes (layers_l, chin_l, chout_l, hk_l, wk_l, hin_l, win_l, h_pad_l, w_pad_l, h_str_l, w_str_l, data_type_l):
+def compute_cast_buffer_memocc_bytes (graph):
 
     memocc_bytes = 0
 
+    layers_l = graph.layers_l
+    chin_l = graph.in_ch_l; chout_l = graph.out_ch_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    data_type_l = graph.data_type_l
+
     # Find the largest activation size (buffer for temporary casts)
     act_inout = 'Input'
     previous_type = data_type_l[0]
@@ -148,8 +163,8 @@ def compute_cast_buffer_memocc_bytes (layers_l, chin_l, chout_l, hk_l, wk_l, hin
             print("[deployment_utils.compute_im2col_memocc_bytes]: Invalid data type @Layer{}!!".format(layer))
             exit()    
         # Output H and W
-        hout = math.floor( (hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer] )
-        wout = math.floor( (win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer] )
+        hout = graph.hout_l[layer]
+        wout = graph.wout_l[layer]
         # Find mixed precision
         if data_type_l[layer] != previous_type:
             # Find current sizes
@@ -165,15 +180,21 @@ def compute_cast_buffer_memocc_bytes (layers_l, chin_l, chout_l, hk_l, wk_l, hin
                 max_act_size = curr_max_act_size
                 max_act_index = layer
 
-    memocc_bytes = max_act_size
+    memocc_bytes = max_act_size * graph.batch_size
 
     return memocc_bytes, max_act_index, act_inout
 
 
-def compute_bt_memocc_bytes(layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l, data_type_l):
+def compute_bt_memocc_bytes(graph):
 
     memocc_bytes = 0
 
+    layers_l = graph.layers_l
+    in_ch_l = graph.in_ch_l; out_ch_l = graph.out_ch_l
+    hk_l = graph.hk_l; wk_l = graph.wk_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    data_type_l = graph.data_type_l
+
     max_bt_size = 0
     max_bt_index = 0
     for layer in range(len(layers_l)):
@@ -223,17 +244,18 @@ def InitProject(proj_folder_path):
     utils_folder = proj_folder + 'utils/'
     trainlib_dest_folder = proj_folder + 'lib/' 
     
-    os.mkdir(proj_folder)
-    os.mkdir(utils_folder)
+    # Files are only (re)written if changed (see DNN_Files), so that an existing project is updated in place
+    os.makedirs(proj_folder, exist_ok=True)
+    os.makedirs(utils_folder, exist_ok=True)
 
-    shutil.copy2('./deployer_utils/srcfiles/main.c', proj_folder)
-    shutil.copy2('./deployer_utils/srcfiles/stats.h', proj_folder)
-    shutil.copy2('./deployer_utils/srcfiles/dump_utils.py', utils_folder)
-    shutil.copytree(trainlib_src_folder, trainlib_dest_folder)
+    files.CopyIfChanged('./deployer_utils/srcfiles/main.c', proj_folder)
+    files.CopyIfChanged('./deployer_utils/srcfiles/stats.h', proj_folder)
+    files.CopyIfChanged('./deployer_utils/srcfiles/dump_utils.py', utils_folder)
+    files.CopyTreeIfChanged(trainlib_src_folder, trainlib_dest_folder)
 
-    f = open(proj_folder+'readme.txt', 'w')
+    f = files.OpenGenerated(proj_folder+'readme.txt')
     f.write('To compile the application, run "make clean get_golden all run > log.txt".\nIf running on a board (not GVSoC), add "APP_CFLAGS += -DBOARD" to the user section of the Makefile (profiling of cycles only).\n')
-    f.write('To modify the hyperparameters (learning rate, epochs, batch size still not implemented), \nedit the variables inside "utils/GM.py".\n')
+    f.write('To modify the hyperparameters (learning rate, epochs), \nedit the variables inside "utils/GM.py" (they are written in hyperparameters.h).\nThe batch size also sizes the tensors of net.c, change it in the Deployer and generate the project again.\n')
     f.close()
 
     return
@@ -243,12 +265,18 @@ def InitProject(proj_folder_path):
 
 
 # Generates the Makefile
-def GenerateMakefile(proj_folder_path, project_name, layers_l, NUM_CORES, data_type_l, opt_mm_fw_list, opt_mm_wg_list, opt_mm_ig_list):
+def GenerateMakefile(proj_folder_path, project_name, graph, NUM_CORES, DATA_OUTPUT):
+
+    layers_l = graph.layers_l
+    data_type_l = graph.data_type_l
+    opt_mm_fw_list = graph.opt_mm_fw_l
+    opt_mm_wg_list = graph.opt_mm_wg_l
+    opt_mm_ig_list = graph.opt_mm_ig_l
 
     proj_folder = proj_folder_path
     makefile_name = proj_folder + 'Makefile'
 
-    f = open(makefile_name, 'w')
+    f = files.OpenGenerated(makefile_name)
 
     f.write('APP = ' + project_name + '\n\n')
 
@@ -265,7 +293,10 @@ def GenerateMakefile(proj_folder_path, project_name, layers_l, NUM_CORES, data_t
     f.write('NUM_MATMULS?=24		# Available standard matmuls in the library' + '\n')
     f.write('TRAIN_LIB=./lib\n')
     f.write('TRAIN_LIB_SRCS=$(TRAIN_LIB)/sources\n')
-    f.write('APP_SRCS = main.c net.c\n\n')
+    f.write('APP_SRCS = main.c net.c\n')
+    if DATA_OUTPUT == 'BIN':
+        f.write('APP_SRCS += io_data_bin.c\n')
+    f.write('\n')
 
     f.write('APP_CFLAGS += -I. -I$(TRAIN_LIB)/include\n')
     f.write('APP_CFLAGS += -O3 -g3\n')
@@ -337,24 +368,30 @@ def GenerateMakefile(proj_folder_path, project_name, layers_l, NUM_CORES, data_t
 
 
 # Generates the Golden Model
-def GenerateGM(proj_folder_path, project_name,
-                layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                h_str_l, w_str_l, h_pad_l, w_pad_l,
+def GenerateGM(proj_folder_path, project_name, graph,
                 epochs, batch_size, learning_rate, optimizer, loss_fn,
-                data_type_l, sumnode_connections, USE_DMA):
+                USE_DMA, DATA_OUTPUT):
+
+    # Lists of the graph
+    layers_l = graph.layers_l
+    in_ch_l = graph.in_ch_l; out_ch_l = graph.out_ch_l
+    hk_l = graph.hk_l; wk_l = graph.wk_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    h_str_l = graph.h_str_l; w_str_l = graph.w_str_l
+    h_pad_l = graph.h_pad_l; w_pad_l = graph.w_pad_l
+    data_type_l = graph.data_type_l
+    sumnode_connections = graph.sumnode_connections
 
     # Check if GPU is available, else keep fake FP16
     cuda_is_on = torch.cuda.is_available()
     
     # Print DNN structure
     print("---------- DNN ARCHITECTURE ----------")
-    for layer in range(len(layers_l)):
-        h_out = math.floor((hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer])
-        w_out = math.floor((win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer])
-        print("Layer {}: {} {}, in=[{}, {}, {}], wgt=[{}, {}, {}, {}], out=[{}, {}, {}]".format(layer, data_type_l[layer], layers_l[layer], in_ch_l[layer], hin_l[layer], win_l[layer], out_ch_l[layer], hk_l[layer], wk_l[layer], in_ch_l[layer], out_ch_l[layer], h_out, w_out))
+    for layer in graph:
+        print(layer)
     print("--------------------------------------")
 
-    f = open(proj_folder_path+'utils/GM.py', 'w')
+    f = files.OpenGenerated(proj_folder_path+'utils/GM.py')
 
     f.write("import torch\n")
     f.write("import torch.nn as nn\n")
@@ -369,6 +406,19 @@ def GenerateGM(proj_folder_path, project_name,
     f.write("else:\n")
     f.write("\tdevice = torch.device('cpu')\n")  
 
+    # Reuse the outputs of a previous run of the same golden model
+    f.write("\n# Reuse the outputs of a previous run with the same configuration (see dump_utils.restore_golden_model())\n")
+    f.write("if dump.restore_golden_model():\n")
+    f.write("\texit()\n")
+
+    # Select output format of the data
+    if DATA_OUTPUT == 'BIN':
+        f.write("\n# Write data to io_data.bin (linked by io_data_bin.c)\n")
+        f.write("dump.set_output_mode('bin')\n")
+    elif DATA_OUTPUT != 'TEXT':
+        print("[deployment_utils.GenerateGM]: Invalid data output format {}!".format(DATA_OUTPUT))
+        exit()
+
     # Define hyperparameters
     f.write("# Define hyperparameters\n")
     f.write("learning_rate = "+str(learning_rate)+"\n")
@@ -392,8 +442,8 @@ def GenerateGM(proj_folder_path, project_name,
         f.write("l"+str(layer)+"_wpad = "+str(w_pad_l[layer])+"\n")
     f.write("\n")
 
-    # Write sizes to the header files 
-    f.write("f = open('init-defines.h', 'w')\n")
+    # Write sizes to the header files (rewritten only if changed, to avoid rebuilding net.c)
+    f.write("f = dump.open_if_changed('init-defines.h')\n")
     for layer in range(len(layers_l)):
         f.write("f.write('// Layer"+str(layer)+"\\n')\n")
         f.write("f.write('#define Tin_C_l"+str(layer)+" '+str(l"+str(layer)+"_in_ch)+'\\n')\n")
@@ -403,8 +453,8 @@ def GenerateGM(proj_folder_path, project_name,
             f.write("f.write('#define Tker_W_l"+str(layer)+" '+str(l"+str(layer)+"_wk)+'\\n')\n")
         f.write("f.write('#define Tin_H_l"+str(layer)+" '+str(l"+str(layer)+"_hin)+'\\n')\n")
         f.write("f.write('#define Tin_W_l"+str(layer)+" '+str(l"+str(layer)+"_win)+'\\n')\n")
-        f.write("f.write('#define Tout_H_l"+str(layer)+" '+str(math.floor((l"+str(layer)+"_hin-l"+str(layer)+"_hk+2*l"+str(layer)+"_hpad+l"+str(layer)+"_hstr)/l"+str(layer)+"_hstr))+'\\n')\n")
-        f.write("f.write('#define Tout_W_l"+str(layer)+" '+str(math.floor((l"+str(layer)+"_win-l"+str(layer)+"_wk+2*l"+str(layer)+"_wpad+l"+str(layer)+"_wstr)/l"+str(layer)+"_wstr))+'\\n')\n")
+        f.write("f.write('#define Tout_H_l"+str(layer)+" "+str(graph.hout_l[layer])+"\\n')\n")
+        f.write("f.write('#define Tout_W_l"+str(layer)+" "+str(graph.wout_l[layer])+"\\n')\n")
         # Padding and stride
         if layers_l[layer]  != 'Skipnode' and layers_l[layer]  != 'Sumnode':
             f.write("f.write('#define Tstr_H_l"+str(layer)+" '+str(l"+str(layer)+"_hstr)+'\\n')\n")
@@ -413,9 +463,9 @@ def GenerateGM(proj_folder_path, project_name,
             f.write("f.write('#define Tpad_W_l"+str(layer)+" '+str(l"+str(layer)+"_wpad)+'\\n')\n")
     f.write("f.close()\n\n")
 
-    # Write hyperparameters to header
-    f.write("f = open('init-defines.h', 'a')\n")
-    f.write("f.write('\\n// HYPERPARAMETERS\\n')\n")
+    # Write hyperparameters to their own header
+    f.write("f = dump.open_if_changed('hyperparameters.h')\n")
+    f.write("f.write('// HYPERPARAMETERS\\n')\n")
     f.write("f.write('#define LEARNING_RATE '+str(learning_rate)+'\\n')\n")
     f.write("f.write('#define EPOCHS '+str(epochs)+'\\n')\n")
     f.write("f.write('#define BATCH_SIZE '+str(batch_size)+'\\n')\n")
@@ -424,7 +474,7 @@ def GenerateGM(proj_folder_path, project_name,
     # Create input data and label
     f.write("\n# Simple input data \n")
     if (layers_l[0] == 'linear'):
-        f.write("inp = torch.div(torch.ones(l0_in_ch), 1e6).to(device)\n")
+        f.write("inp = torch.div(torch.ones(batch_size, l0_in_ch), 1e6).to(device)\n")
     elif (layers_l[0] in ['conv2d', 'DW', 'PW', 'Skipnode', 'InstNorm']):
         f.write("inp = torch.torch.div(torch.rand(batch_size, l0_in_ch, l0_hin, l0_win), 1e6).to(device)\n")
     # Throw error
@@ -497,9 +547,9 @@ def GenerateGM(proj_folder_path, project_name,
         if sumnode_connections[layer] != -1:
             variable = f'y{sumnode_connections[layer]}' # Create a temporary variable for skip connections
 
-        # Vectorize inputs in case of linear layer
+        # Vectorize inputs in case of linear layer (one vector per sample)
         if layers_l[layer] == 'linear':
-            f.write(f"\n\t\t{variable} = torch.reshape(x, (-1,))")
+            f.write(f"\n\t\t{variable} = torch.reshape(x, (batch_size, -1))")
         # Set data format for each layer
         if layer == 0 and data_type_l[layer] == 'FP16':
             if cuda_is_on: 
@@ -557,16 +607,16 @@ def GenerateGM(proj_folder_path, project_name,
     f.write("f.write('// Init weights\\n')\n")
     for layer in range(len(layers_l)):
         if (layers_l[layer] not in ['ReLU', 'MaxPool',  'AvgPool', 'Skipnode', 'Sumnode']):
-            dump = f"+dump.tensor_to_string(net.l{layer}.weight.data)+"
+            dump = f"net.l{layer}.weight.data"
             if layers_l[layer] != 'InstNorm':
                 f.write("f.write('#define WGT_SIZE_L"+str(layer)+" '+str(l"+str(layer)+"_in_ch*l"+str(layer)+"_out_ch*l"+str(layer)+"_hk*l"+str(layer)+"_wk)+'\\n')\n")
             else:
                 f.write("f.write(f'#define WGT_SIZE_L" + f"{layer}" + "  2*{" + f"l{layer}_in_ch" + "}\\n')\n")
-                dump = f"+dump.tensor_to_string(net.l{layer}.weight.data)+dump.tensor_to_string(net.l{layer}.bias.data)+"
+                dump = f"[net.l{layer}.weight.data, net.l{layer}.bias.data]"
             if data_type_l[layer] == 'FP32':
-                f.write("f.write('PI_L2 float init_WGT_l"+str(layer)+"[WGT_SIZE_L"+str(layer)+"] = {'"+dump+"'};\\n')\n")
+                f.write("dump.write_array(f, 'init_WGT_l"+str(layer)+"', "+dump+", 'float', 'PI_L2', 'WGT_SIZE_L"+str(layer)+"')\n")
             elif data_type_l[layer] == 'FP16':
-                f.write("f.write('PI_L2 fp16 init_WGT_l"+str(layer)+"[WGT_SIZE_L"+str(layer)+"] = {'"+dump+"'};\\n')\n")
+                f.write("dump.write_array(f, 'init_WGT_l"+str(layer)+"', "+dump+", 'fp16', 'PI_L2', 'WGT_SIZE_L"+str(layer)+"')\n")
             else:
                 print("[deployment_utils.GenerateGM] Error in data type definition! (weight init)")
                 exit()
@@ -607,29 +657,32 @@ def GenerateGM(proj_folder_path, project_name,
     # Dump input and output of the network to the header file for the MCU
     f.write("f = open('io_data.h', 'a')\n")
     f.write("f.write('// Input and Output data\\n')\n")
-    f.write("f.write('#define IN_SIZE "+str(in_ch_l[0]*win_l[0]*hin_l[0])+"\\n')\n")
+    f.write("f.write('#define IN_SIZE "+str(graph.batch_size*in_ch_l[0]*win_l[0]*hin_l[0])+"\\n')\n")
     # Fake input data definition
     memory_loc = 'L1'
     if USE_DMA == 'SB' or USE_DMA == 'DB':
         memory_loc = 'L2'
     if data_type_l[0] == 'FP32':
-        f.write(f"f.write('PI_{memory_loc} float INPUT[IN_SIZE] ="+" {'+dump.tensor_to_string(inp)+'};\\n')\n")
+        f.write(f"dump.write_array(f, 'INPUT', inp, 'float', 'PI_{memory_loc}', 'IN_SIZE')\n")
     elif data_type_l[0] == 'FP16':
-        f.write(f"f.write('PI_{memory_loc} fp16 INPUT[IN_SIZE] ="+" {'+dump.tensor_to_string(inp)+'};\\n')\n")
+        f.write(f"dump.write_array(f, 'INPUT', inp, 'fp16', 'PI_{memory_loc}', 'IN_SIZE')\n")
     else:
         print("[deployment_utils.GenerateGM] Invalid input data size!")
-    f.write("out_size = (int(math.floor(l"+str(last_layer)+"_hin-l"+str(last_layer)+"_hk+2*l"+str(last_layer)+"_hpad+l"+str(last_layer)+"_hstr)/l"+str(last_layer)+"_hstr)) * (int(math.floor(l"+str(last_layer)+"_win-l"+str(last_layer)+"_wk+2*l"+str(last_layer)+"_wpad+l"+str(last_layer)+"_wstr)/l"+str(last_layer)+"_wstr)) * l"+str(last_layer)+"_out_ch\n") 
+    f.write("out_size = "+str(graph.batch_size*graph[last_layer].out_size())+"\n")
     f.write("f.write('#define OUT_SIZE '+str(out_size)+'\\n')\n")
     # Fake output data and label definition
     if data_type_l[-1] == 'FP32':
-        f.write("f.write('PI_L2 float REFERENCE_OUTPUT[OUT_SIZE] = {'+dump.tensor_to_string(out)+'};\\n')\n")
-        f.write(f"f.write('PI_{memory_loc} float LABEL[OUT_SIZE] = "+"{'+dump.tensor_to_string(label)+'};\\n')\n")
+        f.write("dump.write_array(f, 'REFERENCE_OUTPUT', out, 'float', 'PI_L2', 'OUT_SIZE')\n")
+        f.write(f"dump.write_array(f, 'LABEL', label, 'float', 'PI_{memory_loc}', 'OUT_SIZE')\n")
     elif data_type_l[-1] == 'FP16':
-        f.write("f.write('PI_L2 fp16 REFERENCE_OUTPUT[OUT_SIZE] = {'+dump.tensor_to_string(out)+'};\\n')\n")
-        f.write(f"f.write('PI_{memory_loc} fp16 LABEL[OUT_SIZE] = "+"{'+dump.tensor_to_string(label)+'};\\n')\n")    
+        f.write("dump.write_array(f, 'REFERENCE_OUTPUT', out, 'fp16', 'PI_L2', 'OUT_SIZE')\n")
+        f.write(f"dump.write_array(f, 'LABEL', label, 'fp16', 'PI_{memory_loc}', 'OUT_SIZE')\n")    
     else:
         print("[deployment_utils.GenerateGM] Invalid output data size!")
     f.write("f.close()\n")
+    f.write("dump.close_output()\n")
+    f.write("\n# Store the outputs for the next runs with the same configuration\n")
+    f.write("dump.store_golden_model()\n")
 
     f.close()
 
@@ -640,15 +693,22 @@ def GenerateGM(proj_folder_path, project_name,
 
 
 # Generate the net.c and net.h files for the execution on PULP
-def GenerateNet(proj_folder_path, project_name,
-                layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                h_str_l, w_str_l, h_pad_l, w_pad_l,
+def GenerateNet(proj_folder_path, project_name, graph,
                 epochs, batch_size, learning_rate, optimizer, loss_fn,
-                data_type_l, sumnode_connections,
-                PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS):
+                PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS, USE_L1_PLANNER, FUSION=None):
+
+    # Lists of the graph
+    layers_l = graph.layers_l
+    h_str_l = graph.h_str_l; w_str_l = graph.w_str_l
+    h_pad_l = graph.h_pad_l; w_pad_l = graph.w_pad_l
+    data_type_l = graph.data_type_l
+    sumnode_connections = graph.sumnode_connections
+    # Layers fused with a ReLU (see DNN_Fusion)
+    if FUSION is None:
+        FUSION = fusion_pass.NoFusion()
 
     # Generate net.h
-    f = open(proj_folder_path+'net.h', 'w')
+    f = files.OpenGenerated(proj_folder_path+'net.h')
 
     f.write("// PULP Defines\n")
     f.write("#define STACK_SIZE      4096\n")
@@ -673,7 +733,7 @@ def GenerateNet(proj_folder_path, project_name,
 
 
     # Generate net.c
-    f = open(proj_folder_path+'net.c', 'w')
+    f = files.OpenGenerated(proj_folder_path+'net.c')
 
     f.write("/**\n * INCLUDES\n**/\n\n")
 
@@ -681,6 +741,7 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("#include \"net.h\"\n")
     f.write("#include \"stats.h\"\n\n")
     f.write("#include \"init-defines.h\"\n")
+    f.write("#include \"hyperparameters.h\"\n")
     f.write("#include \"io_data.h\"\n")
 
 
@@ -809,234 +870,12 @@ def GenerateNet(proj_folder_path, project_name,
             print("[deployment_utils.GenerateNet] Invalid data type for kernel definition @Layer{}!".format(layer))
             exit()
 
-    f.write("\n// Define kernel grad tensors\n")
-    for layer in range(len(layers_l)):
-        # Define FP32 tensors
-        if data_type_l[layer] == 'FP32':
-            if layers_l[layer] == 'MaxPool' or layers_l[layer] == 'AvgPool':
-                f.write("PI_L1 float l"+str(layer)+"_ker_diff[1];\n")
-            elif layers_l[layer] == 'Skipnode' or layers_l[layer] == 'Sumnode':
-                pass
-            elif layers_l[layer] == 'InstNorm':
-                f.write("PI_L1 float l"+str(layer)+f"_ker_diff[2*Tin_C_l{layer}];\n")
-            else:    
-                f.write("PI_L1 float l"+str(layer)+"_ker_diff[Tin_C_l"+str(layer)+" * Tout_C_l"+str(layer)+" * Tker_H_l"+str(layer)+" * Tker_W_l"+str(layer)+"];\n")
-        # Define FP16 tensors
-        elif data_type_l[layer] == 'FP16':
-            if layers_l[layer] == 'MaxPool' or layers_l[layer] == 'AvgPool':
-                f.write("PI_L1 fp16 l"+str(layer)+"_ker_diff[1];\n")
-            elif layers_l[layer] == 'Skipnode' or layers_l[layer] == 'Sumnode':
-                pass
-            elif layers_l[layer] == 'InstNorm':
-                f.write("PI_L1 fp16 l"+str(layer)+f"_ker_diff[2*Tin_C_l{layer}];\n")
-            else:    
-                f.write("PI_L1 fp16 l"+str(layer)+"_ker_diff[Tin_C_l"+str(layer)+" * Tout_C_l"+str(layer)+" * Tker_H_l"+str(layer)+" * Tker_W_l"+str(layer)+"];\n")
-        # Data type error
-        else:
-            print("[deployment_utils.GenerateNet] Invalid data type for kernel grad definition @Layer{}!".format(layer))
-            exit()
-
-    f.write("\n// Define I/O tensors\n")
-
-    previous_was_skip = False 
-    for layer in range(len(layers_l)):
-        # Define FP32 tensors
-        if not previous_was_skip: # If the previous layer was a Skipnode, then do not generate layer in and diff
-            if data_type_l[layer] == 'FP32':
-                f.write("PI_L1 float l"+str(layer)+"_in[Tin_C_l"+str(layer)+" * Tin_H_l"+str(layer)+" * Tin_W_l"+str(layer)+"];\n")
-                if (layer == len(layers_l)-1):
-                    f.write("PI_L1 float l"+str(layer)+"_out[Tout_C_l"+str(layer)+" * Tout_H_l"+str(layer)+" * Tout_W_l"+str(layer)+"];\n")
-            # Define FP16 tensors
-            elif data_type_l[layer] == 'FP16':
-                f.write("PI_L1 fp16 l"+str(layer)+"_in[Tin_C_l"+str(layer)+" * Tin_H_l"+str(layer)+" * Tin_W_l"+str(layer)+"];\n")
-                if (layer == len(layers_l)-1):
-                    f.write("PI_L1 fp16 l"+str(layer)+"_out[Tout_C_l"+str(layer)+" * Tout_H_l"+str(layer)+" * Tout_W_l"+str(layer)+"];\n")
-            # Data type error
-            else:
-                print("[deployment_utils.GenerateNet] Invalid data type for I/O definition @Layer{}!".format(layer))
-                exit()
-
-        if layers_l[layer] == 'Skipnode':
-            previous_was_skip = True
-        else:
-            previous_was_skip = False
-    # Write IM2COL buffers
-    im2col_flag = False
-    im2col_type = 'FW'  # 'FW' or 'BW'
-    im2col_max_memocc = 0
-    im2col_layer_index = 0
-    im2col_byte_length = 0
-    im2col_max_data_type = 'FP32'
-    for layer in range(len(layers_l)):
-        if layers_l[layer] == 'conv2d': # or layers_l[layer] == 'DW':
-            if data_type_l[layer] == 'FP32':
-                im2col_byte_length = 4
-            elif data_type_l[layer] == 'FP16':
-                im2col_byte_length = 2
-            im2col_flag = True
-            i2c_mem = 0
-            i2c_FW = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * math.floor((hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer]) * math.floor((win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer]) * im2col_byte_length
-            i2c_BW = out_ch_l[layer] * hk_l[layer] * wk_l[layer] * hin_l[layer] * win_l[layer] * im2col_byte_length
-            if i2c_FW > i2c_BW:
-                i2c_mem = i2c_FW
-                im2col_type = 'FW'
-            else:
-                i2c_mem = i2c_BW
-                im2col_type = 'BW'
-            if i2c_mem > im2col_max_memocc:
-                im2col_max_memocc = i2c_mem
-                im2col_layer_index = layer
-                im2col_max_data_type = data_type_l[layer]
-    if im2col_flag == True:
-        if im2col_type == 'FW':
-            f.write("\n// Define IM2COL buffer for all the convolutions\n")
-            if im2col_max_data_type == 'FP32':
-                f.write("PI_L1 float im2col_buffer[Tin_C_l"+str(im2col_layer_index)+"*Tker_H_l"+str(im2col_layer_index)+"*Tker_W_l"+str(im2col_layer_index)+"*Tout_H_l"+str(im2col_layer_index)+"*Tout_W_l"+str(im2col_layer_index)+"];\n")
-            elif im2col_max_data_type == 'FP16':
-                f.write("PI_L1 fp16 im2col_buffer[Tin_C_l"+str(im2col_layer_index)+"*Tker_H_l"+str(im2col_layer_index)+"*Tker_W_l"+str(im2col_layer_index)+"*Tout_H_l"+str(im2col_layer_index)+"*Tout_W_l"+str(im2col_layer_index)+"];\n")
-            else:
-                print("[deployment_utils.GenerateNet] Invalid data type for im2col!!")
-                exit()
-        else:
-            f.write("\n// Define IM2COL buffer for all the convolutions\n")
-            if im2col_max_data_type == 'FP32':
-                f.write("PI_L1 float im2col_buffer[Tout_C_l"+str(im2col_layer_index)+"*Tker_H_l"+str(im2col_layer_index)+"*Tker_W_l"+str(im2col_layer_index)+"*Tin_H_l"+str(im2col_layer_index)+"*Tin_W_l"+str(im2col_layer_index)+"];\n")
-            elif im2col_max_data_type == 'FP16':
-                f.write("PI_L1 fp16 im2col_buffer[Tout_C_l"+str(im2col_layer_index)+"*Tker_H_l"+str(im2col_layer_index)+"*Tker_W_l"+str(im2col_layer_index)+"*Tin_H_l"+str(im2col_layer_index)+"*Tin_W_l"+str(im2col_layer_index)+"];\n")
-            else:
-                print("[deployment_utils.GenerateNet] Invalid data type for im2col!!")
-                exit()
-
-    # Write in grad transposition / blocktranspose buffer
-    bt_flag = False
-    bt_max_memocc = 0
-    bt_layer_index = 0
-    wgt_grad_pw = False
-    bt_max_data_type = 'FP32'
-    for layer in range(len(layers_l)):
-        # Check layer data layout
-        data_layout = 'CHW'     # Change to input list of data layouts
-        if (layers_l[layer] == 'conv2d' or layers_l[layer] == 'PW') and layer == 0:
-            bt_flag = True
-            bt_layer_index = 0
-        elif (layers_l[layer] == 'conv2d' or layers_l[layer] == 'PW') and layer > 0:
-            bt_flag = True
-            bt_mem = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * out_ch_l[layer]
-            if bt_mem > bt_max_memocc:
-                bt_max_memocc = bt_mem
-                bt_layer_index = layer
-                bt_max_data_type = data_type_l[layer]
-        # Special conditions in case of HWC
-        if (data_layout == 'HWC' and layers_l[layer] == 'PW'):
-            # Special allocation for weight grad in HWC
-            bt_flag = True
-            bt_mem = in_ch_l[layer] * hin_l[layer] * win_l[layer]
-            if data_type_l[layer] == 'FP16':
-                hout = hin_l[layer]; wout = win_l[layer]
-                bt_mem += out_ch_l[layer] * hout * wout
-            if bt_mem > bt_max_memocc:
-                bt_max_memocc = bt_mem
-                bt_layer_index = layer
-                bt_max_data_type = data_type_l[layer]
-                wgt_grad_pw = True
-    if (bt_flag == True) and (wgt_grad_pw == False):
-        f.write("\n// Define transposition / block transposition buffer for all conv2d and PW layers\n")
-        if bt_layer_index == 0:
-            f.write("PI_L1 float bt_buffer[1];")
-        elif bt_layer_index > 0:
-            if bt_max_data_type == 'FP32':
-                f.write("PI_L1 float bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tout_C_l"+str(bt_layer_index)+"*Tker_H_l"+str(bt_layer_index)+"*Tker_W_l"+str(bt_layer_index)+"];\n")
-            elif bt_max_data_type == 'FP16':
-                f.write("PI_L1 fp16 bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tout_C_l"+str(bt_layer_index)+"*Tker_H_l"+str(bt_layer_index)+"*Tker_W_l"+str(bt_layer_index)+"];\n")
-            else:
-                print("[deployment_utils.GenerateNet] Invalid data type for blocktranspose!")
-                exit()
-    elif (bt_flag == True) and (wgt_grad_pw == True):
-        f.write("\n// Define transposition / block transposition buffer for all conv2d and PW layers\n")
-        if bt_max_data_type == 'FP32':
-            f.write("PI_L1 float bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tin_H_l"+str(bt_layer_index)+"*Tin_W_l"+str(bt_layer_index)+"];\n")
-        elif bt_max_data_type == 'FP16':
-            f.write("PI_L1 fp16 bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tin_H_l"+str(bt_layer_index)+"*Tin_W_l"+str(bt_layer_index)+"+Tout_C_l"+str(bt_layer_index)+"*Tout_H_l"+str(bt_layer_index)+"*Tout_W_l"+str(bt_layer_index)+"];\n")
-        else:
-            print("[deployment_utils.GenerateNet] Invalid data type for pw transp buffer definition!\n")
-            exit()
-
-
-    # Define tensors to backpropagate the output error
-    f.write("\n// Define error propagation tensors\n")
-    previous_was_skip = False
-    for layer in range(len(layers_l)):
-        if not previous_was_skip:
-            # Define FP32 tensors
-            if data_type_l[layer] == 'FP32':
-                if layer > 0:
-                    f.write("PI_L1 float l"+str(layer)+"_in_diff[Tin_C_l"+str(layer)+" * Tin_H_l"+str(layer)+" * Tin_W_l"+str(layer)+"];\n")
-                if (layer == len(layers_l)-1):
-                    f.write("PI_L1 float l"+str(layer)+"_out_diff[Tout_C_l"+str(layer)+" * Tout_H_l"+str(layer)+" * Tout_W_l"+str(layer)+"];\n")
-            # Define FP16 tensors
-            elif data_type_l[layer] == 'FP16':
-                if layer > 0:
-                    f.write("PI_L1 fp16 l"+str(layer)+"_in_diff[Tin_C_l"+str(layer)+" * Tin_H_l"+str(layer)+" * Tin_W_l"+str(layer)+"];\n")
-                if (layer == len(layers_l)-1):
-                    f.write("PI_L1 fp16 l"+str(layer)+"_out_diff[Tout_C_l"+str(layer)+" * Tout_H_l"+str(layer)+" * Tout_W_l"+str(layer)+"];\n")
-            # Data type error
-            else:
-                print("[deployment_utils.GenerateNet] Invalid data type for input grad definition @Layer{}!".format(layer))
-                exit()  
-        if layers_l[layer] == 'Skipnode':
-            previous_was_skip = True
-        else:
-            previous_was_skip = False   
-      
-
-    # Define buffer for mixed precision propagation
-    previous_type = data_type_l[0]
-    is_mixed_precision = False
-    curr_cast_in_size = 0
-    curr_cast_out_size = 0
-    curr_max_size = 0
-    is_max_input = False
-    max_cast_buffer_index = 0
-    max_cast_buffer_size = 0
-    max_cast_buffer_type = 'FP32'
-    for layer in range(len(layers_l)):
-        # Output size for current layer
-        h_out = math.floor((hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer])
-        w_out = math.floor((win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer])
-        # Find if there are mixed types
-        if data_type_l[layer] != previous_type:
-            is_mixed_precision = True
-            # Find biggest size
-            curr_cast_in_size = in_ch_l[layer] * hin_l[layer] * win_l[layer]
-            curr_cast_out_size = out_ch_l[layer] * h_out * w_out
-            if curr_cast_in_size > curr_cast_out_size:
-                curr_max_size = curr_cast_in_size
-                is_max_input = True
-            else:
-                curr_max_size = curr_cast_out_size
-                is_max_input = False
-            if curr_max_size > max_cast_buffer_size:
-                max_cast_buffer_size = curr_max_size
-                max_cast_buffer_type = data_type_l[layer-1]
-                max_cast_buffer_index = layer
-        previous_type = data_type_l[layer]
-
-    # Allocate buffer
-    if is_mixed_precision:
-        f.write("\n// Define cast buffer to manage mixed precision (size="+str(max_cast_buffer_size)+")\n")
-        if max_cast_buffer_type == 'FP32':
-            if is_max_input:
-                f.write("PI_L1 float cast_buffer[Tin_C_l"+str(max_cast_buffer_index)+" * Tin_H_l"+str(max_cast_buffer_index)+" * Tin_W_l"+str(max_cast_buffer_index)+"];\n")
-            else:
-                f.write("PI_L1 float cast_buffer[Tout_C_l"+str(max_cast_buffer_index)+" * Tout_H_l"+str(max_cast_buffer_index)+" * Tout_W_l"+str(max_cast_buffer_index)+"];\n")
-        elif max_cast_buffer_type == 'FP16':
-            if is_max_input:
-                f.write("PI_L1 fp16 cast_buffer[Tin_C_l"+str(max_cast_buffer_index)+" * Tin_H_l"+str(max_cast_buffer_index)+" * Tin_W_l"+str(max_cast_buffer_index)+"];\n")
-            else:
-                f.write("PI_L1 fp16 cast_buffer[Tout_C_l"+str(max_cast_buffer_index)+" * Tout_H_l"+str(max_cast_buffer_index)+" * Tout_W_l"+str(max_cast_buffer_index)+"];\n")
-        else:
-            print("[deployment_utils.GenerateNet]: Invalid data type for mixed precision buffer!")
-            exit() 
+    # Define activations, gradients and buffers (static or placed in the L1 arena)
+    if USE_L1_PLANNER == True:
+        l1_plan = graph.cached('l1_plan', lambda: planner.PlanL1Memory(graph, FUSION))
+        f.write(planner.ArenaDeclarations(l1_plan))
+    else:
+        GenerateNetTensors(f, graph)
 
 
 
@@ -1052,12 +891,15 @@ def GenerateNet(proj_folder_path, project_name,
 
     f.write("\n\n\n/**\n * DNN BACKEND FUNCTIONS\n**/\n")
 
+    if batching.IsBatched(graph):
+        f.write(ntemp.shift_blob_functions())
+
     f.write("\n// DNN initialization function\n")
     f.write("void DNN_init()\n{\n")
     for layer in range(len(layers_l)):
         if layer == 0:
             f.write("  // Layer "+str(layer)+"\n")
-            f.write("  for(int i=0; i<Tin_C_l0*Tin_H_l0*Tin_W_l0; i++)\t\t\tl0_in[i] = INPUT[i];\n")
+            f.write("  for(int i=0; i<"+batching.BatchPrefix(graph)+"Tin_C_l0*Tin_H_l0*Tin_W_l0; i++)\t\t\tl0_in[i] = INPUT[i];\n")
             if layers_l[layer] not in ['Skipnode', 'Sumnode', 'InstNorm']:
                 f.write("  for(int i=0; i<Tin_C_l0*Tout_C_l0*Tker_H_l0*Tker_W_l0; i++)\t\tl0_ker[i] = init_WGT_l0[i];\n")
             elif layers_l[layer] == 'InstNorm':
@@ -1087,6 +929,7 @@ def GenerateNet(proj_folder_path, project_name,
     # Mixed precision check
     C_data_type = 'float'
     f.write("\n  // Connect tensors to blobs\n")
+    previous_was_skip = 0
     previous_was_skip_data = 0
     previous_was_skip_diff = 0
     for layer in range(len(layers_l)):
@@ -1314,35 +1157,43 @@ def GenerateNet(proj_folder_path, project_name,
             f.write("  #endif\n")      
 
         # Generate layer template
-        if layers_l[layer] == 'linear':
-            f.write(ntemp.linear_template_FW(layer, data_type_l[layer]))
+        if layer in FUSION['FW']:
+            template = ntemp.fused_ReLU_template_FW(layer, layers_l[layer], FUSION['FW'][layer], data_type_l[layer])
+        elif fusion_pass.IsFused(FUSION, layer, 'FW'):
+            template = "  // Layer "+str(layer)+" (ReLU) fused with layer "+str(layer-1)+"\n"
+        elif layers_l[layer] == 'linear':
+            template = ntemp.linear_template_FW(layer, data_type_l[layer])
         elif layers_l[layer] == 'conv2d':
-            f.write(ntemp.conv2d_template_FW(layer, data_type_l[layer]))
+            template = ntemp.conv2d_template_FW(layer, data_type_l[layer])
         elif layers_l[layer] == 'DW':
-            f.write(ntemp.DW_template_FW(layer, data_type_l[layer]))
+            template = ntemp.DW_template_FW(layer, data_type_l[layer])
         elif layers_l[layer] == 'PW':
-            f.write(ntemp.PW_template_FW(layer, data_type_l[layer]))
+            template = ntemp.PW_template_FW(layer, data_type_l[layer])
         elif layers_l[layer] == 'ReLU':
-            f.write(ntemp.ReLU_template_FW(layer, data_type_l[layer]))
+            template = ntemp.ReLU_template_FW(layer, data_type_l[layer])
         elif layers_l[layer] == 'AvgPool':
-            f.write(ntemp.AvgPool_template_FW(layer, data_type_l[layer]))
+            template = ntemp.AvgPool_template_FW(layer, data_type_l[layer])
         elif layers_l[layer] == 'MaxPool':
-            f.write(ntemp.MaxPool_template_FW(layer, data_type_l[layer]))
+            template = ntemp.MaxPool_template_FW(layer, data_type_l[layer])
         elif layers_l[layer] == 'Skipnode':
-            pass
+            template = ""
         elif layers_l[layer] == 'Sumnode':
-            f.write(ntemp.residualconn_template_FW(layer, data_type_l[layer]))
+            template = ntemp.residualconn_template_FW(layer, data_type_l[layer])
         elif layers_l[layer]  == 'InstNorm':
-            f.write(ntemp.InstNorm_template_FW(layer, data_type_l[layer]))
+            template = ntemp.InstNorm_template_FW(layer, data_type_l[layer])
         else:
             print("[deployment_utils.GenerateNet FW]: PULP layer not implemented or wrapped in DNN Deployer!")
             exit()
+        # Loop over the samples of the batch (see DNN_Batch)
+        if batching.IsBatched(graph) and not fusion_pass.IsFused(FUSION, layer, 'FW'):
+            template = batching.BatchLoop(graph, layer, 'FW', template, FUSION)
+        f.write(template)
         # Insert casting operator for data type variation
         if layer < len(layers_l)-1 and data_type_l[layer] != data_type_l[layer+1]:
             if data_type_l[layer] == 'FP32' and data_type_l[layer+1] == 'FP16':
-                f.write(ntemp.cast_fp32_to_fp16_template(layer, "FW", data_type_l[layer]))
+                f.write(ntemp.cast_fp32_to_fp16_template(layer, "FW", data_type_l[layer], batching.BatchPrefix(graph)))
             elif data_type_l[layer] == 'FP16' and data_type_l[layer+1] == 'FP32':
-                f.write(ntemp.cast_fp16_to_fp32_template(layer, "FW", data_type_l[layer]))
+                f.write(ntemp.cast_fp16_to_fp32_template(layer, "FW", data_type_l[layer], batching.BatchPrefix(graph)))
             else:
                 print("[deployment_utils.GenerateNet]: Unable to convert {} to {} @layer{}!".format(data_type_l[layer], data_type_l[layer+1], layer))
         
@@ -1360,7 +1211,10 @@ def GenerateNet(proj_folder_path, project_name,
 
     # Compute loss
     if loss_fn == "MSELoss":
-        f.write("  loss_args.output = &layer"+str(len(layers_l)-1)+"_out;\n")
+        if batching.IsBatched(graph):
+            f.write(ntemp.batch_output_template(len(layers_l)-1, data_type_l[-1]))
+        else:
+            f.write("  loss_args.output = &layer"+str(len(layers_l)-1)+"_out;\n")
         f.write("  loss_args.target = LABEL;\n")
         f.write("  loss_args.wr_loss = &loss;\n") 
         if data_type_l[-1] == 'FP32':
@@ -1368,7 +1222,10 @@ def GenerateNet(proj_folder_path, project_name,
         elif data_type_l[-1] == 'FP16':
             f.write("  pulp_MSELoss_backward_fp16(&loss_args);\n") 
     elif loss_fn == 'CrossEntropyLoss':
-        f.write("  loss_args.output = &layer"+str(len(layers_l)-1)+"_out;\n")
+        if batching.IsBatched(graph):
+            f.write(ntemp.batch_output_template(len(layers_l)-1, data_type_l[-1]))
+        else:
+            f.write("  loss_args.output = &layer"+str(len(layers_l)-1)+"_out;\n")
         f.write("  loss_args.target = LABEL;\n")
         f.write("  loss_args.wr_loss = &loss;\n")
         if data_type_l[-1] == 'FP32':
@@ -1399,40 +1256,48 @@ def GenerateNet(proj_folder_path, project_name,
         if lay == 0:
             skip_in_grad = 1
             FIRST_LAYER = True
-        if layers_l[lay] == 'linear':
-            f.write(ntemp.linear_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER))
+        if lay in FUSION['BW']:
+            template = ntemp.fused_ReLU_template_BW(lay, layers_l[lay], FUSION['BW'][lay], data_type_l[lay])
+        elif fusion_pass.IsFused(FUSION, lay, 'BW'):
+            template = "  // Layer "+str(lay)+" (ReLU) fused with layer "+str(lay+1)+"\n"
+        elif layers_l[lay] == 'linear':
+            template = ntemp.linear_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER)
         elif layers_l[lay] == 'conv2d':
-            f.write(ntemp.conv2d_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER))
+            template = ntemp.conv2d_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER)
         elif layers_l[lay] == 'DW':
-            f.write(ntemp.DW_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER))
+            template = ntemp.DW_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER)
         elif layers_l[lay] == 'PW':
-            f.write(ntemp.PW_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER))
+            template = ntemp.PW_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER)
         elif layers_l[lay] == 'ReLU':
-            f.write(ntemp.ReLU_template_BW(lay, data_type_l[lay]))
+            template = ntemp.ReLU_template_BW(lay, data_type_l[lay])
         elif layers_l[lay] == 'AvgPool':
-            f.write(ntemp.AvgPool_template_BW(lay, data_type_l[lay]))
+            template = ntemp.AvgPool_template_BW(lay, data_type_l[lay])
         elif layers_l[lay] == 'MaxPool':
-            f.write(ntemp.MaxPool_template_BW(lay, data_type_l[lay]))
+            template = ntemp.MaxPool_template_BW(lay, data_type_l[lay])
         elif layers_l[lay] == 'Skipnode':
-            f.write(ntemp.residualconn_template_sum_BW(sumnode_connections[lay], data_type_l[lay]))
+            template = ntemp.residualconn_template_sum_BW(sumnode_connections[lay], data_type_l[lay])
         elif layers_l[lay] == 'Sumnode':
-            f.write(ntemp.residualconn_template_copy_BW(lay, data_type_l[lay]))
+            template = ntemp.residualconn_template_copy_BW(lay, data_type_l[lay])
             prev_sumnode = lay
         elif layers_l[lay]  == 'InstNorm':
-            f.write(ntemp.InstNorm_template_BW(lay, data_type_l[lay]))
+            template = ntemp.InstNorm_template_BW(lay, data_type_l[lay])
         else:
             print("[deployment_utils.GenerateNet BW]: PULP layer not implemented or wrapped in DNN Deployer!")
             exit()
+        # Loop over the samples of the batch (see DNN_Batch)
+        if batching.IsBatched(graph) and not fusion_pass.IsFused(FUSION, lay, 'BW'):
+            template = batching.BatchLoop(graph, lay, 'BW', template, FUSION)
+        f.write(template)
         # Insert casting operator for data type variation
         if lay < len(layers_l)-1 and lay > 0 and data_type_l[lay] != data_type_l[lay-1]:
             if data_type_l[lay] == 'FP32' and data_type_l[lay-1] == 'FP16':
-                f.write(ntemp.cast_fp32_to_fp16_template(lay, "BW", data_type_l[lay]))
+                f.write(ntemp.cast_fp32_to_fp16_template(lay, "BW", data_type_l[lay], batching.BatchPrefix(graph)))
             elif data_type_l[lay] == 'FP16' and data_type_l[lay-1] == 'FP32':
-                f.write(ntemp.cast_fp16_to_fp32_template(lay, "BW", data_type_l[lay]))
+                f.write(ntemp.cast_fp16_to_fp32_template(lay, "BW", data_type_l[lay], batching.BatchPrefix(graph)))
             else:
                 print("[deployment_utils.GenerateNet]: Unable to convert {} to {} @layer{}!".format(data_type_l[lay], data_type_l[lay-1], lay))
         if sumnode_connections[lay] != -1 and layers_l[lay] != 'Sumnode' and layers_l[lay] != 'Skipnode' and skip_in_grad==0:
-            f.write(ntemp.sum(lay, data_type_l[lay]))
+            f.write(ntemp.sum(lay, data_type_l[lay], batching.BatchPrefix(graph)))
 
         # Profile layer by layer?
         if PROFILE_SINGLE_LAYERS == True:
@@ -1446,7 +1311,10 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("void compute_loss()\n{\n")
 
     if loss_fn == "MSELoss":
-        f.write("  loss_args.output = &layer"+str(len(layers_l)-1)+"_out;\n")
+        if batching.IsBatched(graph):
+            f.write(ntemp.batch_output_template(len(layers_l)-1, data_type_l[-1]))
+        else:
+            f.write("  loss_args.output = &layer"+str(len(layers_l)-1)+"_out;\n")
         f.write("  loss_args.target = LABEL;\n")
         f.write("  loss_args.wr_loss = &loss;\n")
         if data_type_l[-1] == 'FP32':
@@ -1457,7 +1325,10 @@ def GenerateNet(proj_folder_path, project_name,
             print("[deplyment_utils.GenerateNet]: Invalid loss type!")
             exit()
     elif loss_fn == "CrossEntropyLoss":
-        f.write("  loss_args.output = &layer"+str(len(layers_l)-1)+"_out;\n")
+        if batching.IsBatched(graph):
+            f.write(ntemp.batch_output_template(len(layers_l)-1, data_type_l[-1]))
+        else:
+            f.write("  loss_args.output = &layer"+str(len(layers_l)-1)+"_out;\n")
         f.write("  loss_args.target = LABEL;\n")
         f.write("  loss_args.wr_loss = &loss;\n")
         if data_type_l[-1] == 'FP32':
@@ -1506,7 +1377,7 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("void print_output()\n{\n")
     output_index = len(layers_l) - 1
     f.write("  printf(\"\\nLayer "+str(output_index)+" output:\\n\");\n\n")
-    f.write("  for (int i=0; i<Tout_C_l"+str(output_index)+"*Tout_H_l"+str(output_index)+"*Tout_W_l"+str(output_index)+"; i++)\n  {\n")
+    f.write("  for (int i=0; i<"+batching.BatchPrefix(graph)+"Tout_C_l"+str(output_index)+"*Tout_H_l"+str(output_index)+"*Tout_W_l"+str(output_index)+"; i++)\n  {\n")
     f.write("    printf(\"%f \", l"+str(output_index)+"_out[i]);\n")
     f.write("    // Newline when an output row ends\n")
     f.write("    // if(!(i%Tout_W_l"+str(output_index)+")) printf(\"\\n\");\n")
@@ -1522,9 +1393,9 @@ def GenerateNet(proj_folder_path, project_name,
     output_index = len(layers_l) - 1
     f.write("  int integrity_check = 0;\n")
     if data_type_l[output_index] == 'FP32':
-        f.write("  integrity_check = verify_tensor(l"+str(output_index)+"_out, REFERENCE_OUTPUT, Tout_C_l"+str(output_index)+"*Tout_H_l"+str(output_index)+"*Tout_W_l"+str(output_index)+", TOLERANCE);\n")
+        f.write("  integrity_check = verify_tensor(l"+str(output_index)+"_out, REFERENCE_OUTPUT, "+batching.BatchPrefix(graph)+"Tout_C_l"+str(output_index)+"*Tout_H_l"+str(output_index)+"*Tout_W_l"+str(output_index)+", TOLERANCE);\n")
     elif data_type_l[output_index] == 'FP16':
-        f.write("  integrity_check = verify_tensor_fp16(l"+str(output_index)+"_out, REFERENCE_OUTPUT, Tout_C_l"+str(output_index)+"*Tout_H_l"+str(output_index)+"*Tout_W_l"+str(output_index)+", TOLERANCE);\n")
+        f.write("  integrity_check = verify_tensor_fp16(l"+str(output_index)+"_out, REFERENCE_OUTPUT, "+batching.BatchPrefix(graph)+"Tout_C_l"+str(output_index)+"*Tout_H_l"+str(output_index)+"*Tout_W_l"+str(output_index)+", TOLERANCE);\n")
     else:
         print("[deployment_utils.GenerateNet]: Invalid inference verification data type!!")
         exit()
@@ -1580,3 +1451,254 @@ def GenerateNet(proj_folder_path, project_name,
 
     return
 
+
+
+
+
+# Write the static definitions of the activations, gradients and buffers of net.c
+def GenerateNetTensors(f, graph):
+
+    # Lists of the graph
+    layers_l = graph.layers_l
+    in_ch_l = graph.in_ch_l; out_ch_l = graph.out_ch_l
+    hk_l = graph.hk_l; wk_l = graph.wk_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    data_type_l = graph.data_type_l
+    # Activations and gradients hold the whole batch (see DNN_Batch)
+    batch = batching.BatchPrefix(graph)
+
+    f.write("\n// Define kernel grad tensors\n")
+    for layer in range(len(layers_l)):
+        # Define FP32 tensors
+        if data_type_l[layer] == 'FP32':
+            if layers_l[layer] == 'MaxPool' or layers_l[layer] == 'AvgPool':
+                f.write("PI_L1 float l"+str(layer)+"_ker_diff[1];\n")
+            elif layers_l[layer] == 'Skipnode' or layers_l[layer] == 'Sumnode':
+                pass
+            elif layers_l[layer] == 'InstNorm':
+                f.write("PI_L1 float l"+str(layer)+f"_ker_diff[2*Tin_C_l{layer}];\n")
+            else:    
+                f.write("PI_L1 float l"+str(layer)+"_ker_diff[Tin_C_l"+str(layer)+" * Tout_C_l"+str(layer)+" * Tker_H_l"+str(layer)+" * Tker_W_l"+str(layer)+"];\n")
+        # Define FP16 tensors
+        elif data_type_l[layer] == 'FP16':
+            if layers_l[layer] == 'MaxPool' or layers_l[layer] == 'AvgPool':
+                f.write("PI_L1 fp16 l"+str(layer)+"_ker_diff[1];\n")
+            elif layers_l[layer] == 'Skipnode' or layers_l[layer] == 'Sumnode':
+                pass
+            elif layers_l[layer] == 'InstNorm':
+                f.write("PI_L1 fp16 l"+str(layer)+f"_ker_diff[2*Tin_C_l{layer}];\n")
+            else:    
+                f.write("PI_L1 fp16 l"+str(layer)+"_ker_diff[Tin_C_l"+str(layer)+" * Tout_C_l"+str(layer)+" * Tker_H_l"+str(layer)+" * Tker_W_l"+str(layer)+"];\n")
+        # Data type error
+        else:
+            print("[deployment_utils.GenerateNet] Invalid data type for kernel grad definition @Layer{}!".format(layer))
+            exit()
+
+    f.write("\n// Define I/O tensors\n")
+
+    previous_was_skip = False 
+    for layer in range(len(layers_l)):
+        # Define FP32 tensors
+        if not previous_was_skip: # If the previous layer was a Skipnode, then do not generate layer in and diff
+            if data_type_l[layer] == 'FP32':
+                f.write("PI_L1 float l"+str(layer)+"_in["+batch+"Tin_C_l"+str(layer)+" * Tin_H_l"+str(layer)+" * Tin_W_l"+str(layer)+"];\n")
+                if (layer == len(layers_l)-1):
+                    f.write("PI_L1 float l"+str(layer)+"_out["+batch+"Tout_C_l"+str(layer)+" * Tout_H_l"+str(layer)+" * Tout_W_l"+str(layer)+"];\n")
+            # Define FP16 tensors
+            elif data_type_l[layer] == 'FP16':
+                f.write("PI_L1 fp16 l"+str(layer)+"_in["+batch+"Tin_C_l"+str(layer)+" * Tin_H_l"+str(layer)+" * Tin_W_l"+str(layer)+"];\n")
+                if (layer == len(layers_l)-1):
+                    f.write("PI_L1 fp16 l"+str(layer)+"_out["+batch+"Tout_C_l"+str(layer)+" * Tout_H_l"+str(layer)+" * Tout_W_l"+str(layer)+"];\n")
+            # Data type error
+            else:
+                print("[deployment_utils.GenerateNet] Invalid data type for I/O definition @Layer{}!".format(layer))
+                exit()
+
+        if layers_l[layer] == 'Skipnode':
+            previous_was_skip = True
+        else:
+            previous_was_skip = False
+    # Write IM2COL buffers
+    im2col_flag = False
+    im2col_type = 'FW'  # 'FW' or 'BW'
+    im2col_max_memocc = 0
+    im2col_layer_index = 0
+    im2col_byte_length = 0
+    im2col_max_data_type = 'FP32'
+    for layer in range(len(layers_l)):
+        if layers_l[layer] == 'conv2d': # or layers_l[layer] == 'DW':
+            if data_type_l[layer] == 'FP32':
+                im2col_byte_length = 4
+            elif data_type_l[layer] == 'FP16':
+                im2col_byte_length = 2
+            im2col_flag = True
+            i2c_mem = 0
+            i2c_FW = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * graph.hout_l[layer] * graph.wout_l[layer] * im2col_byte_length
+            i2c_BW = out_ch_l[layer] * hk_l[layer] * wk_l[layer] * hin_l[layer] * win_l[layer] * im2col_byte_length
+            if i2c_FW > i2c_BW:
+                i2c_mem = i2c_FW
+                im2col_type = 'FW'
+            else:
+                i2c_mem = i2c_BW
+                im2col_type = 'BW'
+            if i2c_mem > im2col_max_memocc:
+                im2col_max_memocc = i2c_mem
+                im2col_layer_index = layer
+                im2col_max_data_type = data_type_l[layer]
+    if im2col_flag == True:
+        if im2col_type == 'FW':
+            f.write("\n// Define IM2COL buffer for all the convolutions\n")
+            if im2col_max_data_type == 'FP32':
+                f.write("PI_L1 float im2col_buffer[Tin_C_l"+str(im2col_layer_index)+"*Tker_H_l"+str(im2col_layer_index)+"*Tker_W_l"+str(im2col_layer_index)+"*Tout_H_l"+str(im2col_layer_index)+"*Tout_W_l"+str(im2col_layer_index)+"];\n")
+            elif im2col_max_data_type == 'FP16':
+                f.write("PI_L1 fp16 im2col_buffer[Tin_C_l"+str(im2col_layer_index)+"*Tker_H_l"+str(im2col_layer_index)+"*Tker_W_l"+str(im2col_layer_index)+"*Tout_H_l"+str(im2col_layer_index)+"*Tout_W_l"+str(im2col_layer_index)+"];\n")
+            else:
+                print("[deployment_utils.GenerateNet] Invalid data type for im2col!!")
+                exit()
+        else:
+            f.write("\n// Define IM2COL buffer for all the convolutions\n")
+            if im2col_max_data_type == 'FP32':
+                f.write("PI_L1 float im2col_buffer[Tout_C_l"+str(im2col_layer_index)+"*Tker_H_l"+str(im2col_layer_index)+"*Tker_W_l"+str(im2col_layer_index)+"*Tin_H_l"+str(im2col_layer_index)+"*Tin_W_l"+str(im2col_layer_index)+"];\n")
+            elif im2col_max_data_type == 'FP16':
+                f.write("PI_L1 fp16 im2col_buffer[Tout_C_l"+str(im2col_layer_index)+"*Tker_H_l"+str(im2col_layer_index)+"*Tker_W_l"+str(im2col_layer_index)+"*Tin_H_l"+str(im2col_layer_index)+"*Tin_W_l"+str(im2col_layer_index)+"];\n")
+            else:
+                print("[deployment_utils.GenerateNet] Invalid data type for im2col!!")
+                exit()
+
+    # Write in grad transposition / blocktranspose buffer
+    bt_flag = False
+    bt_max_memocc = 0
+    bt_layer_index = 0
+    wgt_grad_pw = False
+    bt_max_data_type = 'FP32'
+    for layer in range(len(layers_l)):
+        # Check layer data layout
+        data_layout = 'CHW'     # Change to input list of data layouts
+        if (layers_l[layer] == 'conv2d' or layers_l[layer] == 'PW') and layer == 0:
+            bt_flag = True
+            bt_layer_index = 0
+        elif (layers_l[layer] == 'conv2d' or layers_l[layer] == 'PW') and layer > 0:
+            bt_flag = True
+            bt_mem = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * out_ch_l[layer]
+            if bt_mem > bt_max_memocc:
+                bt_max_memocc = bt_mem
+                bt_layer_index = layer
+                bt_max_data_type = data_type_l[layer]
+        # Special conditions in case of HWC
+        if (data_layout == 'HWC' and layers_l[layer] == 'PW'):
+            # Special allocation for weight grad in HWC
+            bt_flag = True
+            bt_mem = in_ch_l[layer] * hin_l[layer] * win_l[layer]
+            if data_type_l[layer] == 'FP16':
+                hout = hin_l[layer]; wout = win_l[layer]
+                bt_mem += out_ch_l[layer] * hout * wout
+            if bt_mem > bt_max_memocc:
+                bt_max_memocc = bt_mem
+                bt_layer_index = layer
+                bt_max_data_type = data_type_l[layer]
+                wgt_grad_pw = True
+    if (bt_flag == True) and (wgt_grad_pw == False):
+        f.write("\n// Define transposition / block transposition buffer for all conv2d and PW layers\n")
+        if bt_layer_index == 0:
+            f.write("PI_L1 float bt_buffer[1];")
+        elif bt_layer_index > 0:
+            if bt_max_data_type == 'FP32':
+                f.write("PI_L1 float bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tout_C_l"+str(bt_layer_index)+"*Tker_H_l"+str(bt_layer_index)+"*Tker_W_l"+str(bt_layer_index)+"];\n")
+            elif bt_max_data_type == 'FP16':
+                f.write("PI_L1 fp16 bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tout_C_l"+str(bt_layer_index)+"*Tker_H_l"+str(bt_layer_index)+"*Tker_W_l"+str(bt_layer_index)+"];\n")
+            else:
+                print("[deployment_utils.GenerateNet] Invalid data type for blocktranspose!")
+                exit()
+    elif (bt_flag == True) and (wgt_grad_pw == True):
+        f.write("\n// Define transposition / block transposition buffer for all conv2d and PW layers\n")
+        if bt_max_data_type == 'FP32':
+            f.write("PI_L1 float bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tin_H_l"+str(bt_layer_index)+"*Tin_W_l"+str(bt_layer_index)+"];\n")
+        elif bt_max_data_type == 'FP16':
+            f.write("PI_L1 fp16 bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tin_H_l"+str(bt_layer_index)+"*Tin_W_l"+str(bt_layer_index)+"+Tout_C_l"+str(bt_layer_index)+"*Tout_H_l"+str(bt_layer_index)+"*Tout_W_l"+str(bt_layer_index)+"];\n")
+        else:
+            print("[deployment_utils.GenerateNet] Invalid data type for pw transp buffer definition!\n")
+            exit()
+
+
+    # Define tensors to backpropagate the output error
+    f.write("\n// Define error propagation tensors\n")
+    previous_was_skip = False
+    for layer in range(len(layers_l)):
+        if not previous_was_skip:
+            # Define FP32 tensors
+            if data_type_l[layer] == 'FP32':
+                if layer > 0:
+                    f.write("PI_L1 float l"+str(layer)+"_in_diff["+batch+"Tin_C_l"+str(layer)+" * Tin_H_l"+str(layer)+" * Tin_W_l"+str(layer)+"];\n")
+                if (layer == len(layers_l)-1):
+                    f.write("PI_L1 float l"+str(layer)+"_out_diff["+batch+"Tout_C_l"+str(layer)+" * Tout_H_l"+str(layer)+" * Tout_W_l"+str(layer)+"];\n")
+            # Define FP16 tensors
+            elif data_type_l[layer] == 'FP16':
+                if layer > 0:
+                    f.write("PI_L1 fp16 l"+str(layer)+"_in_diff["+batch+"Tin_C_l"+str(layer)+" * Tin_H_l"+str(layer)+" * Tin_W_l"+str(layer)+"];\n")
+                if (layer == len(layers_l)-1):
+                    f.write("PI_L1 fp16 l"+str(layer)+"_out_diff["+batch+"Tout_C_l"+str(layer)+" * Tout_H_l"+str(layer)+" * Tout_W_l"+str(layer)+"];\n")
+            # Data type error
+            else:
+                print("[deployment_utils.GenerateNet] Invalid data type for input grad definition @Layer{}!".format(layer))
+                exit()  
+        if layers_l[layer] == 'Skipnode':
+            previous_was_skip = True
+        else:
+            previous_was_skip = False   
+      
+
+    # Define buffer for mixed precision propagation
+    previous_type = data_type_l[0]
+    is_mixed_precision = False
+    curr_cast_in_size = 0
+    curr_cast_out_size = 0
+    curr_max_size = 0
+    is_max_input = False
+    max_cast_buffer_index = 0
+    max_cast_buffer_size = 0
+    max_cast_buffer_type = 'FP32'
+    for layer in range(len(layers_l)):
+        # Output size for current layer
+        h_out = graph.hout_l[layer]
+        w_out = graph.wout_l[layer]
+        # Find if there are mixed types
+        if data_type_l[layer] != previous_type:
+            is_mixed_precision = True
+            # Find biggest size
+            curr_cast_in_size = in_ch_l[layer] * hin_l[layer] * win_l[layer]
+            curr_cast_out_size = out_ch_l[layer] * h_out * w_out
+            if curr_cast_in_size > curr_cast_out_size:
+                curr_max_size = curr_cast_in_size
+                is_max_input = True
+            else:
+                curr_max_size = curr_cast_out_size
+                is_max_input = False
+            if curr_max_size > max_cast_buffer_size:
+                max_cast_buffer_size = curr_max_size
+                max_cast_buffer_type = data_type_l[layer-1]
+                max_cast_buffer_index = layer
+        previous_type = data_type_l[layer]
+
+    # Allocate buffer
+    if is_mixed_precision:
+        f.write("\n// Define cast buffer to manage mixed precision (size="+str(max_cast_buffer_size)+")\n")
+        if max_cast_buffer_type == 'FP32':
+            if is_max_input:
+                f.write("PI_L1 float cast_buffer["+batch+"Tin_C_l"+str(max_cast_buffer_index)+" * Tin_H_l"+str(max_cast_buffer_index)+" * Tin_W_l"+str(max_cast_buffer_index)+"];\n")
+            else:
+                f.write("PI_L1 float cast_buffer["+batch+"Tout_C_l"+str(max_cast_buffer_index)+" * Tout_H_l"+str(max_cast_buffer_index)+" * Tout_W_l"+str(max_cast_buffer_index)+"];\n")
+        elif max_cast_buffer_type == 'FP16':
+            if is_max_input:
+                f.write("PI_L1 fp16 cast_buffer["+batch+"Tin_C_l"+str(max_cast_buffer_index)+" * Tin_H_l"+str(max_cast_buffer_index)+" * Tin_W_l"+str(max_cast_buffer_index)+"];\n")
+            else:
+                f.write("PI_L1 fp16 cast_buffer["+batch+"Tout_C_l"+str(max_cast_buffer_index)+" * Tout_H_l"+str(max_cast_buffer_index)+" * Tout_W_l"+str(max_cast_buffer_index)+"];\n")
+        else:
+            print("[deployment_utils.GenerateNet]: Invalid data type for mixed precision buffer!")
+            exit() 
+
+    # Define buffer for the weight gradients of the samples of the batch
+    if batching.IsBatched(graph):
+        f.write("\n// Define buffer to accumulate the weight gradients over the batch (size="+str(batching.BatchGradBytes(graph))+" bytes)\n")
+        f.write("PI_L1 float batch_grad_buffer["+str((batching.BatchGradBytes(graph) + 3) // 4)+"];\n")
+
+    return
@@ -20,17 +20,23 @@ Authors: Giacomo Saporetti, Davide Nadalini
 
 import os
 import shutil
-import math
 
 from torch import mm
 import deployer_utils.net_templates_double_buffer as ntemp
+import deployer_utils.DNN_Files as files
+import deployer_utils.DNN_Scheduler as sched
 
 
 """
 DNN Size Checker backend functions
 """
 
-def max_layer_dim (layers_l, cin_l, hin_l, win_l, cout_l, hk_l, wk_l, data, h_str, w_str, h_pad, w_pad):
+def max_layer_dim (graph):
+    layers_l = graph.layers_l
+    cin_l = graph.in_ch_l; cout_l = graph.out_ch_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    hk_l = graph.hk_l; wk_l = graph.wk_l
+    data = graph.data_type_l[0]
     RES = 0
     temp1 = 0 #input
     temp2 = 0 #wgt
@@ -74,13 +80,19 @@ DNN Composer backend functions
 
 
 # Generate the net.c and net.h files for the execution on PULP
-def GenerateNet(proj_folder_path, project_name,
-                layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                h_str_l, w_str_l, h_pad_l, w_pad_l,
+def GenerateNet(proj_folder_path, project_name, graph,
                 epochs, batch_size, learning_rate, optimizer, loss_fn,
-                data_type_l, sumnode_connections, MAX_LAYER_DIM,
-                PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS):
-
+                MAX_LAYER_DIM, PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS):
+
+    # Lists of the graph
+    layers_l = graph.layers_l
+    in_ch_l = graph.in_ch_l; out_ch_l = graph.out_ch_l
+    hk_l = graph.hk_l; wk_l = graph.wk_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    h_str_l = graph.h_str_l; w_str_l = graph.w_str_l
+    h_pad_l = graph.h_pad_l; w_pad_l = graph.w_pad_l
+    data_type_l = graph.data_type_l
+    sumnode_connections = graph.sumnode_connections
 
     data_type = data_type_l[0]
     data_size = 0
@@ -92,8 +104,12 @@ def GenerateNet(proj_folder_path, project_name,
         data_size = 2
         suffix = "_fp16"
 
+    # Schedule the DMA transfers of the backward step
+    schedule = sched.ScheduleBackward(graph)
+    sched.PrintSchedule(graph, schedule)
+
     # Generate net.h
-    f = open(proj_folder_path+'net.h', 'w')
+    f = files.OpenGenerated(proj_folder_path+'net.h')
 
     f.write("// PULP Defines\n")
     f.write("#define STACK_SIZE      4096\n")
@@ -132,14 +148,16 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("void dma_handler(uint8_t do_store, uint8_t do_load, void * src_store, void * dst_store, void * src_load, void * dst_load);\n")
     f.write("void load(uint32_t src, uint32_t dst, int dim);\n")
     f.write("void store(uint32_t src, uint32_t dst, int dim);\n")
+    f.write("void prefetch(uint32_t src, uint32_t dst, int dim, pi_cl_dma_cmd_t * cmd);\n")
     f.write("void update();\n")
     f.write("void get_dim(void * src_blob, void * dst_blob);\n")
     f.write(f"#define MAX_SIZE {MAX_LAYER_DIM}\n")
+    f.write("#define DMA_CMD_SLOTS 6\n")
     f.close()    
 
 
     # Generate net.c
-    f = open(proj_folder_path+'net.c', 'w')
+    f = files.OpenGenerated(proj_folder_path+'net.c')
 
     f.write("/**\n * INCLUDES\n**/\n\n")
 
@@ -147,6 +165,7 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("#include \"net.h\"\n")
     f.write("#include \"stats.h\"\n\n")
     f.write("#include \"init-defines.h\"\n")
+    f.write("#include \"hyperparameters.h\"\n")
     f.write("#include \"io_data.h\"\n")
 
 
@@ -195,9 +214,14 @@ def GenerateNet(proj_folder_path, project_name,
         print("[deployment_utils.GenerateNet] Invalid last layer data type!")
         exit()
     
-    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_store;\n")
-    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_load;\n")
-    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_struct;\n")
+    f.write("\n// DMA command slots (transfers in different slots can be waited for separately)\n")
+    f.write("PI_L1 pi_cl_dma_cmd_t dma_cmd[DMA_CMD_SLOTS];\n")
+    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_store = &dma_cmd[0];\n")
+    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_load = &dma_cmd[1];\n")
+    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_struct = &dma_cmd[2];\n")
+    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_prefetch = &dma_cmd[3];\n")
+    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_prefetch_wgt = &dma_cmd[4];\n")
+    f.write("PI_L1 pi_cl_dma_cmd_t * cmd_wgt = &dma_cmd[5];\n")
 
 
     f.write("\n\n\n/**\n * DATA\n**/\n")
@@ -392,7 +416,7 @@ def GenerateNet(proj_folder_path, project_name,
                 im2col_byte_length = 2
             im2col_flag = True
             i2c_mem = 0
-            i2c_FW = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * math.floor((hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer]) * math.floor((win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer]) * im2col_byte_length
+            i2c_FW = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * graph.hout_l[layer] * graph.wout_l[layer] * im2col_byte_length
             i2c_BW = out_ch_l[layer] * hk_l[layer] * wk_l[layer] * hin_l[layer] * win_l[layer] * im2col_byte_length
             if i2c_FW > i2c_BW:
                 i2c_mem = i2c_FW
@@ -513,8 +537,8 @@ def GenerateNet(proj_folder_path, project_name,
     max_cast_buffer_type = 'FP32'
     for layer in range(len(layers_l)):
         # Output size for current layer
-        h_out = math.floor((hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer])
-        w_out = math.floor((win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer])
+        h_out = graph.hout_l[layer]
+        w_out = graph.wout_l[layer]
         # Find if there are mixed types
         if data_type_l[layer] != previous_type:
             is_mixed_precision = True
@@ -1050,6 +1074,7 @@ def GenerateNet(proj_folder_path, project_name,
         f.write("  printf(\"\\nBACKWARD PROFILING:\\n\\n\");\n")
 
     next_input_buffer = 0
+    wgt_wait = False
     for layer in range(len(layers_l)):
         lay = len(layers_l) - layer - 1
 
@@ -1126,6 +1151,24 @@ def GenerateNet(proj_folder_path, project_name,
             f.write(f"\tload((uint32_t) layer{lay}_out.diff, (uint32_t) out.diff, {bytes_per_data}*layer{lay}_out.dim);\n")
             f.write("\tpi_cl_dma_cmd_wait(cmd_load);\n")
 
+        # Prefetch the input and the coefficients of the next layer during the computation (see DNN_Scheduler),
+        # each transfer in flight has its own command slot
+        prefetch_in = lay > 0 and schedule[lay]['in']
+        prefetch_wgt = lay > 0 and schedule[lay]['wgt']
+        if prefetch_in or prefetch_wgt:
+            f.write(f"\tget_dim( &layer{lay-1}_in, &d{next_input_buffer}_blob);\n")
+            if prefetch_in:
+                f.write(f"\tprefetch((uint32_t) layer{lay-1}_in.data, (uint32_t) d{next_input_buffer}_blob.data, {bytes_per_data}*layer{lay-1}_in.dim, cmd_prefetch);\n")
+            if not layers_l[lay-1] in ['Skipnode', 'Sumnode',  'ReLU']:
+                f.write(f"\tget_dim( &layer{lay-1}_wgt, &w{next_input_buffer}_blob);\n")
+            if prefetch_wgt:
+                f.write(f"\tprefetch((uint32_t) layer{lay-1}_wgt.data, (uint32_t) w{next_input_buffer}_blob.data, {bytes_per_data}*layer{lay-1}_wgt.dim, cmd_prefetch_wgt);\n")
+
+        # Wait for the coefficients loaded at the end of the previous layer
+        if wgt_wait and layers_l[lay] in sched.WG_WGT_LAYERS:
+            f.write("\tpi_cl_dma_cmd_wait(cmd_wgt);\n")
+            wgt_wait = False
+
         # Compute dW if needed
         if not layers_l[lay] in ['Skipnode', 'Sumnode',  'ReLU']:
             if layers_l[lay] == 'linear':
@@ -1148,6 +1191,9 @@ def GenerateNet(proj_folder_path, project_name,
 
         # Compute dIN
         if not skip_in_grad:
+            if wgt_wait:
+                f.write("\tpi_cl_dma_cmd_wait(cmd_wgt);\n")
+                wgt_wait = False
             if layers_l[lay] == 'linear':
                 f.write(ntemp.linear_template_in_BW(lay, data_type_l[lay]))
             elif layers_l[lay] == 'conv2d':
@@ -1168,18 +1214,37 @@ def GenerateNet(proj_folder_path, project_name,
             if is_skipderivation:
                 f.write(ntemp.sum(lay, layers_l[lay] == 'Skipnode', current_buffer, output_buffer, data_type_l[lay]))
 
-        # Load next layer's input and coefficients
+        # Load next layer's input and coefficients (if not prefetched)
         if lay > 0:
             f.write("\tpi_cl_dma_cmd_wait(cmd_store);\n")
+            if prefetch_in:
+                f.write("\tpi_cl_dma_cmd_wait(cmd_prefetch);\n")
+            if prefetch_wgt:
+                f.write("\tpi_cl_dma_cmd_wait(cmd_prefetch_wgt);\n")
             if layers_l[lay] == 'Sumnode':
                 f.write(f"\tload((uint32_t) layer{lay - 1}_out.data, (uint32_t) out.data, {bytes_per_data}*out.dim);\n")
                 f.write("\tpi_cl_dma_flush();\n")
-            f.write(f"\tget_dim( &layer{lay-1}_in, &d{next_input_buffer}_blob);\n")
-            f.write(f"\tload((uint32_t) layer{lay-1}_in.data, (uint32_t) d{next_input_buffer}_blob.data, {bytes_per_data}*layer{lay-1}_in.dim);\n")
-            if not layers_l[lay -1 ] in ['Skipnode', 'Sumnode',  'ReLU']:
-                f.write(f"\tget_dim( &layer{lay-1}_wgt, &w{next_input_buffer}_blob);\n")
-                f.write(f"\tload((uint32_t) layer{lay-1}_wgt.data, (uint32_t) w{next_input_buffer}_blob.data, {bytes_per_data}*layer{lay-1}_wgt.dim);\n")
-            f.write("\tpi_cl_dma_flush();\n")
+            if not (prefetch_in or prefetch_wgt):
+                f.write(f"\tget_dim( &layer{lay-1}_in, &d{next_input_buffer}_blob);\n")
+            loaded = False
+            if not prefetch_in:
+                f.write(f"\tload((uint32_t) layer{lay-1}_in.data, (uint32_t) d{next_input_buffer}_blob.data, {bytes_per_data}*layer{lay-1}_in.dim);\n")
+                loaded = True
+            if not layers_l[lay -1 ] in ['Skipnode', 'Sumnode',  'ReLU'] and not prefetch_wgt:
+                if not prefetch_in:
+                    f.write(f"\tget_dim( &layer{lay-1}_wgt, &w{next_input_buffer}_blob);\n")
+                # The coefficients are only waited for when the next layer needs them
+                if schedule[lay]['deferred_wgt']:
+                    f.write(f"\tprefetch((uint32_t) layer{lay-1}_wgt.data, (uint32_t) w{next_input_buffer}_blob.data, {bytes_per_data}*layer{lay-1}_wgt.dim, cmd_wgt);\n")
+                    wgt_wait = True
+                else:
+                    f.write(f"\tload((uint32_t) layer{lay-1}_wgt.data, (uint32_t) w{next_input_buffer}_blob.data, {bytes_per_data}*layer{lay-1}_wgt.dim);\n")
+                    loaded = True
+            # The input is the only load in flight with the deferred coefficients (a flush would also wait for them)
+            if loaded and wgt_wait:
+                f.write("\tpi_cl_dma_cmd_wait(cmd_load);\n")
+            elif loaded:
+                f.write("\tpi_cl_dma_flush();\n")
 
         current_buffer = next_buffer
 
@@ -1209,6 +1274,8 @@ def GenerateNet(proj_folder_path, project_name,
             f.write("  #ifdef PROF_NET\n")
             f.write("  STOP_STATS();\n")
             f.write("  #endif\n\n")  
+    if wgt_wait:
+        f.write("\tpi_cl_dma_cmd_wait(cmd_wgt);\n")
     f.write("}\n")
 
 
@@ -1455,6 +1522,9 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("\nvoid store(uint32_t src, uint32_t dst, int dim){\n")
     f.write("\tpi_cl_dma_cmd(dst, src, dim, PI_CL_DMA_DIR_LOC2EXT , cmd_store);}\n")
 
+    f.write("\nvoid prefetch(uint32_t src, uint32_t dst, int dim, pi_cl_dma_cmd_t * cmd){\n")
+    f.write("\tpi_cl_dma_cmd(src, dst, dim, PI_CL_DMA_DIR_EXT2LOC , cmd);}\n")
+
     f.write("\nvoid get_dim(void * src_blob, void * dst_blob){\n")
     f.write("\tstruct blob * s = (struct blob * ) src_blob;\n")
     f.write("\tstruct blob * d = (struct blob * ) dst_blob;\n")
@@ -20,11 +20,11 @@ Authors: Giacomo Saporetti, Davide Nadalini
 
 import os
 import shutil
-import math
 
 from torch import mm
 import deployer_utils.GM_templates as Gtemp
 import deployer_utils.net_templates_single_buffer as ntemp
+import deployer_utils.DNN_Files as files
 
 
 """
@@ -59,7 +59,12 @@ def max_wgt_dim(layers_l, cin_l, hin_l, win_l, cout_l, hk_l, wk_l):
     return RES
 
 
-def max_layer_dim (layers_l, cin_l, hin_l, win_l, cout_l, hk_l, wk_l, data, h_str, w_str, h_pad, w_pad):
+def max_layer_dim (graph, tiles={}):
+    layers_l = graph.layers_l
+    cin_l = graph.in_ch_l; cout_l = graph.out_ch_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    hk_l = graph.hk_l; wk_l = graph.wk_l
+    data = graph.data_type_l[0]
     RES = 0
     temp1 = 0 #input
     temp2 = 0 #wgt
@@ -84,8 +89,8 @@ def max_layer_dim (layers_l, cin_l, hin_l, win_l, cout_l, hk_l, wk_l, data, h_st
 
         temp1 = cin_l[layer]*hin_l[layer]*win_l[layer]
 
-        hout = int((hin_l[layer] - hk_l[layer] + 2*h_pad[layer])/h_str[layer] + 1)
-        wout = int((win_l[layer] - wk_l[layer] + 2*w_pad[layer])/w_str[layer] + 1)
+        hout = graph.hout_l[layer]
+        wout = graph.wout_l[layer]
         if layers_l[layer] == 'linear':
             temp3 = cout_l[layer]
         else:
@@ -93,6 +98,15 @@ def max_layer_dim (layers_l, cin_l, hin_l, win_l, cout_l, hk_l, wk_l, data, h_st
         
         tot = temp1 + temp2 + temp3
         print(f"Layer {layer} ({layers_l[layer]}):  Input: {temp1}, Coefficients: {temp2}, Output: {temp3}, Total: {tot}")
+        tot = 2*tot #The 2 factor accounts for for both data and diff storage
+        # Tiled layers only need a tile in L1 (and the buffer of the partial sums)
+        if layer in tiles:
+            tile = tiles[layer]
+            tot = 2*(tile['in'] + tile['wgt'] + tile['out']) + tile['acc']
+            # The output of the last layer is loaded as a whole to compute the loss
+            if layer == len(layers_l)-1:
+                tot = max(tot, 2*temp3)
+            print(f"Layer {layer} ({layers_l[layer]}) tile:  Input: {tile['in']}, Coefficients: {tile['wgt']}, Output: {tile['out']}, Partial sums: {tile['acc']}")
         if tot > RES:
             RES = tot
             max_layer = layer
@@ -100,7 +114,7 @@ def max_layer_dim (layers_l, cin_l, hin_l, win_l, cout_l, hk_l, wk_l, data, h_st
     multiplier = 2
     if data  == 'FP32':
         multiplier = 4
-    RES = 2*multiplier*RES #The 2 factor accounts for for both data and diff storage
+    RES = multiplier*RES
     print(f"Max Layer size (including data and gradients): {RES} bytes   @layer {max_layer}")
     return RES
 
@@ -111,13 +125,19 @@ DNN Composer backend functions
 
 
 # Generate the net.c and net.h files for the execution on PULP
-def GenerateNet(proj_folder_path, project_name,
-                layers_l, in_ch_l, out_ch_l, hk_l, wk_l, hin_l, win_l,
-                h_str_l, w_str_l, h_pad_l, w_pad_l,
+def GenerateNet(proj_folder_path, project_name, graph,
                 epochs, batch_size, learning_rate, optimizer, loss_fn,
-                data_type_l, sumnode_connections, MAX_LAYER_DIM,
-                PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS):
-
+                MAX_LAYER_DIM, TILES, PROFILE_SINGLE_LAYERS, SEPARATE_BACKWARD_STEPS):
+
+    # Lists of the graph
+    layers_l = graph.layers_l
+    in_ch_l = graph.in_ch_l; out_ch_l = graph.out_ch_l
+    hk_l = graph.hk_l; wk_l = graph.wk_l
+    hin_l = graph.hin_l; win_l = graph.win_l
+    h_str_l = graph.h_str_l; w_str_l = graph.w_str_l
+    h_pad_l = graph.h_pad_l; w_pad_l = graph.w_pad_l
+    data_type_l = graph.data_type_l
+    sumnode_connections = graph.sumnode_connections
 
     data_type = data_type_l[0]
     data_size = 0
@@ -130,7 +150,7 @@ def GenerateNet(proj_folder_path, project_name,
         suffix = "_fp16"
 
     # Generate net.h
-    f = open(proj_folder_path+'net.h', 'w')
+    f = files.OpenGenerated(proj_folder_path+'net.h')
 
     f.write("// PULP Defines\n")
     f.write("#define STACK_SIZE      4096\n")
@@ -165,15 +185,30 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("void reset_arguments();\n")
     f.write("void update_blob();\n")
     f.write("void reset_dim();\n")
+    if len(TILES) > 0:
+        f.write("void load_tile(void * ext, void * loc, int num_ch, int ch_stride, int ch_len);\n")
+        f.write("void store_tile(void * ext, void * loc, int num_ch, int ch_stride, int ch_len);\n")
+        f.write("void accumulate_tile(void * ext, void * loc, int num_ch, int ch_stride, int ch_len);\n")
+        f.write("void sum_tile(void * dest, void * src, int dim);\n")
+        f.write("void clear_l2(void * ext, int dim);\n")
+        f.write("void set_tile_dim(int in_C, int in_H, int in_W, int in_max, int w_C, int w_H, int w_W, int w_dim, int out_C, int out_H, int out_W);\n")
 
     f.write(f"#define MAX_IN_SIZE {max_input_dim(layers_l, in_ch_l, hin_l, win_l)}\n")
     f.write(f"#define MAX_WGT_SIZE {max_wgt_dim(layers_l, in_ch_l, hin_l, win_l, out_ch_l, hk_l, wk_l)}\n")
     f.write(f"#define MAX_SIZE {MAX_LAYER_DIM}\n")
+
+    # Sizes of the tiles (see DNN_Tiler)
+    if len(TILES) > 0:
+        f.write("\n// Tiled layers\n")
+        for layer, tile in TILES.items():
+            f.write(f"#define TILE_CO_L{layer} {tile['tile_co']}\n")
+            f.write(f"#define TILE_HO_L{layer} {tile['tile_ho']}\n")
+            f.write(f"#define TILE_IN_L{layer} {tile['in']}\n")
     f.close()    
 
 
     # Generate net.c
-    f = open(proj_folder_path+'net.c', 'w')
+    f = files.OpenGenerated(proj_folder_path+'net.c')
 
     f.write("/**\n * INCLUDES\n**/\n\n")
 
@@ -181,6 +216,7 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("#include \"net.h\"\n")
     f.write("#include \"stats.h\"\n\n")
     f.write("#include \"init-defines.h\"\n")
+    f.write("#include \"hyperparameters.h\"\n")
     f.write("#include \"io_data.h\"\n")
 
 
@@ -225,6 +261,8 @@ def GenerateNet(proj_folder_path, project_name,
     
     f.write("PI_L1 pi_cl_dma_cmd_t * cmd_store;\n")
     f.write("PI_L1 pi_cl_dma_cmd_t * cmd_load;\n")
+    if len(TILES) > 0:
+        f.write(f"PI_L1 {'float' if data_type == 'FP32' else 'fp16'} * ACC;\n")
 
     f.write("\n\n\n/**\n * DATA\n**/\n")
 
@@ -416,8 +454,12 @@ def GenerateNet(proj_folder_path, project_name,
                 im2col_byte_length = 2
             im2col_flag = True
             i2c_mem = 0
-            i2c_FW = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * math.floor((hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer]) * math.floor((win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer]) * im2col_byte_length
+            i2c_FW = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * graph.hout_l[layer] * graph.wout_l[layer] * im2col_byte_length
             i2c_BW = out_ch_l[layer] * hk_l[layer] * wk_l[layer] * hin_l[layer] * win_l[layer] * im2col_byte_length
+            # Tiled layers only need the im2col of a tile
+            if layer in TILES:
+                i2c_FW = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * TILES[layer]['tile_ho'] * graph.wout_l[layer] * im2col_byte_length
+                i2c_BW = TILES[layer]['tile_co'] * hk_l[layer] * wk_l[layer] * TILES[layer]['tile_hi'] * win_l[layer] * im2col_byte_length
             if i2c_FW > i2c_BW:
                 i2c_mem = i2c_FW
                 im2col_type = 'FW'
@@ -428,7 +470,16 @@ def GenerateNet(proj_folder_path, project_name,
                 im2col_max_memocc = i2c_mem
                 im2col_layer_index = layer
                 im2col_max_data_type = data_type_l[layer]
-    if im2col_flag == True:
+    if im2col_flag == True and im2col_layer_index in TILES:
+        f.write("\n// Define IM2COL buffer for all the convolutions (biggest tile @layer "+str(im2col_layer_index)+")\n")
+        if im2col_max_data_type == 'FP32':
+            f.write("PI_L1 float im2col_buffer["+str(im2col_max_memocc // 4)+"];\n")
+        elif im2col_max_data_type == 'FP16':
+            f.write("PI_L1 fp16 im2col_buffer["+str(im2col_max_memocc // 2)+"];\n")
+        else:
+            print("[deployment_utils.GenerateNet] Invalid data type for im2col!!")
+            exit()
+    elif im2col_flag == True:
         if im2col_type == 'FW':
             f.write("\n// Define IM2COL buffer for all the convolutions\n")
             if im2col_max_data_type == 'FP32':
@@ -463,6 +514,8 @@ def GenerateNet(proj_folder_path, project_name,
         elif (layers_l[layer] == 'conv2d' or layers_l[layer] == 'PW') and layer > 0:
             bt_flag = True
             bt_mem = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * out_ch_l[layer]
+            if layer in TILES:
+                bt_mem = in_ch_l[layer] * hk_l[layer] * wk_l[layer] * TILES[layer]['tile_co']
             if bt_mem > bt_max_memocc:
                 bt_max_memocc = bt_mem
                 bt_layer_index = layer
@@ -484,6 +537,15 @@ def GenerateNet(proj_folder_path, project_name,
         f.write("\n// Define transposition / block transposition buffer for all conv2d and PW layers\n")
         if bt_layer_index == 0:
             f.write("PI_L1 float bt_buffer[1];")
+        elif bt_layer_index in TILES:
+            idx = str(bt_layer_index)
+            if bt_max_data_type == 'FP32':
+                f.write("PI_L1 float bt_buffer[Tin_C_l"+idx+"*TILE_CO_L"+idx+"*Tker_H_l"+idx+"*Tker_W_l"+idx+"];\n")
+            elif bt_max_data_type == 'FP16':
+                f.write("PI_L1 fp16 bt_buffer[Tin_C_l"+idx+"*TILE_CO_L"+idx+"*Tker_H_l"+idx+"*Tker_W_l"+idx+"];\n")
+            else:
+                print("[deployment_utils.GenerateNet] Invalid data type for blocktranspose!")
+                exit()
         elif bt_layer_index > 0:
             if bt_max_data_type == 'FP32':
                 f.write("PI_L1 float bt_buffer[Tin_C_l"+str(bt_layer_index)+"*Tout_C_l"+str(bt_layer_index)+"*Tker_H_l"+str(bt_layer_index)+"*Tker_W_l"+str(bt_layer_index)+"];\n")
@@ -537,8 +599,8 @@ def GenerateNet(proj_folder_path, project_name,
     max_cast_buffer_type = 'FP32'
     for layer in range(len(layers_l)):
         # Output size for current layer
-        h_out = math.floor((hin_l[layer]-hk_l[layer]+2*h_pad_l[layer]+h_str_l[layer])/h_str_l[layer])
-        w_out = math.floor((win_l[layer]-wk_l[layer]+2*w_pad_l[layer]+w_str_l[layer])/w_str_l[layer])
+        h_out = graph.hout_l[layer]
+        w_out = graph.wout_l[layer]
         # Find if there are mixed types
         if data_type_l[layer] != previous_type:
             is_mixed_precision = True
@@ -882,8 +944,9 @@ def GenerateNet(proj_folder_path, project_name,
 
     f.write("\n// Forward pass function\n")
     f.write("void forward()\n{\n")
-    f.write("\treset_dim();\n")
-    f.write("\tload_input(&layer0_in, 1);\n")
+    if 0 not in TILES:
+        f.write("\treset_dim();\n")
+        f.write("\tload_input(&layer0_in, 1);\n")
 
     # Profiling options: single layer or all
     if PROFILE_SINGLE_LAYERS == True:
@@ -899,17 +962,20 @@ def GenerateNet(proj_folder_path, project_name,
             f.write("  START_STATS();\n")
             f.write("  #endif\n")  
 
-        if layer > 0:
+        if layer > 0 and layer not in TILES:
             f.write("\treset_dim();\n")
             f.write(f"\tload_input(&layer{layer}_in, 1);\n")
 
-        if layers_l[layer] not in ['Skipnode', 'ReLU']:
+        if layers_l[layer] not in ['Skipnode', 'ReLU'] and layer not in TILES:
             f.write(f"\tload_coeff(&layer{layer}_wgt, 1);\n")
             if layers_l[layer] not in ['Sumnode', 'InstNorm']:
                 f.write(f"\tcopy_struct_param((unsigned int) &l{layer}_args, (unsigned int) &{layers_l[layer]}_args, sizeof({layers_l[layer]}_args));\n")
-        f.write(f"\tget_output_dim(&layer{layer}_out);\n")
+        if layer not in TILES:
+            f.write(f"\tget_output_dim(&layer{layer}_out);\n")
         # Generate layer template
-        if layers_l[layer] == 'linear':
+        if layer in TILES:
+            f.write(ntemp.tiled_layer_template_FW(layer, layers_l[layer], TILES[layer], data_type_l[layer]))
+        elif layers_l[layer] == 'linear':
             f.write(ntemp.linear_template_FW(layer, data_type_l[layer]))
         elif layers_l[layer] == 'conv2d':
             f.write(ntemp.conv2d_template_FW(layer, data_type_l[layer]))
@@ -932,7 +998,9 @@ def GenerateNet(proj_folder_path, project_name,
         else:
             print("[deployment_utils.GenerateNet]: PULP layer not implemented or wrapped in DNN Deployer!")
             exit()
-        if layers_l[layer] != 'Skipnode':
+        if layer in TILES:
+            f.write("\n")
+        elif layers_l[layer] != 'Skipnode':
             f.write(f"\tstore_output(&layer{layer}_out, 1);\n\n")
         else:
             f.write(f"\tstore_input(&layer{layer}_out, 1);\n\n")
@@ -962,6 +1030,8 @@ def GenerateNet(proj_folder_path, project_name,
 
     f.write("\n// Backward pass function\n")
     f.write("void backward()\n{\n")
+    if len(layers_l)-1 in TILES:
+        f.write("  reset_dim();\n")
 
     # Compute loss
     if loss_fn == "MSELoss":
@@ -1033,22 +1103,28 @@ def GenerateNet(proj_folder_path, project_name,
         
         f.write("\n\treset_dim();\n")
 
-        if layers_l[lay] != 'Sumnode':
+        # Tiled layers load and store their tiles inside the tile loop
+        is_tiled = lay in TILES
+
+        if layers_l[lay] != 'Sumnode' and not is_tiled:
             if layers_l[lay] == 'Skipnode':
                 f.write(f"\tload_input(&layer{target_layer}_in, 0);\n")
             else:
                 f.write(f"\tload_input(&layer{target_layer}_in, 1);\n")
 
-        if layers_l[lay] != 'Sumnode' and layers_l[lay] != 'Skipnode' and layers_l[lay] != 'ReLU':
+        if layers_l[lay] != 'Sumnode' and layers_l[lay] != 'Skipnode' and layers_l[lay] != 'ReLU' and not is_tiled:
             f.write(f"\tload_coeff(&layer{lay}_wgt, 1);\n")
 
-        f.write(f"\tload_output(&layer{lay}_out, 2);\n")
+        if not is_tiled:
+            f.write(f"\tload_output(&layer{lay}_out, 2);\n")
 
         # Copy struct info 
-        if layers_l[lay] != 'Skipnode' and layers_l[lay] != 'Sumnode' and layers_l[lay] != 'ReLU':
+        if layers_l[lay] != 'Skipnode' and layers_l[lay] != 'Sumnode' and layers_l[lay] != 'ReLU' and not is_tiled:
             f.write(f"\tcopy_struct_param((unsigned int) &l{lay}_args, (unsigned int) &{layers_l[lay]}_args, sizeof(l{lay}_args));\n")
 
-        if layers_l[lay] == 'linear':
+        if is_tiled:
+            f.write(ntemp.tiled_layer_template_BW(lay, layers_l[lay], TILES[lay], data_type_l[lay], FIRST_LAYER))
+        elif layers_l[lay] == 'linear':
             f.write(ntemp.linear_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER))
         elif layers_l[lay] == 'conv2d':
             f.write(ntemp.conv2d_template_BW(lay, data_type_l[lay], SEPARATE_BACKWARD_STEPS, FIRST_LAYER))
@@ -1088,10 +1164,10 @@ def GenerateNet(proj_folder_path, project_name,
             f.write(ntemp.sum(lay, data_type_l[lay]))
         
 
-        if layers_l[lay] != 'Sumnode' and layers_l[lay] != 'Skipnode' and layers_l[lay] != 'ReLU':
+        if layers_l[lay] != 'Sumnode' and layers_l[lay] != 'Skipnode' and layers_l[lay] != 'ReLU' and not is_tiled:
             f.write(f"\tstore_coeff(&layer{lay}_wgt, 0);\n")
 
-        if lay > 0 and layers_l[lay] != 'Sumnode':
+        if lay > 0 and layers_l[lay] != 'Sumnode' and not is_tiled:
             f.write(f"\tstore_input(&layer{target_layer}_in, 0);\n")
 
         # Profile layer by layer?
@@ -1161,6 +1237,15 @@ def GenerateNet(proj_folder_path, project_name,
                 print("[deployment_utils.GenerateNet]: Invalid data type for optimizer structure generation @layer{}!".format(layer))  
             f.write("  opt_l"+str(layer)+".weights = &weight_blob;\n")
             f.write("  opt_l"+str(layer)+".learning_rate = LEARNING_RATE;\n")
+            # Tiled layers are updated one output channel tile at a time
+            if layer in TILES and optimizer == "SGD":
+                if data_type_l[layer] == 'FP32':
+                    f.write(ntemp.tiled_update_template(layer, layers_l[layer], "pulp_gradient_descent_fp32")+"\n")
+                elif data_type_l[layer] == 'FP16':
+                    f.write(ntemp.tiled_update_template(layer, layers_l[layer], "pulp_gradient_descent_fp16")+"\n")
+                else:
+                    print("[deployment_utils.GenerateNet]: Invalid data type for gradient descent @Layer{}!".format(layer))
+                continue
             f.write(f"  load_coeff(&layer{layer}_wgt, 2);\n")
             if optimizer == "SGD":
                 if data_type_l[layer] == 'FP32':
@@ -1411,6 +1496,69 @@ def GenerateNet(proj_folder_path, project_name,
     f.write("\tweight_blob.dim = 0;\n")
     f.write("\toutput_blob.dim = 0;}\n")
 
+    # Tile loops of the tiled layers
+    if len(TILES) > 0:
+        C_type = 'float' if data_type == 'FP32' else 'fp16'
+
+        f.write("\n// Copies num_ch channels of ch_len elements (spaced by ch_stride elements in L2) between L2 and L1\n")
+        f.write("void load_tile(void * ext, void * loc, int num_ch, int ch_stride, int ch_len){\n")
+        f.write("\tif (num_ch == 1 || ch_stride == ch_len)\n")
+        f.write(f"\tpi_cl_dma_cmd((uint32_t) ext, (uint32_t) loc, {data_size}*num_ch*ch_len, PI_CL_DMA_DIR_EXT2LOC , cmd_load);\n")
+        f.write("\telse\n")
+        f.write(f"\tpi_cl_dma_cmd_2d((uint32_t) ext, (uint32_t) loc, {data_size}*num_ch*ch_len, {data_size}*ch_stride, {data_size}*ch_len, PI_CL_DMA_DIR_EXT2LOC , cmd_load);\n")
+        f.write("\tpi_cl_dma_cmd_wait(cmd_load);}\n")
+
+        f.write("\nvoid store_tile(void * ext, void * loc, int num_ch, int ch_stride, int ch_len){\n")
+        f.write("\tif (num_ch == 1 || ch_stride == ch_len)\n")
+        f.write(f"\tpi_cl_dma_cmd((uint32_t) ext, (uint32_t) loc, {data_size}*num_ch*ch_len, PI_CL_DMA_DIR_LOC2EXT , cmd_store);\n")
+        f.write("\telse\n")
+        f.write(f"\tpi_cl_dma_cmd_2d((uint32_t) ext, (uint32_t) loc, {data_size}*num_ch*ch_len, {data_size}*ch_stride, {data_size}*ch_len, PI_CL_DMA_DIR_LOC2EXT , cmd_store);\n")
+        f.write("\tpi_cl_dma_cmd_wait(cmd_store);}\n")
+
+        f.write("\n// Adds a tile to the partial sums in L2\n")
+        f.write("void accumulate_tile(void * ext, void * loc, int num_ch, int ch_stride, int ch_len){\n")
+        f.write("\tload_tile(ext, ACC, num_ch, ch_stride, ch_len);\n")
+        f.write("\tsum_tile(loc, ACC, num_ch*ch_len);\n")
+        f.write("\tstore_tile(ext, loc, num_ch, ch_stride, ch_len);}\n")
+
+        f.write("\nvoid sum_tile(void * dest, void * src, int dim){\n")
+        f.write(f"\tvect_sum_args{suffix}.op_1 = ({C_type} *) src;\n")
+        f.write(f"\tvect_sum_args{suffix}.op_2 = ({C_type} *) dest;\n")
+        f.write(f"\tvect_sum_args{suffix}.dest = ({C_type} *) dest;\n")
+        f.write(f"\tvect_sum_args{suffix}.size = dim;\n")
+        f.write(f"\tpi_cl_team_fork(NUM_CORES, vect_sum{suffix}, &vect_sum_args{suffix});}}\n")
+
+        f.write("\n// Sets a tensor in L2 to zero (through the L1 buffer)\n")
+        f.write("void clear_l2(void * ext, int dim){\n")
+        f.write("\tfor (int i=0; i<MAX_SIZE; i++) BUFF[i] = 0;\n")
+        f.write("\tfor (int i=0; i<dim; i+=MAX_SIZE) {\n")
+        f.write("\tint len = (dim-i < MAX_SIZE) ? (dim-i) : MAX_SIZE;\n")
+        f.write(f"\tpi_cl_dma_cmd((uint32_t) ((({C_type} *) ext) + i), (uint32_t) BUFF, {data_size}*len, PI_CL_DMA_DIR_LOC2EXT , cmd_store);\n")
+        f.write("\tpi_cl_dma_cmd_wait(cmd_store);}}\n")
+
+        f.write("\n// Sets the sizes of a tile and its pointers in L1 (the weights do not move with the size of the input tile, up to in_max)\n")
+        f.write("void set_tile_dim(int in_C, int in_H, int in_W, int in_max, int w_C, int w_H, int w_W, int w_dim, int out_C, int out_H, int out_W){\n")
+        f.write("\tinput_blob.C = in_C;\n")
+        f.write("\tinput_blob.H = in_H;\n")
+        f.write("\tinput_blob.W = in_W;\n")
+        f.write("\tinput_blob.dim = in_C*in_H*in_W;\n")
+        f.write("\tweight_blob.C = w_C;\n")
+        f.write("\tweight_blob.H = w_H;\n")
+        f.write("\tweight_blob.W = w_W;\n")
+        f.write("\tweight_blob.dim = w_dim;\n")
+        f.write("\toutput_blob.C = out_C;\n")
+        f.write("\toutput_blob.H = out_H;\n")
+        f.write("\toutput_blob.W = out_W;\n")
+        f.write("\toutput_blob.dim = out_C*out_H*out_W;\n")
+        f.write("\tIN_DATA = BUFF;\n")
+        f.write("\tIN_DIFF = BUFF + in_max;\n")
+        f.write("\tW_DATA = BUFF + 2*in_max;\n")
+        f.write("\tW_DIFF = W_DATA + weight_blob.dim;\n")
+        f.write("\tOUT_DATA = W_DIFF + weight_blob.dim;\n")
+        f.write("\tOUT_DIFF = OUT_DATA + output_blob.dim;\n")
+        f.write("\tACC = OUT_DIFF + output_blob.dim;\n")
+        f.write("\tupdate_blob();}\n")
+
     f.close()
 
 
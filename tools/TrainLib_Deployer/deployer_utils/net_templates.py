@@ -220,6 +220,44 @@ def ReLU_template_BW(layer_number, DATA_TYPE):
     return template
 
 
+"""
+FUSED LAYERS TEMPLATES (see DNN_Fusion)
+"""
+
+FUSED_FW_FUNCTIONS = {'linear': 'pulp_linear_{}_fw_relu_cl', 'conv2d': 'pulp_conv2d_{}_fw_relu_cl', 'DW': 'pulp_conv_dw_{}_fw_relu_cl',
+                      'PW': 'pulp_conv_pw_{}_fw_relu_cl', 'Sumnode': 'pulp_residualconn_{}_fw_relu'}
+FUSED_BW_FUNCTIONS = {'linear': 'pulp_linear_{}', 'conv2d': 'pulp_conv2d_{}', 'DW': 'pulp_conv_dw_{}', 'PW': 'pulp_conv_pw_{}'}
+
+def fused_ReLU_template_FW(layer_number, layer_type, relu_number, DATA_TYPE):
+    if layer_type not in FUSED_FW_FUNCTIONS:
+        print("[net_templates.fused_ReLU_template_FW]: Layer {} can not be fused with ReLU!".format(layer_type))
+        exit()
+    if DATA_TYPE == 'FP32':
+        function = FUSED_FW_FUNCTIONS[layer_type].format('fp32')
+    elif DATA_TYPE == 'FP16':
+        function = FUSED_FW_FUNCTIONS[layer_type].format('fp16')
+    else:
+        print("[net_templates.fused_ReLU_template_FW]: Invalid data type!")
+        exit()
+    template = "  "+function+"(&l"+str(layer_number)+"_args, &l"+str(relu_number)+"_args);\n"
+    return template
+
+def fused_ReLU_template_BW(layer_number, layer_type, relu_number, DATA_TYPE):
+    if layer_type not in FUSED_BW_FUNCTIONS:
+        print("[net_templates.fused_ReLU_template_BW]: Layer {} can not be fused with ReLU!".format(layer_type))
+        exit()
+    if DATA_TYPE == 'FP32':
+        function = FUSED_BW_FUNCTIONS[layer_type].format('fp32')
+    elif DATA_TYPE == 'FP16':
+        function = FUSED_BW_FUNCTIONS[layer_type].format('fp16')
+    else:
+        print("[net_templates.fused_ReLU_template_BW]: Invalid data type!")
+        exit()
+    template  = "  "+function+"_bw_param_grads_cl(&l"+str(layer_number)+"_args);\n"
+    template += "  "+function+"_bw_input_grads_relu_cl(&l"+str(layer_number)+"_args, &l"+str(relu_number)+"_args);\n"
+    return template
+
+
 """
 POOLING TEMPLATES
 """
@@ -287,13 +325,13 @@ def InstNorm_template_BW(layer_number, data_type):
 TYPE CHANGE TEMPLATES
 """
 
-def cast_fp32_to_fp16_template (layer_number, STEP, DATA_TYPE):
+def cast_fp32_to_fp16_template (layer_number, STEP, DATA_TYPE, BATCH_PREFIX=""):
     if STEP == 'FW':
         template =  "  // Propagate FP32 layer "+str(layer_number)+" to FP16\n"
         template += "  struct cast_32t16_args cast_l"+str(layer_number)+"_args;\n"
         template += "  cast_l"+str(layer_number)+"_args.source = (float*) cast_buffer;\n"
         template += "  cast_l"+str(layer_number)+"_args.destination = layer"+str(layer_number+1)+"_in.data;\n"  
-        template += "  cast_l"+str(layer_number)+"_args.size = Tout_C_l"+str(layer_number)+" * Tout_H_l"+str(layer_number)+" * Tout_W_l"+str(layer_number)+";\n"
+        template += "  cast_l"+str(layer_number)+"_args.size = "+BATCH_PREFIX+"Tout_C_l"+str(layer_number)+" * Tout_H_l"+str(layer_number)+" * Tout_W_l"+str(layer_number)+";\n"
         template += "  pi_cl_team_fork(NUM_CORES, cast_fp32_tensor_to_fp16, &cast_l"+str(layer_number)+"_args);\n"
         template += "  // End of casting\n"
     elif STEP == 'BW':
@@ -301,20 +339,20 @@ def cast_fp32_to_fp16_template (layer_number, STEP, DATA_TYPE):
         template += "  struct cast_32t16_args cast_l"+str(layer_number)+"_args;\n"
         template += "  cast_l"+str(layer_number)+"_args.source = layer"+str(layer_number)+"_in.diff;\n"
         template += "  cast_l"+str(layer_number)+"_args.destination = (fp16*) cast_buffer;\n"  
-        template += "  cast_l"+str(layer_number)+"_args.size = Tin_C_l"+str(layer_number)+" * Tin_H_l"+str(layer_number)+" * Tin_W_l"+str(layer_number)+";\n"
+        template += "  cast_l"+str(layer_number)+"_args.size = "+BATCH_PREFIX+"Tin_C_l"+str(layer_number)+" * Tin_H_l"+str(layer_number)+" * Tin_W_l"+str(layer_number)+";\n"
         template += "  pi_cl_team_fork(NUM_CORES, cast_fp32_tensor_to_fp16, &cast_l"+str(layer_number)+"_args);\n"
         template += "  // End of casting\n"
     else:
         print("[net_templates.cast_fp32_to_fp16_template]: Invalid training step for template generation @layer{}!".format(layer_number))
     return template
 
-def cast_fp16_to_fp32_template (layer_number, STEP, DATA_TYPE):
+def cast_fp16_to_fp32_template (layer_number, STEP, DATA_TYPE, BATCH_PREFIX=""):
     if STEP == 'FW':
         template =  "  // Propagate FP16 layer "+str(layer_number)+" to FP32\n"
         template += "  struct cast_16t32_args cast_l"+str(layer_number)+"_args;\n"
         template += "  cast_l"+str(layer_number)+"_args.source = (fp16*) cast_buffer;\n"
         template += "  cast_l"+str(layer_number)+"_args.destination = layer"+str(layer_number+1)+"_in.data;\n" 
-        template += "  cast_l"+str(layer_number)+"_args.size = Tout_C_l"+str(layer_number)+" * Tout_H_l"+str(layer_number)+" * Tout_W_l"+str(layer_number)+";\n" 
+        template += "  cast_l"+str(layer_number)+"_args.size = "+BATCH_PREFIX+"Tout_C_l"+str(layer_number)+" * Tout_H_l"+str(layer_number)+" * Tout_W_l"+str(layer_number)+";\n" 
         template += "  pi_cl_team_fork(NUM_CORES, cast_fp16_tensor_to_fp32, &cast_l"+str(layer_number)+"_args);\n"
         template += "  // End of casting\n"
     elif STEP == 'BW':
@@ -322,7 +360,7 @@ def cast_fp16_to_fp32_template (layer_number, STEP, DATA_TYPE):
         template += "  struct cast_16t32_args cast_l"+str(layer_number)+"_args;\n"
         template += "  cast_l"+str(layer_number)+"_args.source = layer"+str(layer_number)+"_in.diff;\n"
         template += "  cast_l"+str(layer_number)+"_args.destination = (float*) cast_buffer;\n"
-        template += "  cast_l"+str(layer_number)+"_args.size = Tin_C_l"+str(layer_number)+" * Tin_H_l"+str(layer_number)+" * Tin_W_l"+str(layer_number)+";\n"  
+        template += "  cast_l"+str(layer_number)+"_args.size = "+BATCH_PREFIX+"Tin_C_l"+str(layer_number)+" * Tin_H_l"+str(layer_number)+" * Tin_W_l"+str(layer_number)+";\n"  
         template += "  pi_cl_team_fork(NUM_CORES, cast_fp16_tensor_to_fp32, &cast_l"+str(layer_number)+"_args);\n"
         template += "  // End of casting\n"
     else:
@@ -333,6 +371,77 @@ def cast_fp16_to_fp32_template (layer_number, STEP, DATA_TYPE):
 
 
 
+"""
+BATCH TEMPLATES (see DNN_Batch)
+"""
+
+def shift_blobs_template(blobs, samples, DATA_TYPE):
+    if DATA_TYPE == 'FP32':
+        function = "shift_blob"
+    elif DATA_TYPE == 'FP16':
+        function = "shift_blob_fp16"
+    else:
+        print("[net_templates.shift_blobs_template]: Invalid data type!")
+        exit()
+    template = "  "+" ".join([function+"(&"+blob+", "+samples+");" for blob in blobs])+"\n"
+    return template
+
+def batch_grad_select_template(layer_number, DATA_TYPE):
+    if DATA_TYPE == 'FP32':
+        C_type = 'float'
+    elif DATA_TYPE == 'FP16':
+        C_type = 'fp16'
+    else:
+        print("[net_templates.batch_grad_select_template]: Invalid data type!")
+        exit()
+    template = "  layer"+str(layer_number)+"_wgt.diff = (b == 0) ? l"+str(layer_number)+"_ker_diff : ("+C_type+"*) batch_grad_buffer;\n"
+    return template
+
+def batch_grad_sum_template(layer_number, DATA_TYPE):
+    if DATA_TYPE == 'FP32':
+        args = "vect_sum_args"; function = "vect_sum"
+    elif DATA_TYPE == 'FP16':
+        args = "vect_sum_args_fp16"; function = "vect_sum_fp16"
+    else:
+        print("[net_templates.batch_grad_sum_template]: Invalid data type!")
+        exit()
+    template  = "  if (b > 0) {\n"
+    template += "    "+args+".op_1 = l"+str(layer_number)+"_ker_diff;\n"
+    template += "    "+args+".op_2 = layer"+str(layer_number)+"_wgt.diff;\n"
+    template += "    "+args+".dest = l"+str(layer_number)+"_ker_diff;\n"
+    template += "    "+args+".size = layer"+str(layer_number)+"_wgt.dim;\n"
+    template += "    pi_cl_team_fork(NUM_CORES, "+function+", &"+args+");\n"
+    template += "  }\n"
+    return template
+
+def batch_output_template(layer_number, DATA_TYPE):
+    if DATA_TYPE == 'FP32':
+        template = "  struct blob batch_output = layer"+str(layer_number)+"_out;\n"
+    elif DATA_TYPE == 'FP16':
+        template = "  struct blob_fp16 batch_output = layer"+str(layer_number)+"_out;\n"
+    else:
+        print("[net_templates.batch_output_template]: Invalid data type!")
+        exit()
+    template += "  batch_output.dim = BATCH_SIZE*layer"+str(layer_number)+"_out.dim;\n"
+    template += "  loss_args.output = &batch_output;\n"
+    return template
+
+def shift_blob_functions():
+    template  = "\n// Moves a blob to another sample of the batch\n"
+    template += "void shift_blob(struct blob * b, int samples)\n{\n"
+    template += "  b->data += samples*b->dim;\n"
+    template += "  b->diff += samples*b->dim;\n"
+    template += "}\n\n"
+    template += "void shift_blob_fp16(struct blob_fp16 * b, int samples)\n{\n"
+    template += "  b->data += samples*b->dim;\n"
+    template += "  b->diff += samples*b->dim;\n"
+    template += "}\n"
+    return template
+
+
+
+
+
 """
 CONFIGURATION STRUCTURE TEMPLATES
 """
@@ -448,19 +557,19 @@ def resconn_config_template(layer_number, skip_node, skip_input, layer_type):
 #     return template
 
 
-def sum(layer, data_type):
+def sum(layer, data_type, batch_prefix=""):
     if data_type == 'FP32':
         template = f"vect_sum_args.op_1 = layer{layer}_in.diff;\n"
         template += f"vect_sum_args.op_2 = layer{layer+1}_in.diff;\n"
         template += f"vect_sum_args.dest = layer{layer}_in.diff;\n"
-        template += f"vect_sum_args.size = layer{layer}_in.dim;\n"
+        template += f"vect_sum_args.size = {batch_prefix}layer{layer}_in.dim;\n"
         template += "pi_cl_team_fork(NUM_CORES, vect_sum, &vect_sum_args);\n"
 
     elif data_type == 'FP16':
         template = f"vect_sum_args_fp16.op_1 = layer{layer}_in.diff;\n"
         template += f"vect_sum_args_fp16.op_2 = layer{layer+1}_in.diff;\n"
         template += f"vect_sum_args_fp16.dest = layer{layer}_in.diff;\n"
-        template += f"vect_sum_args_fp16.size = layer{layer}_in.dim;\n"
+        template += f"vect_sum_args_fp16.size = {batch_prefix}layer{layer}_in.dim;\n"
         template += "pi_cl_team_fork(NUM_CORES, vect_sum_fp16, &vect_sum_args_fp16);\n"
     else:
         print("\n[net_templates.py - sum] Invalid Data Type\n")
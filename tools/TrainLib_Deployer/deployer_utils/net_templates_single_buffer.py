@@ -300,6 +300,146 @@ def InstNorm_template_BW(layer_number, data_type):
 
 
 
+"""
+TILED LAYER TEMPLATES
+"""
+
+def tiled_kernel_name(layer_type, DATA_TYPE):
+    kernels = {'conv2d': 'pulp_conv2d', 'PW': 'pulp_conv_pw', 'DW': 'pulp_conv_dw', 'linear': 'pulp_linear', 'ReLU': 'pulp_relu'}
+    if layer_type not in kernels:
+        print("[net_templates.tiled_kernel_name]: Layer {} cannot be tiled!".format(layer_type))
+        exit()
+    if DATA_TYPE == 'FP32':
+        return kernels[layer_type]+"_fp32"
+    elif DATA_TYPE == 'FP16':
+        return kernels[layer_type]+"_fp16"
+    else:
+        print("[net_templates.tiled_kernel_name]: Invalid data type!")
+        exit()
+
+# Elements of the weights of an output channel
+def tiled_wgt_size(layer_number, layer_type):
+    if layer_type == 'DW':
+        return "Tker_H_l"+str(layer_number)+"*Tker_W_l"+str(layer_number)
+    return "Tin_C_l"+str(layer_number)+"*Tker_H_l"+str(layer_number)+"*Tker_W_l"+str(layer_number)
+
+# Opens the loops over the output channel tiles and the output row tiles, and sets the sizes of the current tile
+def tiled_loop_template(layer_number, layer_type, tile):
+    l = str(layer_number)
+    template  = "  // Layer "+l+": "+str(tile['num_co'])+" x "+str(tile['num_ho'])+" tiles of TILE_CO_L"+l+" output channels and TILE_HO_L"+l+" output rows\n"
+    template += "  for (int co=0; co<Tout_C_l"+l+"; co+=TILE_CO_L"+l+") {\n"
+    template += "  int nco = (Tout_C_l"+l+"-co < TILE_CO_L"+l+") ? (Tout_C_l"+l+"-co) : TILE_CO_L"+l+";\n"
+    template += "  for (int ho=0; ho<Tout_H_l"+l+"; ho+=TILE_HO_L"+l+") {\n"
+    template += "  int nho = (Tout_H_l"+l+"-ho < TILE_HO_L"+l+") ? (Tout_H_l"+l+"-ho) : TILE_HO_L"+l+";\n"
+    # Input rows of the tile (with the halo of the kernel)
+    if tile['rows_tiled'] and layer_type == 'ReLU':
+        template += "  int hi = ho;\n"
+        template += "  int nhi = nho;\n"
+    elif tile['rows_tiled']:
+        template += "  int hi = ho;\n"
+        template += "  int nhi = nho + Tker_H_l"+l+" - 1;\n"
+    else:
+        template += "  int hi = 0;\n"
+        template += "  int nhi = Tin_H_l"+l+";\n"
+    # Element-wise layers: the input tile has the same channels and rows of the output tile, and there are no weights
+    if layer_type == 'ReLU':
+        template += "  int ci = co;\n"
+        template += "  int nci = nco;\n"
+        template += "  set_tile_dim(nci, nhi, Tin_W_l"+l+", TILE_IN_L"+l+", 0, 0, 0, 0, nco, nho, Tout_W_l"+l+");\n"
+        return template
+    # Input channels of the tile
+    if layer_type == 'DW':
+        template += "  int ci = co;\n"
+        template += "  int nci = nco;\n"
+        template += "  set_tile_dim(nci, nhi, Tin_W_l"+l+", TILE_IN_L"+l+", nco, Tker_H_l"+l+", Tker_W_l"+l+", nco*"+tiled_wgt_size(layer_number, layer_type)+", nco, nho, Tout_W_l"+l+");\n"
+    else:
+        template += "  int ci = 0;\n"
+        template += "  int nci = Tin_C_l"+l+";\n"
+        template += "  set_tile_dim(nci, nhi, Tin_W_l"+l+", TILE_IN_L"+l+", Tin_C_l"+l+", Tker_H_l"+l+", Tker_W_l"+l+", nco*"+tiled_wgt_size(layer_number, layer_type)+", nco, nho, Tout_W_l"+l+");\n"
+    # The weights of the output channel tile stay in L1 for all the row tiles
+    template += "  if (ho == 0) load_tile(layer"+l+"_wgt.data + co*"+tiled_wgt_size(layer_number, layer_type)+", W_DATA, 1, weight_blob.dim, weight_blob.dim);\n"
+    return template
+
+# Arguments of load_tile / store_tile for the input and the output of the current tile
+def tiled_input_args(layer_number):
+    l = str(layer_number)
+    return "(ci*Tin_H_l"+l+" + hi)*Tin_W_l"+l+", IN_DATA, nci, Tin_H_l"+l+"*Tin_W_l"+l+", nhi*Tin_W_l"+l
+
+def tiled_output_args(layer_number):
+    l = str(layer_number)
+    return "(co*Tout_H_l"+l+" + ho)*Tout_W_l"+l+", OUT_DATA, nco, Tout_H_l"+l+"*Tout_W_l"+l+", nho*Tout_W_l"+l
+
+def tiled_layer_template_FW(layer_number, layer_type, tile, DATA_TYPE):
+    l = str(layer_number)
+    kernel = tiled_kernel_name(layer_type, DATA_TYPE)
+    template  = tiled_loop_template(layer_number, layer_type, tile)
+    template += "  load_tile(layer"+l+"_in.data + "+tiled_input_args(layer_number)+");\n"
+    if layer_type == 'ReLU':
+        template += "  "+kernel+"_fw_cl(&act_args);\n"
+    else:
+        template += "  "+kernel+"_fw_cl(&l"+l+"_args);\n"
+    template += "  store_tile(layer"+l+"_out.data + "+tiled_output_args(layer_number)+");\n"
+    template += "  }\n"
+    template += "  }\n"
+    return template
+
+def tiled_layer_template_BW(layer_number, layer_type, tile, DATA_TYPE, FIRST_LAYER):
+    l = str(layer_number)
+    kernel = tiled_kernel_name(layer_type, DATA_TYPE)
+    template = ""
+    # Element-wise layers only propagate the gradient to their input
+    if layer_type == 'ReLU':
+        if FIRST_LAYER == True:
+            return template
+        template += tiled_loop_template(layer_number, layer_type, tile)
+        template += "  load_tile(layer"+l+"_in.data + "+tiled_input_args(layer_number)+");\n"
+        template += "  load_tile(layer"+l+"_out.diff + "+tiled_output_args(layer_number).replace("OUT_DATA", "OUT_DIFF")+");\n"
+        template += "  "+kernel+"_bw_cl(&act_args);\n"
+        template += "  store_tile(layer"+l+"_in.diff + "+tiled_input_args(layer_number).replace("IN_DATA", "IN_DIFF")+");\n"
+        template += "  }\n"
+        template += "  }\n"
+        return template
+    # Input gradients are accumulated in L2 over the output channel tiles and the halos
+    if tile['ig_acc'] and FIRST_LAYER == False:
+        template += "  clear_l2(layer"+l+"_in.diff, Tin_C_l"+l+"*Tin_H_l"+l+"*Tin_W_l"+l+");\n"
+    template += tiled_loop_template(layer_number, layer_type, tile)
+    template += "  load_tile(layer"+l+"_in.data + "+tiled_input_args(layer_number)+");\n"
+    template += "  load_tile(layer"+l+"_out.diff + "+tiled_output_args(layer_number).replace("OUT_DATA", "OUT_DIFF")+");\n"
+    # Weight gradients are accumulated in L1 over the row tiles
+    if tile['wg_acc']:
+        template += "  if (ho > 0) weight_blob.diff = ACC;\n"
+    template += "  "+kernel+"_bw_param_grads_cl(&l"+l+"_args);\n"
+    if tile['wg_acc']:
+        template += "  if (ho > 0) sum_tile(W_DIFF, ACC, weight_blob.dim);\n"
+    if FIRST_LAYER == False:
+        template += "  "+kernel+"_bw_input_grads_cl(&l"+l+"_args);\n"
+        if tile['ig_acc']:
+            template += "  accumulate_tile(layer"+l+"_in.diff + "+tiled_input_args(layer_number).replace("IN_DATA", "IN_DIFF")+");\n"
+        else:
+            template += "  store_tile(layer"+l+"_in.diff + "+tiled_input_args(layer_number).replace("IN_DATA", "IN_DIFF")+");\n"
+    template += "  }\n"
+    template += "  store_tile(layer"+l+"_wgt.diff + co*"+tiled_wgt_size(layer_number, layer_type)+", W_DIFF, 1, weight_blob.dim, weight_blob.dim);\n"
+    template += "  }\n"
+    return template
+
+def tiled_update_template(layer_number, layer_type, optimizer_function):
+    l = str(layer_number)
+    wgt_size = tiled_wgt_size(layer_number, layer_type)
+    template  = "  for (int co=0; co<Tout_C_l"+l+"; co+=TILE_CO_L"+l+") {\n"
+    template += "  int nco = (Tout_C_l"+l+"-co < TILE_CO_L"+l+") ? (Tout_C_l"+l+"-co) : TILE_CO_L"+l+";\n"
+    if layer_type == 'DW':
+        template += "  set_tile_dim(0, 0, 0, 0, nco, Tker_H_l"+l+", Tker_W_l"+l+", nco*"+wgt_size+", 0, 0, 0);\n"
+    else:
+        template += "  set_tile_dim(0, 0, 0, 0, Tin_C_l"+l+", Tker_H_l"+l+", Tker_W_l"+l+", nco*"+wgt_size+", 0, 0, 0);\n"
+    template += "  load_tile(layer"+l+"_wgt.data + co*"+wgt_size+", W_DATA, 1, weight_blob.dim, weight_blob.dim);\n"
+    template += "  load_tile(layer"+l+"_wgt.diff + co*"+wgt_size+", W_DIFF, 1, weight_blob.dim, weight_blob.dim);\n"
+    template += "  pi_cl_team_fork(NUM_CORES, "+optimizer_function+", &opt_l"+l+");\n"
+    template += "  store_tile(layer"+l+"_wgt.data + co*"+wgt_size+", W_DATA, 1, weight_blob.dim, weight_blob.dim);\n"
+    template += "  }\n"
+    return template
+
+
+
 """
 TYPE CHANGE TEMPLATES
 """
@@ -14,58 +14,350 @@ See the License for the specific language governing permissions and
 limitations under the License.
 '''
 
+'''
+Authors: Davide Nadalini, Leonardo Ravaglia
+'''
+
+
+import os
+import io
+import sys
+import json
+import shutil
+import filecmp
+import hashlib
 import torch
+import numpy as np
+
+# Number of elements which are formatted and written to file at once
+CHUNK_SIZE = 65536
+
+# Available element formats:
+# 'float'     -> shortest decimal literal which round-trips to the same fp32 value (e.g. 0.1f)
+# 'hex'       -> exact C99 hexadecimal float literal (e.g. 0x1.99999a0000000p-4f)
+# 'fp16_bits' -> raw IEEE fp16 bit pattern, to initialize 16-bit integer buffers (e.g. 0x2e66)
+FORMATS = ['float', 'hex', 'fp16_bits']
+
+# Output mode of write_array():
+# 'text' -> C initializer lists written into the header file
+# 'bin'  -> raw little-endian data appended to a binary file, the header only gets extern
+#           declarations, while a small C source links the data in with .incbin
+OUTPUT_MODE = 'text'
+# Binary encoding of each C data type (fp16 is float16alt, i.e. bfloat16, in pulp_train_defines.h)
+BIN_ENCODINGS = {'float': 'fp32', 'fp16': 'bf16'}
+# Linker section of each memory attribute (as defined by the PULP SDK)
+BIN_SECTIONS = {'PI_L1': '.data_l1', 'PI_L2': '.l2_data', '': '.data'}
+# Alignment (bytes) of each array inside the binary file
+BIN_ALIGN = 8
+# State of the binary file which is being written
+bin_state = {'file': None, 'bin_path': '', 'src_path': '', 'offset': 0, 'arrays': []}
+# Folder where the outputs of the golden model are cached, one subfolder per configuration
+# (relative to the folder of the test, overridden by the GM_CACHE_DIR environment variable)
+GM_CACHE_DIR = '.gm_cache'
+# Extensions of the generated files which are cached
+GM_CACHE_EXTENSIONS = ('.h', '.c', '.bin')
+# State of the cache of the running golden model
+gm_cache_state = {'key': None, 'entry': '', 'files': {}, 'outputs': []}
+
+
+def tensor_to_numpy(tensor):
+	'''
+	Returns a flat, row-major numpy array with the content of a tensor of any rank
+	(torch tensors, numpy arrays and nested lists are accepted)
+	'''
+	if isinstance(tensor, torch.Tensor):
+		tensor = tensor.detach().cpu()
+		# numpy has no bfloat16, upcast (exact)
+		if tensor.dtype == torch.bfloat16:
+			tensor = tensor.float()
+		tensor = tensor.numpy()
+	return np.ascontiguousarray(tensor).reshape(-1)
+
+
+def format_chunk(array, fmt='float'):
+	'''
+	Formats a flat numpy array as a fragment of a C initializer list.
+	Every element is followed by ', ', so that fragments can be concatenated
+	(e.g. weights followed by biases).
+	'''
+	if array.size == 0:
+		return ''
+
+	if fmt == 'float':
+		# The C literal has the f suffix, so the target value is always the fp32 one.
+		# numpy prints the shortest string which uniquely identifies each fp32 value.
+		strings = array.astype(np.float32).astype(str)
+		return 'f, '.join(strings.tolist()) + 'f, '
+
+	elif fmt == 'hex':
+		# fp32 values are exactly representable as doubles, so float.hex() is exact
+		values = array.astype(np.float32).astype(np.float64).tolist()
+		return 'f, '.join(map(float.hex, values)) + 'f, '
+
+	elif fmt == 'fp16_bits':
+		bits = array.astype(np.float16).view(np.uint16)
+		return ', '.join(np.char.mod('0x%04x', bits).tolist()) + ', '
+
+	else:
+		print("[dump_utils.format_chunk]: Invalid format {}! Available formats are {}".format(fmt, FORMATS))
+		exit()
+
+
+def tensor_to_string(tensor, fmt='float'):
+	'''
+	Returns the content of a tensor of any rank as the body of a C array initializer
+	'''
+	array = tensor_to_numpy(tensor)
+	return ''.join([format_chunk(array[i:i+CHUNK_SIZE], fmt) for i in range(0, array.size, CHUNK_SIZE)])
+
+
+def write_tensor(f, tensor, fmt='float'):
+	'''
+	Streams the content of a tensor into the open file f, one chunk at a time,
+	without building the full string in memory
+	'''
+	array = tensor_to_numpy(tensor)
+	for i in range(0, array.size, CHUNK_SIZE):
+		f.write(format_chunk(array[i:i+CHUNK_SIZE], fmt))
+
+
+def write_array(f, name, tensors, data_type='float', mem_loc='PI_L2', size=None, fmt='float'):
+	'''
+	Streams a complete C array definition into the open file f:
+	<mem_loc> <data_type> <name>[<size>] = {...};
+	tensors can be a single tensor or a list of tensors stored one after the other (e.g. [weight, bias]).
+	size can be a number or a macro name, if None the number of elements is used.
+	'''
+	if not isinstance(tensors, (list, tuple)):
+		tensors = [tensors]
+	if size is None:
+		size = sum([tensor_to_numpy(t).size for t in tensors])
+	if OUTPUT_MODE == 'bin':
+		write_bin_array(f, name, tensors, data_type, mem_loc, size)
+		return
+	if mem_loc != '':
+		mem_loc += ' '
+	f.write('{}{} {}[{}] = {{'.format(mem_loc, data_type, name, size))
+	for t in tensors:
+		write_tensor(f, t, fmt)
+	f.write('};\n')
 
-def tensor_to_string(tensor):
-	tensor_string = ''
-	ndim = len(tensor.size())
-	print("NDIM", ndim)
-
-	if ndim == 1:
-		sz0 = tensor.size()[0]
-		for i in range(sz0):
-			tensor_string += str(tensor[i].item())
-			tensor_string += 'f, ';# if i < sz0-1 else 'f'
-
-	elif ndim == 2:
-		sz0 = tensor.size()[0]
-		sz1 = tensor.size()[1]
-		print('Sizes: ',sz0,sz1)
-		for i in range(sz0):
-			for j in range(sz1):
-				tensor_string += str(tensor[i][j].item())
-				tensor_string += 'f, ';# if (i*j) < (sz0-1)*(sz1-1) else 'f'
-
-	elif ndim == 3:
-		sz0 = tensor.size()[0]
-		sz1 = tensor.size()[1]
-		sz2 = tensor.size()[2]
-		print('Sizes: ', sz0, sz1, sz2)
-		for i in range(sz0):
-			for j in range(sz1):
-				for k in range(sz2):
-					tensor_string += str(tensor[i][j][k].item())
-					tensor_string += 'f, '; # if (i*j*k) < (sz0-1)*(sz1-1)*(sz2-1) else 'f'
-
-	elif ndim == 4:
-		sz0 = tensor.size()[0]
-		sz1 = tensor.size()[1]
-		sz2 = tensor.size()[2]
-		sz3 = tensor.size()[3]
-		print('Sizes: ', sz0, sz1, sz2, sz3)
-		for i in range(sz0):
-			for j in range(sz1):
-				for k in range(sz2):
-					for t in range(sz3):
-						tensor_string += str(tensor[i][j][k][t].item())
-						tensor_string += 'f, '; # if (i*j*k*t) < (sz0-1)*(sz1-1)*(sz2-1)*(sz3-1) else 'f'
 
+def tensor_to_bytes(tensor, encoding='fp32'):
+	'''
+	Returns the content of a tensor as raw little-endian bytes ('fp32', 'fp16' or 'bf16')
+	'''
+	array = tensor_to_numpy(tensor).astype(np.float32)
+	if encoding == 'fp32':
+		return array.astype('<f4').tobytes()
+	elif encoding == 'fp16':
+		return array.astype('<f2').tobytes()
+	elif encoding == 'bf16':
+		# Round to nearest even on the 16 truncated bits
+		bits = array.view(np.uint32).astype(np.uint64)
+		bits = (bits + 0x7FFF + ((bits >> 16) & 1)) >> 16
+		return bits.astype('<u2').tobytes()
 	else:
+		print("[dump_utils.tensor_to_bytes]: Invalid encoding {}!".format(encoding))
+		exit()
+
+
+def set_output_mode(mode, bin_path='io_data.bin', src_path='io_data_bin.c'):
+	'''
+	Selects how write_array() outputs the data ('text' or 'bin').
+	In 'bin' mode, data is appended to bin_path and close_output() generates src_path,
+	which must be compiled together with the application.
+	'''
+	global OUTPUT_MODE
+	if mode not in ['text', 'bin']:
+		print("[dump_utils.set_output_mode]: Invalid output mode {}!".format(mode))
+		exit()
+	OUTPUT_MODE = mode
+	if mode == 'bin':
+		bin_state['file'] = open(bin_path, 'wb')
+		bin_state['bin_path'] = bin_path
+		bin_state['src_path'] = src_path
+		bin_state['offset'] = 0
+		bin_state['arrays'] = []
+
+
+def write_bin_array(f, name, tensors, data_type='float', mem_loc='PI_L2', size=None):
+	'''
+	Appends the tensors to the binary file and writes into the header file f
+	the extern declaration of the array, with its offset and size in the binary file
+	'''
+	if bin_state['file'] is None:
+		print("[dump_utils.write_bin_array]: Binary file not opened, call set_output_mode('bin') first!")
+		exit()
+	if data_type not in BIN_ENCODINGS:
+		print("[dump_utils.write_bin_array]: No binary encoding for data type {}!".format(data_type))
+		exit()
+	if mem_loc not in BIN_SECTIONS:
+		print("[dump_utils.write_bin_array]: No linker section for {}!".format(mem_loc))
+		exit()
+	if not isinstance(tensors, (list, tuple)):
+		tensors = [tensors]
+
+	# Align array start
+	bin_file = bin_state['file']
+	padding = (-bin_state['offset']) % BIN_ALIGN
+	bin_file.write(bytes(padding))
+	bin_state['offset'] += padding
+
+	offset = bin_state['offset']
+	num_bytes = 0
+	num_elements = 0
+	for t in tensors:
+		data = tensor_to_bytes(t, BIN_ENCODINGS[data_type])
+		bin_file.write(data)
+		num_bytes += len(data)
+		num_elements += tensor_to_numpy(t).size
+	bin_state['offset'] += num_bytes
+	bin_state['arrays'].append([name, mem_loc, offset, num_bytes])
+
+	if size is None:
+		size = num_elements
+	if mem_loc != '':
+		mem_loc += ' '
+	f.write('#define {}_BIN_OFFSET {}\n'.format(name, offset))
+	f.write('#define {}_BIN_BYTES {}\n'.format(name, num_bytes))
+	f.write('extern {}{} {}[{}];\n'.format(mem_loc, data_type, name, size))
+
+
+def close_output():
+	'''
+	Closes the binary file (if any) and generates the C source which links its content
+	'''
+	global OUTPUT_MODE
+	if OUTPUT_MODE != 'bin':
+		return
+	bin_state['file'].close()
+	bin_state['file'] = None
+	OUTPUT_MODE = 'text'
+
+	# Absolute path, since .incbin is resolved from the directory of the assembler
+	bin_path = os.path.abspath(bin_state['bin_path'])
+	f = open(bin_state['src_path'], 'w')
+	f.write('// Data of {} ({} bytes), generated by dump_utils.py\n\n'.format(os.path.basename(bin_path), bin_state['offset']))
+	f.write('__asm__(\n')
+	for name, mem_loc, offset, num_bytes in bin_state['arrays']:
+		f.write('\t"\t.pushsection {}, \\"aw\\"\\n"\n'.format(BIN_SECTIONS[mem_loc]))
+		f.write('\t"\t.balign {}\\n"\n'.format(BIN_ALIGN))
+		f.write('\t"\t.global {}\\n"\n'.format(name))
+		f.write('\t"{}:\\n"\n'.format(name))
+		f.write('\t"\t.incbin \\"{}\\", {}, {}\\n"\n'.format(bin_path, offset, num_bytes))
+		f.write('\t"\t.popsection\\n"\n')
+	f.write(');\n')
+	f.close()
+
+
+
+def gm_cache_key(args=None):
+	'''
+	Returns the hash of the configuration of the golden model: its arguments (argparse namespace),
+	the source of the script (which holds its seeds and hyperparameters) and the source of dump_utils
+	'''
+	key = hashlib.sha1()
+	if args is not None:
+		key.update(json.dumps(sorted(vars(args).items()), default=str).encode())
+	for path in [sys.argv[0], __file__]:
+		with open(path, 'rb') as src:
+			key.update(src.read())
+	return key.hexdigest()
+
+
+def gm_cache_snapshot():
+	'''
+	Returns the modification time of the files of the current folder which can be stored in the cache
+	'''
+	return {name: os.stat(name).st_mtime_ns for name in os.listdir('.')
+		if os.path.isfile(name) and name.endswith(GM_CACHE_EXTENSIONS)}
+
+
+def restore_golden_model(args=None):
+	'''
+	Looks for the outputs of the same configuration (see gm_cache_key()) in the cache folder
+	(GM_CACHE_DIR environment variable, .gm_cache by default). If found, the changed ones are copied
+	into the current folder and True is returned, so that the golden model can exit.
+	Otherwise, the files written from now on are stored by store_golden_model().
+	Set the GM_CACHE environment variable to 0 (e.g. make get_golden GM_CACHE=0) to disable the cache.
+	'''
+	if os.environ.get('GM_CACHE', '1') == '0':
+		return False
+	key = gm_cache_key(args)
+	entry = os.path.join(os.environ.get('GM_CACHE_DIR', GM_CACHE_DIR), key)
+	manifest = os.path.join(entry, 'outputs.json')
+	if os.path.isfile(manifest):
+		with open(manifest, 'r') as f:
+			names = json.load(f)
+		if all([os.path.isfile(os.path.join(entry, name)) for name in names]):
+			for name in names:
+				src = os.path.join(entry, name)
+				if not os.path.isfile(name) or not filecmp.cmp(src, name, shallow=False):
+					shutil.copy2(src, name)
+			print("[dump_utils.restore_golden_model]: Golden model outputs restored from {}".format(entry))
+			return True
+	gm_cache_state['key'] = key
+	gm_cache_state['entry'] = entry
+	gm_cache_state['files'] = gm_cache_snapshot()
+	return False
+
+
+def store_golden_model():
+	'''
+	Stores the files written by the golden model since restore_golden_model() into the cache.
+	The data of the 'bin' output mode is not cached, since io_data_bin.c holds the absolute path of io_data.bin.
+	'''
+	if gm_cache_state['key'] is None or bin_state['bin_path'] != '':
+		return
+	before = gm_cache_state['files']
+	after = gm_cache_snapshot()
+	names = sorted(set([name for name in after if before.get(name) != after[name]] + [name for name in gm_cache_state['outputs'] if name in after]))
+
+	# Written in a temporary folder and renamed, so that concurrent golden models never see a partial entry
+	entry = gm_cache_state['entry']
+	tmp_entry = '{}.{}.tmp'.format(entry, os.getpid())
+	os.makedirs(tmp_entry, exist_ok=True)
+	for name in names:
+		shutil.copy2(name, os.path.join(tmp_entry, name))
+	with open(os.path.join(tmp_entry, 'outputs.json'), 'w') as f:
+		json.dump(names, f)
+	try:
+		os.rename(tmp_entry, entry)
+	except OSError:
+		# Already stored by another run
+		shutil.rmtree(tmp_entry, ignore_errors=True)
+	gm_cache_state['key'] = None
+
+
+class ChangedFile(io.StringIO):
+	'''
+	Text file kept in memory and written to path by close() only if its content changed,
+	so that the objects which include an unchanged header are not rebuilt
+	'''
+	def __init__(self, path):
+		super().__init__()
+		self.path = path
 
-		pass # FIXME to be implemented
+	def close(self):
+		if not self.closed:
+			content = self.getvalue()
+			old_content = None
+			if os.path.isfile(self.path):
+				with open(self.path, 'r') as f:
+					old_content = f.read()
+			if content != old_content:
+				with open(self.path, 'w') as f:
+					f.write(content)
+			gm_cache_state['outputs'].append(self.path)
+		super().close()
 
 
-	return tensor_string
+def open_if_changed(path):
+	'''
+	Opens a header for writing, its content is written to disk at close() only if it changed
+	'''
+	return ChangedFile(path)
 
 
 
@@ -76,17 +368,19 @@ def main():
 	    help="An integer will be increased by 1 and printed." )
 	parser.add_argument( '--out_size', type=int, default=2,
 	    help="An integer will be increased by 1 and printed." )
+	parser.add_argument( '--format', type=str, default='float', choices=FORMATS,
+	    help="Format of the dumped elements." )
 	args = parser.parse_args()
 
 	dim0_sz = args.in_size
 	dim1_sz = args.out_size
 	t = torch.rand(dim0_sz)
 	print(t)
-	print(tensor_to_string(t))
+	print(tensor_to_string(t, args.format))
 
 	t = torch.rand(dim1_sz, dim0_sz)
 	print(t)
-	print(tensor_to_string(t))
+	print(tensor_to_string(t, args.format))
 
 
 if __name__ == '__main__':